@@ -0,0 +1,78 @@
+"""
+Micro-benchmark for the TaskMateAI JSON serializer.
+
+Compares the previous pretty-printed json.dumps path with the compact
+serializer on a synthetic store of 10,000 tasks.
+
+Usage:
+    python benchmarks/bench_serializer.py [--tasks 10000] [--repeat 5]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+# Add src to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from taskmateai import serializer
+
+
+def make_store(count):
+    return [
+        {
+            "id": i,
+            "title": f"タスク {i}",
+            "description": "ベンチマーク用のタスクの説明文です。" * 2,
+            "priority": i % 5 + 1,
+            "status": ("todo", "in_progress", "done")[i % 3],
+            "progress": (i * 7) % 101,
+            "subtasks": [{"id": j, "description": f"サブタスク {j}", "status": "todo"} for j in range(1, 4)],
+            "notes": [{"id": 1, "content": "ノート", "timestamp": "2025-01-01T00:00:00"}],
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def best_of(repeat, func):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    tasks = make_store(args.tasks)
+    cases = [
+        ("json.dumps indent=2 (previous)", lambda: json.dumps(tasks, indent=2, ensure_ascii=False).encode("utf-8")),
+        ("json.dumps compact (fallback)", lambda: json.dumps(tasks, ensure_ascii=False,
+                                                             separators=(",", ":")).encode("utf-8")),
+        ("serializer pretty", lambda: serializer.dumps_bytes(tasks, pretty=True)),
+        (f"serializer compact ({serializer.BACKEND})", lambda: serializer.dumps_bytes(tasks)),
+    ]
+
+    print(f"{args.tasks} tasks, best of {args.repeat}")
+    baseline = None
+    for label, func in cases:
+        seconds, data = best_of(args.repeat, func)
+        baseline = baseline or seconds
+        print(f"  encode {label:<36} {seconds * 1000:8.1f} ms  {len(data) / 1024:8.0f} KiB  x{baseline / seconds:.1f}")
+
+    data = serializer.dumps_bytes(tasks)
+    for label, func in (("json.loads", lambda: json.loads(data)),
+                        (f"serializer.loads ({serializer.BACKEND})", lambda: serializer.loads(data))):
+        seconds, _ = best_of(args.repeat, func)
+        print(f"  decode {label:<36} {seconds * 1000:8.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""
+Cold startup benchmark for the TaskMateAI stdio server.
+
+Spawns a fresh server process per run, the way an MCP client launches it for
+every agent, and measures the time from spawn to the responses of initialize,
+the first tools/list and the first get_tasks call. Also reports the import
+time of taskmateai.server from `python -X importtime`, split into the total
+and the part spent in TaskMateAI's own modules. Results use the same JSON
+layout as bench_tools.py, so --compare works the same way.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 10] [--tasks 1000]
+                                       [--output startup.json] [--compare baseline.json]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import datetime
+import subprocess
+import tempfile
+
+# Add this directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from synthetic import write_stores
+from bench_tools import compare, git_commit, summarize
+
+SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), '../src'))
+SERVER_COMMAND = [sys.executable, "-c", "import taskmateai; taskmateai.main()"]
+
+
+def environment():
+    env = dict(os.environ)
+    env["PYTHONPATH"] = SRC + (os.pathsep + env["PYTHONPATH"] if env.get("PYTHONPATH") else "")
+    return env
+
+
+def request(request_id, method, params=None):
+    message = {"jsonrpc": "2.0", "id": request_id, "method": method}
+    if params is not None:
+        message["params"] = params
+    return (json.dumps(message) + "\n").encode("utf-8")
+
+
+def read_response(proc, request_id):
+    while True:
+        line = proc.stdout.readline()
+        if not line:
+            raise RuntimeError(f"server exited before responding: {proc.stderr.read().decode(errors='replace')}")
+        message = json.loads(line)
+        if message.get("id") == request_id:
+            if "error" in message:
+                raise RuntimeError(f"request {request_id} failed: {message['error']}")
+            return message
+
+
+def startup_once(workdir):
+    """Spawn the server and return the seconds until each of the first responses."""
+    from mcp.types import LATEST_PROTOCOL_VERSION
+
+    start = time.perf_counter()
+    proc = subprocess.Popen(SERVER_COMMAND, cwd=workdir, env=environment(),
+                            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        proc.stdin.write(request(1, "initialize", {
+            "protocolVersion": LATEST_PROTOCOL_VERSION,
+            "capabilities": {},
+            "clientInfo": {"name": "bench_startup", "version": "0"},
+        }))
+        proc.stdin.flush()
+        read_response(proc, 1)
+        initialized = time.perf_counter() - start
+
+        proc.stdin.write(b'{"jsonrpc": "2.0", "method": "notifications/initialized"}\n')
+        proc.stdin.write(request(2, "tools/list"))
+        proc.stdin.flush()
+        read_response(proc, 2)
+        listed = time.perf_counter() - start
+
+        proc.stdin.write(request(3, "tools/call", {"name": "get_tasks", "arguments": {"limit": 50}}))
+        proc.stdin.flush()
+        read_response(proc, 3)
+        called = time.perf_counter() - start
+    finally:
+        proc.stdin.close()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+        proc.stdout.close()
+        proc.stderr.close()
+    return {"initialize": initialized, "first tools/list": listed, "first get_tasks": called}
+
+
+def import_times(workdir):
+    """Return (total, own modules) import time of taskmateai.server in seconds."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import taskmateai.server"],
+                            cwd=workdir, env=environment(), capture_output=True, text=True, check=True)
+    total = own = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line[12:]:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[12:].split("|"))
+        if not self_us.isdigit():
+            continue
+        if name.startswith("taskmateai"):
+            own += int(self_us)
+        if name == "taskmateai.server":
+            total = int(cumulative_us)
+    return total / 1e6, own / 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--tasks", type=int, default=1000, help="size of the default store")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="baseline JSON file from an earlier run")
+    parser.add_argument("--threshold", type=float, default=1.5,
+                        help="p50 slowdown ratio reported as a regression by --compare")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="taskmate-startup-")
+    write_stores(os.path.join(workdir, "output"), args.tasks)
+
+    # 1回目はバイトコードのコンパイルを含むため計測しない
+    startup_once(workdir)
+    samples = {}
+    for _ in range(args.runs):
+        for label, seconds in startup_once(workdir).items():
+            samples.setdefault(label, []).append(seconds)
+        total, own = import_times(workdir)
+        samples.setdefault("import taskmateai.server", []).append(total)
+        samples.setdefault("import (own modules)", []).append(own)
+
+    print(f"{args.runs} runs, {args.tasks} tasks")
+    results = []
+    for label, values in samples.items():
+        result = {"op": label, "tasks": args.tasks, "agents": 1, "storage": "json",
+                  **summarize(values, sum(values))}
+        del result["ops_per_sec"]
+        results.append(result)
+        print(f"  {label:<28} p50 {result['p50_ms']:9.3f} ms  p99 {result['p99_ms']:9.3f} ms")
+
+    report = {
+        "benchmark": "startup",
+        "commit": git_commit(),
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nwrote {args.output}")
+    if args.compare:
+        return 1 if compare(results, args.compare, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+"""
+Latency and throughput benchmark for the TaskMateAI tools and resources.
+
+Generates synthetic stores of each requested size and measures p50/p99
+latency and throughput of every call_tool operation, read_resource and
+list_resources against them. Results are written as JSON so runs from
+different commits can be compared with --compare.
+
+Usage:
+    python benchmarks/bench_tools.py [--tasks 100,1000,10000] [--agents 1,100]
+                                     [--storage json] [--iterations 100]
+                                     [--output results.json] [--compare baseline.json]
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+import datetime
+import statistics
+import subprocess
+import tempfile
+
+# Add src and this directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from synthetic import make_store, write_stores
+
+
+def operations(tasks, agents, storage):
+    """Return (label, tool name or kind, argument factory, cold) for every measured operation."""
+    rng = random.Random(1)
+
+    def task_id():
+        return rng.randint(1, tasks)
+
+    ops = [
+        ("get_tasks", "get_tasks", lambda i: {}, False),
+        ("get_tasks (cold cache)", "get_tasks", lambda i: {}, True),
+        ("get_tasks limit=50 summary", "get_tasks", lambda i: {"limit": 50, "summary": True}, False),
+        ("get_tasks status=todo fields", "get_tasks",
+         lambda i: {"status": "todo", "fields": ["id", "title", "priority"]}, False),
+        ("read_resource pending?limit=50", "resource", lambda i: "taskmate://tasks/pending?limit=50", False),
+        ("read_resource all?summary=1", "resource", lambda i: "taskmate://tasks/all?summary=1", False),
+        ("list_resources", "list_resources", lambda i: None, False),
+        ("list_agents", "list_agents", lambda i: {}, False),
+        ("get_next_task", "get_next_task", lambda i: {}, False),
+        ("claim_next_tasks", "claim_next_tasks", lambda i: {"claimant": f"bench{i}", "count": 1}, False),
+        ("heartbeat", "heartbeat", lambda i: {"task_id": task_id(), "claimant": "bench"}, False),
+        ("update_progress", "update_progress", lambda i: {"task_id": task_id(), "progress": 50}, False),
+        ("update_subtask", "update_subtask",
+         lambda i: {"task_id": task_id(), "subtask_id": 1, "status": "done"}, False),
+        ("add_subtask", "add_subtask", lambda i: {"task_id": task_id(), "description": "追加"}, False),
+        ("add_note", "add_note", lambda i: {"task_id": task_id(), "content": "ノート"}, False),
+        ("complete_task", "complete_task", lambda i: {"task_id": task_id()}, False),
+        ("create_task", "create_task", lambda i: {"title": f"新しいタスク {i}", "description": "d"}, False),
+        ("create_tasks x5", "create_tasks",
+         lambda i: {"tasks": [{"title": f"一括 {i}-{j}", "description": "d"} for j in range(5)]}, False),
+        ("update_progress_many x5", "update_progress_many",
+         lambda i: {"updates": [{"task_id": task_id(), "progress": 20} for _ in range(5)]}, False),
+        ("complete_tasks x5", "complete_tasks", lambda i: {"task_ids": [task_id() for _ in range(5)]}, False),
+        ("add_notes x5", "add_notes",
+         lambda i: {"notes": [{"task_id": task_id(), "content": "ノート"} for _ in range(5)]}, False),
+    ]
+    if agents > 1:
+        ops.append(("list_projects", "list_projects", lambda i: {"agent_id": "agent0000"}, False))
+    if storage == "journal":
+        ops.append(("get_task_history", "get_task_history", lambda i: {"task_id": task_id()}, False))
+    return ops
+
+
+def summarize(samples, elapsed):
+    ordered = sorted(samples)
+    p99 = statistics.quantiles(ordered, n=100)[98] if len(ordered) > 1 else ordered[0]
+    return {
+        "iterations": len(samples),
+        "p50_ms": round(statistics.median(ordered) * 1000, 4),
+        "p99_ms": round(p99 * 1000, 4),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 4),
+        "ops_per_sec": round(len(samples) / elapsed, 1) if elapsed > 0 else None,
+    }
+
+
+async def measure(server, kind, make_args, cold, iterations):
+    from mcp.types import ListResourcesRequest
+
+    samples = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        args = make_args(i)
+        if cold:
+            server.task_cache.invalidate()
+        start = time.perf_counter()
+        if kind == "resource":
+            await server.read_resource(args)
+        elif kind == "list_resources":
+            await server.list_resources(ListResourcesRequest(method="resources/list"))
+        else:
+            result = await server.call_tool(kind, args)
+            if "予期せぬエラー" in result[0].text:
+                raise RuntimeError(f"{kind} failed: {result[0].text}")
+        samples.append(time.perf_counter() - start)
+    return samples, time.perf_counter() - started
+
+
+def prepare(server, workdir, tasks, agents, storage, subtasks, notes):
+    output_dir = tempfile.mkdtemp(prefix="stores-", dir=workdir)
+    stores = write_stores(output_dir, tasks, agents, subtasks=subtasks, notes=notes)
+    server.OUTPUT_DIR = output_dir
+    server.STORAGE_MODE = storage
+    server.task_cache.invalidate()
+    server.store_catalog.invalidate()
+    if storage == "sqlite":
+        server.sqlite_store = server.SQLiteStore(os.path.join(output_dir, "taskmate.db"))
+        for agent_id, project_name in stores:
+            server.sqlite_store.save(make_store(tasks if agent_id is None else 10, subtasks, notes),
+                                     agent_id, project_name)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, baseline_path, threshold):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["op"], r["tasks"], r["agents"], r["storage"]): r for r in json.load(f)["results"]}
+    regressions = 0
+    print(f"\ncompared with {baseline_path} (p50, threshold x{threshold})")
+    for result in results:
+        before = baseline.get((result["op"], result["tasks"], result["agents"], result["storage"]))
+        if before is None or not before["p50_ms"]:
+            continue
+        ratio = result["p50_ms"] / before["p50_ms"]
+        flag = "  REGRESSION" if ratio > threshold else ""
+        regressions += bool(flag)
+        print(f"  {result['op']:<32} {result['tasks']:>7} tasks {result['agents']:>5} agents  x{ratio:5.2f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tasks", default="100,1000,10000", help="comma separated store sizes (up to 100000)")
+    parser.add_argument("--agents", default="1", help="comma separated agent counts (up to 1000)")
+    parser.add_argument("--subtasks", type=int, default=3)
+    parser.add_argument("--notes", type=int, default=1)
+    parser.add_argument("--storage", default="json", choices=("json", "journal", "sqlite"))
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--ops", help="comma separated operation labels to run (default: all)")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="baseline JSON file from an earlier run")
+    parser.add_argument("--threshold", type=float, default=1.5,
+                        help="p50 slowdown ratio reported as a regression by --compare")
+    args = parser.parse_args(argv)
+
+    # 既定の出力ディレクトリ (output) に書き込まないよう、作業用のディレクトリに移動してから読み込む
+    workdir = tempfile.mkdtemp(prefix="taskmate-bench-")
+    os.chdir(workdir)
+    from taskmateai import server
+
+    results = []
+    for agents in (int(a) for a in args.agents.split(",")):
+        for tasks in (int(t) for t in args.tasks.split(",")):
+            print(f"{tasks} tasks, {agents} agents, {args.storage}, {args.iterations} iterations")
+            for label, kind, make_args, cold in operations(tasks, agents, args.storage):
+                if args.ops and label not in args.ops.split(","):
+                    continue
+                # 変更するツールでもストアの大きさが変わらないよう、操作ごとにストアを作り直す
+                prepare(server, workdir, tasks, agents, args.storage, args.subtasks, args.notes)
+                asyncio.run(measure(server, kind, make_args, False, 1))
+                samples, elapsed = asyncio.run(measure(server, kind, make_args, cold, args.iterations))
+                result = {"op": label, "tasks": tasks, "agents": agents, "storage": args.storage,
+                          **summarize(samples, elapsed)}
+                results.append(result)
+                print(f"  {label:<32} p50 {result['p50_ms']:9.3f} ms  p99 {result['p99_ms']:9.3f} ms"
+                      f"  {result['ops_per_sec']:>9} ops/s")
+    server.flush_pending_writes()
+
+    report = {
+        "benchmark": "tools",
+        "commit": git_commit(),
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "serializer": server.serializer.BACKEND,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nwrote {args.output}")
+    if args.compare:
+        return 1 if compare(results, args.compare, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+"""
+Synthetic task stores for the TaskMateAI benchmarks and performance tests.
+"""
+import os
+import json
+import random
+
+
+def make_task(task_id, subtasks=3, notes=1, rng=None):
+    rng = rng or random.Random(task_id)
+    status = rng.choice(("todo", "todo", "in_progress", "done"))
+    task = {
+        "id": task_id,
+        "title": f"タスク {task_id}",
+        "description": "ベンチマーク用のタスクの説明文です。" * 2,
+        "priority": rng.randint(1, 5),
+        "status": status,
+        "progress": 100 if status == "done" else rng.choice((0, 10, 50)),
+        "subtasks": [{"id": j, "description": f"サブタスク {j}", "status": rng.choice(("todo", "done"))}
+                     for j in range(1, subtasks + 1)],
+        "notes": [{"id": j, "content": f"ノート {j}", "timestamp": "2025-01-01T00:00:00"}
+                  for j in range(1, notes + 1)],
+    }
+    if status == "done":
+        task["completed_at"] = "2025-01-01T00:00:00"
+    return task
+
+
+def make_store(count, subtasks=3, notes=1, seed=0):
+    """Return a list of count tasks with a fixed mix of statuses and priorities."""
+    rng = random.Random(seed)
+    return [make_task(i, subtasks, notes, rng) for i in range(1, count + 1)]
+
+
+def write_store(tasks_file, tasks):
+    os.makedirs(os.path.dirname(tasks_file), exist_ok=True)
+    with open(tasks_file, "w", encoding="utf-8") as f:
+        json.dump(tasks, f, ensure_ascii=False, separators=(",", ":"))
+
+
+def write_stores(output_dir, tasks=1000, agents=1, projects=0, subtasks=3, notes=1):
+    """
+    Write a default store plus one store per agent (and per project) under output_dir.
+
+    The default store gets `tasks` tasks; every agent and project store gets a
+    small store of 10 tasks so that wide layouts stay cheap to generate.
+
+    Returns the list of (agent_id, project_name) keys written.
+    """
+    write_store(os.path.join(output_dir, "tasks.json"), make_store(tasks, subtasks, notes))
+    stores = [(None, None)]
+    small = make_store(10, subtasks, notes)
+    for a in range(agents - 1):
+        agent_id = f"agent{a:04d}"
+        write_store(os.path.join(output_dir, agent_id, "tasks.json"), small)
+        stores.append((agent_id, None))
+        for p in range(projects):
+            project_name = f"project{p:03d}"
+            write_store(os.path.join(output_dir, agent_id, project_name, "tasks.json"), small)
+            stores.append((agent_id, project_name))
+    return stores
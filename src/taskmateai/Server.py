@@ -1,869 +1,2363 @@
-import os
-import json
-import logging
-import asyncio
-from typing import Any, Dict, List, Optional, Sequence
-from dotenv import load_dotenv
-from mcp.server import Server
-from mcp.types import (
-    Resource,
-    Tool,
-    TextContent,
-    ImageContent,
-    EmbeddedResource
-)
-from pydantic import AnyUrl
-
-# 環境変数の読み込み
-load_dotenv()
-
-# ログの準備
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger("taskmate-server")
-
-# JSONファイルのパス設定
-OUTPUT_DIR = "output"
-DEFAULT_TASKS_FILE = os.path.join(OUTPUT_DIR, "tasks.json")
-
-# 出力ディレクトリが存在しない場合は作成
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-
-# サーバの準備
-app = Server("taskmate-server")
-
-# タスクファイルのパスを取得する関数
-def get_tasks_file_path(agent_id: Optional[str] = None, project_name: Optional[str] = None) -> str:
-    """
-    タスクファイルのパスを生成する関数。
-    
-    Args:
-        agent_id: エージェントID（オプション）
-        project_name: プロジェクト名（オプション）
-        
-    Returns:
-        str: タスクファイルのパス
-    """
-    path_components = [OUTPUT_DIR]
-    
-    if agent_id:
-        path_components.append(agent_id)
-        
-        if project_name:
-            path_components.append(project_name)
-    
-    path_components.append("tasks.json")
-    tasks_file_path = os.path.join(*path_components)
-    
-    # 親ディレクトリが存在することを確認
-    os.makedirs(os.path.dirname(tasks_file_path), exist_ok=True)
-    
-    return tasks_file_path
-
-# JSONファイルから全タスクを読み込む関数
-def read_tasks(agent_id: Optional[str] = None, project_name: Optional[str] = None) -> List[Dict]:
-    """
-    JSONファイルからタスクを読み込む関数。
-    
-    Args:
-        agent_id: エージェントID（オプション）
-        project_name: プロジェクト名（オプション）
-        
-    Returns:
-        List[Dict]: タスクのリスト
-    """
-    tasks_file = get_tasks_file_path(agent_id, project_name)
-    
-    if not os.path.exists(tasks_file):
-        # ファイルが存在しない場合は空のリストを返す
-        return []
-    
-    try:
-        with open(tasks_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except json.JSONDecodeError:
-        logger.error("JSONファイルの解析エラー")
-        return []
-    except Exception as e:
-        logger.error(f"タスクの読み込みエラー: {str(e)}")
-        return []
-
-# JSONファイルにタスクを書き込む関数
-def write_tasks(tasks: List[Dict], agent_id: Optional[str] = None, project_name: Optional[str] = None) -> None:
-    """
-    JSONファイルにタスクを書き込む関数。
-    
-    Args:
-        tasks: 書き込むタスクのリスト
-        agent_id: エージェントID（オプション）
-        project_name: プロジェクト名（オプション）
-        
-    Raises:
-        RuntimeError: タスクの保存に失敗した場合
-    """
-    tasks_file = get_tasks_file_path(agent_id, project_name)
-    
-    try:
-        # 親ディレクトリが存在することを確認
-        os.makedirs(os.path.dirname(tasks_file), exist_ok=True)
-        
-        with open(tasks_file, 'w', encoding='utf-8') as f:
-            json.dump(tasks, f, indent=2, ensure_ascii=False)
-    except Exception as e:
-        logger.error(f"タスクの書き込みエラー: {str(e)}")
-        raise RuntimeError(f"タスクの保存に失敗しました: {str(e)}")
-
-# 利用可能なエージェントの一覧を取得する関数
-def list_agents() -> List[str]:
-    """
-    利用可能なエージェントの一覧を取得する関数。
-    
-    Returns:
-        List[str]: エージェントIDのリスト
-    """
-    agents = []
-    
-    try:
-        # エージェントディレクトリを検索
-        for item in os.listdir(OUTPUT_DIR):
-            item_path = os.path.join(OUTPUT_DIR, item)
-            if os.path.isdir(item_path):
-                agents.append(item)
-    except Exception as e:
-        logger.error(f"エージェント一覧の取得エラー: {str(e)}")
-    
-    return agents
-
-# 特定のエージェントに関連するプロジェクトの一覧を取得する関数
-def list_projects(agent_id: str) -> List[str]:
-    """
-    特定のエージェントに関連するプロジェクトの一覧を取得する関数。
-    
-    Args:
-        agent_id: エージェントID
-        
-    Returns:
-        List[str]: プロジェクト名のリスト
-    """
-    projects = []
-    agent_dir = os.path.join(OUTPUT_DIR, agent_id)
-    
-    if not os.path.exists(agent_dir) or not os.path.isdir(agent_dir):
-        return projects
-    
-    try:
-        # プロジェクトディレクトリを検索
-        for item in os.listdir(agent_dir):
-            item_path = os.path.join(agent_dir, item)
-            if os.path.isdir(item_path):
-                projects.append(item)
-    except Exception as e:
-        logger.error(f"プロジェクト一覧の取得エラー: {str(e)}")
-    
-    return projects
-
-# 新しいタスクIDを生成する関数
-def generate_task_id(tasks):
-    if not tasks:
-        return 1
-    return max(task.get("id", 0) for task in tasks) + 1
-
-# 新しいサブタスクIDを生成する関数
-def generate_subtask_id(subtasks):
-    if not subtasks:
-        return 1
-    return max(subtask.get("id", 0) for subtask in subtasks) + 1
-
-# 利用可能なTODOリソース一覧の取得
-@app.list_resources()
-async def list_resources() -> list[Resource]:
-    resources = []
-    
-    # デフォルトリソース
-    resources.extend([
-        Resource(
-            uri=AnyUrl("taskmate://tasks/all"),
-            name="All Tasks",
-            mimeType="application/json",
-            description="Complete list of all tasks"
-        ),
-        Resource(
-            uri=AnyUrl("taskmate://tasks/pending"),
-            name="Pending Tasks",
-            mimeType="application/json",
-            description="List of tasks not yet completed"
-        ),
-        Resource(
-            uri=AnyUrl("taskmate://tasks/completed"),
-            name="Completed Tasks",
-            mimeType="application/json",
-            description="List of completed tasks"
-        )
-    ])
-    
-    # エージェントごとのリソース
-    for agent_id in list_agents():
-        # エージェントレベルのリソース
-        resources.extend([
-            Resource(
-                uri=AnyUrl(f"taskmate://{agent_id}/tasks/all"),
-                name=f"All Tasks for {agent_id}",
-                mimeType="application/json",
-                description=f"Complete list of all tasks for agent {agent_id}"
-            ),
-            Resource(
-                uri=AnyUrl(f"taskmate://{agent_id}/tasks/pending"),
-                name=f"Pending Tasks for {agent_id}",
-                mimeType="application/json",
-                description=f"List of tasks not yet completed for agent {agent_id}"
-            ),
-            Resource(
-                uri=AnyUrl(f"taskmate://{agent_id}/tasks/completed"),
-                name=f"Completed Tasks for {agent_id}",
-                mimeType="application/json",
-                description=f"List of completed tasks for agent {agent_id}"
-            )
-        ])
-        
-        # プロジェクトごとのリソース
-        for project_name in list_projects(agent_id):
-            resources.extend([
-                Resource(
-                    uri=AnyUrl(f"taskmate://{agent_id}/{project_name}/tasks/all"),
-                    name=f"All Tasks for {agent_id}/{project_name}",
-                    mimeType="application/json",
-                    description=f"Complete list of all tasks for agent {agent_id} in project {project_name}"
-                ),
-                Resource(
-                    uri=AnyUrl(f"taskmate://{agent_id}/{project_name}/tasks/pending"),
-                    name=f"Pending Tasks for {agent_id}/{project_name}",
-                    mimeType="application/json",
-                    description=f"List of tasks not yet completed for agent {agent_id} in project {project_name}"
-                ),
-                Resource(
-                    uri=AnyUrl(f"taskmate://{agent_id}/{project_name}/tasks/completed"),
-                    name=f"Completed Tasks for {agent_id}/{project_name}",
-                    mimeType="application/json",
-                    description=f"List of completed tasks for agent {agent_id} in project {project_name}"
-                )
-            ])
-    
-    return resources
-
-# 特定のTODOリソースの取得
-@app.read_resource()
-async def read_resource(uri: AnyUrl) -> str:
-    uri_str = str(uri)
-    
-    # エージェントとプロジェクトを抽出 (例: "taskmate://agent1/project1/tasks/all")
-    uri_parts = uri_str.replace("taskmate://", "").split("/")
-    
-    agent_id = None
-    project_name = None
-    resource_type = None
-    
-    if len(uri_parts) >= 3 and uri_parts[-2] == "tasks":
-        # エージェントとプロジェクトが指定されている場合 (taskmate://agent/project/tasks/all)
-        agent_id = uri_parts[0]
-        project_name = uri_parts[1]
-        resource_type = uri_parts[-1]
-    elif len(uri_parts) >= 2 and uri_parts[-2] == "tasks":
-        # エージェントのみ指定されている場合 (taskmate://agent/tasks/all)
-        agent_id = uri_parts[0]
-        resource_type = uri_parts[-1]
-    elif len(uri_parts) >= 1:
-        # 従来の形式の場合 (taskmate://tasks/all)
-        resource_type = uri_parts[-1]
-    else:
-        raise ValueError(f"不正なリソースURI: {uri}")
-    
-    # すべてのタスクを読み込む
-    tasks = read_tasks(agent_id, project_name)
-    
-    # リソースURIに基づいてフィルタリング
-    if resource_type == "all":
-        filtered_tasks = tasks
-    elif resource_type == "pending":
-        filtered_tasks = [t for t in tasks if t.get("status") in ["todo", "in_progress"]]
-    elif resource_type == "completed":
-        filtered_tasks = [t for t in tasks if t.get("status") == "done"]
-    else:
-        raise ValueError(f"Unknown resource: {uri}")
-    
-    return json.dumps(filtered_tasks, indent=2, ensure_ascii=False)
-
-# 利用可能なTODOツール一覧の取得
-@app.list_tools()
-async def list_tools() -> list[Tool]:
-    return [
-        Tool(
-            name="list_agents",
-            description="登録されているエージェントの一覧を取得します。",
-            inputSchema={
-                "type": "object",
-                "properties": {}
-            }
-        ),
-        Tool(
-            name="list_projects",
-            description="特定のエージェントに関連するプロジェクトの一覧を取得します。",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "agent_id": {
-                        "type": "string",
-                        "description": "エージェントID"
-                    }
-                },
-                "required": ["agent_id"]
-            }
-        ),
-        Tool(
-            name="get_tasks",
-            description="現在のタスクリストを取得します。優先度や進捗状況でフィルタリングできます。",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "status": {
-                        "type": "string",
-                        "description": "タスクのステータス ('todo', 'in_progress', 'done')",
-                        "enum": ["todo", "in_progress", "done"]
-                    },
-                    "priority_min": {
-                        "type": "integer",
-                        "description": "最小優先度 (1-5)",
-                        "minimum": 1,
-                        "maximum": 5
-                    },
-                    "agent_id": {
-                        "type": "string",
-                        "description": "タスクの対象エージェントID"
-                    },
-                    "project_name": {
-                        "type": "string",
-                        "description": "タスクの対象プロジェクト名"
-                    }
-                }
-            }
-        ),
-        Tool(
-            name="get_next_task",
-            description="優先度の高い次のタスクを取得し、自動的に'in_progress'ステータスに更新します。",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "agent_id": {
-                        "type": "string",
-                        "description": "タスクの対象エージェントID"
-                    },
-                    "project_name": {
-                        "type": "string",
-                        "description": "タスクの対象プロジェクト名"
-                    }
-                }
-            }
-        ),
-        Tool(
-            name="create_task",
-            description="新しいタスクを作成します。サブタスクも定義できます。",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "title": {
-                        "type": "string",
-                        "description": "タスクのタイトル"
-                    },
-                    "description": {
-                        "type": "string",
-                        "description": "タスクの詳細な説明"
-                    },
-                    "priority": {
-                        "type": "integer",
-                        "description": "タスクの優先度 (1-5, 5が最高)",
-                        "minimum": 1,
-                        "maximum": 5,
-                        "default": 3
-                    },
-                    "subtasks": {
-                        "type": "array",
-                        "description": "サブタスクの説明リスト",
-                        "items": {
-                            "type": "string"
-                        }
-                    },
-                    "agent_id": {
-                        "type": "string",
-                        "description": "タスクの対象エージェントID"
-                    },
-                    "project_name": {
-                        "type": "string",
-                        "description": "タスクの対象プロジェクト名"
-                    }
-                },
-                "required": ["title", "description"]
-            }
-        ),
-        Tool(
-            name="update_progress",
-            description="タスクの進捗を更新します。",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "task_id": {
-                        "type": "integer",
-                        "description": "タスクID"
-                    },
-                    "progress": {
-                        "type": "number",
-                        "description": "タスクの進捗率 (0-100)",
-                        "minimum": 0,
-                        "maximum": 100
-                    },
-                    "agent_id": {
-                        "type": "string",
-                        "description": "タスクの対象エージェントID"
-                    },
-                    "project_name": {
-                        "type": "string",
-                        "description": "タスクの対象プロジェクト名"
-                    }
-                },
-                "required": ["task_id", "progress"]
-            }
-        ),
-        Tool(
-            name="complete_task",
-            description="タスクを完了としてマークします。",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "task_id": {
-                        "type": "integer",
-                        "description": "タスクID"
-                    },
-                    "agent_id": {
-                        "type": "string",
-                        "description": "タスクの対象エージェントID"
-                    },
-                    "project_name": {
-                        "type": "string",
-                        "description": "タスクの対象プロジェクト名"
-                    }
-                },
-                "required": ["task_id"]
-            }
-        ),
-        Tool(
-            name="add_subtask",
-            description="既存タスクにサブタスクを追加します。",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "task_id": {
-                        "type": "integer",
-                        "description": "親タスクID"
-                    },
-                    "description": {
-                        "type": "string",
-                        "description": "サブタスクの説明"
-                    },
-                    "agent_id": {
-                        "type": "string",
-                        "description": "タスクの対象エージェントID"
-                    },
-                    "project_name": {
-                        "type": "string",
-                        "description": "タスクの対象プロジェクト名"
-                    }
-                },
-                "required": ["task_id", "description"]
-            }
-        ),
-        Tool(
-            name="update_subtask",
-            description="サブタスクのステータスを更新します。",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "task_id": {
-                        "type": "integer",
-                        "description": "親タスクID"
-                    },
-                    "subtask_id": {
-                        "type": "integer",
-                        "description": "サブタスクID"
-                    },
-                    "status": {
-                        "type": "string",
-                        "description": "サブタスクの新しいステータス ('todo', 'in_progress', 'done')",
-                        "enum": ["todo", "in_progress", "done"]
-                    },
-                    "agent_id": {
-                        "type": "string",
-                        "description": "タスクの対象エージェントID"
-                    },
-                    "project_name": {
-                        "type": "string",
-                        "description": "タスクの対象プロジェクト名"
-                    }
-                },
-                "required": ["task_id", "subtask_id", "status"]
-            }
-        ),
-        Tool(
-            name="add_note",
-            description="タスクにノートを追加します。",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "task_id": {
-                        "type": "integer",
-                        "description": "タスクID"
-                    },
-                    "content": {
-                        "type": "string",
-                        "description": "ノートの内容"
-                    },
-                    "agent_id": {
-                        "type": "string",
-                        "description": "タスクの対象エージェントID"
-                    },
-                    "project_name": {
-                        "type": "string",
-                        "description": "タスクの対象プロジェクト名"
-                    }
-                },
-                "required": ["task_id", "content"]
-            }
-        )
-    ]
-
-# TODOツールの呼び出し
-@app.call_tool()
-async def call_tool(name: str, arguments: Any) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
-    # ツール名の検証
-    valid_tools = ["get_tasks", "get_next_task", "create_task", "update_progress", 
-                 "complete_task", "add_subtask", "update_subtask", "add_note",
-                 "list_agents", "list_projects"]
-    if name not in valid_tools:
-        raise ValueError(f"Unknown tool: {name}")
-
-    # 引数の型確認
-    if not isinstance(arguments, dict):
-        raise ValueError("Invalid arguments: must be a dictionary")
-
-    try:
-        # 共通パラメータの取得
-        agent_id = arguments.get("agent_id")
-        project_name = arguments.get("project_name")
-        
-        # エージェント一覧の取得
-        if name == "list_agents":
-            agents = list_agents()
-            return [TextContent(type="text", text=json.dumps(agents, indent=2, ensure_ascii=False))]
-        
-        # プロジェクト一覧の取得
-        elif name == "list_projects":
-            # 必須パラメータの確認
-            if "agent_id" not in arguments:
-                raise ValueError("Missing required parameter: agent_id")
-                
-            agent_id = arguments["agent_id"]
-            projects = list_projects(agent_id)
-            return [TextContent(type="text", text=json.dumps(projects, indent=2, ensure_ascii=False))]
-        
-        # get_tasks - タスク一覧の取得
-        elif name == "get_tasks":
-            tasks = read_tasks(agent_id, project_name)
-            
-            # フィルタリング
-            if "status" in arguments and arguments["status"]:
-                tasks = [t for t in tasks if t.get("status") == arguments["status"]]
-            if "priority_min" in arguments:
-                tasks = [t for t in tasks if t.get("priority", 0) >= arguments["priority_min"]]
-            
-            return [TextContent(type="text", text=json.dumps(tasks, indent=2, ensure_ascii=False))]
-        
-        # get_next_task - 次のタスクの取得
-        elif name == "get_next_task":
-            tasks = read_tasks(agent_id, project_name)
-            
-            # 未完了のタスクをフィルタリング
-            pending_tasks = [t for t in tasks if t.get("status") != "done"]
-            
-            if not pending_tasks:
-                return [TextContent(type="text", 
-                         text="利用可能なタスクはありません。すべてのタスクが完了しているか、タスクがまだ作成されていません。")]
-            
-            # 優先度でソート (優先度が高い順)
-            pending_tasks.sort(key=lambda t: t.get("priority", 0), reverse=True)
-            
-            # 最も優先度の高いタスクを取得
-            next_task = pending_tasks[0]
-            
-            # タスクステータスを更新
-            for i, task in enumerate(tasks):
-                if task.get("id") == next_task.get("id"):
-                    tasks[i]["status"] = "in_progress"
-                    write_tasks(tasks, agent_id, project_name)
-                    break
-            
-            return [TextContent(type="text", text=json.dumps(next_task, indent=2, ensure_ascii=False))]
-        
-        # create_task - タスク作成
-        elif name == "create_task":
-            # 必須パラメータの確認
-            if "title" not in arguments or "description" not in arguments:
-                raise ValueError("Missing required parameters: title and description")
-            
-            tasks = read_tasks(agent_id, project_name)
-            
-            # サブタスクの準備
-            subtasks = []
-            if "subtasks" in arguments and arguments["subtasks"]:
-                subtasks = [{"id": i+1, "description": desc, "status": "todo"} for i, desc in enumerate(arguments["subtasks"])]
-            
-            # 新しいタスクの作成
-            new_task = {
-                "id": generate_task_id(tasks),
-                "title": arguments["title"],
-                "description": arguments["description"],
-                "priority": arguments.get("priority", 3),
-                "status": "todo",
-                "progress": 0,
-                "subtasks": subtasks,
-                "notes": []
-            }
-            
-            # タスクを追加して保存
-            tasks.append(new_task)
-            write_tasks(tasks, agent_id, project_name)
-            
-            agent_info = f" (エージェント: {agent_id})" if agent_id else ""
-            project_info = f" (プロジェクト: {project_name})" if project_name else ""
-            return [TextContent(type="text", 
-                     text=f"タスク '{new_task['title']}' (ID: {new_task['id']}){agent_info}{project_info} が作成されました。")]
-        
-        # update_progress - 進捗更新
-        elif name == "update_progress":
-            # 必須パラメータの確認
-            if "task_id" not in arguments or "progress" not in arguments:
-                raise ValueError("Missing required parameters: task_id and progress")
-            
-            task_id = arguments["task_id"]
-            progress = arguments["progress"]
-            
-            tasks = read_tasks(agent_id, project_name)
-            
-            # タスクを見つけて更新
-            task_found = False
-            for i, task in enumerate(tasks):
-                if task.get("id") == task_id:
-                    tasks[i]["progress"] = progress
-                    
-                    # 進捗に基づいてステータスを自動更新
-                    if progress >= 100:
-                        tasks[i]["status"] = "done"
-                    elif progress > 0:
-                        tasks[i]["status"] = "in_progress"
-                    
-                    task_found = True
-                    break
-            
-            if not task_found:
-                return [TextContent(type="text", text=f"エラー: タスク (ID: {task_id}) が見つかりません。")]
-            
-            # 変更を保存
-            write_tasks(tasks, agent_id, project_name)
-            
-            return [TextContent(type="text", 
-                     text=f"タスク (ID: {task_id}) の進捗が {progress}% に更新されました。")]
-        
-        # complete_task - タスク完了
-        elif name == "complete_task":
-            # 必須パラメータの確認
-            if "task_id" not in arguments:
-                raise ValueError("Missing required parameter: task_id")
-            
-            task_id = arguments["task_id"]
-            
-            tasks = read_tasks(agent_id, project_name)
-            
-            # タスクを見つけて更新
-            task_found = False
-            for i, task in enumerate(tasks):
-                if task.get("id") == task_id:
-                    tasks[i]["status"] = "done"
-                    tasks[i]["progress"] = 100
-                    task_found = True
-                    break
-            
-            if not task_found:
-                return [TextContent(type="text", text=f"エラー: タスク (ID: {task_id}) が見つかりません。")]
-            
-            # 変更を保存
-            write_tasks(tasks, agent_id, project_name)
-            
-            return [TextContent(type="text", 
-                     text=f"タスク (ID: {task_id}) が完了としてマークされました。")]
-        
-        # add_subtask - サブタスク追加
-        elif name == "add_subtask":
-            # 必須パラメータの確認
-            if "task_id" not in arguments or "description" not in arguments:
-                raise ValueError("Missing required parameters: task_id and description")
-            
-            task_id = arguments["task_id"]
-            description = arguments["description"]
-            
-            tasks = read_tasks(agent_id, project_name)
-            
-            # タスクを見つけてサブタスクを追加
-            task_found = False
-            for i, task in enumerate(tasks):
-                if task.get("id") == task_id:
-                    # サブタスクリストがない場合は作成
-                    if "subtasks" not in task:
-                        tasks[i]["subtasks"] = []
-                    
-                    # 新しいサブタスクの作成
-                    new_subtask = {
-                        "id": generate_subtask_id(task.get("subtasks", [])),
-                        "description": description,
-                        "status": "todo"
-                    }
-                    
-                    tasks[i]["subtasks"].append(new_subtask)
-                    task_found = True
-                    break
-            
-            if not task_found:
-                return [TextContent(type="text", text=f"エラー: タスク (ID: {task_id}) が見つかりません。")]
-            
-            # 変更を保存
-            write_tasks(tasks, agent_id, project_name)
-            
-            return [TextContent(type="text", 
-                     text=f"サブタスク (ID: {new_subtask['id']}) がタスク (ID: {task_id}) に追加されました。")]
-        
-        # update_subtask - サブタスク更新
-        elif name == "update_subtask":
-            # 必須パラメータの確認
-            if "task_id" not in arguments or "subtask_id" not in arguments or "status" not in arguments:
-                raise ValueError("Missing required parameters: task_id, subtask_id and status")
-            
-            task_id = arguments["task_id"]
-            subtask_id = arguments["subtask_id"]
-            status = arguments["status"]
-            
-            # ステータスの検証
-            if status not in ["todo", "in_progress", "done"]:
-                raise ValueError("Invalid status: must be 'todo', 'in_progress', or 'done'")
-            
-            tasks = read_tasks(agent_id, project_name)
-            
-            # タスクとサブタスクを見つけて更新
-            task_found = False
-            subtask_found = False
-            
-            for i, task in enumerate(tasks):
-                if task.get("id") == task_id:
-                    task_found = True
-                    
-                    if "subtasks" in task:
-                        for j, subtask in enumerate(task["subtasks"]):
-                            if subtask.get("id") == subtask_id:
-                                tasks[i]["subtasks"][j]["status"] = status
-                                subtask_found = True
-                                break
-                    
-                    break
-            
-            if not task_found:
-                return [TextContent(type="text", text=f"エラー: タスク (ID: {task_id}) が見つかりません。")]
-            
-            if not subtask_found:
-                return [TextContent(type="text", text=f"エラー: サブタスク (ID: {subtask_id}) が見つかりません。")]
-            
-            # 変更を保存
-            write_tasks(tasks, agent_id, project_name)
-            
-            # メインタスクの進捗を自動更新 (サブタスクの完了率から計算)
-            for i, task in enumerate(tasks):
-                if task.get("id") == task_id and "subtasks" in task and task["subtasks"]:
-                    completed = sum(1 for st in task["subtasks"] if st.get("status") == "done")
-                    total = len(task["subtasks"])
-                    tasks[i]["progress"] = int(completed / total * 100)
-                    
-                    # すべてのサブタスクが完了したら、タスクも完了にする
-                    if completed == total:
-                        tasks[i]["status"] = "done"
-                    elif completed > 0:
-                        tasks[i]["status"] = "in_progress"
-                    
-                    # 更新したタスク情報を保存
-                    write_tasks(tasks, agent_id, project_name)
-                    break
-            
-            return [TextContent(type="text", 
-                     text=f"サブタスク (ID: {subtask_id}) のステータスが '{status}' に更新されました。")]
-        
-        # add_note - ノート追加
-        elif name == "add_note":
-            # 必須パラメータの確認
-            if "task_id" not in arguments or "content" not in arguments:
-                raise ValueError("Missing required parameters: task_id and content")
-            
-            task_id = arguments["task_id"]
-            content = arguments["content"]
-            
-            tasks = read_tasks(agent_id, project_name)
-            
-            # タスクを見つけてノートを追加
-            task_found = False
-            for i, task in enumerate(tasks):
-                if task.get("id") == task_id:
-                    # ノートリストがない場合は作成
-                    if "notes" not in task:
-                        tasks[i]["notes"] = []
-                    
-                    # タイムスタンプを含む新しいノートの作成
-                    import datetime
-                    new_note = {
-                        "id": len(task.get("notes", [])) + 1,
-                        "content": content,
-                        "timestamp": datetime.datetime.now().isoformat()
-                    }
-                    
-                    tasks[i]["notes"].append(new_note)
-                    task_found = True
-                    break
-            
-            if not task_found:
-                return [TextContent(type="text", text=f"エラー: タスク (ID: {task_id}) が見つかりません。")]
-            
-            # 変更を保存
-            write_tasks(tasks, agent_id, project_name)
-            
-            return [TextContent(type="text", 
-                     text=f"ノートがタスク (ID: {task_id}) に追加されました。")]
-                
-    except Exception as e:
-        logger.error(f"Unexpected error: {str(e)}")
-        return [TextContent(type="text", text=f"予期せぬエラーが発生しました: {str(e)}")]
-
-# メイン関数
-async def main():
-    # イベントループの問題を回避するためにここにインポート
-    from mcp.server.stdio import stdio_server
-
-    # サーバの実行
-    async with stdio_server() as (read_stream, write_stream):
-        await app.run(
-            read_stream,
-            write_stream,
-            app.create_initialization_options()
-        )
-
-# Pythonスクリプトとして直接実行された場合
-if __name__ == "__main__":
+import os
+import json
+import logging
+import asyncio
+import datetime
+import functools
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+from dotenv import load_dotenv
+from mcp.server import Server
+from mcp.types import (
+    ListResourcesRequest,
+    ListResourcesResult,
+    Resource,
+    ResourceTemplate,
+    ServerResult,
+    Tool,
+    TextContent,
+    ImageContent,
+    EmbeddedResource
+)
+from pydantic import AnyUrl
+
+from . import serializer
+from .archive import ColdArchive, select_archivable
+from .cache import TaskStoreCache, file_signature
+from .catalog import StoreCatalog
+from .events import add_note_event, index_tasks
+from .fanout import query_stores
+from .journal import JournalStore
+from .locking import StoreConflictError, StoreLock, get_lock_path
+from .metrics import Metrics
+from .notes_log import NotesLog, get_notes_path
+from .paging import decode_cursor, parse_query_options, project_tasks, shape_tasks
+from .profiling import Profiler, parse_targets
+from .ready_queue import ReadyQueue, is_leased, is_ready, ready_key
+from .resources import (
+    METRICS_URI,
+    filter_by_kind,
+    iter_stores,
+    list_store_page,
+    metrics_resource,
+    resource_templates,
+    route_resource_uri,
+    store_resources
+)
+from .search import SearchIndex
+from .sqlite_store import SQLiteStore
+from .tools import ToolRegistry
+from .transaction import TaskTransaction, build_task, generate_subtask_id
+from .writer import WriteBehind
+
+# 環境変数の読み込み
+load_dotenv()
+
+# ログの準備 (ハンドラの設定はサーバの起動時に main() で行う)
+logger = logging.getLogger("taskmate-server")
+
+# JSONファイルのパス設定
+OUTPUT_DIR = "output"
+DEFAULT_TASKS_FILE = os.path.join(OUTPUT_DIR, "tasks.json")
+
+# タスクストアのキャッシュ (上限はストアのシリアライズ後の合計バイト数)
+CACHE_MAX_BYTES = int(os.getenv("TASKMATE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+task_cache = TaskStoreCache(CACHE_MAX_BYTES)
+
+# JSONの出力形式 (既定ではコンパクトな形式。1 にするとインデントした読みやすい形式)
+PRETTY_RESPONSES = os.getenv("TASKMATE_JSON_PRETTY", "0") == "1"
+PRETTY_STORAGE = os.getenv("TASKMATE_STORAGE_PRETTY", "0") == "1"
+
+# ストレージモード ("json": 変更のたびに全体を書き直す, "journal": 変更をジャーナルに追記する,
+# "sqlite": 単一のSQLiteデータベースに保存する)
+STORAGE_MODE = os.getenv("TASKMATE_STORAGE", "json")
+
+# 書き込みの fsync ポリシー ("always", "batched", "off") と、json モードで書き込みをまとめる時間 (ミリ秒。0 は同期書き込み)
+FSYNC_POLICY = os.getenv("TASKMATE_FSYNC", "batched")
+WRITE_BEHIND_MS = int(os.getenv("TASKMATE_WRITE_BEHIND_MS", "0"))
+task_writer = WriteBehind(WRITE_BEHIND_MS / 1000, FSYNC_POLICY, PRETTY_STORAGE)
+
+journal_store = JournalStore(
+    compact_every=int(os.getenv("TASKMATE_JOURNAL_COMPACT_EVENTS", "1000")),
+    keep_history=os.getenv("TASKMATE_JOURNAL_HISTORY", "1") != "0",
+    pretty=PRETTY_STORAGE,
+    fsync=FSYNC_POLICY
+)
+# ノートのログ (json/journal モードでは、ノートをタスクファイルとは別のログに追記する)
+notes_log = NotesLog(FSYNC_POLICY, CACHE_MAX_BYTES)
+sqlite_store = SQLiteStore(os.getenv("TASKMATE_SQLITE_PATH", os.path.join(OUTPUT_DIR, "taskmate.db")))
+
+# タスクを確保する際のリース期間の既定値 (秒)
+LEASE_SECONDS = int(os.getenv("TASKMATE_LEASE_SECONDS", "300"))
+
+# リソース一覧の形式 ("concrete": ストアごとのリソースをページングして列挙する,
+# "templates": URIテンプレートのみを示す) と1ページのストア数 (1ストアあたり3件のリソース)
+RESOURCE_LISTING = os.getenv("TASKMATE_RESOURCE_LISTING", "concrete")
+RESOURCE_PAGE_SIZE = int(os.getenv("TASKMATE_RESOURCE_PAGE_SIZE", "100"))
+
+# エージェントとプロジェクトのカタログ (TASKMATE_CATALOG_WATCH=1 で watchdog による監視を有効にする)
+store_catalog = StoreCatalog()
+CATALOG_WATCH = os.getenv("TASKMATE_CATALOG_WATCH", "0") == "1"
+
+# 完了済みタスクのアーカイブ (完了から何日経ったタスクをコールドセグメントへ移すか。0 は無効) と実行間隔 (秒)
+ARCHIVE_AFTER_DAYS = float(os.getenv("TASKMATE_ARCHIVE_AFTER_DAYS", "0"))
+ARCHIVE_INTERVAL = int(os.getenv("TASKMATE_ARCHIVE_INTERVAL", "3600"))
+cold_archive = ColdArchive(FSYNC_POLICY)
+
+# トランスポート ("stdio": 標準入出力で1つのクライアントに応答する,
+# "http": Streamable HTTP, "sse": Server-Sent Events。HTTPでは1つのプロセスが複数のクライアントに応答する)
+TRANSPORT = os.getenv("TASKMATE_TRANSPORT", "stdio")
+HTTP_HOST = os.getenv("TASKMATE_HTTP_HOST", "127.0.0.1")
+HTTP_PORT = int(os.getenv("TASKMATE_HTTP_PORT", "8000"))
+# HTTPのキープアライブの時間と、終了時に処理中の要求を待つ時間 (秒)
+HTTP_KEEP_ALIVE = int(os.getenv("TASKMATE_HTTP_KEEP_ALIVE", "75"))
+HTTP_SHUTDOWN_TIMEOUT = int(os.getenv("TASKMATE_HTTP_SHUTDOWN_TIMEOUT", "30"))
+
+# ツール・リソース・ストアの読み書きのメトリクス (TASKMATE_HTTP_METRICS=1 でHTTPモードに /metrics を公開する)
+metrics = Metrics()
+HTTP_METRICS = os.getenv("TASKMATE_HTTP_METRICS", "0") == "1"
+
+# 起動時に "taskmateai.tools" のエントリポイントからツールのプラグインを読み込むかどうか
+TOOL_PLUGINS = os.getenv("TASKMATE_TOOL_PLUGINS", "1") == "1"
+
+# プロファイル (TASKMATE_PROFILE に "*" またはカンマ区切りのツール名・リソースの種類を指定すると、その呼び出しの
+# TASKMATE_PROFILE_SAMPLE の割合を cProfile で記録して OUTPUT_DIR/.profiles に書き出す。
+# TASKMATE_PROFILE_MEMORY=1 で tracemalloc によるメモリの追跡を開始する。既定では無効)
+profiler = Profiler(
+    lambda: os.path.join(OUTPUT_DIR, ".profiles"),
+    parse_targets(os.getenv("TASKMATE_PROFILE", "")),
+    float(os.getenv("TASKMATE_PROFILE_SAMPLE", "1.0")),
+    os.getenv("TASKMATE_PROFILE_MEMORY", "0") == "1"
+)
+
+# ストアごとのロック (読み込みから書き込みまでを、他のサーバプロセスとの間でも不可分に行うために使う)
+_store_locks: Dict[tuple, StoreLock] = {}
+_store_locks_guard = threading.Lock()
+
+# ファイルI/Oとシリアライズを実行するスレッドプール (イベントループをブロックしないために使う)
+IO_THREADS = int(os.getenv("TASKMATE_IO_THREADS", "8"))
+io_executor = ThreadPoolExecutor(max_workers=IO_THREADS, thread_name_prefix="taskmate-io")
+
+# query_all_tasks でストアを並行して検索するスレッドプール
+# (ツールは io_executor のスレッドで実行されるため、同じプールで待ち合わせると詰まることがある)
+QUERY_THREADS = int(os.getenv("TASKMATE_QUERY_THREADS", "4"))
+query_executor = ThreadPoolExecutor(max_workers=QUERY_THREADS, thread_name_prefix="taskmate-query")
+# query_all_tasks で limit を省略した場合の最大件数
+QUERY_DEFAULT_LIMIT = 100
+# search_tasks で limit を省略した場合の最大件数
+SEARCH_DEFAULT_LIMIT = 20
+
+# 他のプロセスとの書き込みの競合を検出した場合に、ツールの処理をやり直す回数
+CONFLICT_RETRIES = 3
+
+# イベントループごと・ストアごとの非同期ロック (同じストアへの変更をスレッドプールに投入する前に直列化する)
+_async_store_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[tuple, asyncio.Lock]]" = \
+    weakref.WeakKeyDictionary()
+
+# サーバの準備
+app = Server("taskmate-server")
+
+# ツールの登録先 (各ツールは名前・説明・入力スキーマと処理を一緒に宣言し、名前で呼び出し先を引く)
+tool_registry = ToolRegistry()
+
+# タスクファイルのパスを取得する関数
+def get_tasks_file_path(agent_id: Optional[str] = None, project_name: Optional[str] = None) -> str:
+    """
+    タスクファイルのパスを生成する関数。
+    
+    Args:
+        agent_id: エージェントID（オプション）
+        project_name: プロジェクト名（オプション）
+        
+    Returns:
+        str: タスクファイルのパス
+    """
+    path_components = [OUTPUT_DIR]
+    
+    if agent_id:
+        path_components.append(agent_id)
+        
+        if project_name:
+            path_components.append(project_name)
+    
+    path_components.append("tasks.json")
+    tasks_file_path = os.path.join(*path_components)
+    
+    # 親ディレクトリが存在することを確認 (作成済みのストアは確認を省き、新しいストアはカタログに反映する)
+    if not store_catalog.is_known(OUTPUT_DIR, agent_id, project_name):
+        os.makedirs(os.path.dirname(tasks_file_path), exist_ok=True)
+        store_catalog.add(OUTPUT_DIR, agent_id, project_name)
+    
+    return tasks_file_path
+
+# キャッシュのキーを生成する関数
+def get_store_key(agent_id: Optional[str] = None, project_name: Optional[str] = None) -> tuple:
+    """
+    タスクストアを識別するキーを生成する関数。
+
+    get_tasks_file_path() と同じく、エージェントIDがない場合はプロジェクト名を無視する。
+
+    Args:
+        agent_id: エージェントID（オプション）
+        project_name: プロジェクト名（オプション）
+
+    Returns:
+        tuple: (agent_id, project_name)
+    """
+    if not agent_id:
+        return (None, None)
+    return (agent_id, project_name or None)
+
+# ストアごとのロックを取得する関数
+def store_lock(agent_id: Optional[str] = None, project_name: Optional[str] = None) -> StoreLock:
+    """
+    タスクストアごとのロックを取得する関数。
+
+    ロックはプロセス内では再入可能なロックとして、プロセス間ではストアの
+    ロックファイル (tasks.lock) の fcntl アドバイザリロックとして働く (SQLiteモードではプロセス内のみ)。
+
+    Args:
+        agent_id: エージェントID（オプション）
+        project_name: プロジェクト名（オプション）
+
+    Returns:
+        StoreLock: ストアのロック
+    """
+    key = get_store_key(agent_id, project_name)
+    with _store_locks_guard:
+        lock = _store_locks.get(key)
+        if lock is None:
+            lock = _store_locks[key] = StoreLock(
+                lambda: None if STORAGE_MODE == "sqlite" else get_lock_path(get_tasks_file_path(*key))
+            )
+        return lock
+
+# ストアごとの非同期ロックを取得する関数
+def async_store_lock(agent_id: Optional[str] = None, project_name: Optional[str] = None) -> asyncio.Lock:
+    """
+    実行中のイベントループにおける、タスクストアごとの非同期ロックを取得する関数。
+
+    同じストアへの変更はこのロックで順番に実行し、スレッドロックの待ちで
+    スレッドプールのスレッドを占有しないようにする。異なるストアへの要求は並行して実行される。
+
+    Args:
+        agent_id: エージェントID（オプション）
+        project_name: プロジェクト名（オプション）
+
+    Returns:
+        asyncio.Lock: ストアの非同期ロック
+    """
+    loop = asyncio.get_running_loop()
+    locks = _async_store_locks.get(loop)
+    if locks is None:
+        locks = _async_store_locks[loop] = {}
+    key = get_store_key(agent_id, project_name)
+    lock = locks.get(key)
+    if lock is None:
+        lock = locks[key] = asyncio.Lock()
+    return lock
+
+# ブロッキングする処理をスレッドプールで実行する関数
+async def run_io(func: Callable[..., Any], *args: Any) -> Any:
+    """
+    ファイルI/Oなどのブロッキングする処理を、I/O用のスレッドプールで実行する関数。
+
+    Args:
+        func: 実行する関数
+        *args: 関数の引数
+
+    Returns:
+        Any: 関数の戻り値
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(io_executor, functools.partial(func, *args))
+
+# JSONファイルから全タスクを読み込む関数
+@metrics.timed("store", "read_tasks")
+def read_tasks(agent_id: Optional[str] = None, project_name: Optional[str] = None) -> List[Dict]:
+    """
+    JSONファイルからタスクを読み込む関数。
+    
+    Args:
+        agent_id: エージェントID（オプション）
+        project_name: プロジェクト名（オプション）
+        
+    Returns:
+        List[Dict]: タスクのリスト
+    """
+    if STORAGE_MODE == "sqlite":
+        try:
+            return sqlite_store.load(agent_id, project_name)
+        except Exception as e:
+            metrics.count_error("store", "read_tasks")
+            logger.error(f"タスクの読み込みエラー: {str(e)}")
+            return []
+    
+    tasks_file = get_tasks_file_path(agent_id, project_name)
+    journal_mode = STORAGE_MODE == "journal"
+    
+    # 保存待ちの変更があれば、その状態が最新
+    if not journal_mode:
+        pending = task_writer.pending(tasks_file)
+        if pending is not None:
+            return pending
+    
+    signature = journal_store.signature(tasks_file) if journal_mode else file_signature(tasks_file)
+    
+    if signature is None:
+        # ファイルが存在しない場合は空のリストを返す
+        return []
+    
+    # ファイルが変更されていなければキャッシュを返す
+    key = get_store_key(agent_id, project_name)
+    entry = task_cache.get(key, signature)
+    if entry is not None:
+        return entry.tasks
+    
+    try:
+        if journal_mode:
+            # スナップショットにジャーナルをリプレイする
+            tasks, signature = journal_store.load(tasks_file)
+            size = journal_store.size(signature)
+        else:
+            with open(tasks_file, 'rb') as f:
+                data = f.read()
+            tasks = serializer.loads(data)
+            size = len(data)
+        task_cache.put(key, tasks, signature, size)
+        metrics.increment("bytes_read", size)
+        return tasks
+    except json.JSONDecodeError:
+        metrics.count_error("store", "read_tasks")
+        logger.error("JSONファイルの解析エラー")
+        return []
+    except Exception as e:
+        metrics.count_error("store", "read_tasks")
+        logger.error(f"タスクの読み込みエラー: {str(e)}")
+        return []
+
+# JSONファイルにタスクを書き込む関数
+@metrics.timed("store", "write_tasks")
+def write_tasks(tasks: List[Dict], agent_id: Optional[str] = None, project_name: Optional[str] = None,
+                events: Optional[List[Dict]] = None) -> None:
+    """
+    JSONファイルにタスクを書き込む関数。
+    
+    ジャーナルモードでは events が指定されていればイベントのみを追記し、
+    指定されていなければタスク全体をスナップショットとして書き込む。
+    
+    Args:
+        tasks: 書き込むタスクのリスト (events を適用済みの状態)
+        agent_id: エージェントID（オプション）
+        project_name: プロジェクト名（オプション）
+        events: tasks に適用した変更イベントのリスト（オプション）
+        
+    Raises:
+        StoreConflictError: 読み込んだ後にストアが他のプロセスによって変更されていた場合
+        RuntimeError: タスクの保存に失敗した場合
+    """
+    if STORAGE_MODE == "sqlite":
+        try:
+            sqlite_store.save(tasks, agent_id, project_name, events)
+        except Exception as e:
+            logger.error(f"タスクの書き込みエラー: {str(e)}")
+            raise RuntimeError(f"タスクの保存に失敗しました: {str(e)}")
+        return
+    
+    tasks_file = get_tasks_file_path(agent_id, project_name)
+    key = get_store_key(agent_id, project_name)
+    
+    # 読み込んだ時点からストアが変更されていないことを確認する (コンペアアンドスワップ)。
+    # ストアのロックを使わない書き込みや、他のプロセスの書き込みを上書きしないようにする
+    entry = task_cache.peek(key)
+    if entry is not None and entry.tasks is tasks and entry.signature is not None:
+        if entry.signature[0] == "pending":
+            # 保存待ちの間に他のプロセスが書き込んだ場合は、保存待ちの変更をマージして書き込み、
+            # 最新の状態からやり直す
+            if task_writer.conflicts(tasks_file):
+                task_writer.flush(tasks_file)
+                task_cache.invalidate(key)
+                raise StoreConflictError(f"ストアが他のプロセスによって変更されました: {tasks_file}")
+        else:
+            current = journal_store.signature(tasks_file) if STORAGE_MODE == "journal" else file_signature(tasks_file)
+            if current != entry.signature:
+                task_cache.invalidate(key)
+                raise StoreConflictError(f"ストアが他のプロセスによって変更されました: {tasks_file}")
+    
+    try:
+        # 親ディレクトリが存在することを確認
+        os.makedirs(os.path.dirname(tasks_file), exist_ok=True)
+        
+        if STORAGE_MODE == "journal":
+            if events is None:
+                signature = journal_store.write_snapshot(tasks_file, tasks)
+                size = journal_store.size(signature)
+                metrics.increment("bytes_written", size)
+            else:
+                previous = entry.size if entry is not None and entry.tasks is tasks else None
+                signature = journal_store.append(tasks_file, events)
+                size = journal_store.size(signature)
+                # 追記した分 (読み込んだ時点のサイズが分からない場合はストア全体) を数える
+                appended = size - previous if previous is not None and size >= previous else size
+                metrics.increment("bytes_written", appended)
+        else:
+            # 一時ファイルに書き込んでから置き換える (ライトビハインドが有効な場合は書き込みを予約する)
+            signature = task_writer.write(
+                tasks_file, tasks, lock=store_lock(agent_id, project_name),
+                on_written=lambda old, new: written_behind(key, old, new),
+                events=events
+            )
+            if signature is not None and signature[0] == "pending":
+                entry = task_cache.peek(key)
+                size = entry.size if entry is not None else 0
+            else:
+                size = signature[2] if signature is not None else 0
+                metrics.increment("bytes_written", size)
+    except Exception as e:
+        # 書き込みに失敗した場合、キャッシュの内容はファイルと一致しない
+        task_cache.invalidate(key)
+        logger.error(f"タスクの書き込みエラー: {str(e)}")
+        raise RuntimeError(f"タスクの保存に失敗しました: {str(e)}")
+    
+    # 書き込んだ内容でキャッシュを更新
+    if signature is None:
+        task_cache.invalidate(key)
+    else:
+        entry = task_cache.put(key, tasks, signature, size)
+        
+        # 未完了タスクのキューに変更を反映 (全体を書き直した場合は作り直す)
+        if entry.ready_queue is not None:
+            if events is None:
+                entry.ready_queue = None
+            else:
+                entry.ready_queue.apply(events)
+        
+        # 全文検索の索引に追加されたタスク・サブタスクを反映 (全体を書き直した場合は作り直す)
+        if entry.search_index is not None:
+            if events is None:
+                entry.search_index = None
+            else:
+                entry.search_index.apply(events)
+        
+        # タスクIDの索引に追加・アーカイブされたタスクを反映 (全体を書き直した場合は作り直す)
+        if entry.by_id is not None:
+            if events is None:
+                entry.by_id = None
+            else:
+                for event in events:
+                    if event.get("op") == "create":
+                        entry.by_id.setdefault(event["task"].get("id"), event["task"])
+                    elif event.get("op") == "archive":
+                        entry.by_id.pop(event.get("id"), None)
+        
+        # タスクを取り除いた場合は、タスクIDカウンタの走査をやり直す
+        if events is not None and any(event.get("op") == "archive" for event in events):
+            entry.scanned = 0
+    
+    # ジャーナルが長くなった場合はバックグラウンドでスナップショットを作成
+    if STORAGE_MODE == "journal" and journal_store.needs_compaction(tasks_file):
+        journal_store.schedule_compaction(
+            tasks_file, tasks,
+            on_done=lambda old, new: task_cache.revalidate(key, old, new, journal_store.size(new)),
+            lock=store_lock(agent_id, project_name)
+        )
+
+# ライトビハインドで書き込んだ後に、キャッシュとメトリクスを更新する関数
+def written_behind(key: tuple, old_signature: Any, new_signature: Any) -> None:
+    if new_signature is None:
+        # 他のプロセスの変更とマージした場合、キャッシュはファイルの内容と一致しない
+        task_cache.invalidate(key)
+        return
+    size = new_signature[2]
+    metrics.increment("bytes_written", size)
+    task_cache.revalidate(key, old_signature, new_signature, size)
+
+# 利用可能なエージェントの一覧を取得する関数
+def list_agents() -> List[str]:
+    """
+    利用可能なエージェントの一覧を取得する関数。
+    
+    Returns:
+        List[str]: エージェントIDのリスト
+    """
+    if STORAGE_MODE == "sqlite":
+        return sqlite_store.list_agents()
+    
+    try:
+        # カタログから取得 (出力ディレクトリが変更されていなければ走査しない)
+        return store_catalog.agents(OUTPUT_DIR)
+    except Exception as e:
+        logger.error(f"エージェント一覧の取得エラー: {str(e)}")
+        return []
+
+# 特定のエージェントに関連するプロジェクトの一覧を取得する関数
+def list_projects(agent_id: str) -> List[str]:
+    """
+    特定のエージェントに関連するプロジェクトの一覧を取得する関数。
+    
+    Args:
+        agent_id: エージェントID
+        
+    Returns:
+        List[str]: プロジェクト名のリスト
+    """
+    if STORAGE_MODE == "sqlite":
+        return sqlite_store.list_projects(agent_id)
+    
+    try:
+        # カタログから取得 (エージェントのディレクトリが変更されていなければ走査しない)
+        return store_catalog.projects(OUTPUT_DIR, agent_id)
+    except Exception as e:
+        logger.error(f"プロジェクト一覧の取得エラー: {str(e)}")
+        return []
+
+# ツールとリソースの応答をJSON文字列に変換する関数
+def to_json(obj: Any) -> str:
+    return serializer.dumps(obj, pretty=PRETTY_RESPONSES)
+
+# 新しいタスクIDを生成する関数
+def generate_task_id(tasks):
+    if not tasks:
+        return 1
+    return max(task.get("id", 0) for task in tasks) + 1
+
+# キャッシュされたカウンタを使って新しいタスクIDを払い出す関数
+def next_task_id(tasks: List[Dict], agent_id: Optional[str] = None, project_name: Optional[str] = None) -> int:
+    """
+    新しいタスクIDを払い出す関数。
+
+    tasks が read_tasks() から返されたキャッシュ済みのリストであれば、
+    ストアごとのIDカウンタを使い、全タスクの走査を避ける。
+
+    Args:
+        tasks: read_tasks() で読み込んだタスクのリスト
+        agent_id: エージェントID（オプション）
+        project_name: プロジェクト名（オプション）
+
+    Returns:
+        int: 新しいタスクID
+    """
+    if STORAGE_MODE == "sqlite":
+        return sqlite_store.max_task_id(agent_id, project_name) + 1
+    
+    entry = task_cache.peek(get_store_key(agent_id, project_name))
+    if entry is not None and entry.tasks is tasks:
+        return entry.allocate_task_id()
+    return generate_task_id(tasks)
+
+# トランザクションで新しいタスクIDを払い出す関数
+def allocate_task_id(tx: TaskTransaction, agent_id: Optional[str] = None,
+                     project_name: Optional[str] = None) -> int:
+    # SQLiteモードではストア全体を読み込まずに、最大のIDから求める
+    if STORAGE_MODE == "sqlite":
+        return sqlite_store.max_task_id(agent_id, project_name) + 1
+    return next_task_id(tx.tasks, agent_id, project_name)
+
+# タスクIDからタスクへの索引を取得する関数
+def task_index(tasks: List[Dict], agent_id: Optional[str] = None,
+               project_name: Optional[str] = None) -> Dict[Any, Dict]:
+    """
+    タスクIDからタスクへの索引を取得する関数。
+
+    tasks が read_tasks() から返されたキャッシュ済みのリストであれば、
+    ストアごとに保持する索引を使い、呼び出しのたびに全タスクを走査しない。
+
+    Args:
+        tasks: read_tasks() で読み込んだタスクのリスト
+        agent_id: エージェントID（オプション）
+        project_name: プロジェクト名（オプション）
+
+    Returns:
+        Dict[Any, Dict]: タスクIDからタスクへの索引
+    """
+    entry = task_cache.peek(get_store_key(agent_id, project_name))
+    if entry is not None and entry.tasks is tasks:
+        if entry.by_id is None:
+            entry.by_id = index_tasks(tasks)
+        return entry.by_id
+    return index_tasks(tasks)
+
+# 次に取り組むべきタスクを選ぶ関数
+def select_next_task(tasks: List[Dict], agent_id: Optional[str] = None,
+                     project_name: Optional[str] = None,
+                     now: Optional[datetime.datetime] = None) -> Optional[Dict]:
+    """
+    未完了のタスクのうち、優先度が最も高いタスクを選ぶ関数。
+
+    有効なリースで他の作業者に確保されているタスクは選ばない。
+    tasks が read_tasks() から返されたキャッシュ済みのリストであれば、
+    ストアごとに保持する優先度付きキューを使い O(log n) で選ぶ。
+
+    Args:
+        tasks: read_tasks() で読み込んだタスクのリスト
+        agent_id: エージェントID（オプション）
+        project_name: プロジェクト名（オプション）
+        now: リースの有効性を判定する現在時刻（オプション）
+
+    Returns:
+        Optional[Dict]: 次のタスク。該当するタスクがない場合はNone
+    """
+    now = now or datetime.datetime.now()
+    entry = task_cache.peek(get_store_key(agent_id, project_name))
+    if entry is not None and entry.tasks is tasks:
+        if entry.ready_queue is None:
+            entry.ready_queue = ReadyQueue(tasks, now)
+        return entry.ready_queue.peek(now)
+    
+    # キャッシュされていない場合は全体を走査する (候補と順序は ReadyQueue・SQLiteモードと同じ)
+    pending_tasks = [t for t in tasks if is_ready(t) and not is_leased(t, now)]
+    if not pending_tasks:
+        return None
+    return min(pending_tasks, key=ready_key)
+
+# タスクを確保する関数
+def claim_tasks(tasks: List[Dict], claimant: str, count: int, lease_expires_at: str,
+                agent_id: Optional[str] = None, project_name: Optional[str] = None,
+                now: Optional[datetime.datetime] = None) -> List[Dict]:
+    """
+    確保されていない未完了のタスクを優先度順に確保する関数。
+
+    確保したタスクは 'in_progress' になり、claimed_by と lease_expires_at が設定される。
+    呼び出し元はトランザクションの中で呼び出し、確保したタスクの変更を記録すること。
+
+    Args:
+        tasks: read_tasks() で読み込んだタスクのリスト
+        claimant: 確保する作業者の名前
+        count: 確保するタスクの最大数
+        lease_expires_at: リース期限 (ISO形式)
+        agent_id: エージェントID（オプション）
+        project_name: プロジェクト名（オプション）
+        now: リースの有効性を判定する現在時刻（オプション）
+
+    Returns:
+        List[Dict]: 確保したタスクのリスト (優先度順)
+    """
+    now = now or datetime.datetime.now()
+    claimed = []
+    for _ in range(count):
+        task = select_next_task(tasks, agent_id, project_name, now)
+        if task is None:
+            break
+        task["status"] = "in_progress"
+        task["claimed_by"] = claimant
+        task["lease_expires_at"] = lease_expires_at
+        claimed.append(task)
+    return claimed
+
+# タスクストアのトランザクションを開始する関数
+def open_transaction(agent_id: Optional[str] = None, project_name: Optional[str] = None) -> TaskTransaction:
+    """
+    タスクストアに対するトランザクション (ユニットオブワーク) を生成する関数。
+
+    with 文の間ストアのロックを保持し、タスクを read_tasks() で一度だけ読み込み、
+    記録した変更イベントを write_tasks() で一度だけ保存する。
+    途中で例外が発生した場合は保存せず、変更済みのキャッシュを破棄する。
+    SQLiteモード以外では、追加したノートはタスクファイルではなくノートのログに追記する。
+    SQLiteモードでは、IDで指定したタスクの取得とタスクの追加でストア全体を読み込まない。
+
+    Args:
+        agent_id: エージェントID（オプション）
+        project_name: プロジェクト名（オプション）
+
+    Returns:
+        TaskTransaction: トランザクション
+    """
+    key = get_store_key(agent_id, project_name)
+    if STORAGE_MODE == "sqlite":
+        # IDで指定したタスクは1行だけ読み込み、変更はイベントとして該当する行だけを更新する
+        options = {"lookup": lambda task_id: sqlite_store.get_task(task_id, agent_id, project_name)}
+    else:
+        options = {
+            "count_notes": lambda task_id: notes_log.count(get_tasks_file_path(agent_id, project_name), task_id),
+            "save_notes": lambda entries: append_notes(entries, agent_id, project_name)
+        }
+    return TaskTransaction(
+        load=lambda: read_tasks(agent_id, project_name),
+        save=lambda tasks, events: write_tasks(tasks, agent_id, project_name, events=events),
+        lock=store_lock(agent_id, project_name),
+        discard=lambda: task_cache.invalidate(key),
+        index=lambda tasks: task_index(tasks, agent_id, project_name),
+        **options
+    )
+
+# ノートをログに追記し、全文検索の索引にも反映する関数
+def append_notes(entries: List[tuple], agent_id: Optional[str] = None, project_name: Optional[str] = None) -> None:
+    """
+    ノートをログに追記し、ストアの全文検索の索引があれば追記したノートを加える関数。
+
+    索引が追記前のログの内容から作られていない場合 (他のプロセスが追記した場合など) は、
+    索引を破棄して次の検索で作り直す。
+
+    Args:
+        entries: (タスクID, ノート) のリスト
+        agent_id: エージェントID（オプション）
+        project_name: プロジェクト名（オプション）
+    """
+    tasks_file = get_tasks_file_path(agent_id, project_name)
+    notes_path = get_notes_path(tasks_file)
+    before = file_signature(notes_path)
+    notes_log.append(tasks_file, entries)
+    
+    entry = task_cache.peek(get_store_key(agent_id, project_name))
+    if entry is None or entry.search_index is None:
+        return
+    if entry.search_index.notes_signature == before:
+        entry.search_index.add_notes(entries)
+        entry.search_index.notes_signature = file_signature(notes_path)
+    else:
+        entry.search_index = None
+
+# ログに保存したノートをタスクに加える関数
+def attach_notes(tasks: List[Dict], agent_id: Optional[str] = None,
+                 project_name: Optional[str] = None) -> List[Dict]:
+    """
+    ノートのログに保存したノートを、タスクの notes に加えたリストを返す関数。
+
+    ログにノートがあるタスクだけをコピーし、キャッシュしたタスクは変更しない。
+    SQLiteモードではノートはタスクと一緒に読み込まれるため、そのまま返す。
+
+    Args:
+        tasks: タスクのリスト
+        agent_id: エージェントID（オプション）
+        project_name: プロジェクト名（オプション）
+
+    Returns:
+        List[Dict]: ノートを加えたタスクのリスト
+    """
+    if STORAGE_MODE == "sqlite" or not tasks:
+        return tasks
+    logged = notes_log.notes(get_tasks_file_path(agent_id, project_name))
+    if not logged:
+        return tasks
+    result = []
+    for task in tasks:
+        notes = logged.get(task.get("id"))
+        if notes:
+            task = {**task, "notes": list(task.get("notes") or ()) + notes}
+        result.append(task)
+    return result
+
+# 射影にノートが含まれるかを判定する関数
+def wants_notes(fields: Optional[List[str]] = None, summary: bool = False) -> bool:
+    return not summary and (not fields or "notes" in fields)
+
+# 複数の変更を一度の読み込みと書き込みで適用する関数
+def apply_bulk(items: List[Any], apply_item: Callable[[TaskTransaction, Any], Dict],
+               agent_id: Optional[str] = None, project_name: Optional[str] = None) -> List[Dict]:
+    """
+    複数の変更をまとめて適用する関数。
+
+    1つのトランザクションの中で各項目を apply_item で適用し、
+    成功した項目の変更を一度の write_tasks() で保存する。
+    失敗した項目はタスクを変更せずに結果へ記録し、残りの項目の適用を続ける。
+
+    Args:
+        items: 適用する項目のリスト
+        apply_item: (トランザクション, 項目) を受け取り、結果の辞書を返す関数。
+            項目を適用できない場合は、何も変更する前に LookupError, ValueError または TypeError を送出する
+        agent_id: エージェントID（オプション）
+        project_name: プロジェクト名（オプション）
+
+    Returns:
+        List[Dict]: 項目ごとの結果 (index, ok と、成功時は apply_item の結果、失敗時は error)
+
+    Raises:
+        RuntimeError: 保存に失敗した場合 (いずれの項目も保存されない)
+    """
+    results = []
+    with open_transaction(agent_id, project_name) as tx:
+        for index, item in enumerate(items):
+            try:
+                result = apply_item(tx, item)
+            except (LookupError, ValueError, TypeError) as e:
+                results.append({"index": index, "ok": False, "error": str(e)})
+                continue
+            results.append({"index": index, "ok": True, **result})
+
+    return results
+
+# 一括操作の項目からタスクを取り出す関数
+def _bulk_task(tx: TaskTransaction, item: Any) -> Dict:
+    if not isinstance(item, dict) or "task_id" not in item:
+        raise ValueError("Missing required parameter: task_id")
+    return tx.get(item["task_id"])
+
+# 古い完了済みタスクをコールドセグメントへ移す関数
+def archive_store(agent_id: Optional[str] = None, project_name: Optional[str] = None,
+                  now: Optional[datetime.datetime] = None) -> int:
+    """
+    完了から ARCHIVE_AFTER_DAYS 日以上経ったタスクを、ストアからコールドセグメントへ移す関数。
+
+    セグメントを書き出してから、ストアからタスクを取り除く変更を保存する。
+    completed_at のない完了済みタスク (以前のバージョンで完了したもの) には
+    現在時刻を記録し、次回以降のアーカイブの対象にする。
+    SQLiteモードでは何もしない。
+
+    Args:
+        agent_id: エージェントID（オプション）
+        project_name: プロジェクト名（オプション）
+        now: 現在時刻（オプション）
+
+    Returns:
+        int: アーカイブしたタスクの数
+    """
+    if STORAGE_MODE == "sqlite":
+        return 0
+    now = now or datetime.datetime.now()
+    cutoff = now - datetime.timedelta(days=ARCHIVE_AFTER_DAYS)
+    
+    with open_transaction(agent_id, project_name) as tx:
+        for task in tx.tasks:
+            if task.get("status") == "done" and not task.get("completed_at"):
+                tx.update(task, completed_at=now.isoformat(timespec="seconds"))
+        
+        selected = select_archivable(tx.tasks, cutoff)
+        if selected:
+            cold_archive.append(get_tasks_file_path(agent_id, project_name), selected)
+            tx.remove(selected)
+    return len(selected)
+
+# すべてのストアの古い完了済みタスクをアーカイブする関数
+def archive_all(now: Optional[datetime.datetime] = None) -> int:
+    """
+    すべてのストアに archive_store() を適用する関数。
+
+    Args:
+        now: 現在時刻（オプション）
+
+    Returns:
+        int: アーカイブしたタスクの合計数
+    """
+    total = 0
+    for agent_id, project_name in iter_stores(list_agents, list_projects):
+        try:
+            total += archive_store(agent_id, project_name, now)
+        except Exception as e:
+            logger.error(f"アーカイブのエラー ({agent_id}/{project_name}): {str(e)}")
+    return total
+
+# 定期的にアーカイブを実行する関数
+async def archive_loop() -> None:
+    while True:
+        await asyncio.sleep(ARCHIVE_INTERVAL)
+        count = await run_io(archive_all)
+        if count:
+            logger.info(f"{count} 件の完了済みタスクをアーカイブしました")
+
+# アーカイブしたタスクをストアのタスクに合わせる関数
+def with_archived(tasks: List[Dict], agent_id: Optional[str] = None,
+                  project_name: Optional[str] = None) -> List[Dict]:
+    """
+    アーカイブしたタスクをストアのタスクの前に加える関数 (アーカイブしたタスクはIDが小さい)。
+
+    ストアに同じIDのタスクがある場合はストアのものを使う。
+
+    Args:
+        tasks: ストアのタスクのリスト
+        agent_id: エージェントID（オプション）
+        project_name: プロジェクト名（オプション）
+
+    Returns:
+        List[Dict]: アーカイブしたタスクとストアのタスクのリスト
+    """
+    archived = cold_archive.load(get_tasks_file_path(agent_id, project_name))
+    if not archived:
+        return tasks
+    active_ids = {task.get("id") for task in tasks}
+    return [task for task in archived if task.get("id") not in active_ids] + list(tasks)
+
+# ステータスと最小優先度でタスクを絞り込む関数
+def filter_tasks(tasks: List[Dict], status: Optional[str] = None, priority_min: Optional[int] = None) -> List[Dict]:
+    if status:
+        tasks = [t for t in tasks if t.get("status") == status]
+    if priority_min is not None:
+        tasks = [t for t in tasks if t.get("priority", 0) >= priority_min]
+    return tasks
+
+# ストアのタスクを読み込み、選んだタスクのスナップショットを返す関数
+def snapshot_store(agent_id: Optional[str], project_name: Optional[str],
+                   select: Callable[[List[Dict]], Iterable[Dict]]) -> List[Dict]:
+    """
+    ストアのタスクを読み込み、select で選んだタスクのコピーを返す関数。
+
+    キャッシュしたタスクのリストはトランザクションがコミットの前にその場で変更するため、
+    読み込みと選択はストアのプロセス内のロックを保持して行い、選んだタスクはコピーして返す。
+    他のプロセスはファイルを置き換えて更新するため、ロックファイルはロックしない。
+
+    Args:
+        agent_id: エージェントID
+        project_name: プロジェクト名
+        select: 読み込んだタスクのリストから返すタスクを選ぶ関数
+
+    Returns:
+        List[Dict]: 選んだタスクのコピーのリスト
+    """
+    with store_lock(agent_id, project_name).local():
+        return [snapshot_task(task) for task in select(read_tasks(agent_id, project_name))]
+
+# タスクのコピーを作成する関数 (サブタスクとノートのリストもコピーする)
+def snapshot_task(task: Dict) -> Dict:
+    copy = dict(task)
+    if isinstance(copy.get("subtasks"), list):
+        copy["subtasks"] = [dict(subtask) for subtask in copy["subtasks"]]
+    if isinstance(copy.get("notes"), list):
+        copy["notes"] = list(copy["notes"])
+    return copy
+
+# 1つのストアを get_tasks と同じ条件で検索する関数 (query_all_tasks から並行して呼び出す)
+def scan_store(agent_id: Optional[str] = None, project_name: Optional[str] = None, status: Optional[str] = None,
+               priority_min: Optional[int] = None, include_archived: bool = False) -> List[Dict]:
+    """
+    1つのストアのタスクを get_tasks と同じ条件で絞り込む関数。
+
+    絞り込みは snapshot_store() でストアのプロセス内のロックを保持して行い、一致したタスクのコピーを返す。
+
+    Args:
+        agent_id: エージェントID（オプション）
+        project_name: プロジェクト名（オプション）
+        status: ステータス（オプション）
+        priority_min: 最小優先度（オプション）
+        include_archived: アーカイブした完了済みタスクも含めるかどうか
+
+    Returns:
+        List[Dict]: 条件に一致するタスクのリスト
+    """
+    if STORAGE_MODE == "sqlite":
+        return sqlite_store.query(agent_id, project_name, status=status, priority_min=priority_min)
+    
+    def select(tasks: List[Dict]) -> List[Dict]:
+        if include_archived:
+            tasks = with_archived(tasks, agent_id, project_name)
+        return filter_tasks(tasks, status, priority_min)
+    
+    return snapshot_store(agent_id, project_name, select)
+
+# ストアの全文検索の索引を取得する関数
+def store_search_index(tasks: List[Dict], agent_id: Optional[str] = None,
+                       project_name: Optional[str] = None) -> SearchIndex:
+    """
+    ストアの全文検索の索引を取得する関数。
+
+    tasks が read_tasks() から返されたキャッシュ済みのリストであれば、ストアごとに保持する
+    索引を使う。索引は最初の検索で作成し、以降はタスクの作成、サブタスクとノートの追加を
+    そのまま反映する。ノートのログが外部で変更された場合は作り直す。
+
+    Args:
+        tasks: read_tasks() で読み込んだタスクのリスト
+        agent_id: エージェントID（オプション）
+        project_name: プロジェクト名（オプション）
+
+    Returns:
+        SearchIndex: 索引
+    """
+    if STORAGE_MODE == "sqlite":
+        # ノートはタスクと一緒に読み込まれる
+        return SearchIndex(tasks)
+    
+    tasks_file = get_tasks_file_path(agent_id, project_name)
+    notes_signature = file_signature(get_notes_path(tasks_file))
+    entry = task_cache.peek(get_store_key(agent_id, project_name))
+    if entry is not None and entry.tasks is tasks:
+        index = entry.search_index
+        if index is not None and index.notes_signature == notes_signature:
+            return index
+    
+    index = SearchIndex(tasks)
+    index.add_notes((task_id, note) for task_id, notes in notes_log.notes(tasks_file).items() for note in notes)
+    index.notes_signature = notes_signature
+    if entry is not None and entry.tasks is tasks:
+        entry.search_index = index
+    return index
+
+# 1つのストアを全文検索する関数 (search_tasks から並行して呼び出す)
+def search_store(agent_id: Optional[str] = None, project_name: Optional[str] = None, query: str = "",
+                 status: Optional[str] = None, priority_min: Optional[int] = None) -> List[Dict]:
+    """
+    1つのストアのタスクを全文検索する関数。
+
+    Args:
+        agent_id: エージェントID（オプション）
+        project_name: プロジェクト名（オプション）
+        query: 検索語
+        status: ステータス（オプション）
+        priority_min: 最小優先度（オプション）
+
+    Returns:
+        List[Dict]: 一致したタスクのコピーに関連度 (score) を加えたリスト
+    """
+    scores = {}
+    
+    def select(tasks: List[Dict]) -> List[Dict]:
+        by_id = task_index(tasks, agent_id, project_name)
+        matches = []
+        for task_id, score in store_search_index(tasks, agent_id, project_name).search(query):
+            task = by_id.get(task_id)
+            if task is not None:
+                matches.append(task)
+                scores[task_id] = round(score, 4)
+        return filter_tasks(matches, status, priority_min)
+    
+    # 索引の作成・検索もストアのプロセス内のロックを保持して行う
+    return [{**task, "score": scores[task.get("id")]} for task in snapshot_store(agent_id, project_name, select)]
+
+# 複数のストアのタスクにノートを加え、射影してストアの名前を付ける関数
+def present_store_tasks(entries: List[tuple], fields: Optional[List[str]] = None,
+                        summary: bool = False) -> List[Dict]:
+    """
+    query_stores() の結果のタスクにノートを加えて射影し、agent_id と project_name を付ける関数。
+
+    ノートは射影に含まれる場合だけ、ストアごとにまとめてログから読み込む。
+
+    Args:
+        entries: (タスク, (エージェントID, プロジェクト名)) のリスト
+        fields: 取り出すフィールドのリスト（オプション）
+        summary: Trueの場合はサブタスクとノートを取り除く
+
+    Returns:
+        List[Dict]: タスクのリスト
+    """
+    tasks = [task for task, _ in entries]
+    if wants_notes(fields, summary):
+        positions: Dict[tuple, List[int]] = {}
+        for i, (_, store) in enumerate(entries):
+            positions.setdefault(store, []).append(i)
+        for store, indexes in positions.items():
+            for i, task in zip(indexes, attach_notes([tasks[i] for i in indexes], *store)):
+                tasks[i] = task
+    
+    return [{"agent_id": store[0], "project_name": store[1], **task}
+            for task, (_, store) in zip(project_tasks(tasks, fields, summary), entries)]
+
+# 利用可能なTODOリソース一覧の取得
+async def list_resources(request: Optional[ListResourcesRequest] = None) -> ListResourcesResult:
+    """
+    リソースの一覧を1ページ分取得する関数。
+
+    "concrete" モードではストアを名前順に RESOURCE_PAGE_SIZE 件ずつ列挙し、続きがあれば
+    nextCursor を返す。"templates" モードでは既定のストアのリソースのみを返し、
+    エージェントやプロジェクトのリソースは list_resource_templates() のURIテンプレートで示す。
+
+    Args:
+        request: リソース一覧の要求（オプション。params.cursor で続きのページを指定する）
+
+    Returns:
+        ListResourcesResult: リソースのリストと次のページのカーソル
+    """
+    if RESOURCE_LISTING == "templates":
+        return ListResourcesResult(resources=store_resources() + [metrics_resource()])
+    
+    cursor = request.params.cursor if request is not None and request.params is not None else None
+    stores, next_cursor = await run_io(list_store_page, list_agents, list_projects, cursor, RESOURCE_PAGE_SIZE)
+    resources = [resource for store in stores for resource in store_resources(*store)]
+    # メトリクスのリソースは最初のページの末尾に1件だけ含める
+    if cursor is None:
+        resources.append(metrics_resource())
+    return ListResourcesResult(resources=resources, nextCursor=next_cursor)
+
+# リソース一覧の要求を処理する関数 (カーソルを受け取るため、デコレータを使わずに登録する)
+async def handle_list_resources(request: ListResourcesRequest) -> ServerResult:
+    return ServerResult(await list_resources(request))
+
+app.request_handlers[ListResourcesRequest] = handle_list_resources
+
+# リソースのURIテンプレート一覧の取得
+@app.list_resource_templates()
+async def list_resource_templates() -> list[ResourceTemplate]:
+    return resource_templates()
+
+# 特定のTODOリソースの取得
+@app.read_resource()
+async def read_resource(uri: AnyUrl) -> str:
+    uri = str(uri)
+    if uri == METRICS_URI:
+        return to_json(metrics_snapshot())
+    # 読み込みとシリアライズはスレッドプールで行う (メトリクスはリソースの種類ごとに集計する)
+    route = route_resource_uri(uri)
+    kind = route.kind if route is not None else "unknown"
+    loader = profiler.wrap("resource", kind, load_resource) if profiler.enabled else load_resource
+    with metrics.timer("resource", kind):
+        return await run_io(loader, uri)
+
+# リソースを読み込んでJSON文字列にする関数
+def load_resource(uri: str) -> str:
+    # エージェント、プロジェクト、種類とクエリ文字列を取り出す
+    # (例: "taskmate://agent1/project1/tasks/all?limit=50&fields=id,title&summary=1")
+    route = route_resource_uri(uri)
+    if route is None:
+        raise ValueError(f"Unknown resource: {uri}")
+    options = parse_query_options(route.query)
+    include_archived = options.pop("include_archived", False)
+    
+    # リソースの種類に基づいてフィルタリング (include_archived=1 の場合はアーカイブも含める)
+    def select(tasks: List[Dict]) -> List[Dict]:
+        if include_archived and STORAGE_MODE != "sqlite":
+            tasks = with_archived(tasks, route.agent_id, route.project_name)
+        return filter_by_kind(tasks, route.kind)
+    
+    filtered_tasks = snapshot_store(route.agent_id, route.project_name, select)
+    if wants_notes(options.get("fields"), options.get("summary", False)):
+        filtered_tasks = attach_notes(filtered_tasks, route.agent_id, route.project_name)
+    
+    return to_json(shape_tasks(filtered_tasks, **options))
+
+# キャッシュや書き込みの状態を含めたメトリクスを取得する関数
+def metrics_snapshot() -> Dict[str, Any]:
+    return metrics.snapshot(metrics_gauges())
+
+# メトリクスに含める、キャッシュと書き込みの現在の状態を取得する関数
+def metrics_gauges() -> Dict[str, Any]:
+    lookups = task_cache.hits + task_cache.misses
+    return {
+        "cache_hits": task_cache.hits,
+        "cache_misses": task_cache.misses,
+        "cache_hit_rate": round(task_cache.hits / lookups, 4) if lookups else 0.0,
+        "cache_evictions": task_cache.evictions,
+        "cache_entries": len(task_cache),
+        "cache_bytes": task_cache.total_bytes,
+        "file_writes": task_writer.writes,
+    }
+
+# list_agents - エージェント一覧の取得
+@tool_registry.tool(
+    "list_agents",
+    description="登録されているエージェントの一覧を取得します。",
+    read_only=True
+)
+def tool_list_agents(arguments: Dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+    agents = list_agents()
+    return [TextContent(type="text", text=to_json(agents))]
+
+# list_projects - プロジェクト一覧の取得
+@tool_registry.tool(
+    "list_projects",
+    description="特定のエージェントに関連するプロジェクトの一覧を取得します。",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "agent_id": {
+                "type": "string",
+                "description": "エージェントID"
+            }
+        },
+        "required": ["agent_id"]
+    },
+    read_only=True
+)
+def tool_list_projects(arguments: Dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+    # 必須パラメータの確認
+    if "agent_id" not in arguments:
+        raise ValueError("Missing required parameter: agent_id")
+        
+    agent_id = arguments["agent_id"]
+    projects = list_projects(agent_id)
+    return [TextContent(type="text", text=to_json(projects))]
+
+# get_tasks - タスク一覧の取得
+@tool_registry.tool(
+    "get_tasks",
+    description="現在のタスクリストを取得します。優先度や進捗状況でフィルタリングできます。",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "status": {
+                "type": "string",
+                "description": "タスクのステータス ('todo', 'in_progress', 'done')",
+                "enum": ["todo", "in_progress", "done"]
+            },
+            "priority_min": {
+                "type": "integer",
+                "description": "最小優先度 (1-5)",
+                "minimum": 1,
+                "maximum": 5
+            },
+            "limit": {
+                "type": "integer",
+                "description": "1ページの最大件数。指定した場合は {\"tasks\": [...], \"next_cursor\": ...} の形式で返します",
+                "minimum": 1
+            },
+            "cursor": {
+                "type": "string",
+                "description": "前のページの next_cursor。次のページを取得する場合に指定します"
+            },
+            "fields": {
+                "type": "array",
+                "description": "取得するフィールドのリスト (例: [\"id\", \"title\", \"status\", \"priority\"])",
+                "items": {
+                    "type": "string"
+                }
+            },
+            "summary": {
+                "type": "boolean",
+                "description": "trueの場合はサブタスクとノートを省略します",
+                "default": False
+            },
+            "include_archived": {
+                "type": "boolean",
+                "description": "trueの場合はアーカイブした完了済みタスクも含めます",
+                "default": False
+            },
+            "agent_id": {
+                "type": "string",
+                "description": "タスクの対象エージェントID"
+            },
+            "project_name": {
+                "type": "string",
+                "description": "タスクの対象プロジェクト名"
+            }
+        }
+    },
+    read_only=True
+)
+def tool_get_tasks(arguments: Dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+    agent_id = arguments.get("agent_id")
+    project_name = arguments.get("project_name")
+    
+    limit = arguments.get("limit")
+    cursor = arguments.get("cursor")
+    
+    if STORAGE_MODE == "sqlite":
+        # 索引を使って絞り込み、ページングの範囲だけを読み込む
+        tasks = sqlite_store.query(agent_id, project_name,
+                                   status=arguments.get("status"),
+                                   priority_min=arguments.get("priority_min"),
+                                   after_id=decode_cursor(cursor) if cursor else None,
+                                   limit=limit + 1 if isinstance(limit, int) and limit > 0 else None)
+    else:
+        # 読み取りのみのため、ロックファイルはロックせずにスナップショットを取る
+        tasks = scan_store(agent_id, project_name, arguments.get("status"), arguments.get("priority_min"),
+                           bool(arguments.get("include_archived")))
+    
+    # ノートは射影に含まれる場合だけログから読み込む
+    fields = arguments.get("fields")
+    summary = bool(arguments.get("summary"))
+    if wants_notes(fields, summary):
+        tasks = attach_notes(tasks, agent_id, project_name)
+    
+    # ページングと射影
+    result = shape_tasks(tasks, limit, cursor, fields, summary)
+    return [TextContent(type="text", text=to_json(result))]
+
+# query_all_tasks - すべてのストアにまたがるタスクの検索
+@tool_registry.tool(
+    "query_all_tasks",
+    description="すべてのエージェント・プロジェクトのタスクを並行して検索し、並べ替えて上位を取得します。"
+                "絞り込みの条件は get_tasks と同じです。各タスクには agent_id と project_name が付きます。",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "status": {
+                "type": "string",
+                "description": "タスクのステータス ('todo', 'in_progress', 'done')",
+                "enum": ["todo", "in_progress", "done"]
+            },
+            "priority_min": {
+                "type": "integer",
+                "description": "最小優先度 (1-5)",
+                "minimum": 1,
+                "maximum": 5
+            },
+            "agent_id": {
+                "type": "string",
+                "description": "検索するエージェントID（省略時はすべてのエージェントと既定のストア）"
+            },
+            "sort": {
+                "type": "string",
+                "description": "並び順 ('priority': 優先度の高い順、'progress': 進捗の大きい順、'store': ストアとIDの順)",
+                "enum": ["priority", "progress", "store"],
+                "default": "priority"
+            },
+            "limit": {
+                "type": "integer",
+                "description": f"最大件数（既定は{QUERY_DEFAULT_LIMIT}）",
+                "minimum": 1
+            },
+            "fields": {
+                "type": "array",
+                "description": "取得するフィールドのリスト (例: [\"id\", \"title\", \"status\", \"priority\"])",
+                "items": {
+                    "type": "string"
+                }
+            },
+            "summary": {
+                "type": "boolean",
+                "description": "trueの場合はサブタスクとノートを省略します",
+                "default": False
+            },
+            "include_archived": {
+                "type": "boolean",
+                "description": "trueの場合はアーカイブした完了済みタスクも含めます",
+                "default": False
+            }
+        }
+    },
+    read_only=True
+)
+def tool_query_all_tasks(arguments: Dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+    agent_id = arguments.get("agent_id")
+    if agent_id:
+        stores = [(agent_id, None)] + [(agent_id, project) for project in sorted(list_projects(agent_id))]
+    else:
+        stores = iter_stores(list_agents, list_projects)
+    
+    # ストアごとの検索は query_executor で並行して実行し、終わった順に上位 limit 件へ併合する
+    scan = functools.partial(scan_store, status=arguments.get("status"),
+                             priority_min=arguments.get("priority_min"),
+                             include_archived=bool(arguments.get("include_archived")))
+    result = query_stores(stores, scan, query_executor, arguments.get("sort", "priority"),
+                          arguments.get("limit", QUERY_DEFAULT_LIMIT), QUERY_THREADS)
+    result["tasks"] = present_store_tasks(result["tasks"], arguments.get("fields"), bool(arguments.get("summary")))
+    return [TextContent(type="text", text=to_json(result))]
+
+# search_tasks - タスクの全文検索
+@tool_registry.tool(
+    "search_tasks",
+    description="タスクのタイトル、説明、サブタスクとノートを全文検索し、関連度の高い順に取得します。"
+                "検索語のすべての語を含むタスクが対象です。各タスクには agent_id、project_name と score が付きます。",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "query": {
+                "type": "string",
+                "description": "検索語 (日本語は2文字ずつ、英数字は単語ごとに照合します)"
+            },
+            "scope": {
+                "type": "string",
+                "description": "検索するストア ('store': agent_id と project_name で指定したストア、"
+                               "'agent': agent_id のエージェントとそのすべてのプロジェクト、'all': すべてのストア)",
+                "enum": ["store", "agent", "all"],
+                "default": "store"
+            },
+            "status": {
+                "type": "string",
+                "description": "タスクのステータス ('todo', 'in_progress', 'done')",
+                "enum": ["todo", "in_progress", "done"]
+            },
+            "priority_min": {
+                "type": "integer",
+                "description": "最小優先度 (1-5)",
+                "minimum": 1,
+                "maximum": 5
+            },
+            "limit": {
+                "type": "integer",
+                "description": f"最大件数（既定は{SEARCH_DEFAULT_LIMIT}）",
+                "minimum": 1
+            },
+            "fields": {
+                "type": "array",
+                "description": "取得するフィールドのリスト (例: [\"id\", \"title\", \"status\", \"priority\"])",
+                "items": {
+                    "type": "string"
+                }
+            },
+            "summary": {
+                "type": "boolean",
+                "description": "trueの場合はサブタスクとノートを省略します",
+                "default": False
+            },
+            "agent_id": {
+                "type": "string",
+                "description": "タスクの対象エージェントID"
+            },
+            "project_name": {
+                "type": "string",
+                "description": "タスクの対象プロジェクト名"
+            }
+        },
+        "required": ["query"]
+    },
+    read_only=True
+)
+def tool_search_tasks(arguments: Dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+    agent_id = arguments.get("agent_id")
+    project_name = arguments.get("project_name")
+    
+    # 必須パラメータの確認
+    if not isinstance(arguments.get("query"), str):
+        raise ValueError("Missing required parameter: query")
+    
+    scope = arguments.get("scope", "store")
+    if scope == "store":
+        stores = [(agent_id, project_name)]
+    elif scope == "agent":
+        if not agent_id:
+            raise ValueError("Missing required parameter: agent_id (scope: agent)")
+        stores = [(agent_id, None)] + [(agent_id, project) for project in sorted(list_projects(agent_id))]
+    elif scope == "all":
+        stores = iter_stores(list_agents, list_projects)
+    else:
+        raise ValueError("Invalid scope: must be 'store', 'agent', or 'all'")
+    
+    # ストアごとの検索は query_executor で並行して実行し、関連度の高い上位 limit 件へ併合する
+    scan = functools.partial(search_store, query=arguments["query"], status=arguments.get("status"),
+                             priority_min=arguments.get("priority_min"))
+    result = query_stores(stores, scan, query_executor, "score", arguments.get("limit", SEARCH_DEFAULT_LIMIT),
+                          QUERY_THREADS)
+    
+    tasks = present_store_tasks(result["tasks"], arguments.get("fields"), bool(arguments.get("summary")))
+    result["tasks"] = [{**task, "score": match["score"]} for task, (match, _) in zip(tasks, result["tasks"])]
+    return [TextContent(type="text", text=to_json(result))]
+
+# get_next_task - 次のタスクの取得
+@tool_registry.tool(
+    "get_next_task",
+    description="優先度の高い次のタスクを取得し、自動的に'in_progress'ステータスに更新します。",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "agent_id": {
+                "type": "string",
+                "description": "タスクの対象エージェントID"
+            },
+            "project_name": {
+                "type": "string",
+                "description": "タスクの対象プロジェクト名"
+            }
+        }
+    }
+)
+def tool_get_next_task(arguments: Dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+    agent_id = arguments.get("agent_id")
+    project_name = arguments.get("project_name")
+    
+    with open_transaction(agent_id, project_name) as tx:
+        if STORAGE_MODE == "sqlite":
+            # 索引の先頭から次のタスクを取得する (全体は読み込まない)
+            next_task = sqlite_store.next_task(agent_id, project_name)
+        else:
+            # 最も優先度の高い未完了のタスクを取得
+            next_task = select_next_task(tx.tasks, agent_id, project_name)
+        
+        if next_task is None:
+            return [TextContent(type="text", 
+                     text="利用可能なタスクはありません。すべてのタスクが完了しているか、タスクがまだ作成されていません。")]
+        
+        # タスクステータスを更新
+        tx.update(next_task, status="in_progress")
+    
+    next_task = attach_notes([next_task], agent_id, project_name)[0]
+    return [TextContent(type="text", text=to_json(next_task))]
+
+# create_task - タスク作成
+@tool_registry.tool(
+    "create_task",
+    description="新しいタスクを作成します。サブタスクも定義できます。",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "title": {
+                "type": "string",
+                "description": "タスクのタイトル"
+            },
+            "description": {
+                "type": "string",
+                "description": "タスクの詳細な説明"
+            },
+            "priority": {
+                "type": "integer",
+                "description": "タスクの優先度 (1-5, 5が最高)",
+                "minimum": 1,
+                "maximum": 5,
+                "default": 3
+            },
+            "subtasks": {
+                "type": "array",
+                "description": "サブタスクの説明リスト",
+                "items": {
+                    "type": "string"
+                }
+            },
+            "agent_id": {
+                "type": "string",
+                "description": "タスクの対象エージェントID"
+            },
+            "project_name": {
+                "type": "string",
+                "description": "タスクの対象プロジェクト名"
+            }
+        },
+        "required": ["title", "description"]
+    }
+)
+def tool_create_task(arguments: Dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+    agent_id = arguments.get("agent_id")
+    project_name = arguments.get("project_name")
+    
+    # 必須パラメータの確認
+    if "title" not in arguments or "description" not in arguments:
+        raise ValueError("Missing required parameters: title and description")
+    
+    # 新しいタスクを作成して追加
+    with open_transaction(agent_id, project_name) as tx:
+        new_task = tx.add_task(build_task(allocate_task_id(tx, agent_id, project_name), arguments))
+    
+    agent_info = f" (エージェント: {agent_id})" if agent_id else ""
+    project_info = f" (プロジェクト: {project_name})" if project_name else ""
+    return [TextContent(type="text", 
+             text=f"タスク '{new_task['title']}' (ID: {new_task['id']}){agent_info}{project_info} が作成されました。")]
+
+# update_progress - 進捗更新
+@tool_registry.tool(
+    "update_progress",
+    description="タスクの進捗を更新します。",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "task_id": {
+                "type": "integer",
+                "description": "タスクID"
+            },
+            "progress": {
+                "type": "number",
+                "description": "タスクの進捗率 (0-100)",
+                "minimum": 0,
+                "maximum": 100
+            },
+            "agent_id": {
+                "type": "string",
+                "description": "タスクの対象エージェントID"
+            },
+            "project_name": {
+                "type": "string",
+                "description": "タスクの対象プロジェクト名"
+            }
+        },
+        "required": ["task_id", "progress"]
+    }
+)
+def tool_update_progress(arguments: Dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+    agent_id = arguments.get("agent_id")
+    project_name = arguments.get("project_name")
+    
+    # 必須パラメータの確認
+    if "task_id" not in arguments or "progress" not in arguments:
+        raise ValueError("Missing required parameters: task_id and progress")
+    
+    task_id = arguments["task_id"]
+    progress = arguments["progress"]
+    
+    # タスクを見つけて更新
+    with open_transaction(agent_id, project_name) as tx:
+        task = tx.find(task_id)
+        if task is None:
+            return [TextContent(type="text", text=f"エラー: タスク (ID: {task_id}) が見つかりません。")]
+        tx.set_progress(task, progress)
+    
+    return [TextContent(type="text", 
+             text=f"タスク (ID: {task_id}) の進捗が {progress}% に更新されました。")]
+
+# complete_task - タスク完了
+@tool_registry.tool(
+    "complete_task",
+    description="タスクを完了としてマークします。",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "task_id": {
+                "type": "integer",
+                "description": "タスクID"
+            },
+            "agent_id": {
+                "type": "string",
+                "description": "タスクの対象エージェントID"
+            },
+            "project_name": {
+                "type": "string",
+                "description": "タスクの対象プロジェクト名"
+            }
+        },
+        "required": ["task_id"]
+    }
+)
+def tool_complete_task(arguments: Dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+    agent_id = arguments.get("agent_id")
+    project_name = arguments.get("project_name")
+    
+    # 必須パラメータの確認
+    if "task_id" not in arguments:
+        raise ValueError("Missing required parameter: task_id")
+    
+    task_id = arguments["task_id"]
+    
+    # タスクを見つけて更新
+    with open_transaction(agent_id, project_name) as tx:
+        task = tx.find(task_id)
+        if task is None:
+            return [TextContent(type="text", text=f"エラー: タスク (ID: {task_id}) が見つかりません。")]
+        tx.complete(task)
+    
+    return [TextContent(type="text", 
+             text=f"タスク (ID: {task_id}) が完了としてマークされました。")]
+
+# add_subtask - サブタスク追加
+@tool_registry.tool(
+    "add_subtask",
+    description="既存タスクにサブタスクを追加します。",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "task_id": {
+                "type": "integer",
+                "description": "親タスクID"
+            },
+            "description": {
+                "type": "string",
+                "description": "サブタスクの説明"
+            },
+            "agent_id": {
+                "type": "string",
+                "description": "タスクの対象エージェントID"
+            },
+            "project_name": {
+                "type": "string",
+                "description": "タスクの対象プロジェクト名"
+            }
+        },
+        "required": ["task_id", "description"]
+    }
+)
+def tool_add_subtask(arguments: Dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+    agent_id = arguments.get("agent_id")
+    project_name = arguments.get("project_name")
+    
+    # 必須パラメータの確認
+    if "task_id" not in arguments or "description" not in arguments:
+        raise ValueError("Missing required parameters: task_id and description")
+    
+    task_id = arguments["task_id"]
+    
+    # タスクを見つけてサブタスクを追加
+    with open_transaction(agent_id, project_name) as tx:
+        task = tx.find(task_id)
+        if task is None:
+            return [TextContent(type="text", text=f"エラー: タスク (ID: {task_id}) が見つかりません。")]
+        new_subtask = tx.add_subtask(task, arguments["description"])
+    
+    return [TextContent(type="text", 
+             text=f"サブタスク (ID: {new_subtask['id']}) がタスク (ID: {task_id}) に追加されました。")]
+
+# update_subtask - サブタスク更新
+@tool_registry.tool(
+    "update_subtask",
+    description="サブタスクのステータスを更新します。",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "task_id": {
+                "type": "integer",
+                "description": "親タスクID"
+            },
+            "subtask_id": {
+                "type": "integer",
+                "description": "サブタスクID"
+            },
+            "status": {
+                "type": "string",
+                "description": "サブタスクの新しいステータス ('todo', 'in_progress', 'done')",
+                "enum": ["todo", "in_progress", "done"]
+            },
+            "agent_id": {
+                "type": "string",
+                "description": "タスクの対象エージェントID"
+            },
+            "project_name": {
+                "type": "string",
+                "description": "タスクの対象プロジェクト名"
+            }
+        },
+        "required": ["task_id", "subtask_id", "status"]
+    }
+)
+def tool_update_subtask(arguments: Dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+    agent_id = arguments.get("agent_id")
+    project_name = arguments.get("project_name")
+    
+    # 必須パラメータの確認
+    if "task_id" not in arguments or "subtask_id" not in arguments or "status" not in arguments:
+        raise ValueError("Missing required parameters: task_id, subtask_id and status")
+    
+    task_id = arguments["task_id"]
+    subtask_id = arguments["subtask_id"]
+    status = arguments["status"]
+    
+    # ステータスの検証
+    if status not in ["todo", "in_progress", "done"]:
+        raise ValueError("Invalid status: must be 'todo', 'in_progress', or 'done'")
+    
+    # サブタスクを更新し、メインタスクの進捗も同じ書き込みで更新する
+    with open_transaction(agent_id, project_name) as tx:
+        task = tx.find(task_id)
+        if task is None:
+            return [TextContent(type="text", text=f"エラー: タスク (ID: {task_id}) が見つかりません。")]
+        if tx.set_subtask_status(task, subtask_id, status) is None:
+            return [TextContent(type="text", text=f"エラー: サブタスク (ID: {subtask_id}) が見つかりません。")]
+    
+    return [TextContent(type="text", 
+             text=f"サブタスク (ID: {subtask_id}) のステータスが '{status}' に更新されました。")]
+
+# add_note - ノート追加
+@tool_registry.tool(
+    "add_note",
+    description="タスクにノートを追加します。",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "task_id": {
+                "type": "integer",
+                "description": "タスクID"
+            },
+            "content": {
+                "type": "string",
+                "description": "ノートの内容"
+            },
+            "agent_id": {
+                "type": "string",
+                "description": "タスクの対象エージェントID"
+            },
+            "project_name": {
+                "type": "string",
+                "description": "タスクの対象プロジェクト名"
+            }
+        },
+        "required": ["task_id", "content"]
+    }
+)
+def tool_add_note(arguments: Dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+    agent_id = arguments.get("agent_id")
+    project_name = arguments.get("project_name")
+    
+    # 必須パラメータの確認
+    if "task_id" not in arguments or "content" not in arguments:
+        raise ValueError("Missing required parameters: task_id and content")
+    
+    task_id = arguments["task_id"]
+    
+    # タスクを見つけてノートを追加
+    with open_transaction(agent_id, project_name) as tx:
+        task = tx.find(task_id)
+        if task is None:
+            return [TextContent(type="text", text=f"エラー: タスク (ID: {task_id}) が見つかりません。")]
+        tx.add_note(task, arguments["content"])
+    
+    return [TextContent(type="text", 
+             text=f"ノートがタスク (ID: {task_id}) に追加されました。")]
+
+# create_tasks - タスクの一括作成
+@tool_registry.tool(
+    "create_tasks",
+    description="複数のタスクをまとめて作成します。項目ごとの結果を返します。",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "tasks": {
+                "type": "array",
+                "description": "作成するタスクのリスト (各項目は create_task と同じ形式)",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "title": {"type": "string"},
+                        "description": {"type": "string"},
+                        "priority": {"type": "integer", "minimum": 1, "maximum": 5, "default": 3},
+                        "subtasks": {"type": "array", "items": {"type": "string"}}
+                    },
+                    "required": ["title", "description"]
+                }
+            },
+            "agent_id": {
+                "type": "string",
+                "description": "タスクの対象エージェントID"
+            },
+            "project_name": {
+                "type": "string",
+                "description": "タスクの対象プロジェクト名"
+            }
+        },
+        "required": ["tasks"]
+    }
+)
+def tool_create_tasks(arguments: Dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+    agent_id = arguments.get("agent_id")
+    project_name = arguments.get("project_name")
+    
+    # 必須パラメータの確認
+    if not isinstance(arguments.get("tasks"), list):
+        raise ValueError("Missing required parameter: tasks")
+    
+    next_id = []
+    
+    def create_item(tx, item):
+        if not isinstance(item, dict) or "title" not in item or "description" not in item:
+            raise ValueError("Missing required parameters: title and description")
+        # IDは最初の1件だけ払い出し、以降は連番にする (保存前のSQLiteでも重複しない)
+        task_id = next_id.pop() if next_id else allocate_task_id(tx, agent_id, project_name)
+        next_id.append(task_id + 1)
+        tx.add_task(build_task(task_id, item))
+        return {"task_id": task_id}
+    
+    results = apply_bulk(arguments["tasks"], create_item, agent_id, project_name)
+    return [TextContent(type="text", text=to_json(results))]
+
+# update_progress_many - 進捗の一括更新
+@tool_registry.tool(
+    "update_progress_many",
+    description="複数のタスクの進捗をまとめて更新します。項目ごとの結果を返します。",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "updates": {
+                "type": "array",
+                "description": "更新内容のリスト",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "task_id": {"type": "integer"},
+                        "progress": {"type": "number", "minimum": 0, "maximum": 100}
+                    },
+                    "required": ["task_id", "progress"]
+                }
+            },
+            "agent_id": {
+                "type": "string",
+                "description": "タスクの対象エージェントID"
+            },
+            "project_name": {
+                "type": "string",
+                "description": "タスクの対象プロジェクト名"
+            }
+        },
+        "required": ["updates"]
+    }
+)
+def tool_update_progress_many(arguments: Dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+    agent_id = arguments.get("agent_id")
+    project_name = arguments.get("project_name")
+    
+    # 必須パラメータの確認
+    if not isinstance(arguments.get("updates"), list):
+        raise ValueError("Missing required parameter: updates")
+    
+    def update_item(tx, item):
+        task = _bulk_task(tx, item)
+        if not isinstance(item.get("progress"), (int, float)):
+            raise ValueError("Missing required parameter: progress")
+        return {"task_id": task["id"], **tx.set_progress(task, item["progress"])}
+    
+    results = apply_bulk(arguments["updates"], update_item, agent_id, project_name)
+    return [TextContent(type="text", text=to_json(results))]
+
+# complete_tasks - タスクの一括完了
+@tool_registry.tool(
+    "complete_tasks",
+    description="複数のタスクをまとめて完了としてマークします。項目ごとの結果を返します。",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "task_ids": {
+                "type": "array",
+                "description": "完了にするタスクIDのリスト",
+                "items": {
+                    "type": "integer"
+                }
+            },
+            "agent_id": {
+                "type": "string",
+                "description": "タスクの対象エージェントID"
+            },
+            "project_name": {
+                "type": "string",
+                "description": "タスクの対象プロジェクト名"
+            }
+        },
+        "required": ["task_ids"]
+    }
+)
+def tool_complete_tasks(arguments: Dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+    agent_id = arguments.get("agent_id")
+    project_name = arguments.get("project_name")
+    
+    # 必須パラメータの確認
+    if not isinstance(arguments.get("task_ids"), list):
+        raise ValueError("Missing required parameter: task_ids")
+    
+    def complete_item(tx, task_id):
+        tx.complete(_bulk_task(tx, {"task_id": task_id}))
+        return {"task_id": task_id}
+    
+    results = apply_bulk(arguments["task_ids"], complete_item, agent_id, project_name)
+    return [TextContent(type="text", text=to_json(results))]
+
+# add_notes - ノートの一括追加
+@tool_registry.tool(
+    "add_notes",
+    description="複数のノートをまとめて追加します。項目ごとの結果を返します。",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "notes": {
+                "type": "array",
+                "description": "追加するノートのリスト",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "task_id": {"type": "integer"},
+                        "content": {"type": "string"}
+                    },
+                    "required": ["task_id", "content"]
+                }
+            },
+            "agent_id": {
+                "type": "string",
+                "description": "タスクの対象エージェントID"
+            },
+            "project_name": {
+                "type": "string",
+                "description": "タスクの対象プロジェクト名"
+            }
+        },
+        "required": ["notes"]
+    }
+)
+def tool_add_notes(arguments: Dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+    agent_id = arguments.get("agent_id")
+    project_name = arguments.get("project_name")
+    
+    # 必須パラメータの確認
+    if not isinstance(arguments.get("notes"), list):
+        raise ValueError("Missing required parameter: notes")
+    
+    def note_item(tx, item):
+        task = _bulk_task(tx, item)
+        if "content" not in item:
+            raise ValueError("Missing required parameter: content")
+        new_note = tx.add_note(task, item["content"])
+        return {"task_id": task["id"], "note_id": new_note["id"]}
+    
+    results = apply_bulk(arguments["notes"], note_item, agent_id, project_name)
+    return [TextContent(type="text", text=to_json(results))]
+
+# claim_next_tasks - タスクの確保
+@tool_registry.tool(
+    "claim_next_tasks",
+    description="優先度の高い未確保のタスクを指定した数だけ確保します。確保したタスクはリース期限まで他の作業者に渡されません。",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "claimant": {
+                "type": "string",
+                "description": "タスクを確保する作業者の名前"
+            },
+            "count": {
+                "type": "integer",
+                "description": "確保するタスクの最大数",
+                "minimum": 1,
+                "default": 1
+            },
+            "lease_seconds": {
+                "type": "integer",
+                "description": "リース期間 (秒)",
+                "minimum": 1
+            },
+            "agent_id": {
+                "type": "string",
+                "description": "タスクの対象エージェントID"
+            },
+            "project_name": {
+                "type": "string",
+                "description": "タスクの対象プロジェクト名"
+            }
+        },
+        "required": ["claimant"]
+    }
+)
+def tool_claim_next_tasks(arguments: Dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+    agent_id = arguments.get("agent_id")
+    project_name = arguments.get("project_name")
+    
+    # 必須パラメータの確認
+    if "claimant" not in arguments:
+        raise ValueError("Missing required parameter: claimant")
+    
+    claimant = arguments["claimant"]
+    count = arguments.get("count", 1)
+    now = datetime.datetime.now()
+    lease_expires_at = (now + datetime.timedelta(seconds=arguments.get("lease_seconds", LEASE_SECONDS))
+                        ).isoformat(timespec="seconds")
+    
+    if STORAGE_MODE == "sqlite":
+        # 選択と更新を1つのSQLiteトランザクションで行う
+        claimed = sqlite_store.claim(claimant, count, lease_expires_at, agent_id, project_name,
+                                     now=now.isoformat(timespec="seconds"))
+    else:
+        with open_transaction(agent_id, project_name) as tx:
+            claimed = claim_tasks(tx.tasks, claimant, count, lease_expires_at, agent_id, project_name, now)
+            for task in claimed:
+                tx.update(task, status="in_progress", claimed_by=claimant,
+                          lease_expires_at=lease_expires_at)
+    
+    claimed = attach_notes(claimed, agent_id, project_name)
+    return [TextContent(type="text", text=to_json(claimed))]
+
+# heartbeat - リースの延長
+@tool_registry.tool(
+    "heartbeat",
+    description="確保しているタスクのリースを延長します。",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "task_id": {
+                "type": "integer",
+                "description": "タスクID"
+            },
+            "claimant": {
+                "type": "string",
+                "description": "タスクを確保している作業者の名前"
+            },
+            "lease_seconds": {
+                "type": "integer",
+                "description": "延長後のリース期間 (秒)",
+                "minimum": 1
+            },
+            "agent_id": {
+                "type": "string",
+                "description": "タスクの対象エージェントID"
+            },
+            "project_name": {
+                "type": "string",
+                "description": "タスクの対象プロジェクト名"
+            }
+        },
+        "required": ["task_id", "claimant"]
+    }
+)
+def tool_heartbeat(arguments: Dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+    agent_id = arguments.get("agent_id")
+    project_name = arguments.get("project_name")
+    
+    # 必須パラメータの確認
+    if "task_id" not in arguments or "claimant" not in arguments:
+        raise ValueError("Missing required parameters: task_id and claimant")
+    
+    task_id = arguments["task_id"]
+    claimant = arguments["claimant"]
+    lease_expires_at = (datetime.datetime.now()
+                        + datetime.timedelta(seconds=arguments.get("lease_seconds", LEASE_SECONDS))
+                        ).isoformat(timespec="seconds")
+    
+    with open_transaction(agent_id, project_name) as tx:
+        task = tx.find(task_id)
+        
+        if task is None:
+            return [TextContent(type="text", text=f"エラー: タスク (ID: {task_id}) が見つかりません。")]
+        
+        if task.get("claimed_by") != claimant or task.get("status") == "done":
+            return [TextContent(type="text", 
+                     text=f"エラー: タスク (ID: {task_id}) は {claimant} によって確保されていません。")]
+        
+        tx.update(task, lease_expires_at=lease_expires_at)
+    
+    return [TextContent(type="text", 
+             text=f"タスク (ID: {task_id}) のリースが {lease_expires_at} まで延長されました。")]
+
+# get_task_history - タスクの変更履歴の取得
+@tool_registry.tool(
+    "get_task_history",
+    description="タスクの変更履歴 (ノートの追加を含む) を取得します（ジャーナルモードでのみ利用可能）。",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "task_id": {
+                "type": "integer",
+                "description": "タスクID"
+            },
+            "agent_id": {
+                "type": "string",
+                "description": "タスクの対象エージェントID"
+            },
+            "project_name": {
+                "type": "string",
+                "description": "タスクの対象プロジェクト名"
+            }
+        },
+        "required": ["task_id"]
+    },
+    read_only=True
+)
+def tool_get_task_history(arguments: Dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+    agent_id = arguments.get("agent_id")
+    project_name = arguments.get("project_name")
+    
+    # 必須パラメータの確認
+    if "task_id" not in arguments:
+        raise ValueError("Missing required parameter: task_id")
+    
+    if STORAGE_MODE != "journal":
+        return [TextContent(type="text", 
+                 text="エラー: タスクの変更履歴はジャーナルモード (TASKMATE_STORAGE=journal) でのみ利用できます。")]
+    
+    tasks_file = get_tasks_file_path(agent_id, project_name)
+    task_id = arguments["task_id"]
+    history = journal_store.history(tasks_file, task_id)
+    
+    # ノートはジャーナルではなくノートのログに追記されるため、ノート追加のイベントとして時刻順に合流させる
+    history.extend({"ts": note.get("timestamp"), **add_note_event(task_id, note)}
+                   for note in notes_log.notes(tasks_file).get(task_id, []))
+    history.sort(key=lambda event: event.get("ts") or "")
+    return [TextContent(type="text", text=to_json(history))]
+
+# get_metrics - メトリクスの取得
+@tool_registry.tool(
+    "get_metrics",
+    description="ツールとリソースの呼び出し回数・エラー数・レイテンシ (p50/p99とヒストグラム)、"
+                "ストアの読み書きのバイト数、キャッシュのヒット率を取得します。",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "reset": {
+                "type": "boolean",
+                "description": "取得した後に集計をリセットするかどうか（既定はfalse）"
+            }
+        }
+    },
+    read_only=True
+)
+def tool_get_metrics(arguments: Dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+    snapshot = metrics_snapshot()
+    if arguments.get("reset", False):
+        metrics.reset()
+    return [TextContent(type="text", text=to_json(snapshot))]
+
+# configure_profiling - プロファイルの設定
+@tool_registry.tool(
+    "configure_profiling",
+    description="ツールの呼び出しとリソースの読み込みのプロファイル (cProfile) と、"
+                "メモリの追跡 (tracemalloc) を開始・停止します。記録は出力ディレクトリの .profiles に書き出されます。",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "enabled": {
+                "type": "boolean",
+                "description": "プロファイルを有効にするかどうか"
+            },
+            "targets": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "記録するツール名またはリソースの種類のリスト（既定は [\"*\"] ですべて）"
+            },
+            "sample_rate": {
+                "type": "number",
+                "description": "対象の呼び出しのうち記録する割合（0より大きく1以下。既定は1）"
+            },
+            "memory": {
+                "type": "boolean",
+                "description": "tracemalloc によるメモリの追跡を開始 (true) または停止 (false) します（省略時は変更しない）"
+            }
+        },
+        "required": ["enabled"]
+    },
+    read_only=True
+)
+def tool_configure_profiling(arguments: Dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+    if "enabled" not in arguments:
+        raise ValueError("Missing required parameter: enabled")
+    targets = arguments.get("targets", ["*"])
+    if not isinstance(targets, list):
+        raise ValueError("Invalid parameter: targets must be a list")
+    profiler.configure(
+        parse_targets(",".join(str(t) for t in targets) or "*") if arguments["enabled"] else None,
+        float(arguments.get("sample_rate", 1.0)),
+        arguments.get("memory")
+    )
+    logger.info(f"プロファイルの設定を変更しました: {profiler.status()}")
+    return [TextContent(type="text", text=to_json(profiler.status()))]
+
+# get_profile_summary - プロファイルの集計
+@tool_registry.tool(
+    "get_profile_summary",
+    description="記録したプロファイルを合算し、時間のかかっている関数の上位を取得します。"
+                "memory を指定すると、メモリのスナップショットを書き出して確保量の多い行も返します。",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "target": {
+                "type": "string",
+                "description": "集計するツール名またはリソースの種類（省略時はすべて）"
+            },
+            "limit": {
+                "type": "integer",
+                "description": "返す関数（と行）の数（既定は20）"
+            },
+            "sort": {
+                "type": "string",
+                "enum": ["tottime", "cumtime"],
+                "description": "並べ替えの基準（tottime: 関数自身の時間、cumtime: 呼び出し先を含む時間）"
+            },
+            "memory": {
+                "type": "boolean",
+                "description": "tracemalloc のスナップショットを取るかどうか（メモリの追跡が有効な場合のみ）"
+            }
+        }
+    },
+    read_only=True
+)
+def tool_get_profile_summary(arguments: Dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+    summary = {"profiling": profiler.status()}
+    summary.update(profiler.summary(arguments.get("target"), int(arguments.get("limit", 20)),
+                                    arguments.get("sort", "tottime")))
+    if arguments.get("memory", False):
+        summary["memory"] = profiler.snapshot_memory(int(arguments.get("limit", 20)))
+    return [TextContent(type="text", text=to_json(summary))]
+
+# 利用可能なTODOツール一覧の取得 (登録が変わるまで同じリストを返す)
+@app.list_tools()
+async def list_tools() -> list[Tool]:
+    return tool_registry.tools()
+
+# TODOツールの呼び出し
+async def call_tool(name: str, arguments: Any) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+    # ツール名の検証
+    spec = tool_registry.get(name)
+    if spec is None:
+        raise ValueError(f"Unknown tool: {name}")
+
+    # 引数の型確認
+    if not isinstance(arguments, dict):
+        raise ValueError("Invalid arguments: must be a dictionary")
+
+    # ファイルI/Oはスレッドプールで実行し、同じストアへの変更は非同期ロックで順番に実行する
+    # (プロファイルが有効な場合は、対象の呼び出しを記録しながら実行する)
+    runner = profiler.wrap("tool", name, run_tool) if profiler.enabled else run_tool
+    with metrics.timer("tool", name):
+        if spec.read_only:
+            return await run_io(runner, name, arguments)
+        async with async_store_lock(arguments.get("agent_id"), arguments.get("project_name")):
+            return await run_io(runner, name, arguments)
+
+# MCPクライアントからのツールの呼び出しを処理する関数
+# (引数はツールごとに1回だけ作成したバリデータで検証する。mcp の既定の検証は呼び出しごとにスキーマを検査するため使わない。
+#  validate_input は mcp 1.10 以降の引数のため、pyproject の下限もそれに合わせている)
+@app.call_tool(validate_input=False)
+async def handle_call_tool(name: str, arguments: Any) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+    tool_registry.validate(name, arguments)
+    return await call_tool(name, arguments)
+
+# 書き込みの競合時にやり直しながらツールを実行する関数
+def run_tool(name: str, arguments: Dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+    """
+    ツールを実行する関数。
+
+    他のプロセスによる書き込みとの競合を検出した場合は、何も保存されていないため、
+    最新の状態を読み込み直して CONFLICT_RETRIES 回までやり直す。
+
+    Args:
+        name: ツール名
+        arguments: ツールの引数
+
+    Returns:
+        Sequence[TextContent | ImageContent | EmbeddedResource]: ツールの結果
+    """
+    for attempt in range(1, CONFLICT_RETRIES + 1):
+        try:
+            return handle_tool(name, arguments)
+        except StoreConflictError as e:
+            logger.warning(f"書き込みの競合を検出しました ({attempt}/{CONFLICT_RETRIES}): {str(e)}")
+    metrics.count_error("tool", name)
+    return [TextContent(type="text",
+             text="エラー: 他のプロセスによる変更と競合したため、保存できませんでした。もう一度実行してください。")]
+
+# ツールを実行する関数 (スレッドプールで実行する)
+def handle_tool(name: str, arguments: Dict) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+    try:
+        spec = tool_registry.get(name)
+        if spec is None:
+            raise ValueError(f"Unknown tool: {name}")
+        return spec.handler(arguments)
+    except StoreConflictError:
+        # run_tool() でやり直す
+        raise
+    except Exception as e:
+        metrics.count_error("tool", name)
+        logger.error(f"Unexpected error: {str(e)}")
+        return [TextContent(type="text", text=f"予期せぬエラーが発生しました: {str(e)}")]
+
+# 保存待ちの変更を書き込む関数
+def flush_pending_writes() -> None:
+    task_writer.flush()
+    journal_store.flush()
+
+# メトリクスを Prometheus のテキスト形式で取得する関数
+def prometheus_metrics() -> str:
+    return metrics.prometheus(metrics_gauges())
+
+# HTTPトランスポートでサーバを実行する関数
+async def serve_http(transport: str = "http") -> None:
+    """
+    HTTPトランスポートでサーバを実行する関数。
+
+    1つのプロセスで複数のMCPクライアントに応答し、キャッシュとストアを共有する。
+    SIGINT/SIGTERM を受け取ると新しい接続の受け付けを止め、処理中の要求を
+    HTTP_SHUTDOWN_TIMEOUT 秒まで待ってから、保存待ちの変更を書き込んで終了する。
+
+    Args:
+        transport: トランスポートの種類 ("http" または "sse")
+    """
+    # 標準入出力のモードでは不要なため、ここでインポート
+    import uvicorn
+    from .http_transport import create_http_app
+
+    config = uvicorn.Config(
+        create_http_app(app, transport, on_shutdown=flush_pending_writes,
+                        metrics_text=prometheus_metrics if HTTP_METRICS else None),
+        host=HTTP_HOST,
+        port=HTTP_PORT,
+        timeout_keep_alive=HTTP_KEEP_ALIVE,
+        timeout_graceful_shutdown=HTTP_SHUTDOWN_TIMEOUT,
+        log_level="info"
+    )
+    logger.info(f"http://{HTTP_HOST}:{HTTP_PORT} で待ち受けます ({transport})")
+    await uvicorn.Server(config).serve()
+
+# メイン関数
+async def main():
+    # イベントループの問題を回避するためにここにインポート
+    from mcp.server.stdio import stdio_server
+
+    # インポート時にはファイルシステムやログの設定を変更せず、起動時に行う
+    logging.basicConfig(level=logging.INFO)
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    # プラグインのツールを登録する (最初の tools/list より前に行う)
+    if TOOL_PLUGINS:
+        tool_registry.load_plugins()
+
+    # エージェントとプロジェクトのカタログをバックグラウンドで作成しておく (最初の応答を待たせない)
+    if STORAGE_MODE != "sqlite":
+        asyncio.get_running_loop().run_in_executor(io_executor, store_catalog.warm, OUTPUT_DIR)
+        if CATALOG_WATCH:
+            store_catalog.watch(OUTPUT_DIR)
+
+    # 古い完了済みタスクの定期的なアーカイブ
+    archiver = asyncio.create_task(archive_loop()) if ARCHIVE_AFTER_DAYS > 0 else None
+
+    # サーバの実行 (終了時には実行中のI/Oを待ち、保存待ちの変更を書き込む)
+    try:
+        if TRANSPORT == "stdio":
+            async with stdio_server() as (read_stream, write_stream):
+                await app.run(
+                    read_stream,
+                    write_stream,
+                    app.create_initialization_options()
+                )
+        else:
+            await serve_http(TRANSPORT)
+    finally:
+        if archiver is not None:
+            archiver.cancel()
+        io_executor.shutdown(wait=True)
+        query_executor.shutdown(wait=True)
+        flush_pending_writes()
+
+# Pythonスクリプトとして直接実行された場合
+if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,161 @@
+import os
+import re
+import json
+import logging
+import datetime
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from . import serializer
+from .cache import FileSignature, file_signature
+from .writer import atomic_write
+
+logger = logging.getLogger("taskmate-server")
+
+# コールドセグメントのファイル名 (例: tasks.archive.000001.jsonl.gz)
+_SEGMENT = re.compile(r"^(?P<stem>.+)\.archive\.(?P<seq>\d{6,})\.jsonl\.gz$")
+
+
+# タスクファイルに対応するコールドセグメントのパスを取得する関数
+def get_segment_path(tasks_file: str, seq: int) -> str:
+    root, _ = os.path.splitext(tasks_file)
+    return f"{root}.archive.{seq:06d}.jsonl.gz"
+
+
+# 完了日時を解析する関数
+def completed_at(task: Dict) -> Optional[datetime.datetime]:
+    value = task.get("completed_at")
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+# アーカイブの対象となるタスクを選ぶ関数
+def select_archivable(tasks: List[Dict], cutoff: datetime.datetime) -> List[Dict]:
+    """
+    完了日時が cutoff より前の完了済みタスクを選ぶ関数。
+
+    IDが最大のタスクは、新しいタスクIDの払い出しの基準として常にストアに残す。
+
+    Args:
+        tasks: タスクのリスト
+        cutoff: この日時より前に完了したタスクを選ぶ
+
+    Returns:
+        List[Dict]: アーカイブするタスクのリスト
+    """
+    ids = [t.get("id") for t in tasks if isinstance(t.get("id"), int)]
+    max_id = max(ids) if ids else None
+    selected = []
+    for task in tasks:
+        if task.get("status") != "done" or task.get("id") == max_id:
+            continue
+        done_at = completed_at(task)
+        if done_at is not None and done_at < cutoff:
+            selected.append(task)
+    return selected
+
+
+class ColdArchive:
+    """
+    完了済みタスクのコールドストレージ。
+
+    アーカイブしたタスクは tasks.json と同じディレクトリに、gzip 圧縮した
+    JSON Lines のセグメント (tasks.archive.000001.jsonl.gz, ...) として書き出す。
+    セグメントは追記専用で、一度書き出したものは書き換えない。
+    読み込んだ内容はセグメントの一覧とシグネチャで検証してメモリに保持する。
+    """
+
+    def __init__(self, fsync: str = "batched"):
+        """
+        Args:
+            fsync: セグメントを書き込む際の fsync のポリシー
+        """
+        self.fsync = fsync
+        self._loaded: Dict[str, Tuple[Tuple[FileSignature, ...], List[Dict]]] = {}
+        self._lock = threading.Lock()
+
+    def segments(self, tasks_file: str) -> List[str]:
+        """
+        ストアのセグメントのパスを古い順に取得する。
+
+        Args:
+            tasks_file: タスクファイルのパス
+
+        Returns:
+            List[str]: セグメントのパスのリスト
+        """
+        directory = os.path.dirname(tasks_file) or "."
+        stem = os.path.splitext(os.path.basename(tasks_file))[0]
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            return []
+        found = []
+        for name in names:
+            match = _SEGMENT.match(name)
+            if match and match.group("stem") == stem:
+                found.append((int(match.group("seq")), os.path.join(directory, name)))
+        return [path for _, path in sorted(found)]
+
+    def append(self, tasks_file: str, tasks: List[Dict]) -> Optional[str]:
+        """
+        タスクを新しいセグメントとして書き出す。
+
+        Args:
+            tasks_file: タスクファイルのパス
+            tasks: アーカイブするタスクのリスト
+
+        Returns:
+            Optional[str]: 書き出したセグメントのパス。タスクが空の場合はNone
+        """
+        if not tasks:
+            return None
+        with self._lock:
+            existing = self.segments(tasks_file)
+            seq = int(_SEGMENT.match(os.path.basename(existing[-1])).group("seq")) + 1 if existing else 1
+            lines = b"".join(serializer.dumps_bytes(task) + b"\n" for task in tasks)
+            path = get_segment_path(tasks_file, seq)
+            # アーカイブを使わない場合の起動を速くするため、ここでインポート
+            import gzip
+            atomic_write(path, gzip.compress(lines), self.fsync)
+        logger.info(f"{len(tasks)} 件の完了済みタスクをアーカイブしました: {path}")
+        return path
+
+    def load(self, tasks_file: str) -> List[Dict]:
+        """
+        アーカイブしたタスクを読み込む (同じIDのタスクは後のセグメントのものを使う)。
+
+        Args:
+            tasks_file: タスクファイルのパス
+
+        Returns:
+            List[Dict]: アーカイブしたタスクのリスト (ID順)
+        """
+        paths = self.segments(tasks_file)
+        signature = tuple(sig for sig in (file_signature(p) for p in paths) if sig is not None)
+        with self._lock:
+            cached = self._loaded.get(tasks_file)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        import gzip
+
+        by_id: Dict = {}
+        for path in paths:
+            try:
+                with gzip.open(path, 'rb') as f:
+                    for line in f:
+                        if line.strip():
+                            task = serializer.loads(line)
+                            by_id[task.get("id")] = task
+            except (OSError, EOFError, json.JSONDecodeError, ValueError) as e:
+                logger.error(f"アーカイブの読み込みエラー: {path}: {str(e)}")
+        tasks = sorted(by_id.values(), key=lambda t: t.get("id") if isinstance(t.get("id"), int) else 0)
+
+        with self._lock:
+            self._loaded[tasks_file] = (signature, tasks)
+        return tasks
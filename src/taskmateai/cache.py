@@ -0,0 +1,210 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple
+
+# ファイルの状態を表すシグネチャの型 (パス, 更新時刻(ns), サイズ, iノード番号)
+# ファイルは置き換えて書き込むため、更新時刻の分解能の範囲内で同じ大きさに書き換えられても iノード番号で区別できる
+FileSignature = Tuple[str, int, int, int]
+
+
+# ファイルのシグネチャを取得する関数
+def file_signature(path: str) -> Optional[FileSignature]:
+    """
+    キャッシュの有効性判定に使うファイルのシグネチャを取得する関数。
+
+    Args:
+        path: 対象ファイルのパス
+
+    Returns:
+        Optional[FileSignature]: (パス, mtime_ns, サイズ, iノード番号)。ファイルが存在しない場合はNone
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (path, stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+class CacheEntry:
+    """
+    1つのタスクストア (エージェント/プロジェクト) のキャッシュエントリ。
+    """
+
+    __slots__ = ("tasks", "signature", "size", "max_task_id", "scanned", "ready_queue", "by_id", "search_index")
+
+    def __init__(self, tasks: List[Dict], signature: Optional[FileSignature], size: int):
+        self.tasks = tasks
+        self.signature = signature
+        self.size = size
+        # タスクIDカウンタ (走査済みのタスク数と、その中の最大ID)
+        self.max_task_id = 0
+        self.scanned = 0
+        # 未完了タスクの優先度付きキュー (必要になった時点で作成する)
+        self.ready_queue = None
+        # タスクIDからタスクへの索引 (必要になった時点で作成する)
+        self.by_id = None
+        # 全文検索の転置インデックス (必要になった時点で作成する)
+        self.search_index = None
+
+    def allocate_task_id(self) -> int:
+        """
+        新しいタスクIDを払い出す。
+
+        前回の払い出し以降に追加されたタスクのみを確認するため、
+        ストアの大きさに関係なくほぼ O(1) で動作する。
+
+        Returns:
+            int: 新しいタスクID
+        """
+        tasks = self.tasks
+        for task in tasks[self.scanned:]:
+            task_id = task.get("id", 0)
+            if isinstance(task_id, int) and task_id > self.max_task_id:
+                self.max_task_id = task_id
+        self.scanned = len(tasks)
+        self.max_task_id += 1
+        return self.max_task_id
+
+
+class TaskStoreCache:
+    """
+    (agent_id, project_name) をキーとしたタスクストアのインメモリキャッシュ。
+
+    エントリはファイルのシグネチャ (mtime/サイズ) と共に保持され、
+    外部からファイルが変更された場合は次回アクセス時に無効化される。
+    保持するストアの合計サイズが上限を超えた場合は、最も長く使われていない
+    エントリから削除する (LRU)。
+    """
+
+    def __init__(self, max_bytes: int):
+        """
+        Args:
+            max_bytes: キャッシュに保持するストアの合計サイズ上限 (シリアライズ後のバイト数)
+        """
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable, signature: Optional[FileSignature]) -> Optional[CacheEntry]:
+        """
+        シグネチャが一致する場合のみキャッシュエントリを返す。
+
+        Args:
+            key: ストアのキー
+            signature: 現在のファイルのシグネチャ
+
+        Returns:
+            Optional[CacheEntry]: 有効なエントリ。存在しないか古い場合はNone
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.signature != signature:
+                # 外部から変更されたエントリは破棄する
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def peek(self, key: Hashable) -> Optional[CacheEntry]:
+        """
+        シグネチャの確認やLRU順の更新を行わずにエントリを返す。
+
+        Args:
+            key: ストアのキー
+
+        Returns:
+            Optional[CacheEntry]: エントリ。存在しない場合はNone
+        """
+        with self._lock:
+            return self._entries.get(key)
+
+    def put(self, key: Hashable, tasks: List[Dict], signature: Optional[FileSignature], size: int) -> CacheEntry:
+        """
+        エントリを登録 (または更新) する。
+
+        同じリストオブジェクトを書き戻す場合は、IDカウンタを引き継ぐ。
+
+        Args:
+            key: ストアのキー
+            tasks: タスクのリスト
+            signature: 書き込み後/読み込み時のファイルのシグネチャ
+            size: ストアのサイズ (シリアライズ後のバイト数)
+
+        Returns:
+            CacheEntry: 登録されたエントリ
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.tasks is tasks:
+                self.total_bytes += size - entry.size
+                entry.signature = signature
+                entry.size = size
+                self._entries.move_to_end(key)
+            else:
+                if entry is not None:
+                    self._remove(key)
+                entry = CacheEntry(tasks, signature, size)
+                self._entries[key] = entry
+                self.total_bytes += size
+            self._evict()
+            return entry
+
+    def revalidate(self, key: Hashable, old_signature, new_signature, size: int) -> None:
+        """
+        自プロセスによるファイルの書き換え後に、エントリのシグネチャを更新する。
+
+        エントリのシグネチャが old_signature と一致する場合のみ更新する。
+
+        Args:
+            key: ストアのキー
+            old_signature: 書き換え前のシグネチャ
+            new_signature: 書き換え後のシグネチャ
+            size: 書き換え後のストアのサイズ
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.signature == old_signature:
+                self.total_bytes += size - entry.size
+                entry.signature = new_signature
+                entry.size = size
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """
+        エントリを無効化する。
+
+        Args:
+            key: 無効化するストアのキー。Noneの場合はすべてのエントリを破棄する
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self.total_bytes = 0
+            elif key in self._entries:
+                self._remove(key)
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self.total_bytes -= entry.size
+
+    def _evict(self) -> None:
+        # 直近に使われたエントリは上限を超えていても1件は残す
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.evictions += 1
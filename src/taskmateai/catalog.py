@@ -0,0 +1,220 @@
+import os
+import time
+import logging
+import threading
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+logger = logging.getLogger("taskmate-server")
+
+
+class _Listing(NamedTuple):
+    """ディレクトリの子ディレクトリ一覧と、読み込み時のディレクトリの更新時刻。"""
+    mtime_ns: int
+    children: Tuple[str, ...]
+    stable: bool
+
+
+class StoreCatalog:
+    """
+    エージェントとプロジェクトのカタログ。
+
+    出力ディレクトリとエージェントのディレクトリについて、子ディレクトリの一覧を
+    メモリ上に保持する。一覧はディレクトリの更新時刻 (mtime) で検証するため、
+    変更がなければ問い合わせのたびに stat を1回行うだけで済む。
+    サーバ自身がストアを作成した場合は add() で一覧を直接更新し、
+    外部の変更を監視している場合は invalidate() で破棄する。
+
+    更新時刻の分解能が粗いファイルシステムで同じ時刻内の変更を見落とさないよう、
+    更新されてから settle_seconds 以内のディレクトリの一覧は信用せずに読み直す。
+    """
+
+    def __init__(self, settle_seconds: float = 2.0):
+        """
+        Args:
+            settle_seconds: 更新直後のディレクトリの一覧を読み直す期間 (秒)
+        """
+        self.settle_ns = int(settle_seconds * 1e9)
+        self._listings: Dict[str, _Listing] = {}
+        self._known: Set[Tuple[str, Optional[str], Optional[str]]] = set()
+        self._lock = threading.Lock()
+        self._observer = None
+        self.scans = 0
+
+    def _scan(self, path: str, mtime_ns: int) -> _Listing:
+        with os.scandir(path) as entries:
+            # "." で始まるディレクトリ (プロファイルの出力先など) はストアではない
+            children = tuple(sorted(entry.name for entry in entries
+                                    if entry.is_dir() and not entry.name.startswith(".")))
+        self.scans += 1
+        stable = time.time_ns() - mtime_ns > self.settle_ns
+        return _Listing(mtime_ns, children, stable)
+
+    def _children(self, path: str) -> List[str]:
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            with self._lock:
+                self._listings.pop(path, None)
+            return []
+
+        with self._lock:
+            listing = self._listings.get(path)
+        if listing is not None and listing.stable and listing.mtime_ns == mtime_ns:
+            return list(listing.children)
+
+        try:
+            listing = self._scan(path, mtime_ns)
+        except NotADirectoryError:
+            return []
+        with self._lock:
+            self._listings[path] = listing
+        return list(listing.children)
+
+    def agents(self, root: str) -> List[str]:
+        """
+        エージェントの一覧を取得する。
+
+        Args:
+            root: 出力ディレクトリ
+
+        Returns:
+            List[str]: エージェントIDのリスト (名前順)
+        """
+        return self._children(root)
+
+    def projects(self, root: str, agent_id: str) -> List[str]:
+        """
+        エージェントのプロジェクトの一覧を取得する。
+
+        Args:
+            root: 出力ディレクトリ
+            agent_id: エージェントID
+
+        Returns:
+            List[str]: プロジェクト名のリスト (名前順)
+        """
+        return self._children(os.path.join(root, agent_id))
+
+    def warm(self, root: str) -> None:
+        """
+        すべてのエージェントとプロジェクトの一覧を読み込んでおく (起動時に使う)。
+
+        Args:
+            root: 出力ディレクトリ
+        """
+        for agent_id in self.agents(root):
+            self.projects(root, agent_id)
+
+    def is_known(self, root: str, agent_id: Optional[str] = None, project_name: Optional[str] = None) -> bool:
+        """
+        ストアのディレクトリが作成済みとして登録されているかどうかを返す。
+        """
+        return (root, agent_id, project_name) in self._known
+
+    def add(self, root: str, agent_id: Optional[str] = None, project_name: Optional[str] = None) -> None:
+        """
+        サーバが作成したストアのディレクトリをカタログに反映する。
+
+        親ディレクトリの一覧を読み込み済みであれば、読み直さずに新しいディレクトリを追加する。
+
+        Args:
+            root: 出力ディレクトリ
+            agent_id: エージェントID（オプション）
+            project_name: プロジェクト名（オプション）
+        """
+        with self._lock:
+            self._known.add((root, agent_id, project_name))
+            if agent_id:
+                self._insert(root, agent_id)
+                if project_name:
+                    self._insert(os.path.join(root, agent_id), project_name)
+
+    def _insert(self, path: str, child: str) -> None:
+        listing = self._listings.get(path)
+        # 読み込んでいない一覧や、更新直後で次の問い合わせ時に読み直す一覧はそのままにする
+        if listing is None or not listing.stable or child in listing.children:
+            return
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            self._listings.pop(path, None)
+            return
+        children = tuple(sorted(listing.children + (child,)))
+        self._listings[path] = _Listing(mtime_ns, children, listing.stable)
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """
+        ディレクトリの一覧を破棄する。
+
+        Args:
+            path: 破棄するディレクトリ（オプション。省略時はすべて）
+        """
+        with self._lock:
+            if path is None:
+                self._listings.clear()
+                self._known.clear()
+            else:
+                path = os.path.normpath(path)
+                for key in [k for k in self._listings if os.path.normpath(k) == path]:
+                    del self._listings[key]
+                self._known = {k for k in self._known if not _is_within(_store_dir(*k), path)}
+
+    def watch(self, root: str) -> bool:
+        """
+        watchdog がインストールされていれば、出力ディレクトリの外部からの変更を監視する。
+
+        ディレクトリの作成、削除、移動を検知すると、その親ディレクトリの一覧を破棄する。
+
+        Args:
+            root: 出力ディレクトリ
+
+        Returns:
+            bool: 監視を開始した場合はTrue
+        """
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            logger.info("watchdog がインストールされていないため、カタログは更新時刻でのみ検証します")
+            return False
+
+        catalog = self
+
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if not event.is_directory or event.event_type not in ("created", "deleted", "moved"):
+                    return
+                for path in (event.src_path, getattr(event, "dest_path", "")):
+                    if path:
+                        catalog.invalidate(os.path.dirname(path))
+                        catalog.invalidate(path)
+
+        if self._observer is None:
+            self._observer = Observer()
+            self._observer.daemon = True
+            self._observer.start()
+        self._observer.schedule(_Handler(), root, recursive=True)
+        return True
+
+    def stop(self) -> None:
+        """
+        外部からの変更の監視を停止する。
+        """
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer = None
+
+
+# ストアのディレクトリを返す関数
+def _store_dir(root: str, agent_id: Optional[str], project_name: Optional[str]) -> str:
+    parts = [root]
+    if agent_id:
+        parts.append(agent_id)
+        if project_name:
+            parts.append(project_name)
+    return os.path.normpath(os.path.join(*parts))
+
+
+# path が directory またはその配下であるかどうかを判定する関数
+def _is_within(path: str, directory: str) -> bool:
+    return path == directory or path.startswith(directory.rstrip(os.sep) + os.sep)
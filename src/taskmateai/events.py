@@ -0,0 +1,101 @@
+from typing import Any, Dict, List
+
+# タスクストアに対する変更イベント
+#
+# 各ツールは変更内容をイベントとして write_tasks() に渡す。
+# ジャーナルなどの追記型ストレージはイベントのみを保存し、
+# 起動時にスナップショットへ再適用 (リプレイ) して状態を復元する。
+# リプレイが途中から重複しても結果が変わらないよう、すべてのイベントは冪等に定義する。
+
+
+# タスク作成イベントを生成する関数
+def create_event(task: Dict) -> Dict:
+    return {"op": "create", "task": task}
+
+
+# タスクのフィールド更新イベントを生成する関数
+def update_event(task_id: int, **fields: Any) -> Dict:
+    return {"op": "update", "id": task_id, "set": fields}
+
+
+# サブタスク追加イベントを生成する関数
+def add_subtask_event(task_id: int, subtask: Dict) -> Dict:
+    return {"op": "add_subtask", "id": task_id, "subtask": subtask}
+
+
+# サブタスクのフィールド更新イベントを生成する関数
+def update_subtask_event(task_id: int, subtask_id: int, **fields: Any) -> Dict:
+    return {"op": "update_subtask", "id": task_id, "subtask_id": subtask_id, "set": fields}
+
+
+# ノート追加イベントを生成する関数
+def add_note_event(task_id: int, note: Dict) -> Dict:
+    return {"op": "add_note", "id": task_id, "note": note}
+
+
+# タスクのアーカイブ (アクティブなストアからの削除) イベントを生成する関数
+def archive_event(task_id: int) -> Dict:
+    return {"op": "archive", "id": task_id}
+
+
+# イベントが対象とするタスクIDを取得する関数
+def event_task_id(event: Dict) -> Any:
+    if event.get("op") == "create":
+        return event["task"].get("id")
+    return event.get("id")
+
+
+# タスクIDからタスクへの索引を作成する関数
+def index_tasks(tasks: List[Dict]) -> Dict[Any, Dict]:
+    return {task.get("id"): task for task in tasks}
+
+
+# イベントをタスクリストに適用する関数
+def apply_event(tasks: List[Dict], by_id: Dict[Any, Dict], event: Dict) -> None:
+    """
+    イベントをタスクリストに適用する関数。
+
+    Args:
+        tasks: 適用先のタスクリスト
+        by_id: タスクIDからタスクへの索引 (tasks と同期して更新される)
+        event: 適用するイベント
+
+    Raises:
+        ValueError: 未知のイベント種別の場合
+    """
+    op = event.get("op")
+
+    if op == "create":
+        task = event["task"]
+        if task.get("id") not in by_id:
+            tasks.append(task)
+            by_id[task.get("id")] = task
+        return
+
+    task = by_id.get(event.get("id"))
+    if task is None:
+        # 対象のタスクが存在しない場合は無視する
+        return
+
+    if op == "archive":
+        del by_id[event.get("id")]
+        tasks.remove(task)
+    elif op == "update":
+        task.update(event["set"])
+    elif op == "add_subtask":
+        subtasks = task.setdefault("subtasks", [])
+        subtask = event["subtask"]
+        if not any(s.get("id") == subtask.get("id") for s in subtasks):
+            subtasks.append(subtask)
+    elif op == "update_subtask":
+        for subtask in task.get("subtasks", []):
+            if subtask.get("id") == event["subtask_id"]:
+                subtask.update(event["set"])
+                break
+    elif op == "add_note":
+        notes = task.setdefault("notes", [])
+        note = event["note"]
+        if not any(n.get("id") == note.get("id") for n in notes):
+            notes.append(note)
+    else:
+        raise ValueError(f"Unknown event: {op}")
@@ -0,0 +1,93 @@
+import heapq
+import itertools
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# 並び順の種類 (同じ値の場合はエージェント、プロジェクト、タスクIDの順。"score" は検索結果の関連度)
+SORT_KEYS = ("priority", "progress", "store", "score")
+
+Store = Tuple[Optional[str], Optional[str]]
+
+
+# 複数のストアにまたがるタスクの並び順のキーを返す関数を作成する関数
+def _sort_key(sort: str) -> Callable[[Tuple[Dict, Store]], Any]:
+    def store_order(entry: Tuple[Dict, Store]) -> Tuple:
+        task, (agent_id, project_name) = entry
+        return (agent_id or "", project_name or "", task.get("id") or 0)
+
+    if sort == "store":
+        return store_order
+    # 優先度・進捗・関連度は大きいものから
+    return lambda entry: (-(entry[0].get(sort) or 0),) + store_order(entry)
+
+
+# 複数のストアを並行して検索し、結果を1つの順序にまとめる関数
+def query_stores(stores: Iterable[Store], scan: Callable[[Optional[str], Optional[str]], List[Dict]],
+                 executor: Executor, sort: str = "priority", limit: Optional[int] = None,
+                 concurrency: int = 4) -> Dict[str, Any]:
+    """
+    複数のストアを並行して検索し、結果を並べ替えて上位 limit 件を返す関数。
+
+    各ストアの検索はエグゼキュータで並行して実行し、終わった順に上位 limit 件へ併合する。
+    同時に投入する検索は concurrency 件までとし、併合した結果はすぐに手放すため、
+    保持するタスクはストアの数に関係なく limit 件と、実行中の concurrency 件分の結果に収まる。
+    検索に失敗したストアは errors に記録し、残りのストアの結果を返す。
+
+    Args:
+        stores: (エージェントID, プロジェクト名) の列
+        scan: (エージェントID, プロジェクト名) を受け取り、条件に一致するタスクのリストを返す関数
+        executor: 検索を実行するエグゼキュータ
+        sort: 並び順 ("priority": 優先度の高い順、"progress": 進捗の大きい順、"store": ストアとIDの順)
+        limit: 最大件数（オプション。省略時はすべて）
+        concurrency: 同時に実行する検索の最大数 (エグゼキュータのスレッド数に合わせる)
+
+    Returns:
+        Dict[str, Any]: {"tasks": [(タスク, (エージェントID, プロジェクト名)), ...], "total": 一致した件数,
+                         "stores": 検索したストアの数, "errors": [...]}
+
+    Raises:
+        ValueError: 並び順、limit または concurrency が不正な場合
+    """
+    if sort not in SORT_KEYS:
+        raise ValueError(f"Invalid sort: {sort} (must be one of {', '.join(SORT_KEYS)})")
+    if limit is not None and (not isinstance(limit, int) or isinstance(limit, bool) or limit < 1):
+        raise ValueError("Invalid limit: must be a positive integer")
+    if concurrency < 1:
+        raise ValueError("Invalid concurrency: must be a positive integer")
+
+    key = _sort_key(sort)
+    remaining = iter(stores)
+    pending: Dict[Future, Store] = {}
+    best: List[Tuple[Dict, Store]] = []
+    total = 0
+    scanned = 0
+    errors = []
+
+    # 終わった検索の結果を上位 limit 件へ併合する (Future は pending から外し、結果ごと手放す)
+    def merge(future: Future) -> None:
+        nonlocal best, total
+        store = pending.pop(future)
+        try:
+            tasks = future.result()
+        except Exception as e:
+            errors.append({"agent_id": store[0], "project_name": store[1], "error": str(e)})
+            return
+        total += len(tasks)
+        entries = itertools.chain(best, ((task, store) for task in tasks))
+        best = heapq.nsmallest(limit, entries, key=key) if limit is not None else list(entries)
+
+    while True:
+        # 実行中の検索が concurrency 件になるまで次のストアを投入する
+        for store in itertools.islice(remaining, concurrency - len(pending)):
+            pending[executor.submit(scan, *store)] = store
+            scanned += 1
+        if not pending:
+            break
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        while done:
+            merge(done.pop())
+
+    if limit is None:
+        best.sort(key=key)
+    errors.sort(key=lambda error: (error["agent_id"] or "", error["project_name"] or ""))
+    return {"tasks": best, "total": total, "stores": scanned, "errors": errors}
@@ -0,0 +1,93 @@
+import logging
+import contextlib
+from typing import Any, AsyncIterator, Callable, Optional
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+from starlette.routing import Mount, Route
+
+logger = logging.getLogger("taskmate-server")
+
+# HTTPトランスポートの種類 ("http": Streamable HTTP, "sse": Server-Sent Events)
+HTTP_TRANSPORTS = ("http", "sse")
+
+
+# MCPサーバをHTTPで公開するASGIアプリケーションを作成する関数
+def create_http_app(server: Any, transport: str = "http",
+                    on_shutdown: Optional[Callable[[], None]] = None,
+                    json_response: bool = False,
+                    metrics_text: Optional[Callable[[], str]] = None) -> Starlette:
+    """
+    1つのMCPサーバを、複数のクライアントから同時に使えるHTTPアプリケーションとして公開する関数。
+
+    "http" では /mcp を Streamable HTTP のエンドポイントとし、"sse" では /sse で
+    イベントストリームを開き、/messages/ でクライアントからのメッセージを受け取る。
+    いずれも /health で稼働状態を返し、metrics_text が指定されていれば /metrics で
+    Prometheus のテキスト形式のメトリクスを返す。すべてのクライアントは同じプロセスの
+    キャッシュとストアを共有する。アプリケーションの終了時 (lifespan の終了時) には、
+    セッションを閉じた後に on_shutdown を呼び出す。
+
+    Args:
+        server: MCPサーバ (mcp.server.Server)
+        transport: トランスポートの種類 ("http" または "sse")
+        on_shutdown: 終了時に呼び出す関数（オプション。保存待ちの変更の書き込みに使う）
+        json_response: Trueの場合、Streamable HTTP の応答をストリームではなくJSONで返す
+        metrics_text: Prometheus のテキスト形式のメトリクスを返す関数（オプション）
+
+    Returns:
+        Starlette: ASGIアプリケーション
+
+    Raises:
+        ValueError: トランスポートの種類が不正な場合
+    """
+    if transport not in HTTP_TRANSPORTS:
+        raise ValueError(f"Invalid transport: {transport} (must be one of {', '.join(HTTP_TRANSPORTS)})")
+
+    async def health(request: Request) -> Response:
+        return JSONResponse({"status": "ok", "transport": transport})
+
+    routes = [Route("/health", endpoint=health)]
+
+    if metrics_text is not None:
+        async def prometheus(request: Request) -> Response:
+            return PlainTextResponse(metrics_text(), media_type="text/plain; version=0.0.4")
+
+        routes.append(Route("/metrics", endpoint=prometheus))
+
+    if transport == "http":
+        from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+
+        session_manager = StreamableHTTPSessionManager(app=server, json_response=json_response)
+
+        async def handle_mcp(scope, receive, send) -> None:
+            await session_manager.handle_request(scope, receive, send)
+
+        routes.append(Mount("/mcp", app=handle_mcp))
+        sessions = session_manager.run
+    else:
+        from mcp.server.sse import SseServerTransport
+
+        sse = SseServerTransport("/messages/")
+
+        async def handle_sse(request: Request) -> Response:
+            async with sse.connect_sse(request.scope, request.receive, request._send) as (read_stream, write_stream):
+                await server.run(read_stream, write_stream, server.create_initialization_options())
+            return Response()
+
+        routes.append(Route("/sse", endpoint=handle_sse, methods=["GET"]))
+        routes.append(Mount("/messages/", app=sse.handle_post_message))
+        sessions = contextlib.nullcontext
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app: Starlette) -> AsyncIterator[None]:
+        try:
+            async with sessions():
+                logger.info(f"HTTPトランスポート ({transport}) を開始しました")
+                yield
+        finally:
+            if on_shutdown is not None:
+                on_shutdown()
+            logger.info(f"HTTPトランスポート ({transport}) を終了しました")
+
+    return Starlette(routes=routes, lifespan=lifespan)
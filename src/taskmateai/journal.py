@@ -0,0 +1,327 @@
+import os
+import json
+import logging
+import datetime
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Callable, ContextManager, Dict, List, Optional, Set, Tuple
+
+from . import serializer
+from .cache import FileSignature, file_signature
+from .events import apply_event, event_task_id, index_tasks
+from .writer import append_lines, atomic_write
+
+logger = logging.getLogger("taskmate-server")
+
+# ジャーナルモードのストアのシグネチャ (スナップショット, ジャーナル)
+JournalSignature = Tuple[Optional[FileSignature], Optional[FileSignature]]
+
+
+# タスクファイルに対応するジャーナルファイルのパスを取得する関数
+def get_journal_path(tasks_file: str) -> str:
+    root, _ = os.path.splitext(tasks_file)
+    return root + ".journal.jsonl"
+
+
+# タスクファイルに対応する履歴ファイルのパスを取得する関数
+def get_history_path(tasks_file: str) -> str:
+    root, _ = os.path.splitext(tasks_file)
+    return root + ".history.jsonl"
+
+
+class JournalStore:
+    """
+    追記型ジャーナルによるタスクストア。
+
+    tasks.json をスナップショットとし、以降の変更をイベントとして
+    tasks.journal.jsonl に1行ずつ追記する。読み込み時はスナップショットに
+    ジャーナルをリプレイして状態を復元する。ジャーナルが一定の件数を超えると、
+    バックグラウンドでスナップショットを書き直してジャーナルを切り詰める (コンパクション)。
+    切り詰めたイベントは tasks.history.jsonl に移され、タスクの変更履歴として参照できる。
+    """
+
+    def __init__(self, compact_every: int = 1000, keep_history: bool = True, pretty: bool = False,
+                 fsync: str = "batched"):
+        """
+        Args:
+            compact_every: コンパクションを行うジャーナルのイベント数
+            keep_history: コンパクション時に切り詰めたイベントを履歴として残すかどうか
+            pretty: スナップショットをインデントした読みやすい形式で書き込むかどうか
+            fsync: fsync のポリシー ("always" の場合は追記のたびにジャーナルを fsync する)
+        """
+        self.compact_every = compact_every
+        self.keep_history = keep_history
+        self.pretty = pretty
+        self.fsync = fsync
+        self._counts: Dict[str, int] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._pending: Dict[str, Future] = {}
+        # ストアのロックを使うコンパクションを予約したストア
+        self._store_locked: Set[str] = set()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="taskmate-compact")
+
+    def _lock(self, tasks_file: str) -> threading.Lock:
+        with self._locks_guard:
+            lock = self._locks.get(tasks_file)
+            if lock is None:
+                lock = self._locks[tasks_file] = threading.Lock()
+            return lock
+
+    def signature(self, tasks_file: str) -> Optional[JournalSignature]:
+        """
+        スナップショットとジャーナルのシグネチャを取得する。
+
+        Args:
+            tasks_file: スナップショット (tasks.json) のパス
+
+        Returns:
+            Optional[JournalSignature]: どちらのファイルも存在しない場合はNone
+        """
+        snapshot = file_signature(tasks_file)
+        journal = file_signature(get_journal_path(tasks_file))
+        if snapshot is None and journal is None:
+            return None
+        return (snapshot, journal)
+
+    @staticmethod
+    def size(signature: Optional[JournalSignature]) -> int:
+        """
+        シグネチャからストアのディスク上のサイズを求める。
+
+        Args:
+            signature: signature() で取得したシグネチャ
+
+        Returns:
+            int: スナップショットとジャーナルの合計バイト数
+        """
+        if signature is None:
+            return 0
+        return sum(part[2] for part in signature if part is not None)
+
+    def load(self, tasks_file: str) -> Tuple[List[Dict], Optional[JournalSignature]]:
+        """
+        スナップショットにジャーナルをリプレイしてタスクを読み込む。
+
+        Args:
+            tasks_file: スナップショット (tasks.json) のパス
+
+        Returns:
+            Tuple[List[Dict], Optional[JournalSignature]]: タスクのリストと読み込み時のシグネチャ
+
+        Raises:
+            json.JSONDecodeError: スナップショットの解析に失敗した場合
+        """
+        journal_file = get_journal_path(tasks_file)
+
+        with self._lock(tasks_file):
+            tasks: List[Dict] = []
+            if os.path.exists(tasks_file):
+                with open(tasks_file, 'rb') as f:
+                    tasks = serializer.loads(f.read())
+
+            count = 0
+            if os.path.exists(journal_file):
+                by_id = index_tasks(tasks)
+                with open(journal_file, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        if not line.strip():
+                            continue
+                        try:
+                            event = serializer.loads(line)
+                        except json.JSONDecodeError:
+                            # 書き込み途中で中断された行は読み飛ばす
+                            logger.warning(f"ジャーナルの不正な行を無視しました: {journal_file}")
+                            continue
+                        apply_event(tasks, by_id, event)
+                        count += 1
+
+            self._counts[tasks_file] = count
+            return tasks, self.signature(tasks_file)
+
+    def append(self, tasks_file: str, events: List[Dict]) -> Optional[JournalSignature]:
+        """
+        イベントをジャーナルに追記する。
+
+        書き込み量はイベントの大きさのみに比例し、ストアの大きさには依存しない。
+
+        Args:
+            tasks_file: スナップショット (tasks.json) のパス
+            events: 追記するイベントのリスト
+
+        Returns:
+            Optional[JournalSignature]: 追記後のシグネチャ
+        """
+        timestamp = datetime.datetime.now().isoformat()
+        data = "".join(
+            serializer.dumps({"ts": timestamp, **event}) + "\n"
+            for event in events
+        )
+
+        with self._lock(tasks_file):
+            append_lines(get_journal_path(tasks_file), data.encode('utf-8'), self.fsync)
+            self._counts[tasks_file] = self._counts.get(tasks_file, 0) + len(events)
+            return self.signature(tasks_file)
+
+    def write_snapshot(self, tasks_file: str, tasks: List[Dict]) -> Optional[JournalSignature]:
+        """
+        タスク全体をスナップショットとして書き込み、ジャーナルを空にする。
+
+        Args:
+            tasks_file: スナップショット (tasks.json) のパス
+            tasks: 書き込むタスクのリスト
+
+        Returns:
+            Optional[JournalSignature]: 書き込み後のシグネチャ
+        """
+        data = serializer.dumps(tasks, pretty=self.pretty)
+
+        # 古い状態のスナップショットで上書きされないよう、実行中のコンパクションを待つ。
+        # ストアのロックを使うコンパクションは、呼び出し元が保持しているロックを待つため待たない
+        # (ロックの取得後にスナップショットが置き換えられていることを確認して中止する)
+        pending = self._pending.get(tasks_file)
+        if pending is not None and tasks_file not in self._store_locked:
+            pending.result()
+
+        with self._lock(tasks_file):
+            self._replace_file(tasks_file, data)
+            journal_file = get_journal_path(tasks_file)
+            if os.path.exists(journal_file):
+                with open(journal_file, 'r', encoding='utf-8') as f:
+                    self._archive_history(tasks_file, f.read())
+                os.remove(journal_file)
+            self._counts[tasks_file] = 0
+            return self.signature(tasks_file)
+
+    def needs_compaction(self, tasks_file: str) -> bool:
+        """
+        ジャーナルがコンパクションの閾値を超えているかどうかを返す。
+        """
+        return (self._counts.get(tasks_file, 0) >= self.compact_every
+                and tasks_file not in self._pending)
+
+    def schedule_compaction(
+        self,
+        tasks_file: str,
+        tasks: List[Dict],
+        on_done: Optional[Callable[[Optional[JournalSignature], Optional[JournalSignature]], None]] = None,
+        lock: Optional[ContextManager] = None
+    ) -> Future:
+        """
+        現在の状態のスナップショットをバックグラウンドで書き込む。
+
+        tasks はジャーナルの末尾までを反映した状態でなければならない。
+        シリアライズは呼び出し元のスレッドで行い、ディスクへの書き込みと
+        ジャーナルの切り詰めのみをバックグラウンドで行う。
+        lock を指定した場合は、スナップショットの置き換えからジャーナルの切り詰めまでを
+        ストアのロックを保持して行い、他のプロセスが追記したイベントを失わないようにする。
+        それまでに他のプロセスがスナップショットを置き換えていた場合はコンパクションを中止する。
+
+        Args:
+            tasks_file: スナップショット (tasks.json) のパス
+            tasks: 現在のタスクのリスト
+            on_done: 完了時に (コンパクション前のシグネチャ, 後のシグネチャ) で呼ばれる関数
+            lock: スナップショットの置き換えからジャーナルの切り詰めまで保持するストアのロック（オプション）
+
+        Returns:
+            Future: コンパクションの完了を表すFuture
+        """
+        data = serializer.dumps(tasks, pretty=self.pretty)
+        journal_file = get_journal_path(tasks_file)
+
+        with self._lock(tasks_file):
+            offset = os.path.getsize(journal_file) if os.path.exists(journal_file) else 0
+            compacted = self._counts.get(tasks_file, 0)
+            snapshot = file_signature(tasks_file)
+            future = self._executor.submit(self._compact, tasks_file, data, offset, compacted, on_done,
+                                           lock, snapshot)
+            self._pending[tasks_file] = future
+            if lock is not None:
+                self._store_locked.add(tasks_file)
+        return future
+
+    def _compact(self, tasks_file, data, offset, compacted, on_done, lock=None, snapshot=None) -> None:
+        tmp_file = tasks_file + ".compact.tmp"
+        journal_file = get_journal_path(tasks_file)
+
+        try:
+            # ロックの外でスナップショットを書き出しておく
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+
+            with lock or nullcontext(), self._lock(tasks_file):
+                if lock is not None and file_signature(tasks_file) != snapshot:
+                    # 他のプロセス (またはスナップショットの書き込み) が先にジャーナルを切り詰めた
+                    logger.info(f"スナップショットが置き換えられたため、コンパクションを中止しました: {tasks_file}")
+                    os.remove(tmp_file)
+                    return
+                before = self.signature(tasks_file)
+                os.replace(tmp_file, tasks_file)
+
+                # スナップショットに反映済みの部分をジャーナルから取り除く
+                with open(journal_file, 'rb') as f:
+                    head = f.read(offset)
+                    tail = f.read()
+                self._archive_history(tasks_file, head.decode('utf-8'))
+                self._replace_file(journal_file, tail.decode('utf-8'))
+
+                self._counts[tasks_file] = max(0, self._counts.get(tasks_file, 0) - compacted)
+                after = self.signature(tasks_file)
+                if on_done is not None:
+                    on_done(before, after)
+        except Exception as e:
+            logger.error(f"ジャーナルのコンパクションエラー: {str(e)}")
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+        finally:
+            # schedule_compaction() が登録を終えるまで待ってから解除する
+            with self._lock(tasks_file):
+                self._pending.pop(tasks_file, None)
+                self._store_locked.discard(tasks_file)
+
+    def _archive_history(self, tasks_file: str, data: str) -> None:
+        if self.keep_history and data:
+            with open(get_history_path(tasks_file), 'a', encoding='utf-8') as f:
+                f.write(data)
+
+    def _replace_file(self, path: str, data: str) -> None:
+        atomic_write(path, data.encode('utf-8'), self.fsync)
+
+    def history(self, tasks_file: str, task_id: int) -> List[Dict]:
+        """
+        タスクの変更履歴 (イベントのリスト) を古い順に取得する。
+
+        Args:
+            tasks_file: スナップショット (tasks.json) のパス
+            task_id: タスクID
+
+        Returns:
+            List[Dict]: タスクに関するイベントのリスト
+        """
+        events = []
+        with self._lock(tasks_file):
+            for path in (get_history_path(tasks_file), get_journal_path(tasks_file)):
+                if not os.path.exists(path):
+                    continue
+                with open(path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            event = serializer.loads(line)
+                        except json.JSONDecodeError:
+                            continue
+                        if event_task_id(event) == task_id:
+                            events.append(event)
+        return events
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """
+        実行中のコンパクションの完了を待つ。
+
+        Args:
+            timeout: 各コンパクションを待つ最大秒数
+        """
+        for future in list(self._pending.values()):
+            future.result(timeout=timeout)
@@ -0,0 +1,92 @@
+import os
+import threading
+from typing import Callable, ContextManager, Optional
+
+try:
+    import fcntl
+except ImportError:
+    # fcntl のないプラットフォーム (Windows) ではプロセス内のロックのみを使う
+    fcntl = None
+
+
+class StoreConflictError(RuntimeError):
+    """読み込んだ後にストアが他のプロセスによって変更されていた場合に送出する例外。"""
+
+
+# タスクファイルに対応するロックファイルのパスを取得する関数
+def get_lock_path(tasks_file: str) -> str:
+    root, _ = os.path.splitext(tasks_file)
+    return root + ".lock"
+
+
+class StoreLock:
+    """
+    タスクストアのロック。
+
+    プロセス内ではスレッドの再入可能なロックとして動作し、最も外側の取得時には
+    ロックファイルに fcntl.flock による排他ロック (アドバイザリロック) を掛けて、
+    同じ出力ディレクトリを使う他のサーバプロセスとの間でも読み込みから書き込みまでを不可分にする。
+    ロックファイルのパスは取得のたびに path で求める (None の場合はプロセス内のロックのみ)。
+    """
+
+    def __init__(self, path: Optional[Callable[[], Optional[str]]] = None):
+        """
+        Args:
+            path: ロックファイルのパスを返す関数（オプション）
+        """
+        self._path = path
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._fd: Optional[int] = None
+
+    def __enter__(self) -> "StoreLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.release()
+
+    def acquire(self) -> None:
+        """ロックを取得する (他のプロセスが保持している場合は解放されるまで待つ)。"""
+        self._lock.acquire()
+        if self._depth == 0:
+            try:
+                self._fd = self._lock_file()
+            except BaseException:
+                self._lock.release()
+                raise
+        self._depth += 1
+
+    def local(self) -> ContextManager:
+        """
+        プロセス内のロックのみを返す (ロックファイルはロックしない)。
+
+        キャッシュしたタスクを読み取る間、同じプロセスの変更と交互にならないようにする。
+        """
+        return self._lock
+
+    def release(self) -> None:
+        """ロックを解放する。"""
+        self._depth -= 1
+        if self._depth == 0 and self._fd is not None:
+            fd, self._fd = self._fd, None
+            try:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            finally:
+                os.close(fd)
+        self._lock.release()
+
+    def _lock_file(self) -> Optional[int]:
+        if fcntl is None or self._path is None:
+            return None
+        path = self._path()
+        if path is None:
+            return None
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        except BaseException:
+            os.close(fd)
+            raise
+        return fd
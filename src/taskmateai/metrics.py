@@ -0,0 +1,240 @@
+import time
+import bisect
+import functools
+import threading
+import contextlib
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# レイテンシのヒストグラムのバケットの上限 (秒)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """
+    固定のバケットでレイテンシの分布を数えるヒストグラム。
+
+    観測値そのものは保持しないため、呼び出し回数に関係なく一定のメモリで動作する。
+    パーセンタイルは該当するバケットの上限で概算する。
+    """
+
+    __slots__ = ("buckets", "counts", "count", "total", "max")
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        # 最後の要素は最大のバケットを超えた観測値 (+Inf) の数
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        """
+        q分位点 (0 < q <= 1) をバケットの上限で概算する。
+
+        Args:
+            q: 分位 (例: 0.99)
+
+        Returns:
+            float: 秒。観測値がない場合は0
+        """
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """(バケットの上限, その上限以下の観測値の数) のリストを返す。最後の上限は inf。"""
+        result = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += count
+            result.append((bound, cumulative))
+        return result
+
+
+class OperationStats:
+    """1つの操作 (ツール、リソース、ストアの読み書き) の呼び出し回数、エラー数とレイテンシ。"""
+
+    __slots__ = ("calls", "errors", "latency")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.latency = Histogram()
+
+
+class Metrics:
+    """
+    操作ごとのレイテンシのヒストグラム、呼び出し回数、エラー数と、任意のカウンタを集計するクラス。
+
+    操作は (種類, 名前) で区別する (例: ("tool", "get_tasks"), ("store", "read_tasks"))。
+    スレッドプールの複数のスレッドから同時に記録できる。
+    """
+
+    def __init__(self):
+        self._operations: Dict[Tuple[str, str], OperationStats] = {}
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def observe(self, kind: str, name: str, seconds: float, error: bool = False) -> None:
+        """
+        1回の呼び出しを記録する。
+
+        Args:
+            kind: 操作の種類
+            name: 操作の名前
+            seconds: 所要時間 (秒)
+            error: 呼び出しが失敗したかどうか
+        """
+        with self._lock:
+            stats = self._operations.get((kind, name))
+            if stats is None:
+                stats = self._operations[(kind, name)] = OperationStats()
+            stats.calls += 1
+            stats.errors += error
+            stats.latency.observe(seconds)
+
+    def count_error(self, kind: str, name: str) -> None:
+        """例外にならずに結果として返されたエラーを記録する (呼び出し自体は observe() で数える)。"""
+        with self._lock:
+            stats = self._operations.get((kind, name))
+            if stats is None:
+                stats = self._operations[(kind, name)] = OperationStats()
+            stats.errors += 1
+
+    def increment(self, counter: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + amount
+
+    @contextlib.contextmanager
+    def timer(self, kind: str, name: str) -> Iterator[None]:
+        """
+        ブロックの所要時間を記録するコンテキストマネージャ。例外が発生した場合はエラーとして数える。
+
+        Args:
+            kind: 操作の種類
+            name: 操作の名前
+        """
+        start = time.perf_counter()
+        error = True
+        try:
+            yield
+            error = False
+        finally:
+            self.observe(kind, name, time.perf_counter() - start, error)
+
+    def timed(self, kind: str, name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+        """関数の呼び出しを timer() で記録するデコレータを返す。"""
+        def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+            @functools.wraps(func)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                with self.timer(kind, name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def reset(self) -> None:
+        with self._lock:
+            self._operations.clear()
+            self._counters.clear()
+            self.started_at = time.time()
+
+    def snapshot(self, gauges: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        集計結果を辞書として返す。
+
+        Args:
+            gauges: 集計結果に含める、呼び出し元が管理する値（オプション。キャッシュの状態など）
+
+        Returns:
+            Dict[str, Any]: {"uptime_seconds", "operations": {種類: {名前: {...}}}, "counters", "gauges"}
+        """
+        with self._lock:
+            operations: Dict[str, Dict[str, Any]] = {}
+            for (kind, name), stats in sorted(self._operations.items()):
+                latency = stats.latency
+                operations.setdefault(kind, {})[name] = {
+                    "calls": stats.calls,
+                    "errors": stats.errors,
+                    "mean_ms": round(latency.total / latency.count * 1000, 3) if latency.count else 0.0,
+                    "p50_ms": round(latency.quantile(0.5) * 1000, 3),
+                    "p99_ms": round(latency.quantile(0.99) * 1000, 3),
+                    "max_ms": round(latency.max * 1000, 3),
+                    "buckets_ms": {_format_bound(bound * 1000): count for bound, count in latency.cumulative()},
+                }
+            counters = dict(sorted(self._counters.items()))
+            started_at = self.started_at
+        return {
+            "uptime_seconds": round(time.time() - started_at, 3),
+            "operations": operations,
+            "counters": counters,
+            "gauges": gauges or {},
+        }
+
+    def prometheus(self, gauges: Optional[Dict[str, Any]] = None, prefix: str = "taskmate") -> str:
+        """
+        集計結果を Prometheus のテキスト形式 (version 0.0.4) で返す。
+
+        Args:
+            gauges: 出力に含める、呼び出し元が管理する数値（オプション）
+            prefix: メトリクス名の接頭辞
+
+        Returns:
+            str: Prometheus のテキスト形式の文字列
+        """
+        with self._lock:
+            operations = sorted(self._operations.items())
+            counters = sorted(self._counters.items())
+            histograms = [(key, stats.calls, stats.errors, stats.latency.cumulative(), stats.latency.total)
+                          for key, stats in operations]
+
+        lines = [
+            f"# HELP {prefix}_operation_duration_seconds Latency of tool calls, resource reads and store I/O",
+            f"# TYPE {prefix}_operation_duration_seconds histogram",
+        ]
+        for (kind, name), _, _, cumulative, total in histograms:
+            labels = f'kind="{_escape(kind)}",name="{_escape(name)}"'
+            for bound, count in cumulative:
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{prefix}_operation_duration_seconds_bucket{{{labels},le="{le}"}} {count}')
+            lines.append(f"{prefix}_operation_duration_seconds_sum{{{labels}}} {total!r}")
+            lines.append(f"{prefix}_operation_duration_seconds_count{{{labels}}} {cumulative[-1][1]}")
+
+        lines += [
+            f"# HELP {prefix}_operation_errors_total Failed tool calls, resource reads and store I/O",
+            f"# TYPE {prefix}_operation_errors_total counter",
+        ]
+        for (kind, name), _, errors, _, _ in histograms:
+            lines.append(f'{prefix}_operation_errors_total{{kind="{_escape(kind)}",name="{_escape(name)}"}} {errors}')
+
+        for counter, value in counters:
+            lines.append(f"# TYPE {prefix}_{counter}_total counter")
+            lines.append(f"{prefix}_{counter}_total {value}")
+        for gauge, value in sorted((gauges or {}).items()):
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                lines.append(f"# TYPE {prefix}_{gauge} gauge")
+                lines.append(f"{prefix}_{gauge} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# バケットの上限 (ミリ秒) を表示用の文字列にする関数
+def _format_bound(bound_ms: float) -> str:
+    return "+Inf" if bound_ms == float("inf") else f"{bound_ms:g}"
+
+
+# Prometheus のラベルの値をエスケープする関数
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,47 @@
+from typing import List, NotRequired, Optional, TypedDict
+
+# タスク・サブタスク・ノートの型
+#
+# ストアのタスクは JSON から読み込んだ辞書のまま保持し、実行時は通常の辞書として扱う。
+# orjson は辞書を変換の呼び出しなしでそのまま読み書きでき、読み込み時にキーの文字列を
+# 共有するため、同じキーを繰り返し保持するメモリも増えない。
+# ここでは新しく作るタスクの形 (キーと値の型) だけを定義し、JSON の形はそのまま保つ。
+#
+# __slots__ を使ったモデルクラスは採用しない。1万件のストアで常駐メモリは約3割減る
+# (17.8 MB → 12.0 MB) が、任意のフィールドを元の JSON の形のまま保つには変換の呼び出し
+# (orjson の default) が必要になり、全体の書き込みが約7倍遅くなる (11 ms → 79 ms)。
+# IDによる検索は、ストアごとのタスクIDの索引 (CacheEntry.by_id) で O(1) にしている。
+
+
+class Subtask(TypedDict):
+    """サブタスク。"""
+    id: int
+    description: str
+    status: str
+
+
+class Note(TypedDict):
+    """タスクのノート。"""
+    id: int
+    content: str
+    timestamp: str
+
+
+class Task(TypedDict):
+    """
+    タスク。
+
+    create_task が作成するフィールドを持つ。
+    claimed_by や lease_expires_at など一部のタスクにしかないフィールドは省略できる。
+    """
+    id: int
+    title: str
+    description: str
+    priority: int
+    status: str
+    progress: int
+    subtasks: List[Subtask]
+    notes: List[Note]
+    completed_at: NotRequired[Optional[str]]
+    claimed_by: NotRequired[str]
+    lease_expires_at: NotRequired[str]
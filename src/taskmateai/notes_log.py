@@ -0,0 +1,135 @@
+import os
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import serializer
+from .cache import FileSignature, file_signature
+from .models import Note
+from .writer import append_lines
+
+logger = logging.getLogger("taskmate-server")
+
+
+# タスクファイルに対応するノートログのパスを取得する関数
+def get_notes_path(tasks_file: str) -> str:
+    root, _ = os.path.splitext(tasks_file)
+    return root + ".notes.jsonl"
+
+
+class NotesLog:
+    """
+    タスクのノートを保存する追記専用のログ。
+
+    ノートは tasks.json には書き込まず、tasks.notes.jsonl に
+    {"task_id": ..., "note": {...}} の形で1行ずつ追記する。ノートの追加は
+    ノートの大きさのみに比例する追記で、タスクファイルには触れない。
+    ログはノートが必要になった時点で一度だけ読み込み、タスクIDごとの索引として保持する。
+    以降の追記は索引にも反映し、ファイルが外部で変更された場合 (シグネチャの変化) は読み直す。
+    保持する索引のログの合計サイズが上限を超えた場合は、最も長く使われていない索引から破棄する (LRU)。
+    """
+
+    def __init__(self, fsync: str = "batched", max_bytes: Optional[int] = None):
+        """
+        Args:
+            fsync: fsync のポリシー ("always" の場合は追記のたびにログを fsync する)
+            max_bytes: 索引を保持するログの合計サイズの上限（オプション。省略時は無制限）
+        """
+        self.fsync = fsync
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._indexes: "OrderedDict[str, Tuple[Optional[FileSignature], Dict[Any, List[Note]]]]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._indexes)
+
+    def notes(self, tasks_file: str) -> Dict[Any, List[Note]]:
+        """
+        タスクIDごとのノートの索引を取得する。
+
+        Args:
+            tasks_file: タスクファイルのパス
+
+        Returns:
+            Dict[Any, List[Note]]: タスクIDからノートのリストへの辞書
+        """
+        path = get_notes_path(tasks_file)
+        signature = file_signature(path)
+        with self._lock:
+            cached = self._indexes.get(tasks_file)
+            if cached is not None and cached[0] == signature:
+                self._indexes.move_to_end(tasks_file)
+                return cached[1]
+
+            index: Dict[Any, List[Note]] = {}
+            if signature is not None:
+                try:
+                    with open(path, 'rb') as f:
+                        for line in f:
+                            if not line.strip():
+                                continue
+                            try:
+                                entry = serializer.loads(line)
+                            except ValueError:
+                                # 書き込み途中で終了した最後の行は無視する
+                                logger.warning(f"ノートログの不正な行を無視しました: {path}")
+                                continue
+                            index.setdefault(entry.get("task_id"), []).append(entry.get("note", {}))
+                except OSError as e:
+                    logger.error(f"ノートログの読み込みエラー: {str(e)}")
+            self._put(tasks_file, signature, index)
+            return index
+
+    def count(self, tasks_file: str, task_id: Any) -> int:
+        """
+        タスクのノートの数を取得する。
+
+        Args:
+            tasks_file: タスクファイルのパス
+            task_id: タスクID
+
+        Returns:
+            int: ログに記録したノートの数
+        """
+        return len(self.notes(tasks_file).get(task_id, ()))
+
+    def append(self, tasks_file: str, entries: List[Tuple[Any, Dict]]) -> None:
+        """
+        ノートをログに追記する。
+
+        Args:
+            tasks_file: タスクファイルのパス
+            entries: (タスクID, ノート) のリスト
+        """
+        if not entries:
+            return
+        path = get_notes_path(tasks_file)
+        data = b"".join(serializer.dumps_bytes({"task_id": task_id, "note": note}) + b"\n"
+                        for task_id, note in entries)
+
+        with self._lock:
+            index = self.notes(tasks_file)
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            # 最後の行が途中までしか書かれていない場合も、追記したノートがその行とつながらないようにする
+            append_lines(path, data, self.fsync)
+            for task_id, note in entries:
+                index.setdefault(task_id, []).append(note)
+            self._put(tasks_file, file_signature(path), index)
+
+    def _put(self, tasks_file: str, signature: Optional[FileSignature], index: Dict[Any, List[Note]]) -> None:
+        previous = self._indexes.pop(tasks_file, None)
+        if previous is not None:
+            self.total_bytes -= _size(previous[0])
+        self._indexes[tasks_file] = (signature, index)
+        self.total_bytes += _size(signature)
+        # 直近に使われた索引は上限を超えていても1件は残す
+        while self.max_bytes is not None and self.total_bytes > self.max_bytes and len(self._indexes) > 1:
+            _, (evicted, _) = self._indexes.popitem(last=False)
+            self.total_bytes -= _size(evicted)
+
+
+# 索引の大きさとして数えるログのサイズ (バイト数) を返す関数
+def _size(signature: Optional[FileSignature]) -> int:
+    return signature[2] if signature is not None else 0
@@ -0,0 +1,170 @@
+import json
+import heapq
+import base64
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl
+
+# summary モードで取り除くフィールド (件数が増えやすいもの)
+DETAIL_FIELDS = ("subtasks", "notes")
+
+
+# タスクの並び順のキーを返す関数
+def _task_key(task: Dict) -> Any:
+    return task.get("id") or 0
+
+
+# ページングのカーソルを生成する関数
+def encode_cursor(task_id: Any) -> str:
+    """
+    ページングのカーソルを生成する関数。
+
+    カーソルは直前のページの最後のタスクIDを不透明な文字列にしたもので、
+    ページの間にタスクが追加や削除されても結果が重複したり抜けたりしない。
+
+    Args:
+        task_id: 直前のページの最後のタスクID
+
+    Returns:
+        str: カーソル
+    """
+    payload = json.dumps({"after": task_id}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+# ページングのカーソルを解釈する関数
+def decode_cursor(cursor: str) -> Any:
+    """
+    ページングのカーソルを解釈する関数。
+
+    Args:
+        cursor: encode_cursor() で生成したカーソル
+
+    Returns:
+        Any: 直前のページの最後のタスクID
+
+    Raises:
+        ValueError: カーソルが不正な場合
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        after = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))["after"]
+        if isinstance(after, bool) or not isinstance(after, (int, float)):
+            raise TypeError(after)
+        return after
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+# タスクをページに分割する関数
+def paginate(tasks: Iterable[Dict], limit: Optional[int] = None,
+             cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+    """
+    タスクをIDの昇順に並べ、カーソルの位置から limit 件を取り出す関数。
+
+    全体を並べ替えず、必要な limit + 1 件だけを選ぶ。
+
+    Args:
+        tasks: タスクのリスト
+        limit: 1ページの最大件数（オプション。省略時は残りすべて）
+        cursor: 前のページの next_cursor（オプション）
+
+    Returns:
+        Tuple[List[Dict], Optional[str]]: (ページのタスク, 次のページのカーソル。最後のページではNone)
+
+    Raises:
+        ValueError: limit またはカーソルが不正な場合
+    """
+    if limit is not None and (not isinstance(limit, int) or isinstance(limit, bool) or limit < 1):
+        raise ValueError("Invalid limit: must be a positive integer")
+
+    if cursor:
+        after = decode_cursor(cursor)
+        tasks = [t for t in tasks if _task_key(t) > after]
+
+    if limit is None:
+        return sorted(tasks, key=_task_key), None
+
+    page = heapq.nsmallest(limit + 1, tasks, key=_task_key)
+    if len(page) <= limit:
+        return page, None
+    del page[limit:]
+    return page, encode_cursor(_task_key(page[-1]))
+
+
+# タスクから必要なフィールドだけを取り出す関数
+def project_tasks(tasks: List[Dict], fields: Optional[List[str]] = None,
+                  summary: bool = False) -> List[Dict]:
+    """
+    タスクから必要なフィールドだけを取り出す関数。
+
+    Args:
+        tasks: タスクのリスト
+        fields: 取り出すフィールドのリスト（オプション。省略時はすべて）
+        summary: Trueの場合はサブタスクとノートを取り除く
+
+    Returns:
+        List[Dict]: 射影したタスクのリスト (元のタスクは変更しない)
+    """
+    if fields:
+        keep = [f for f in fields if not (summary and f in DETAIL_FIELDS)]
+        return [{f: t[f] for f in keep if f in t} for t in tasks]
+    if summary:
+        return [{k: v for k, v in t.items() if k not in DETAIL_FIELDS} for t in tasks]
+    return tasks
+
+
+# ページングと射影を適用する関数
+def shape_tasks(tasks: List[Dict], limit: Optional[int] = None, cursor: Optional[str] = None,
+                fields: Optional[List[str]] = None, summary: bool = False) -> Any:
+    """
+    タスクのリストにページングと射影を適用する関数。
+
+    limit と cursor のどちらも指定されていない場合は従来どおりタスクのリストを返し、
+    いずれかが指定されている場合は {"tasks": [...], "next_cursor": ...} を返す。
+
+    Args:
+        tasks: 絞り込み済みのタスクのリスト
+        limit: 1ページの最大件数（オプション）
+        cursor: 前のページの next_cursor（オプション）
+        fields: 取り出すフィールドのリスト（オプション）
+        summary: Trueの場合はサブタスクとノートを取り除く
+
+    Returns:
+        Any: タスクのリスト、またはページ
+    """
+    if limit is None and not cursor:
+        return project_tasks(tasks, fields, summary)
+    page, next_cursor = paginate(tasks, limit, cursor)
+    return {"tasks": project_tasks(page, fields, summary), "next_cursor": next_cursor}
+
+
+# リソースURIのクエリ文字列からページングと射影の指定を取り出す関数
+def parse_query_options(query: str) -> Dict[str, Any]:
+    """
+    リソースURIのクエリ文字列 (例: "limit=50&fields=id,title&summary=1") を解釈する関数。
+
+    Args:
+        query: "?" より後ろのクエリ文字列
+
+    Returns:
+        Dict[str, Any]: shape_tasks() のキーワード引数 (include_archived のみ呼び出し側で取り出す)
+
+    Raises:
+        ValueError: limit が整数でない場合
+    """
+    options: Dict[str, Any] = {}
+    for name, value in parse_qsl(query):
+        if name == "limit":
+            try:
+                options["limit"] = int(value)
+            except ValueError:
+                raise ValueError("Invalid limit: must be a positive integer")
+        elif name == "cursor":
+            options["cursor"] = value
+        elif name == "fields":
+            options["fields"] = [f for f in value.split(",") if f]
+        elif name == "summary":
+            options["summary"] = value.lower() in ("1", "true", "yes")
+        elif name == "include_archived":
+            options["include_archived"] = value.lower() in ("1", "true", "yes")
+    return options
@@ -0,0 +1,282 @@
+import os
+import glob
+import random
+import datetime
+import itertools
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+
+# cProfile, pstats, tracemalloc はプロファイルを使う時点で読み込む (無効な場合の起動を速くするため)
+if TYPE_CHECKING:
+    import cProfile
+    import tracemalloc
+
+# tracemalloc で記録するスタックの深さ
+MEMORY_FRAMES = 10
+
+
+# プロファイルの対象の指定 ("*" はすべて、それ以外はカンマ区切りの名前) を解析する関数
+def parse_targets(value: Optional[str]) -> Optional[frozenset]:
+    """
+    プロファイルの対象の指定を解析する関数。
+
+    Args:
+        value: "*"、カンマ区切りのツール名・リソースの種類、または空文字列
+
+    Returns:
+        Optional[frozenset]: 対象の名前の集合。"*" の場合は空の集合 (すべて)、空文字列の場合はNone (無効)
+    """
+    if not value or not value.strip():
+        return None
+    names = frozenset(name.strip() for name in value.split(",") if name.strip())
+    return frozenset() if "*" in names else names
+
+
+class Profiler:
+    """
+    ツールの呼び出しとリソースの読み込みを cProfile で記録し、tracemalloc のスナップショットを取るクラス。
+
+    対象の呼び出しのうち sample_rate の割合を記録し、呼び出しごとの統計を
+    "{種類}-{名前}-{時刻}-{連番}.prof" として出力ディレクトリに書き出す。
+    無効な場合、呼び出し元は enabled を確認するだけでよく、呼び出しは一切包まない。
+
+    cProfile は同時に1つしか有効にできないため、他の呼び出しを記録している間は記録を省略する。
+    記録中は他のスレッドで実行された処理も統計に含まれることがある。
+    """
+
+    def __init__(self, output_dir: Callable[[], str], targets: Optional[frozenset] = None,
+                 sample_rate: float = 1.0, memory: bool = False, keep: int = 50):
+        """
+        Args:
+            output_dir: ダンプを書き出すディレクトリを返す関数
+            targets: 対象の名前の集合（空の集合はすべて、Noneは無効）
+            sample_rate: 対象の呼び出しのうち記録する割合 (0〜1)
+            memory: tracemalloc によるメモリの追跡を開始するかどうか
+            keep: 操作ごと (メモリのスナップショットはまとめて) に残すダンプの数 (古いものから削除する)
+        """
+        self.output_dir = output_dir
+        self.keep = keep
+        self.targets: Optional[frozenset] = None
+        self.sample_rate = 1.0
+        self.enabled = False
+        self._busy = threading.Lock()
+        self._sequence = itertools.count(1)
+        self._last_snapshot: "Optional[tracemalloc.Snapshot]" = None
+        # (起動時にはメモリの追跡を止めない)
+        self.configure(targets, sample_rate, memory or None)
+
+    def configure(self, targets: Optional[frozenset], sample_rate: float = 1.0, memory: Optional[bool] = None) -> None:
+        """
+        プロファイルの対象と記録する割合を設定する。
+
+        Args:
+            targets: 対象の名前の集合（空の集合はすべて、Noneは無効）
+            sample_rate: 対象の呼び出しのうち記録する割合 (0〜1)
+            memory: tracemalloc によるメモリの追跡を開始 (True) または停止 (False) する。Noneは変更しない
+
+        Raises:
+            ValueError: 記録する割合が範囲外の場合
+        """
+        if not 0 < sample_rate <= 1:
+            raise ValueError(f"Invalid sample rate: {sample_rate} (must be in (0, 1])")
+        self.targets = targets
+        self.sample_rate = sample_rate
+        self.enabled = targets is not None
+        if memory is None:
+            return
+        import tracemalloc
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start(MEMORY_FRAMES)
+        elif not memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+            self._last_snapshot = None
+
+    def status(self) -> Dict[str, Any]:
+        """現在の設定を辞書として返す。"""
+        import tracemalloc
+        return {
+            "enabled": self.enabled,
+            "targets": sorted(self.targets) or ["*"] if self.targets is not None else [],
+            "sample_rate": self.sample_rate,
+            "memory": tracemalloc.is_tracing(),
+            "output_dir": self.output_dir(),
+        }
+
+    def wrap(self, kind: str, name: str, func: Callable[..., Any]) -> Callable[..., Any]:
+        """
+        対象かつ抽出された呼び出しであれば、func を記録しながら実行する関数を返す。
+
+        Args:
+            kind: 操作の種類 ("tool" または "resource")
+            name: ツール名またはリソースの種類
+            func: 実行する関数
+
+        Returns:
+            Callable[..., Any]: 記録する場合は func を包んだ関数、そうでなければ func そのもの
+        """
+        targets = self.targets
+        if targets is None or (targets and name not in targets):
+            return func
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return func
+
+        def profiled(*args: Any) -> Any:
+            return self.run(kind, name, func, *args)
+        return profiled
+
+    def run(self, kind: str, name: str, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        func を cProfile で記録しながら実行し、統計をファイルに書き出す。
+
+        Args:
+            kind: 操作の種類
+            name: ツール名またはリソースの種類
+            func: 実行する関数
+            *args: 関数の引数
+
+        Returns:
+            Any: 関数の戻り値
+        """
+        if not self._busy.acquire(blocking=False):
+            return func(*args)
+        try:
+            import cProfile
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # 他のプロファイラが有効な場合は記録しない
+                return func(*args)
+            try:
+                return func(*args)
+            finally:
+                profile.disable()
+                self._dump(profile, kind, name)
+        finally:
+            self._busy.release()
+
+    def _dump(self, profile: "cProfile.Profile", kind: str, name: str) -> None:
+        directory = self.output_dir()
+        os.makedirs(directory, exist_ok=True)
+        stamp = datetime.datetime.now().strftime("%Y%m%dT%H%M%S")
+        prefix = f"{kind}-{_safe_name(name)}-"
+        profile.dump_stats(os.path.join(directory, f"{prefix}{stamp}-{next(self._sequence):06d}.prof"))
+        self._prune(directory, glob.escape(prefix) + "*.prof")
+
+    def _prune(self, directory: str, pattern: str) -> None:
+        # 古いダンプを削除する (ファイル名は時刻と連番の順に並ぶ)
+        dumps = sorted(glob.glob(os.path.join(glob.escape(directory), pattern)))
+        for path in dumps[:-self.keep] if self.keep > 0 else []:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    def dumps(self, name: Optional[str] = None) -> List[str]:
+        """
+        書き出したダンプのパスの一覧を返す。
+
+        Args:
+            name: ツール名またはリソースの種類で絞り込む（オプション）
+
+        Returns:
+            List[str]: ダンプのパスのリスト
+        """
+        pattern = f"*-{_safe_name(name)}-*.prof" if name else "*.prof"
+        return sorted(glob.glob(os.path.join(glob.escape(self.output_dir()), pattern)))
+
+    def summary(self, name: Optional[str] = None, limit: int = 20, sort: str = "tottime") -> Dict[str, Any]:
+        """
+        書き出したダンプを合算し、時間のかかっている関数の上位を返す。
+
+        Args:
+            name: ツール名またはリソースの種類で絞り込む（オプション）
+            limit: 返す関数の数
+            sort: 並べ替えの基準 ("tottime": 関数自身の時間, "cumtime": 呼び出し先を含む時間)
+
+        Returns:
+            Dict[str, Any]: {"dumps": ダンプの数, "operations": {操作: ダンプの数}, "hotspots": [...]}
+
+        Raises:
+            ValueError: 並べ替えの基準が不正な場合
+        """
+        if sort not in ("tottime", "cumtime"):
+            raise ValueError(f"Invalid sort: {sort} (must be tottime or cumtime)")
+        paths = self.dumps(name)
+        operations: Dict[str, int] = {}
+        for path in paths:
+            operation = os.path.basename(path).rsplit("-", 2)[0]
+            operations[operation] = operations.get(operation, 0) + 1
+        if not paths:
+            return {"dumps": 0, "operations": {}, "hotspots": []}
+
+        import pstats
+        stats = pstats.Stats(*paths)
+        rows = []
+        for (filename, line, function), (_, calls, tottime, cumtime, _) in stats.stats.items():
+            rows.append({
+                "function": f"{filename}:{line}({function})",
+                "calls": calls,
+                "tottime_ms": round(tottime * 1000, 3),
+                "cumtime_ms": round(cumtime * 1000, 3),
+            })
+        rows.sort(key=lambda row: row[f"{sort}_ms"], reverse=True)
+        return {"dumps": len(paths), "operations": operations, "hotspots": rows[:limit]}
+
+    def snapshot_memory(self, limit: int = 20) -> Dict[str, Any]:
+        """
+        tracemalloc のスナップショットを書き出し、確保されているメモリの多い行の上位を返す。
+
+        前回のスナップショットがあれば、そこから増えた行の上位も返す。
+
+        Args:
+            limit: 返す行の数
+
+        Returns:
+            Dict[str, Any]: {"path", "current_kb", "peak_kb", "top": [...], "growth": [...]}
+
+        Raises:
+            RuntimeError: メモリの追跡が有効でない場合
+        """
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("Memory tracing is not enabled")
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ))
+        directory = self.output_dir()
+        os.makedirs(directory, exist_ok=True)
+        stamp = datetime.datetime.now().strftime("%Y%m%dT%H%M%S")
+        path = os.path.join(directory, f"memory-{stamp}-{next(self._sequence):06d}.snapshot")
+        snapshot.dump(path)
+        self._prune(directory, "memory-*.snapshot")
+
+        current, peak = tracemalloc.get_traced_memory()
+        result = {
+            "path": path,
+            "current_kb": round(current / 1024, 1),
+            "peak_kb": round(peak / 1024, 1),
+            "top": [_memory_row(stat) for stat in snapshot.statistics("lineno")[:limit]],
+            "growth": [],
+        }
+        if self._last_snapshot is not None:
+            diffs = [d for d in snapshot.compare_to(self._last_snapshot, "lineno") if d.size_diff > 0]
+            result["growth"] = [_memory_row(d) for d in diffs[:limit]]
+        self._last_snapshot = snapshot
+        return result
+
+
+# ファイル名に使えるように名前を置き換える関数
+def _safe_name(name: str) -> str:
+    return "".join(c if c.isalnum() or c == "_" else "_" for c in name)
+
+
+# tracemalloc の統計を辞書にする関数
+def _memory_row(stat: Any) -> Dict[str, Any]:
+    frame = stat.traceback[0]
+    row = {"location": f"{frame.filename}:{frame.lineno}", "size_kb": round(stat.size / 1024, 1), "count": stat.count}
+    if hasattr(stat, "size_diff"):
+        row["size_diff_kb"] = round(stat.size_diff / 1024, 1)
+    return row
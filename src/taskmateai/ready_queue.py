@@ -0,0 +1,188 @@
+import heapq
+import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .events import event_task_id
+
+
+# 次のタスクの候補にならないステータス (JSONモードとSQLiteモードで共通)
+DONE_STATUSES = ("done",)
+
+
+# リースの期限を解釈する関数
+def parse_lease(expires: Any) -> Optional[datetime.datetime]:
+    """
+    リース期限の文字列を解釈する関数。
+
+    Args:
+        expires: リース期限 (ISO形式)
+
+    Returns:
+        Optional[datetime.datetime]: リース期限。リースがないか解釈できない場合はNone
+    """
+    if not expires:
+        return None
+    try:
+        return datetime.datetime.fromisoformat(expires)
+    except (TypeError, ValueError):
+        return None
+
+
+def lease_expiry(task: Dict) -> Optional[datetime.datetime]:
+    return parse_lease(task.get("lease_expires_at"))
+
+
+# タスクが有効なリースで確保されているかどうかを判定する関数
+def is_leased(task: Dict, now: datetime.datetime) -> bool:
+    expires = lease_expiry(task)
+    return expires is not None and expires > now
+
+
+# 次のタスクの候補になるステータスかどうかを判定する関数
+def is_ready_status(status: Any) -> bool:
+    return status not in DONE_STATUSES
+
+
+def is_ready(task: Dict) -> bool:
+    return is_ready_status(task.get("status"))
+
+
+# 次のタスクを選ぶ順序 (優先度の降順, IDの昇順) のキー
+def ready_key(task: Dict) -> Tuple[Any, Any]:
+    return (-(task.get("priority") or 0), task.get("id"))
+
+
+class ReadyQueue:
+    """
+    未完了タスクの優先度付きキュー。
+
+    (優先度の降順, IDの昇順) のヒープで未完了タスクを保持し、次のタスクを
+    ストアの大きさに関係なく O(log n) で取り出す。完了したタスクはヒープから
+    即座には取り除かず、先頭に現れた時点で読み捨てる (遅延削除)。
+    有効なリースで確保されたタスクはリース期限順の別のヒープに移し、
+    期限が切れた時点で自動的にキューへ戻す。
+    キュー内のタスクはストアのタスクと同じオブジェクトを参照するため、
+    変更イベントを apply() に渡すことで状態の変化を反映できる。
+    """
+
+    def __init__(self, tasks: List[Dict], now: Optional[datetime.datetime] = None):
+        """
+        Args:
+            tasks: ストアのタスクのリスト
+            now: リースの有効性を判定する現在時刻（オプション）
+        """
+        now = now or datetime.datetime.now()
+        self._by_id: Dict[Any, Dict] = {}
+        self._heap: List[Tuple[Any, Any]] = []
+        self._leases: List[Tuple[datetime.datetime, Any]] = []
+        self._queued: Set[Any] = set()
+
+        for task in tasks:
+            task_id = task.get("id")
+            self._by_id[task_id] = task
+            if not self._is_ready(task):
+                continue
+            if is_leased(task, now):
+                self._leases.append((lease_expiry(task), task_id))
+            else:
+                self._heap.append(self._heap_key(task))
+                self._queued.add(task_id)
+        heapq.heapify(self._heap)
+        heapq.heapify(self._leases)
+
+    def __len__(self) -> int:
+        return len(self._queued)
+
+    _is_ready = staticmethod(is_ready)
+    _heap_key = staticmethod(ready_key)
+
+    @staticmethod
+    def _priority(task: Dict) -> Any:
+        return task.get("priority") or 0
+
+    def notify(self, task: Dict) -> None:
+        """
+        タスクの追加や状態の変化をキューに反映する。
+
+        Args:
+            task: 追加または変更されたタスク
+        """
+        task_id = task.get("id")
+        self._by_id[task_id] = task
+        if self._is_ready(task) and task_id not in self._queued:
+            heapq.heappush(self._heap, self._heap_key(task))
+            self._queued.add(task_id)
+
+    def apply(self, events: List[Dict]) -> None:
+        """
+        ストアに適用済みの変更イベントをキューに反映する。
+
+        Args:
+            events: 変更イベントのリスト
+        """
+        for event in events:
+            if event.get("op") == "create":
+                self.notify(event["task"])
+                continue
+            if event.get("op") == "archive":
+                # アーカイブしたタスクはキューから読み捨てる
+                self._by_id.pop(event.get("id"), None)
+                continue
+            task = self._by_id.get(event_task_id(event))
+            if task is None:
+                continue
+            if "priority" in event.get("set", {}) and task.get("id") in self._queued and self._is_ready(task):
+                # 優先度が変わった場合は新しい位置にも登録する (古い位置は peek() で読み捨てる)
+                heapq.heappush(self._heap, self._heap_key(task))
+            else:
+                self.notify(task)
+
+    def _release_expired(self, now: datetime.datetime) -> None:
+        # 期限切れのリースのタスクをキューに戻す
+        leases = self._leases
+        while leases and leases[0][0] <= now:
+            _, task_id = heapq.heappop(leases)
+            task = self._by_id.get(task_id)
+            if task is None:
+                continue
+            expires = lease_expiry(task)
+            if expires is not None and expires > now:
+                # 延長されたリースは新しい期限で登録し直す
+                heapq.heappush(leases, (expires, task_id))
+            else:
+                self.notify(task)
+
+    def peek(self, now: Optional[datetime.datetime] = None) -> Optional[Dict]:
+        """
+        確保されていない未完了タスクのうち、優先度が最も高いものを返す (キューからは取り除かない)。
+
+        Args:
+            now: リースの有効性を判定する現在時刻（オプション）
+
+        Returns:
+            Optional[Dict]: 次のタスク。該当するタスクがない場合はNone
+        """
+        now = now or datetime.datetime.now()
+        self._release_expired(now)
+
+        heap = self._heap
+        while heap:
+            neg_priority, task_id = heap[0]
+            task = self._by_id.get(task_id)
+            if task is None or not self._is_ready(task):
+                # 完了済みのタスクを読み捨てる
+                heapq.heappop(heap)
+                self._queued.discard(task_id)
+                continue
+            if is_leased(task, now):
+                # リース中のタスクは期限まで別のヒープで待たせる
+                heapq.heappop(heap)
+                self._queued.discard(task_id)
+                heapq.heappush(self._leases, (lease_expiry(task), task_id))
+                continue
+            if -neg_priority != self._priority(task):
+                # 優先度が変わっていれば正しい位置に入れ直す
+                heapq.heapreplace(heap, self._heap_key(task))
+                continue
+            return task
+        return None
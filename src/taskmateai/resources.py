@@ -0,0 +1,212 @@
+import re
+import json
+import base64
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+from urllib.parse import unquote
+
+from mcp.types import Resource, ResourceTemplate
+from pydantic import AnyUrl
+
+# リソースの種類ごとの (名前, 説明, 対象のステータス。Noneはすべて)
+RESOURCE_KINDS: Dict[str, Tuple[str, str, Optional[Tuple[str, ...]]]] = {
+    "all": ("All Tasks", "Complete list of all tasks", None),
+    "pending": ("Pending Tasks", "List of tasks not yet completed", ("todo", "in_progress")),
+    "completed": ("Completed Tasks", "List of completed tasks", ("done",)),
+}
+
+# サーバのメトリクスのリソースURI
+METRICS_URI = "taskmate://metrics"
+
+# リソースURIのルーティング (例: taskmate://tasks/all, taskmate://agent1/tasks/pending,
+# taskmate://agent1/project1/tasks/completed?limit=50)
+_ROUTE = re.compile(
+    r"^taskmate://(?:(?P<agent>[^/?#]+)/(?:(?P<project>[^/?#]+)/)?)?tasks/"
+    r"(?P<kind>" + "|".join(RESOURCE_KINDS) + r")/?(?:\?(?P<query>.*))?$"
+)
+
+
+class ResourceRoute(NamedTuple):
+    """リソースURIの解析結果。"""
+    agent_id: Optional[str]
+    project_name: Optional[str]
+    kind: str
+    query: str
+
+
+# リソースURIを解析する関数
+def route_resource_uri(uri: str) -> Optional[ResourceRoute]:
+    """
+    リソースURIを事前にコンパイルした正規表現で解析する関数。
+
+    Args:
+        uri: リソースURI
+
+    Returns:
+        Optional[ResourceRoute]: 解析結果。該当するリソースがない場合はNone
+    """
+    match = _ROUTE.match(uri)
+    if match is None:
+        return None
+    agent_id, project_name, kind, query = match.group("agent", "project", "kind", "query")
+    return ResourceRoute(
+        unquote(agent_id) if agent_id else None,
+        unquote(project_name) if project_name else None,
+        kind,
+        query or ""
+    )
+
+
+# リソースの種類に該当するタスクを絞り込む関数
+def filter_by_kind(tasks: List[Dict], kind: str) -> List[Dict]:
+    statuses = RESOURCE_KINDS[kind][2]
+    if statuses is None:
+        return tasks
+    return [t for t in tasks if t.get("status") in statuses]
+
+
+# ストアのリソースURIを生成する関数
+def resource_uri(agent_id: Optional[str], project_name: Optional[str], kind: str) -> str:
+    path = "/".join(p for p in (agent_id, project_name if agent_id else None) if p)
+    return f"taskmate://{path}/tasks/{kind}" if path else f"taskmate://tasks/{kind}"
+
+
+# ストアのリソース一覧を生成する関数
+def store_resources(agent_id: Optional[str] = None, project_name: Optional[str] = None) -> List[Resource]:
+    """
+    1つのストアについて、種類ごとのリソースを生成する関数。
+
+    Args:
+        agent_id: エージェントID（オプション）
+        project_name: プロジェクト名（オプション）
+
+    Returns:
+        List[Resource]: リソースのリスト
+    """
+    if agent_id and project_name:
+        name_suffix = f" for {agent_id}/{project_name}"
+        description_suffix = f" for agent {agent_id} in project {project_name}"
+    elif agent_id:
+        name_suffix = f" for {agent_id}"
+        description_suffix = f" for agent {agent_id}"
+    else:
+        name_suffix = description_suffix = ""
+
+    return [
+        Resource(
+            uri=AnyUrl(resource_uri(agent_id, project_name, kind)),
+            name=name + name_suffix,
+            mimeType="application/json",
+            description=description + description_suffix
+        )
+        for kind, (name, description, _) in RESOURCE_KINDS.items()
+    ]
+
+
+# メトリクスのリソースを生成する関数
+def metrics_resource() -> Resource:
+    return Resource(
+        uri=AnyUrl(METRICS_URI),
+        name="Server Metrics",
+        mimeType="application/json",
+        description="Per-tool call counts, error counts and latency histograms, store I/O bytes and cache hit rate"
+    )
+
+
+# リソースのURIテンプレートを生成する関数
+def resource_templates() -> List[ResourceTemplate]:
+    kinds = ",".join(RESOURCE_KINDS)
+    return [
+        ResourceTemplate(
+            uriTemplate="taskmate://{agent_id}/tasks/{kind}",
+            name="Tasks for an agent",
+            mimeType="application/json",
+            description=f"Tasks for an agent. kind is one of: {kinds}. "
+                        "Accepts ?limit=&cursor=&fields=&summary=&include_archived= query parameters"
+        ),
+        ResourceTemplate(
+            uriTemplate="taskmate://{agent_id}/{project_name}/tasks/{kind}",
+            name="Tasks for a project",
+            mimeType="application/json",
+            description=f"Tasks for an agent's project. kind is one of: {kinds}. "
+                        "Accepts ?limit=&cursor=&fields=&summary=&include_archived= query parameters"
+        ),
+    ]
+
+
+# ストアのキーを名前順に列挙する関数
+def iter_stores(list_agents: Callable[[], List[str]],
+                list_projects: Callable[[str], List[str]],
+                after: Optional[Tuple[str, str]] = None) -> Iterator[Tuple[Optional[str], Optional[str]]]:
+    """
+    ストアを (エージェント, プロジェクト) の名前順に列挙する関数。
+
+    既定のストアは (None, None)、エージェントのストアは (agent, None) として、
+    それぞれ配下のストアより前に列挙する。プロジェクトの一覧は列挙がそのエージェントに
+    達した時点で初めて取得する。
+
+    Args:
+        list_agents: エージェントの一覧を返す関数
+        list_projects: エージェントのプロジェクトの一覧を返す関数
+        after: このキーより後のストアだけを列挙する (キーは (agent or "", project or ""))
+
+    Yields:
+        Tuple[Optional[str], Optional[str]]: (エージェントID, プロジェクト名)
+    """
+    if after is None:
+        yield (None, None)
+    after_agent, after_project = after or ("", "")
+
+    for agent_id in sorted(list_agents()):
+        if agent_id < after_agent:
+            continue
+        if agent_id > after_agent:
+            yield (agent_id, None)
+            projects_after = ""
+        else:
+            projects_after = after_project
+        for project_name in sorted(list_projects(agent_id)):
+            if project_name > projects_after:
+                yield (agent_id, project_name)
+
+
+# ストアの一覧を1ページ分取得する関数
+def list_store_page(list_agents: Callable[[], List[str]], list_projects: Callable[[str], List[str]],
+                    cursor: Optional[str] = None,
+                    page_size: int = 100) -> Tuple[List[Tuple[Optional[str], Optional[str]]], Optional[str]]:
+    """
+    ストアの一覧をカーソルの位置から page_size 件取得する関数。
+
+    Args:
+        list_agents: エージェントの一覧を返す関数
+        list_projects: エージェントのプロジェクトの一覧を返す関数
+        cursor: 前のページの次のカーソル（オプション）
+        page_size: 1ページのストア数
+
+    Returns:
+        Tuple[List[Tuple[Optional[str], Optional[str]]], Optional[str]]:
+            (ストアのリスト, 次のページのカーソル。最後のページではNone)
+
+    Raises:
+        ValueError: カーソルが不正な場合
+    """
+    after = _decode_store_cursor(cursor) if cursor else None
+    stores = []
+    for store in iter_stores(list_agents, list_projects, after):
+        if len(stores) == page_size:
+            return stores, _encode_store_cursor(stores[-1])
+        stores.append(store)
+    return stores, None
+
+
+def _encode_store_cursor(store: Tuple[Optional[str], Optional[str]]) -> str:
+    payload = json.dumps([store[0] or "", store[1] or ""], ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def _decode_store_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        agent_id, project_name = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return str(agent_id), str(project_name)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
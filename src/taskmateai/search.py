@@ -0,0 +1,232 @@
+import re
+import math
+import threading
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Tuple
+
+# 文字の連続ではなく2文字ずつに区切る文字 (ひらがな、カタカナ、CJK統合漢字、ハングル)
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af"
+_TOKEN_RE = re.compile(f"([{_CJK}]+)|([^\\W_{_CJK}]+)")
+_CJK_CHAR_RE = re.compile(f"[{_CJK}]")
+
+# フィールドごとの重み (タイトルに含まれる語を重視する)
+FIELD_WEIGHTS = {"title": 2.0, "description": 1.0, "subtask": 1.0, "note": 1.0}
+
+# BM25 のパラメータ
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+# テキストを検索用のトークンに分割する関数
+def tokenize(text: Any) -> List[str]:
+    """
+    テキストを検索用のトークンに分割する関数。
+
+    NFKC で正規化して小文字にした後、英数字などは単語ごとに、日本語などの
+    分かち書きしない文字の連続は2文字ずつ (バイグラム) に区切る。
+    1文字だけの連続はその1文字をトークンにする。
+
+    Args:
+        text: テキスト (文字列以外は空とみなす)
+
+    Returns:
+        List[str]: トークンのリスト (重複を含む)
+    """
+    if not isinstance(text, str) or not text:
+        return []
+    tokens = []
+    for cjk, word in _TOKEN_RE.findall(unicodedata.normalize("NFKC", text).lower()):
+        if word:
+            tokens.append(word)
+        elif len(cjk) == 1:
+            tokens.append(cjk)
+        else:
+            tokens.extend(cjk[i:i + 2] for i in range(len(cjk) - 1))
+    return tokens
+
+
+class SearchIndex:
+    """
+    1つのストアのタスクの全文検索のための転置インデックス。
+
+    タイトル、説明、サブタスクとノートの内容をトークンに分割し、トークンごとに
+    タスクIDと (フィールドの重みを掛けた) 出現回数を保持する。検索はクエリの
+    すべてのトークンを含むタスクを BM25 で順位付けする。
+    タスクの作成、サブタスクとノートの追加は、索引全体を作り直さずに反映する。
+    """
+
+    def __init__(self, tasks: Iterable[Dict] = ()):
+        """
+        Args:
+            tasks: ストアのタスクのリスト
+        """
+        self._postings: Dict[str, Dict[Any, float]] = {}
+        self._lengths: Dict[Any, float] = {}
+        self._terms: Dict[Any, Counter] = {}
+        self._total_length = 0.0
+        self._lock = threading.Lock()
+        # 索引に反映済みのノートのログのシグネチャ (呼び出し元が管理する)
+        self.notes_signature: Any = None
+        for task in tasks:
+            self.add_task(task)
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def add_task(self, task: Dict) -> None:
+        """
+        タスクのタイトル、説明、サブタスクとノートを索引に追加する。
+
+        Args:
+            task: タスク
+        """
+        task_id = task.get("id")
+        with self._lock:
+            self._add(task_id, task.get("title"), FIELD_WEIGHTS["title"])
+            self._add(task_id, task.get("description"), FIELD_WEIGHTS["description"])
+            for subtask in task.get("subtasks") or ():
+                self._add(task_id, subtask.get("description"), FIELD_WEIGHTS["subtask"])
+            for note in task.get("notes") or ():
+                self._add(task_id, note.get("content"), FIELD_WEIGHTS["note"])
+
+    def add_text(self, task_id: Any, text: Any, field: str = "note") -> None:
+        """
+        タスクにテキスト (サブタスクやノートの内容) を追加する。
+
+        Args:
+            task_id: タスクID
+            text: 追加するテキスト
+            field: フィールドの種類 (FIELD_WEIGHTS のキー)
+        """
+        with self._lock:
+            self._add(task_id, text, FIELD_WEIGHTS[field])
+
+    def add_notes(self, entries: Iterable[Tuple[Any, Dict]]) -> None:
+        """
+        ノートのログの (タスクID, ノート) を索引に追加する。
+
+        Args:
+            entries: (タスクID, ノート) の列
+        """
+        with self._lock:
+            for task_id, note in entries:
+                self._add(task_id, note.get("content"), FIELD_WEIGHTS["note"])
+
+    def remove_task(self, task_id: Any) -> None:
+        """
+        タスクを索引から取り除く。
+
+        Args:
+            task_id: タスクID
+        """
+        with self._lock:
+            terms = self._terms.pop(task_id, None)
+            if terms is None:
+                return
+            for token in terms:
+                postings = self._postings.get(token)
+                if postings is not None:
+                    postings.pop(task_id, None)
+                    if not postings:
+                        del self._postings[token]
+            self._total_length -= self._lengths.pop(task_id, 0.0)
+
+    def apply(self, events: List[Dict]) -> None:
+        """
+        ストアに適用済みの変更イベントを索引に反映する。
+
+        Args:
+            events: 変更イベントのリスト
+        """
+        for event in events:
+            op = event.get("op")
+            if op == "create":
+                self.add_task(event["task"])
+            elif op == "add_subtask":
+                self.add_text(event.get("id"), event["subtask"].get("description"), "subtask")
+            elif op == "add_note":
+                self.add_text(event.get("id"), event["note"].get("content"), "note")
+            elif op == "archive":
+                self.remove_task(event.get("id"))
+
+    def search(self, query: str) -> List[Tuple[Any, float]]:
+        """
+        クエリのすべてのトークンを含むタスクを検索する。
+
+        1文字の日本語などのトークンは、その文字を含むバイグラムのいずれかに一致すればよい。
+
+        Args:
+            query: 検索語
+
+        Returns:
+            List[Tuple[Any, float]]: (タスクID, スコア) のリスト (スコアの降順、同じスコアではIDの昇順)
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+        with self._lock:
+            count = len(self._lengths)
+            if count == 0:
+                return []
+            average = self._total_length / count or 1.0
+            matches = [self._match(token) for token in tokens]
+            if any(not postings for postings in matches):
+                return []
+
+            # 件数の少ないトークンから候補を絞り込む
+            matches.sort(key=len)
+            candidates = set(matches[0])
+            for postings in matches[1:]:
+                candidates.intersection_update(postings)
+                if not candidates:
+                    return []
+
+            weighted = [(postings, math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5)) * (BM25_K1 + 1))
+                        for postings in matches]
+            lengths = self._lengths
+            base = BM25_K1 * (1 - BM25_B)
+            slope = BM25_K1 * BM25_B / average
+            scores = []
+            for task_id in candidates:
+                norm = base + slope * lengths[task_id]
+                score = 0.0
+                for postings, idf in weighted:
+                    tf = postings[task_id]
+                    score += idf * tf / (tf + norm)
+                scores.append((task_id, score))
+        scores.sort(key=lambda item: (-item[1], _id_key(item[0])))
+        return scores
+
+    def _match(self, token: str) -> Dict[Any, float]:
+        postings = self._postings.get(token)
+        if len(token) != 1 or not _CJK_CHAR_RE.match(token):
+            return postings or {}
+        # 1文字の検索語は、その文字だけのトークンと、その文字を含むバイグラムの出現回数を合計する
+        merged: Dict[Any, float] = dict(postings or {})
+        for term, term_postings in self._postings.items():
+            if len(term) == 2 and token in term:
+                for task_id, tf in term_postings.items():
+                    merged[task_id] = merged.get(task_id, 0.0) + tf
+        return merged
+
+    def _add(self, task_id: Any, text: Any, weight: float) -> None:
+        tokens = tokenize(text)
+        if task_id not in self._lengths:
+            self._lengths[task_id] = 0.0
+            self._terms[task_id] = Counter()
+        if not tokens:
+            return
+        terms = self._terms[task_id]
+        for token, n in Counter(tokens).items():
+            self._postings.setdefault(token, {})
+            self._postings[token][task_id] = self._postings[token].get(task_id, 0.0) + n * weight
+            terms[token] += n
+        length = len(tokens) * weight
+        self._lengths[task_id] += length
+        self._total_length += length
+
+
+# タスクIDの並び順のキーを返す関数 (数値以外のIDも並べられるようにする)
+def _id_key(task_id: Any) -> Tuple[int, Any]:
+    return (0, task_id) if isinstance(task_id, (int, float)) else (1, str(task_id))
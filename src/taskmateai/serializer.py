@@ -0,0 +1,78 @@
+import json
+from typing import Any, Union
+
+# orjson がインストールされていれば使う (未インストールの場合は標準の json にフォールバックする)
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson の有無に依存
+    orjson = None
+
+# 使用しているJSONエンコーダの名前
+BACKEND = "orjson" if orjson is not None else "json"
+
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS if orjson is not None else 0
+
+
+# オブジェクトをJSONのバイト列に変換する関数
+def dumps_bytes(obj: Any, pretty: bool = False) -> bytes:
+    """
+    オブジェクトをUTF-8のJSONバイト列に変換する関数。
+
+    既定では空白を含まないコンパクトな形式で出力する。非ASCII文字はエスケープしない。
+
+    Args:
+        obj: 変換するオブジェクト
+        pretty: Trueの場合は2スペースでインデントした読みやすい形式で出力する
+
+    Returns:
+        bytes: JSONのバイト列
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=_ORJSON_OPTIONS | (orjson.OPT_INDENT_2 if pretty else 0))
+        except TypeError:
+            # 64ビットを超える整数など orjson が扱えない値は標準の json で変換する
+            pass
+    return _std_dumps(obj, pretty).encode("utf-8")
+
+
+# オブジェクトをJSON文字列に変換する関数
+def dumps(obj: Any, pretty: bool = False) -> str:
+    """
+    オブジェクトをJSON文字列に変換する関数。
+
+    Args:
+        obj: 変換するオブジェクト
+        pretty: Trueの場合は2スペースでインデントした読みやすい形式で出力する
+
+    Returns:
+        str: JSON文字列
+    """
+    if orjson is not None:
+        return dumps_bytes(obj, pretty).decode("utf-8")
+    return _std_dumps(obj, pretty)
+
+
+# JSONを解析する関数
+def loads(data: Union[str, bytes]) -> Any:
+    """
+    JSON文字列またはバイト列を解析する関数。
+
+    Args:
+        data: JSON文字列またはUTF-8のバイト列
+
+    Returns:
+        Any: 解析したオブジェクト
+
+    Raises:
+        json.JSONDecodeError: 解析に失敗した場合
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _std_dumps(obj: Any, pretty: bool) -> str:
+    if pretty:
+        return json.dumps(obj, indent=2, ensure_ascii=False)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
@@ -0,0 +1,579 @@
+from __future__ import annotations
+
+import os
+import sys
+import json
+import logging
+import datetime
+import threading
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
+
+# sqlite3 は SQLiteモードで接続する時点で読み込む (サーバの起動を速くするため)
+if TYPE_CHECKING:
+    import sqlite3
+
+from .archive import ColdArchive
+from .journal import JournalStore
+from .notes_log import NotesLog
+from .ready_queue import is_leased, is_ready_status, parse_lease
+
+logger = logging.getLogger("taskmate-server")
+
+# 専用カラムに保存するタスクのフィールド (それ以外は extra にJSONで保存する)
+TASK_COLUMNS = ("title", "description", "priority", "status", "progress", "claimed_by", "lease_expires_at")
+SUBTASK_COLUMNS = ("description", "status")
+NOTE_COLUMNS = ("content", "timestamp")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    agent_id TEXT NOT NULL,
+    project_name TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    title TEXT,
+    description TEXT,
+    priority NUMERIC,
+    status TEXT,
+    progress NUMERIC,
+    claimed_by TEXT,
+    lease_expires_at TEXT,
+    extra TEXT,
+    PRIMARY KEY (agent_id, project_name, id)
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_status_priority
+    ON tasks (agent_id, project_name, status, priority, id);
+CREATE TABLE IF NOT EXISTS subtasks (
+    agent_id TEXT NOT NULL,
+    project_name TEXT NOT NULL,
+    task_id INTEGER NOT NULL,
+    id INTEGER NOT NULL,
+    description TEXT,
+    status TEXT,
+    extra TEXT,
+    PRIMARY KEY (agent_id, project_name, task_id, id)
+);
+CREATE TABLE IF NOT EXISTS notes (
+    agent_id TEXT NOT NULL,
+    project_name TEXT NOT NULL,
+    task_id INTEGER NOT NULL,
+    id INTEGER NOT NULL,
+    content TEXT,
+    timestamp TEXT,
+    extra TEXT,
+    PRIMARY KEY (agent_id, project_name, task_id, id)
+);
+"""
+
+
+# エージェントID・プロジェクト名をDBのキーに変換する関数
+def store_key(agent_id: Optional[str] = None, project_name: Optional[str] = None) -> Tuple[str, str]:
+    """
+    (agent_id, project_name) をDB上のキーに変換する関数。
+
+    ファイル配置と同じく、エージェントIDがない場合はプロジェクト名を無視する。
+    指定がない場合は空文字列で表す。
+
+    Args:
+        agent_id: エージェントID（オプション）
+        project_name: プロジェクト名（オプション）
+
+    Returns:
+        Tuple[str, str]: (agent_id, project_name)
+    """
+    if not agent_id:
+        return ("", "")
+    return (agent_id, project_name or "")
+
+
+# 辞書を専用カラムの値と残りのフィールドに分ける関数
+def _split_fields(item: Dict, columns: Tuple[str, ...], skip: Tuple[str, ...] = ()) -> Tuple[List[Any], Optional[str]]:
+    values = [item.get(column) for column in columns]
+    extra = {k: v for k, v in item.items() if k not in columns and k not in skip}
+    return values, json.dumps(extra, ensure_ascii=False) if extra else None
+
+
+# 行を辞書に戻す関数 (値がNULLのフィールドは元の辞書に存在しなかったものとして扱う)
+def _join_fields(row: sqlite3.Row, columns: Tuple[str, ...]) -> Dict:
+    item = {"id": row["id"]}
+    for column in columns:
+        if row[column] is not None:
+            item[column] = row[column]
+    return item
+
+
+# SQLから呼び出すリースの判定関数 (JSONモードの is_leased() と同じ判定を行う)
+def _lease_active(expires: Optional[str], now: str) -> bool:
+    return is_leased({"lease_expires_at": expires}, parse_lease(now))
+
+
+class SQLiteStore:
+    """
+    単一のSQLiteファイルによるタスクストア。
+
+    タスク・サブタスク・ノートをそれぞれのテーブルに保存し、
+    (agent_id, project_name, status, priority) の索引により
+    ステータスや優先度による絞り込みを全件走査なしで行う。
+    WALモードで開くため、読み込みが書き込みをブロックしない。
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Args:
+            db_path: データベースファイルのパス
+        """
+        self.db_path = db_path
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        # 接続はスレッドごとに保持する
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        import sqlite3
+        conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.create_function("lease_active", 2, _lease_active, deterministic=True)
+
+        with self._schema_lock:
+            if not self._schema_ready:
+                conn.executescript(SCHEMA)
+                # 以前のバージョンで作成されたデータベースにカラムを追加する
+                existing = {row[1] for row in conn.execute("PRAGMA table_info(tasks)")}
+                for column in ("claimed_by", "lease_expires_at"):
+                    if column not in existing:
+                        conn.execute(f"ALTER TABLE tasks ADD COLUMN {column} TEXT")
+                self._schema_ready = True
+
+        self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def close(self) -> None:
+        """
+        現在のスレッドの接続を閉じる。
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # ---- 読み込み ----
+
+    def _fetch(self, key: Tuple[str, str], where: str = "", params: Tuple = (), order: str = "rowid",
+               limit: Optional[int] = None) -> List[Dict]:
+        conn = self._connect()
+        select = f"FROM tasks WHERE agent_id = ? AND project_name = ?{where} ORDER BY {order}"
+        if limit is not None:
+            select += f" LIMIT {int(limit)}"
+        rows = conn.execute(f"SELECT * {select}", key + params).fetchall()
+        if not rows:
+            return []
+
+        tasks = []
+        by_id = {}
+        for row in rows:
+            task = _join_fields(row, TASK_COLUMNS)
+            task["subtasks"] = []
+            task["notes"] = []
+            if row["extra"]:
+                task.update(json.loads(row["extra"]))
+            tasks.append(task)
+            by_id[task["id"]] = task
+
+        # サブタスクとノートは対象のタスクの分だけ読み込む
+        if where or limit is not None:
+            child_where = f" AND task_id IN (SELECT id {select})"
+            child_params = key + params
+        else:
+            child_where, child_params = "", ()
+
+        for table, columns, field in (("subtasks", SUBTASK_COLUMNS, "subtasks"), ("notes", NOTE_COLUMNS, "notes")):
+            for row in conn.execute(
+                f"SELECT * FROM {table} WHERE agent_id = ? AND project_name = ?{child_where} ORDER BY rowid",
+                key + child_params
+            ):
+                task = by_id.get(row["task_id"])
+                if task is None:
+                    continue
+                item = _join_fields(row, columns)
+                if row["extra"]:
+                    item.update(json.loads(row["extra"]))
+                task[field].append(item)
+
+        return tasks
+
+    def load(self, agent_id: Optional[str] = None, project_name: Optional[str] = None) -> List[Dict]:
+        """
+        ストアの全タスクを読み込む。
+
+        Args:
+            agent_id: エージェントID（オプション）
+            project_name: プロジェクト名（オプション）
+
+        Returns:
+            List[Dict]: タスクのリスト (登録順)
+        """
+        return self._fetch(store_key(agent_id, project_name))
+
+    def query(self, agent_id: Optional[str] = None, project_name: Optional[str] = None,
+              status: Optional[str] = None, priority_min: Optional[int] = None,
+              after_id: Optional[int] = None, limit: Optional[int] = None) -> List[Dict]:
+        """
+        索引を使ってステータスや優先度でタスクを絞り込む。
+
+        after_id または limit を指定した場合は主キーの順 (IDの昇順) にたどり、
+        該当する範囲のタスクだけを読み込む。
+
+        Args:
+            agent_id: エージェントID（オプション）
+            project_name: プロジェクト名（オプション）
+            status: ステータス（オプション）
+            priority_min: 最小優先度（オプション）
+            after_id: このIDより大きいタスクだけを返す（オプション）
+            limit: 最大件数（オプション）
+
+        Returns:
+            List[Dict]: 条件に一致するタスクのリスト (登録順。after_id または limit の指定時はIDの昇順)
+        """
+        where = ""
+        params: Tuple = ()
+        if status:
+            where += " AND status = ?"
+            params += (status,)
+        if priority_min is not None:
+            where += " AND priority >= ?"
+            params += (priority_min,)
+        if after_id is not None:
+            where += " AND id > ?"
+            params += (after_id,)
+        if after_id is not None or limit is not None:
+            return self._fetch(store_key(agent_id, project_name), where, params, order="id", limit=limit)
+        if not where:
+            return self.load(agent_id, project_name)
+        return self._fetch(store_key(agent_id, project_name), where, params)
+
+    def _statuses(self, conn: sqlite3.Connection, key: Tuple[str, str]) -> List[Optional[str]]:
+        # 索引をたどってストア内のステータスを列挙する (ステータスの種類ごとに O(log n))
+        statuses = []
+        if conn.execute("SELECT 1 FROM tasks WHERE agent_id = ? AND project_name = ? AND status IS NULL LIMIT 1",
+                        key).fetchone():
+            statuses.append(None)
+        row = conn.execute("SELECT status FROM tasks WHERE agent_id = ? AND project_name = ? "
+                           "AND status IS NOT NULL ORDER BY status LIMIT 1", key).fetchone()
+        while row is not None:
+            statuses.append(row[0])
+            row = conn.execute("SELECT status FROM tasks WHERE agent_id = ? AND project_name = ? "
+                               "AND status > ? ORDER BY status LIMIT 1", key + (row[0],)).fetchone()
+        return statuses
+
+    def _ready_ids(self, conn: sqlite3.Connection, key: Tuple[str, str], now: str, limit: int) -> List[int]:
+        # 候補になるステータスごとに索引を優先度順にたどり、リース中でないタスクを集める
+        # (候補の判定は JSONモードの ReadyQueue と同じ is_ready_status() と is_leased() を使う)
+        candidates = []
+        for status in filter(is_ready_status, self._statuses(conn, key)):
+            candidates.extend(conn.execute(
+                "SELECT priority, id FROM tasks WHERE agent_id = ? AND project_name = ? AND status IS ? "
+                "AND NOT lease_active(lease_expires_at, ?) "
+                f"ORDER BY priority DESC, id ASC LIMIT {int(limit)}",
+                key + (status, now)
+            ).fetchall())
+        candidates.sort(key=lambda row: (-(row[0] or 0), row[1]))
+        return [row[1] for row in candidates[:limit]]
+
+    def _fetch_ids(self, key: Tuple[str, str], ids: List[int]) -> List[Dict]:
+        if not ids:
+            return []
+        tasks = self._fetch(key, f" AND id IN ({','.join('?' * len(ids))})", tuple(ids))
+        order = {task_id: i for i, task_id in enumerate(ids)}
+        return sorted(tasks, key=lambda t: order[t["id"]])
+
+    def next_task(self, agent_id: Optional[str] = None, project_name: Optional[str] = None,
+                  now: Optional[str] = None) -> Optional[Dict]:
+        """
+        リース中でない未完了のタスクのうち、優先度が最も高いもの (同じ優先度ではIDが最小のもの) を取得する。
+
+        ステータスごとに索引の先頭を参照するため、ストアの大きさに関係なく O(log n) で動作する。
+
+        Args:
+            agent_id: エージェントID（オプション）
+            project_name: プロジェクト名（オプション）
+            now: リースの有効性を判定する現在時刻 (ISO形式)（オプション）
+
+        Returns:
+            Optional[Dict]: 次のタスク。該当するタスクがない場合はNone
+        """
+        key = store_key(agent_id, project_name)
+        now = now or datetime.datetime.now().isoformat(timespec="seconds")
+        tasks = self._fetch_ids(key, self._ready_ids(self._connect(), key, now, 1))
+        return tasks[0] if tasks else None
+
+    def get_task(self, task_id: int, agent_id: Optional[str] = None,
+                 project_name: Optional[str] = None) -> Optional[Dict]:
+        """
+        IDを指定してタスクを取得する。
+
+        Returns:
+            Optional[Dict]: タスク。存在しない場合はNone
+        """
+        tasks = self._fetch(store_key(agent_id, project_name), " AND id = ?", (task_id,))
+        return tasks[0] if tasks else None
+
+    def claim(self, claimant: str, count: int, lease_expires_at: str, agent_id: Optional[str] = None,
+              project_name: Optional[str] = None, now: Optional[str] = None) -> List[Dict]:
+        """
+        リース中でない未完了のタスクを優先度順に確保する。
+
+        選択と更新を1つの書き込みトランザクションで行うため、
+        複数のプロセスが同時に呼び出しても同じタスクが重複して確保されることはない。
+
+        Args:
+            claimant: 確保する作業者の名前
+            count: 確保するタスクの最大数
+            lease_expires_at: リース期限 (ISO形式)
+            agent_id: エージェントID（オプション）
+            project_name: プロジェクト名（オプション）
+            now: リースの有効性を判定する現在時刻 (ISO形式)（オプション）
+
+        Returns:
+            List[Dict]: 確保したタスクのリスト (優先度順)
+        """
+        key = store_key(agent_id, project_name)
+        now = now or datetime.datetime.now().isoformat(timespec="seconds")
+        with self._transaction() as conn:
+            ids = self._ready_ids(conn, key, now, count)
+            for task_id in ids:
+                conn.execute(
+                    "UPDATE tasks SET status = 'in_progress', claimed_by = ?, lease_expires_at = ? "
+                    "WHERE agent_id = ? AND project_name = ? AND id = ?",
+                    (claimant, lease_expires_at) + key + (task_id,)
+                )
+            return self._fetch_ids(key, ids)
+
+    def max_task_id(self, agent_id: Optional[str] = None, project_name: Optional[str] = None) -> int:
+        """
+        ストア内の最大のタスクIDを取得する (タスクがない場合は0)。
+        """
+        row = self._connect().execute(
+            "SELECT MAX(id) FROM tasks WHERE agent_id = ? AND project_name = ?",
+            store_key(agent_id, project_name)
+        ).fetchone()
+        return row[0] or 0
+
+    def list_agents(self) -> List[str]:
+        """
+        タスクが登録されているエージェントの一覧を取得する。
+        """
+        rows = self._connect().execute(
+            "SELECT DISTINCT agent_id FROM tasks WHERE agent_id != '' ORDER BY agent_id"
+        )
+        return [row[0] for row in rows]
+
+    def list_projects(self, agent_id: str) -> List[str]:
+        """
+        エージェントのタスクが登録されているプロジェクトの一覧を取得する。
+        """
+        rows = self._connect().execute(
+            "SELECT DISTINCT project_name FROM tasks WHERE agent_id = ? AND project_name != '' "
+            "ORDER BY project_name",
+            (agent_id,)
+        )
+        return [row[0] for row in rows]
+
+    # ---- 書き込み ----
+
+    def save(self, tasks: Optional[List[Dict]], agent_id: Optional[str] = None, project_name: Optional[str] = None,
+             events: Optional[List[Dict]] = None) -> None:
+        """
+        タスクを保存する。
+
+        events が指定されている場合は変更イベントのみを適用し、
+        指定されていない場合はストアの内容を tasks で置き換える。
+
+        Args:
+            tasks: タスクのリスト (events を指定する場合は参照しない)
+            agent_id: エージェントID（オプション）
+            project_name: プロジェクト名（オプション）
+            events: 変更イベントのリスト（オプション）
+        """
+        key = store_key(agent_id, project_name)
+        with self._transaction() as conn:
+            if events is None:
+                for table in ("tasks", "subtasks", "notes"):
+                    conn.execute(f"DELETE FROM {table} WHERE agent_id = ? AND project_name = ?", key)
+                for task in tasks or []:
+                    self._insert_task(conn, key, task)
+            else:
+                for event in events:
+                    self._apply_event(conn, key, event)
+
+    def _insert_task(self, conn: sqlite3.Connection, key: Tuple[str, str], task: Dict) -> None:
+        values, extra = _split_fields(task, TASK_COLUMNS, skip=("id", "subtasks", "notes"))
+        conn.execute(
+            f"INSERT OR REPLACE INTO tasks (agent_id, project_name, id, {', '.join(TASK_COLUMNS)}, extra) "
+            f"VALUES (?, ?, ?, {', '.join('?' * len(TASK_COLUMNS))}, ?)",
+            key + (task.get("id"), *values, extra)
+        )
+        for subtask in task.get("subtasks", []):
+            self._insert_child(conn, "subtasks", SUBTASK_COLUMNS, key, task.get("id"), subtask)
+        for note in task.get("notes", []):
+            self._insert_child(conn, "notes", NOTE_COLUMNS, key, task.get("id"), note)
+
+    @staticmethod
+    def _insert_child(conn: sqlite3.Connection, table: str, columns: Tuple[str, ...], key: Tuple[str, str],
+                      task_id: Any, item: Dict) -> None:
+        values, extra = _split_fields(item, columns, skip=("id",))
+        conn.execute(
+            f"INSERT OR IGNORE INTO {table} (agent_id, project_name, task_id, id, {', '.join(columns)}, extra) "
+            f"VALUES (?, ?, ?, ?, {', '.join('?' * len(columns))}, ?)",
+            key + (task_id, item.get("id"), *values, extra)
+        )
+
+    @staticmethod
+    def _update_row(conn: sqlite3.Connection, table: str, columns: Tuple[str, ...], where: str,
+                    params: Tuple, fields: Dict) -> None:
+        assignments = []
+        values: List[Any] = []
+        for column, value in fields.items():
+            if column in columns:
+                assignments.append(f"{column} = ?")
+                values.append(value)
+        other = {k: v for k, v in fields.items() if k not in columns}
+        if other:
+            # 専用カラムのないフィールドは extra にマージする
+            row = conn.execute(f"SELECT extra FROM {table} WHERE {where}", params).fetchone()
+            if row is None:
+                return
+            extra = json.loads(row["extra"]) if row["extra"] else {}
+            extra.update(other)
+            assignments.append("extra = ?")
+            values.append(json.dumps(extra, ensure_ascii=False))
+        if assignments:
+            conn.execute(f"UPDATE {table} SET {', '.join(assignments)} WHERE {where}", tuple(values) + params)
+
+    def _apply_event(self, conn: sqlite3.Connection, key: Tuple[str, str], event: Dict) -> None:
+        op = event.get("op")
+        task_where = "agent_id = ? AND project_name = ? AND id = ?"
+
+        if op == "create":
+            task = event["task"]
+            exists = conn.execute(f"SELECT 1 FROM tasks WHERE {task_where}", key + (task.get("id"),)).fetchone()
+            if exists is None:
+                self._insert_task(conn, key, task)
+        elif op == "update":
+            self._update_row(conn, "tasks", TASK_COLUMNS, task_where, key + (event["id"],), event["set"])
+        elif op == "add_subtask":
+            self._insert_child(conn, "subtasks", SUBTASK_COLUMNS, key, event["id"], event["subtask"])
+        elif op == "update_subtask":
+            self._update_row(conn, "subtasks", SUBTASK_COLUMNS,
+                             "agent_id = ? AND project_name = ? AND task_id = ? AND id = ?",
+                             key + (event["id"], event["subtask_id"]), event["set"])
+        elif op == "add_note":
+            self._insert_child(conn, "notes", NOTE_COLUMNS, key, event["id"], event["note"])
+        elif op == "archive":
+            for table, where in (("subtasks", "task_id"), ("notes", "task_id"), ("tasks", "id")):
+                conn.execute(f"DELETE FROM {table} WHERE agent_id = ? AND project_name = ? AND {where} = ?",
+                             key + (event["id"],))
+        else:
+            raise ValueError(f"Unknown event: {op}")
+
+    # ---- 移行 ----
+
+    def import_tree(self, output_dir: str) -> Dict[str, int]:
+        """
+        output/**/tasks.json の階層をデータベースに取り込む。
+
+        ジャーナルモードで保存されたストアはジャーナルを適用した状態で取り込む。
+        コールドセグメントにアーカイブしたタスクもストアのタスクの前に取り込み
+        (SQLiteモードではアーカイブしない)、ノートのログのノートは各タスクの notes に加える。
+        既存のストアの内容は置き換えられる。
+
+        Args:
+            output_dir: 取り込む出力ディレクトリ
+
+        Returns:
+            Dict[str, int]: 取り込んだタスクファイルのパスとタスク数 (アーカイブしたタスクを含む)
+        """
+        imported = {}
+        journal = JournalStore()
+        archive = ColdArchive()
+        notes_log = NotesLog()
+
+        for root, dirs, files in os.walk(output_dir):
+            dirs.sort()
+            relative = os.path.relpath(root, output_dir)
+            parts = [] if relative == os.curdir else relative.split(os.sep)
+            if len(parts) > 2 or "tasks.json" not in files and "tasks.journal.jsonl" not in files:
+                continue
+
+            tasks_file = os.path.join(root, "tasks.json")
+            try:
+                tasks, _ = journal.load(tasks_file)
+            except json.JSONDecodeError:
+                logger.error(f"JSONファイルの解析エラー: {tasks_file}")
+                continue
+
+            # アーカイブしたタスクはIDが小さいため前に置く (同じIDのタスクはストアのものを使う)
+            active_ids = {task.get("id") for task in tasks}
+            tasks = [task for task in archive.load(tasks_file) if task.get("id") not in active_ids] + tasks
+
+            logged = notes_log.notes(tasks_file)
+            if logged:
+                for task in tasks:
+                    notes = logged.get(task.get("id"))
+                    if notes:
+                        task["notes"] = list(task.get("notes") or ()) + notes
+
+            agent_id = parts[0] if parts else None
+            project_name = parts[1] if len(parts) > 1 else None
+            self.save(tasks, agent_id, project_name)
+            imported[tasks_file] = len(tasks)
+
+        return imported
+
+
+# コマンドラインから既存のJSONファイルを移行する
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="python -m taskmateai.sqlite_store",
+        description="TaskMateAI SQLiteストレージの管理コマンド"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    migrate = subparsers.add_parser("migrate", help="output/**/tasks.json をSQLiteデータベースに取り込む")
+    migrate.add_argument("--output-dir", default="output", help="取り込む出力ディレクトリ (既定: output)")
+    migrate.add_argument("--db", default=None, help="データベースファイルのパス (既定: <output-dir>/taskmate.db)")
+    args = parser.parse_args(argv)
+
+    db_path = args.db or os.path.join(args.output_dir, "taskmate.db")
+    store = SQLiteStore(db_path)
+    imported = store.import_tree(args.output_dir)
+    for tasks_file, count in imported.items():
+        print(f"{tasks_file}: {count} 件")
+    print(f"{len(imported)} 個のタスクファイルを {db_path} に取り込みました。")
+    store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
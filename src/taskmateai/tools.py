@@ -0,0 +1,176 @@
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from mcp.types import Tool
+
+logger = logging.getLogger("taskmate-server")
+
+# プラグインがツールを登録するエントリポイントのグループ
+PLUGIN_GROUP = "taskmateai.tools"
+
+# ツールの処理 (引数の辞書を受け取り、MCPのコンテンツのリストを返す)
+ToolHandler = Callable[[Dict], Sequence[Any]]
+
+
+class ToolSpec:
+    """登録されたツールの定義 (MCPの Tool、処理、ストアを変更しないかどうか)。"""
+
+    __slots__ = ("tool", "handler", "read_only", "_validator")
+
+    def __init__(self, tool: Tool, handler: ToolHandler, read_only: bool = False):
+        self.tool = tool
+        self.handler = handler
+        self.read_only = read_only
+        self._validator: Any = None
+
+    @property
+    def name(self) -> str:
+        return self.tool.name
+
+    def validate(self, arguments: Any) -> None:
+        """
+        引数を入力スキーマで検証する。
+
+        スキーマの検査とバリデータの作成は最初の呼び出しで1回だけ行う。
+
+        Args:
+            arguments: ツールの引数
+
+        Raises:
+            ValueError: 引数がスキーマに合わない場合
+        """
+        if self._validator is None:
+            # jsonschema は mcp が読み込むため、ここでのインポートは起動時間に影響しない
+            from jsonschema.validators import validator_for
+            cls = validator_for(self.tool.inputSchema)
+            cls.check_schema(self.tool.inputSchema)
+            self._validator = cls(self.tool.inputSchema)
+        from jsonschema.exceptions import best_match
+        error = best_match(self._validator.iter_errors(arguments))
+        if error is not None:
+            raise ValueError(f"Input validation error: {error.message}")
+
+
+class ToolRegistry:
+    """
+    ツールを名前で登録し、一覧と呼び出し先を提供するクラス。
+
+    各ツールは名前・説明・入力スキーマと処理を一緒に1回だけ宣言する。
+    list_tools の結果は登録が変わるまで同じリストを返し、呼び出し先は辞書で引く。
+    プラグインは "taskmateai.tools" グループのエントリポイントで、レジストリを受け取る関数を提供する。
+    """
+
+    def __init__(self):
+        self._specs: Dict[str, ToolSpec] = {}
+        self._tools: Optional[List[Tool]] = None
+        self._guard = threading.Lock()
+
+    def add(self, name: str, description: str, input_schema: Dict[str, Any], handler: ToolHandler,
+            read_only: bool = False, replace: bool = False) -> ToolSpec:
+        """
+        ツールを登録する。
+
+        Args:
+            name: ツール名
+            description: ツールの説明
+            input_schema: 引数のJSONスキーマ
+            handler: 引数の辞書を受け取り、コンテンツのリストを返す関数
+            read_only: ストアを変更しないかどうか (Trueの場合、ストアのロックを取らずに並行して実行する)
+            replace: 同じ名前のツールを置き換えるかどうか
+
+        Returns:
+            ToolSpec: 登録したツールの定義
+
+        Raises:
+            ValueError: 同じ名前のツールが登録されていて replace が指定されていない場合
+        """
+        spec = ToolSpec(Tool(name=name, description=description, inputSchema=input_schema), handler, read_only)
+        with self._guard:
+            if name in self._specs and not replace:
+                raise ValueError(f"Tool already registered: {name}")
+            self._specs[name] = spec
+            self._tools = None
+        return spec
+
+    def tool(self, name: str, description: str, input_schema: Optional[Dict[str, Any]] = None,
+             read_only: bool = False, replace: bool = False) -> Callable[[ToolHandler], ToolHandler]:
+        """
+        関数をツールの処理として登録するデコレータ。
+
+        Args:
+            name: ツール名
+            description: ツールの説明
+            input_schema: 引数のJSONスキーマ（省略時は引数なし）
+            read_only: ストアを変更しないかどうか
+            replace: 同じ名前のツールを置き換えるかどうか
+
+        Returns:
+            Callable[[ToolHandler], ToolHandler]: 関数をそのまま返すデコレータ
+        """
+        def decorator(handler: ToolHandler) -> ToolHandler:
+            self.add(name, description, input_schema or {"type": "object", "properties": {}}, handler,
+                     read_only, replace)
+            return handler
+        return decorator
+
+    def get(self, name: str) -> Optional[ToolSpec]:
+        return self._specs.get(name)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._specs
+
+    def __len__(self) -> int:
+        return len(self._specs)
+
+    def names(self) -> List[str]:
+        return list(self._specs)
+
+    def tools(self) -> List[Tool]:
+        """登録順のツールのリストを返す。登録が変わるまで同じリストを返す。"""
+        tools = self._tools
+        if tools is None:
+            with self._guard:
+                tools = self._tools = [spec.tool for spec in self._specs.values()]
+        return tools
+
+    def validate(self, name: str, arguments: Any) -> None:
+        """
+        引数をツールの入力スキーマで検証する。未登録のツールは検証しない。
+
+        Args:
+            name: ツール名
+            arguments: ツールの引数
+
+        Raises:
+            ValueError: 引数がスキーマに合わない場合
+        """
+        spec = self._specs.get(name)
+        if spec is not None:
+            spec.validate(arguments)
+
+    def load_plugins(self, group: str = PLUGIN_GROUP) -> List[str]:
+        """
+        エントリポイントに登録されたプラグインを読み込み、ツールを登録させる。
+
+        各エントリポイントはレジストリを引数に取る関数を指す。読み込みに失敗した
+        プラグインはログに記録して読み飛ばす。
+
+        Args:
+            group: エントリポイントのグループ
+
+        Returns:
+            List[str]: 読み込んだプラグインの名前のリスト
+        """
+        from importlib.metadata import entry_points
+
+        loaded = []
+        for entry_point in entry_points(group=group):
+            try:
+                entry_point.load()(self)
+            except Exception as e:
+                logger.error(f"ツールのプラグイン {entry_point.name} を読み込めませんでした: {str(e)}")
+                continue
+            loaded.append(entry_point.name)
+            logger.info(f"ツールのプラグイン {entry_point.name} を読み込みました")
+        return loaded
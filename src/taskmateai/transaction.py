@@ -0,0 +1,414 @@
+import datetime
+from typing import Any, Callable, ContextManager, Dict, List, Optional, Tuple
+
+from .events import (
+    add_note_event,
+    add_subtask_event,
+    create_event,
+    archive_event,
+    index_tasks,
+    update_event,
+    update_subtask_event
+)
+from .models import Note, Subtask, Task
+
+
+# 新しいサブタスクIDを生成する関数
+def generate_subtask_id(subtasks):
+    if not subtasks:
+        return 1
+    return max(subtask.get("id", 0) for subtask in subtasks) + 1
+
+# 新しいタスクを組み立てる関数
+def build_task(task_id: int, item: Dict) -> Task:
+    """
+    create_task の引数から新しいタスクを組み立てる関数。
+
+    Args:
+        task_id: 新しいタスクのID
+        item: title, description, priority, subtasks を含む辞書
+
+    Returns:
+        Task: 新しいタスク
+    """
+    subtasks = []
+    if item.get("subtasks"):
+        subtasks = [Subtask(id=i+1, description=desc, status="todo") for i, desc in enumerate(item["subtasks"])]
+
+    return Task(
+        id=task_id,
+        title=item["title"],
+        description=item["description"],
+        priority=item.get("priority", 3),
+        status="todo",
+        progress=0,
+        subtasks=subtasks,
+        notes=[]
+    )
+
+# タスクの進捗を設定する関数
+def set_task_progress(task: Dict, progress: Any) -> Dict:
+    """
+    タスクの進捗を設定し、進捗に応じてステータスを更新する関数。
+
+    Args:
+        task: 更新するタスク
+        progress: 進捗率 (0-100)
+
+    Returns:
+        Dict: 変更したフィールド (update_event に渡す)
+    """
+    task["progress"] = progress
+
+    # 進捗に基づいてステータスを自動更新
+    if progress >= 100:
+        task["status"] = "done"
+    elif progress > 0:
+        task["status"] = "in_progress"
+
+    changes = {"progress": progress}
+    if "status" in task:
+        changes["status"] = task["status"]
+    return stamp_completion(task, changes)
+
+# タスクを完了にする関数
+def mark_task_done(task: Dict) -> Dict:
+    task["status"] = "done"
+    task["progress"] = 100
+    return stamp_completion(task, {"status": "done", "progress": 100})
+
+# タスクの完了日時を記録する関数
+def stamp_completion(task: Dict, changes: Dict) -> Dict:
+    """
+    タスクが完了になった時点の日時を completed_at に記録する関数。
+
+    完了済みのタスクの日時は変えず、未完了に戻したタスクの日時は消す。
+
+    Args:
+        task: ステータスを更新したタスク
+        changes: 変更したフィールド (completed_at の変更を追加する)
+
+    Returns:
+        Dict: changes
+    """
+    if task.get("status") == "done":
+        if not task.get("completed_at"):
+            task["completed_at"] = changes["completed_at"] = datetime.datetime.now().isoformat(timespec="seconds")
+    elif task.get("completed_at"):
+        task["completed_at"] = changes["completed_at"] = None
+    return changes
+
+# サブタスクの完了率からタスクの進捗を計算する関数
+def rollup_subtask_progress(task: Dict) -> Optional[Dict]:
+    """
+    サブタスクの完了率からタスクの進捗とステータスを更新する関数。
+
+    Args:
+        task: 更新するタスク
+
+    Returns:
+        Optional[Dict]: 変更したフィールド (update_event に渡す)。サブタスクがない場合はNone
+    """
+    subtasks = task.get("subtasks")
+    if not subtasks:
+        return None
+
+    completed = sum(1 for st in subtasks if st.get("status") == "done")
+    total = len(subtasks)
+    task["progress"] = int(completed / total * 100)
+
+    # すべてのサブタスクが完了したら、タスクも完了にする
+    if completed == total:
+        task["status"] = "done"
+    elif completed > 0:
+        task["status"] = "in_progress"
+
+    changes = {"progress": task["progress"]}
+    if "status" in task:
+        changes["status"] = task["status"]
+    return stamp_completion(task, changes)
+
+# タスクにノートを追加する関数
+def append_note(task: Dict, content: str) -> Dict:
+    """
+    タイムスタンプ付きのノートをタスクに追加する関数。
+
+    Args:
+        task: ノートを追加するタスク
+        content: ノートの内容
+
+    Returns:
+        Dict: 追加したノート
+    """
+    notes = task.setdefault("notes", [])
+    new_note = build_note(len(notes) + 1, content)
+    notes.append(new_note)
+    return new_note
+
+# 新しいノートを組み立てる関数
+def build_note(note_id: int, content: str) -> Note:
+    return Note(
+        id=note_id,
+        content=content,
+        timestamp=datetime.datetime.now().isoformat()
+    )
+
+
+class TaskTransaction:
+    """
+    タスクストアに対する1回の作業単位 (ユニットオブワーク)。
+
+    with 文の間ストアのロックを保持し、タスクは最初に参照されたときに一度だけ読み込む。
+    変更はメソッドを通して行い、変更イベントとして記録する。ブロックを正常に抜けると
+    記録したイベントを一度だけ保存し、変更がなければ何も書き込まない。
+    例外で抜けた場合は保存せず、読み込んだ状態を discard で破棄する。
+    save_notes を指定した場合、ノートはタスクに加えずに別のログへ保存する
+    (ノートだけを追加したトランザクションはタスクを書き込まない)。
+
+    例:
+        with TaskTransaction(load, save, lock) as tx:
+            task = tx.get(task_id)
+            tx.set_progress(task, 50)
+    """
+
+    def __init__(self, load: Callable[[], List[Dict]],
+                 save: Callable[[Optional[List[Dict]], List[Dict]], None],
+                 lock: Optional[ContextManager] = None,
+                 discard: Optional[Callable[[], None]] = None,
+                 index: Callable[[List[Dict]], Dict[Any, Dict]] = index_tasks,
+                 count_notes: Optional[Callable[[Any], int]] = None,
+                 save_notes: Optional[Callable[[List[Tuple[Any, Dict]]], None]] = None,
+                 lookup: Optional[Callable[[Any], Optional[Dict]]] = None):
+        """
+        Args:
+            load: ストアのタスクのリストを読み込む関数
+            save: (タスクのリスト, 変更イベントのリスト) を保存する関数
+            lock: トランザクションの間保持するロック（オプション）
+            discard: 保存せずに終了した場合に、変更済みの読み込み結果を破棄する関数（オプション）
+            index: タスクのリストからタスクIDの索引を返す関数（オプション。
+                ストアごとに保持する索引を返せば、検索のたびに全体を走査しない）
+            count_notes: タスクIDを受け取り、ログに保存済みのノートの数を返す関数（オプション）
+            save_notes: (タスクID, ノート) のリストをログに追記する関数（オプション）
+            lookup: IDを指定してタスクを1件だけ読み込む関数（オプション。指定した場合、
+                ストア全体を読み込むまでは find() と add_task() は全体を読み込まない）
+        """
+        self._load = load
+        self._save = save
+        self._lock = lock
+        self._discard = discard
+        self._index = index
+        self._count_notes = count_notes
+        self._save_notes = save_notes
+        self._lookup = lookup
+        self._tasks: Optional[List[Dict]] = None
+        self._by_id: Optional[Dict[Any, Dict]] = None
+        # lookup で読み込んだ (または追加した) タスク
+        self._found: Dict[Any, Optional[Dict]] = {}
+        self.events: List[Dict] = []
+        self.notes: List[Tuple[Any, Dict]] = []
+
+    def __enter__(self) -> "TaskTransaction":
+        if self._lock is not None:
+            self._lock.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        try:
+            if exc_type is None:
+                self.commit()
+            elif self.events and self._discard is not None:
+                self._discard()
+        finally:
+            if self._lock is not None:
+                self._lock.__exit__(exc_type, exc, tb)
+
+    @property
+    def tasks(self) -> List[Dict]:
+        """ストアのタスクのリスト (最初に参照したときに読み込む)。"""
+        if self._tasks is None:
+            self._tasks = self._load()
+        return self._tasks
+
+    def commit(self) -> bool:
+        """
+        記録した変更イベントを保存する。
+
+        Returns:
+            bool: 保存した場合はTrue (変更がない場合はFalse)
+
+        Raises:
+            RuntimeError: 保存に失敗した場合
+        """
+        if not self.events and not self.notes:
+            return False
+        if self.events:
+            events, self.events = self.events, []
+            self._save(self._tasks, events)
+        if self.notes:
+            notes, self.notes = self.notes, []
+            self._save_notes(notes)
+        return True
+
+    def find(self, task_id: Any) -> Optional[Dict]:
+        """
+        IDを指定してタスクを取得する。
+
+        Returns:
+            Optional[Dict]: タスク。存在しない場合はNone
+        """
+        if self._by_id is None:
+            if self._lookup is not None and self._tasks is None:
+                # 同じタスクには同じ辞書を返す
+                if task_id not in self._found:
+                    self._found[task_id] = self._lookup(task_id)
+                return self._found[task_id]
+            self._by_id = self._index(self.tasks)
+        return self._by_id.get(task_id)
+
+    def get(self, task_id: Any) -> Dict:
+        """
+        IDを指定してタスクを取得する。
+
+        Raises:
+            LookupError: タスクが存在しない場合
+        """
+        task = self.find(task_id)
+        if task is None:
+            raise LookupError(f"タスク (ID: {task_id}) が見つかりません。")
+        return task
+
+    def add_task(self, task: Dict) -> Dict:
+        """
+        タスクを追加する。
+
+        Args:
+            task: 追加するタスク (build_task() で組み立てたもの)
+
+        Returns:
+            Dict: 追加したタスク
+        """
+        if self._lookup is not None and self._tasks is None:
+            self._found[task["id"]] = task
+        else:
+            self.tasks.append(task)
+            if self._by_id is not None:
+                self._by_id[task["id"]] = task
+        self.events.append(create_event(task))
+        return task
+
+    def remove(self, tasks: List[Dict]) -> None:
+        """
+        タスクをストアから取り除く (アーカイブへの移動に使う)。
+
+        Args:
+            tasks: 取り除くタスクのリスト
+        """
+        ids = {task.get("id") for task in tasks}
+        if not ids:
+            return
+        # キャッシュと同じリストを使い続けるため、リストをその場で書き換える
+        self.tasks[:] = [task for task in self.tasks if task.get("id") not in ids]
+        for task_id in ids:
+            if self._by_id is not None:
+                self._by_id.pop(task_id, None)
+            self.events.append(archive_event(task_id))
+
+    def update(self, task: Dict, **changes: Any) -> Dict:
+        """
+        タスクのフィールドを更新する。
+
+        Args:
+            task: 更新するタスク
+            **changes: 更新するフィールドと値
+
+        Returns:
+            Dict: 更新したタスク
+        """
+        task.update(changes)
+        self.events.append(update_event(task.get("id"), **changes))
+        return task
+
+    def set_progress(self, task: Dict, progress: Any) -> Dict:
+        """
+        タスクの進捗を設定する (ステータスも進捗に応じて更新する)。
+
+        Returns:
+            Dict: 変更したフィールド
+        """
+        changes = set_task_progress(task, progress)
+        self.events.append(update_event(task.get("id"), **changes))
+        return changes
+
+    def complete(self, task: Dict) -> Dict:
+        """
+        タスクを完了にする。
+
+        Returns:
+            Dict: 変更したフィールド
+        """
+        changes = mark_task_done(task)
+        self.events.append(update_event(task.get("id"), **changes))
+        return changes
+
+    def add_subtask(self, task: Dict, description: str) -> Dict:
+        """
+        タスクにサブタスクを追加する。
+
+        Returns:
+            Dict: 追加したサブタスク
+        """
+        subtasks = task.setdefault("subtasks", [])
+        new_subtask = Subtask(
+            id=generate_subtask_id(subtasks),
+            description=description,
+            status="todo"
+        )
+        subtasks.append(new_subtask)
+        self.events.append(add_subtask_event(task.get("id"), new_subtask))
+        return new_subtask
+
+    def set_subtask_status(self, task: Dict, subtask_id: Any, status: str) -> Optional[Dict]:
+        """
+        サブタスクのステータスを更新し、サブタスクの完了率からタスクの進捗を更新する。
+
+        Args:
+            task: サブタスクを持つタスク
+            subtask_id: サブタスクID
+            status: 新しいステータス
+
+        Returns:
+            Optional[Dict]: 更新したサブタスク。存在しない場合はNone (何も変更しない)
+        """
+        subtask = next((st for st in task.get("subtasks", []) if st.get("id") == subtask_id), None)
+        if subtask is None:
+            return None
+
+        subtask["status"] = status
+        self.events.append(update_subtask_event(task.get("id"), subtask_id, status=status))
+
+        changes = rollup_subtask_progress(task)
+        if changes is not None:
+            self.events.append(update_event(task.get("id"), **changes))
+        return subtask
+
+    def add_note(self, task: Dict, content: str) -> Dict:
+        """
+        タスクにノートを追加する。
+
+        Returns:
+            Dict: 追加したノート
+        """
+        if self._save_notes is None:
+            new_note = append_note(task, content)
+            self.events.append(add_note_event(task.get("id"), new_note))
+            return new_note
+
+        # ノートのIDは、タスクに埋め込まれたノート、ログのノート、このトランザクションで追加したノートの続き番号
+        task_id = task.get("id")
+        note_id = len(task.get("notes") or ()) + 1
+        if self._count_notes is not None:
+            note_id += self._count_notes(task_id)
+        note_id += sum(1 for pending_id, _ in self.notes if pending_id == task_id)
+        new_note = build_note(note_id, content)
+        self.notes.append((task_id, new_note))
+        return new_note
@@ -0,0 +1,328 @@
+import os
+import time
+import logging
+import threading
+from contextlib import nullcontext
+from typing import Any, Callable, ContextManager, Dict, List, Optional, Tuple
+
+from . import serializer
+from .cache import FileSignature, file_signature
+from .events import apply_event, create_event, index_tasks
+
+logger = logging.getLogger("taskmate-server")
+
+# fsync のポリシー
+# "always": 書き込みのたびにファイルとディレクトリを fsync する
+# "batched": 書き込みのたびにファイルを fsync する (ライトビハインドではまとめた書き込みごとに1回)
+# "off": fsync しない (os.replace によりプロセスのクラッシュでファイルが壊れることはない)
+FSYNC_POLICIES = ("always", "batched", "off")
+
+# ライトビハインドで保存待ちのストアのシグネチャ ("pending", パス, 世代)
+PendingSignature = Tuple[str, str, int]
+
+
+# ファイルを原子的に置き換える関数
+def atomic_write(path: str, data: bytes, fsync: str = "batched") -> Optional[FileSignature]:
+    """
+    一時ファイルに書き込んでから os.replace() でファイルを置き換える関数。
+
+    書き込みの途中でプロセスが停止しても、元のファイルか新しいファイルの
+    どちらかが必ず残り、途中まで書かれたファイルが読まれることはない。
+
+    Args:
+        path: 書き込むファイルのパス
+        data: 書き込む内容
+        fsync: fsync のポリシー ("always", "batched", "off")
+
+    Returns:
+        Optional[FileSignature]: 書き込み後のファイルのシグネチャ
+    """
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            if fsync != "off":
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    if fsync == "always":
+        # 置き換え (ディレクトリエントリの更新) も永続化する
+        fsync_directory(os.path.dirname(path) or ".")
+    return file_signature(path)
+
+
+# 行単位のログに追記する関数
+def append_lines(path: str, data: bytes, fsync: str = "batched") -> None:
+    """
+    改行で終わる行 (JSON Lines) をログファイルに追記する関数。
+
+    書き込みの途中でプロセスが停止して最後の行が改行で終わっていない場合は、
+    先に改行を書いてから追記する。途中までの行は読み込み時に不正な行として読み飛ばされ、
+    追記した行がその行とつながって失われることはない。
+
+    Args:
+        path: 追記するファイルのパス
+        data: 追記する内容 (改行で終わる行)
+        fsync: fsync のポリシー ("always" の場合は追記のたびに fsync する)
+    """
+    with open(path, 'a+b') as f:
+        if f.seek(0, os.SEEK_END) > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                data = b"\n" + data
+        f.write(data)
+        if fsync == "always":
+            f.flush()
+            os.fsync(f.fileno())
+
+
+# ディレクトリを fsync する関数
+def fsync_directory(directory: str) -> None:
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        # ディレクトリの fsync に対応していないプラットフォームでは無視する
+        pass
+    finally:
+        os.close(fd)
+
+
+class _PendingWrite:
+    """保存待ちのストア。"""
+    __slots__ = ("tasks", "signature", "lock", "on_written", "base", "events")
+
+    def __init__(self, tasks: List[Dict], signature: PendingSignature,
+                 lock: Optional[ContextManager], on_written: Optional[Callable],
+                 base: Optional[FileSignature], events: Optional[List[Dict]]):
+        self.tasks = tasks
+        self.signature = signature
+        self.lock = lock
+        self.on_written = on_written
+        # 最後に確認したファイルのシグネチャと、それ以降に適用した変更イベント (不明な場合はNone)
+        self.base = base
+        self.events = events
+
+
+class WriteBehind:
+    """
+    タスクストアのライトビハインド (グループコミット)。
+
+    window が 0 の場合は write() のたびに同期的に書き込む。
+    window が正の場合は書き込みを記録するだけで直ちに戻り、バックグラウンドの
+    スレッドが window 秒の間に届いた同じストアへの書き込みをまとめて、
+    最新の状態だけを1回で書き込む。保存待ちの間は pending() が最新の状態を返す。
+    プロセスが停止した場合、最大で window 秒分の変更が失われる。
+
+    バックグラウンドの書き込みはストアのロックを保持したままシリアライズと置き換えを行い、
+    保存待ちの間にファイルが他のプロセスによって変更されていた場合は、ファイルの最新の状態に
+    保存待ちの変更イベントを適用し直して (マージして) 書き込む。
+    ストアのロックを指定した書き込みで変更イベントがない (マージできない) 場合は同期的に書き込む。
+    """
+
+    def __init__(self, window: float = 0.0, fsync: str = "batched", pretty: bool = False):
+        """
+        Args:
+            window: 書き込みをまとめる時間 (秒)。0 の場合は同期的に書き込む
+            fsync: fsync のポリシー ("always", "batched", "off")
+            pretty: インデントした読みやすい形式で書き込むかどうか
+
+        Raises:
+            ValueError: fsync のポリシーが不正な場合
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Invalid fsync policy: {fsync} (must be one of {', '.join(FSYNC_POLICIES)})")
+        self.window = window
+        self.fsync = fsync
+        self.pretty = pretty
+        self.writes = 0
+        self.merges = 0
+        self._dirty: Dict[str, _PendingWrite] = {}
+        self._generation = 0
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def write(self, path: str, tasks: List[Dict], lock: Optional[ContextManager] = None,
+              on_written: Optional[Callable[[Any, Optional[FileSignature]], None]] = None,
+              events: Optional[List[Dict]] = None) -> Any:
+        """
+        タスクを書き込む (または書き込みを予約する)。
+
+        Args:
+            path: 書き込むファイルのパス
+            tasks: 書き込むタスクのリスト
+            lock: バックグラウンドでシリアライズしてファイルを置き換える間に保持するストアのロック（オプション）
+            on_written: バックグラウンドで書き込んだ後に (この呼び出しの戻り値, 書き込み後のシグネチャ)
+                で呼ばれる関数（オプション）。他のプロセスの変更とマージした場合、
+                tasks はファイルの内容と一致しないため、シグネチャには None を渡す
+            events: 前回の書き込みから tasks に適用した変更イベントのリスト（オプション）
+
+        Returns:
+            Any: 同期的に書き込んだ場合はファイルのシグネチャ、予約した場合は保存待ちを表すシグネチャ
+        """
+        if self.window <= 0 or (lock is not None and events is None):
+            # 同期的な書き込みでは、呼び出し側がストアのロックを保持している
+            signature = atomic_write(path, serializer.dumps_bytes(tasks, pretty=self.pretty), self.fsync)
+            with self._cond:
+                # 保存待ちの変更は tasks に含まれている
+                self._dirty.pop(path, None)
+            self.writes += 1
+            return signature
+
+        with self._cond:
+            self._generation += 1
+            signature = ("pending", path, self._generation)
+            previous = self._dirty.get(path)
+            if previous is None:
+                base = file_signature(path)
+                pending_events = list(events) if events is not None else None
+            else:
+                base = previous.base
+                if previous.events is not None and events is not None:
+                    pending_events = previous.events + list(events)
+                else:
+                    pending_events = None
+            self._dirty[path] = _PendingWrite(tasks, signature, lock, on_written, base, pending_events)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="taskmate-write-behind", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+        return signature
+
+    def pending(self, path: str) -> Optional[List[Dict]]:
+        """
+        保存待ちのタスクのリストを返す。
+
+        Args:
+            path: ファイルのパス
+
+        Returns:
+            Optional[List[Dict]]: 保存待ちのタスクのリスト。保存待ちでない場合はNone
+        """
+        with self._cond:
+            pending = self._dirty.get(path)
+        return pending.tasks if pending is not None else None
+
+    def conflicts(self, path: str) -> bool:
+        """
+        保存待ちの間にファイルが他のプロセスによって変更されたかどうかを返す。
+
+        Args:
+            path: ファイルのパス
+
+        Returns:
+            bool: 保存待ちで、ファイルのシグネチャが最後に確認したものと異なる場合はTrue
+        """
+        with self._cond:
+            pending = self._dirty.get(path)
+        return pending is not None and file_signature(path) != pending.base
+
+    def flush(self, path: Optional[str] = None) -> bool:
+        """
+        保存待ちの書き込みを直ちに書き込む (終了時などに使う)。
+
+        Args:
+            path: 書き込むファイルのパス（オプション。省略時はすべての保存待ちを書き込む）
+
+        Returns:
+            bool: すべての書き込みに成功した場合はTrue
+        """
+        if path is not None:
+            return self._flush_one(path)
+        return self._flush_all()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._dirty:
+                    self._cond.wait()
+            # 同じストアへの書き込みが集まるのを待つ
+            time.sleep(self.window)
+            self._flush_all()
+
+    def _flush_all(self) -> bool:
+        with self._flush_lock:
+            with self._cond:
+                paths = list(self._dirty)
+            ok = True
+            for path in paths:
+                ok = self._flush_one(path) and ok
+            return ok
+
+    def _flush_one(self, path: str) -> bool:
+        with self._cond:
+            pending = self._dirty.get(path)
+        if pending is None:
+            return True
+
+        try:
+            # 他のプロセスの書き込みと交互にならないよう、確認から置き換えまでストアのロックを保持する
+            with pending.lock or nullcontext():
+                with self._cond:
+                    pending = self._dirty.get(path)
+                if pending is None:
+                    return True
+                tasks = pending.tasks
+                merged = pending.events is not None and file_signature(path) != pending.base
+                if merged:
+                    tasks = self._merge(path, pending.events)
+                data = serializer.dumps_bytes(tasks, pretty=self.pretty)
+                signature = atomic_write(path, data, self.fsync)
+                self.writes += 1
+                if merged:
+                    self.merges += 1
+
+                with self._cond:
+                    current = self._dirty.get(path)
+                    if current is pending:
+                        del self._dirty[path]
+                    elif current is not None:
+                        # 書き込み中に届いた変更 (ロックを使わない書き込み) は、書き込んだ内容を基準にする
+                        current.base = signature
+                        if current.events is not None and pending.events is not None:
+                            current.events = current.events[len(pending.events):]
+                if pending.on_written is not None:
+                    pending.on_written(pending.signature, None if merged else signature)
+        except Exception as e:
+            # 保存待ちのまま残し、次の周期で再試行する
+            logger.error(f"タスクの書き込みエラー (ライトビハインド): {path}: {str(e)}")
+            return False
+        return True
+
+    def _merge(self, path: str, events: List[Dict]) -> List[Dict]:
+        """
+        ファイルの最新の状態に、保存待ちの変更イベントを適用したタスクのリストを返す。
+
+        他のプロセスが同じIDのタスクを作成していた場合、保存待ちのタスクには新しいIDを割り当てる。
+        """
+        try:
+            with open(path, 'rb') as f:
+                tasks = serializer.loads(f.read())
+        except FileNotFoundError:
+            tasks = []
+        by_id = index_tasks(tasks)
+        renamed: Dict[Any, int] = {}
+        for event in events:
+            if event.get("op") == "create":
+                task = event["task"]
+                if task.get("id") in by_id:
+                    new_id = max((i for i in by_id if isinstance(i, int)), default=0) + 1
+                    logger.warning(f"タスクIDが他のプロセスと重複したため変更しました: {task.get('id')} -> {new_id} ({path})")
+                    renamed[task.get("id")] = new_id
+                    event = create_event(dict(task, id=new_id))
+            elif event.get("id") in renamed:
+                event = dict(event, id=renamed[event.get("id")])
+            apply_event(tasks, by_id, event)
+        logger.warning(f"保存待ちの間に他のプロセスが変更したストアにマージしました: {path}")
+        return tasks
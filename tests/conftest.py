@@ -2,11 +2,18 @@
 Test fixtures for TaskMateAI test suite.
 """
 import os
+import sys
+import glob
 import json
 import pytest
 import tempfile
 from pathlib import Path
 
+# Add src to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from taskmateai.locking import get_lock_path
+
 
 @pytest.fixture
 def temp_tasks_file():
@@ -17,9 +24,11 @@ def temp_tasks_file():
     
     yield temp_file_path
     
-    # Cleanup
-    if os.path.exists(temp_file_path):
-        os.unlink(temp_file_path)
+    # Cleanup (including the lock file, notes log, journal and archive segments written next to the tasks file)
+    root = os.path.splitext(temp_file_path)[0]
+    for path in [temp_file_path, get_lock_path(temp_file_path)] + glob.glob(glob.escape(root) + ".*"):
+        if os.path.exists(path):
+            os.unlink(path)
 
 
 @pytest.fixture
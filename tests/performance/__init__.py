@@ -0,0 +1,3 @@
+"""
+TaskMateAI Performance Tests.
+"""
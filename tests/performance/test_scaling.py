@@ -0,0 +1,89 @@
+"""
+Asymptotic guard tests for scaling-sensitive TaskMateAI operations.
+
+Each test times an operation on a small and a 20x larger synthetic store and
+checks that the latency grows far less than the store, so an accidental full
+scan or full rewrite on these paths fails the suite.
+"""
+import os
+import sys
+import time
+import asyncio
+import statistics
+import pytest
+from unittest.mock import patch
+
+# Add src and benchmarks to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../benchmarks')))
+
+from synthetic import make_store, write_store
+from taskmateai.server import call_tool, read_tasks, select_next_task, task_cache
+
+SMALL = 1000
+LARGE = 20000
+# Linear growth would be 20x; allow a generous margin for timer noise
+MAX_RATIO = 4.0
+
+
+def median_latency(store_file, mode, func, repeat=40):
+    with patch('taskmateai.server.STORAGE_MODE', mode), \
+         patch('taskmateai.server.get_tasks_file_path', return_value=store_file):
+        task_cache.invalidate()
+        read_tasks()
+        func(0)
+        samples = []
+        for i in range(1, repeat + 1):
+            start = time.perf_counter()
+            func(i)
+            samples.append(time.perf_counter() - start)
+        task_cache.invalidate()
+    return statistics.median(samples)
+
+
+def tool(name, make_args):
+    return lambda i: asyncio.run(call_tool(name, make_args(i)))
+
+
+@pytest.fixture(scope="module")
+def stores(tmp_path_factory):
+    """Write a small and a large store once for the module."""
+    paths = {}
+    for size in (SMALL, LARGE):
+        path = str(tmp_path_factory.mktemp(f"store{size}") / "tasks.json")
+        write_store(path, make_store(size))
+        paths[size] = path
+    return paths
+
+
+def assert_sublinear(stores, mode, make_func):
+    small = median_latency(stores[SMALL], mode, make_func(SMALL))
+    large = median_latency(stores[LARGE], mode, make_func(LARGE))
+    assert large < small * MAX_RATIO, f"{large * 1000:.3f} ms vs {small * 1000:.3f} ms"
+
+
+class TestScaling:
+    """Operations that must not scale with the store size."""
+
+    def test_select_next_task(self, stores):
+        """Test that picking the next task uses the ready queue, not a scan."""
+        assert_sublinear(stores, "json", lambda size: lambda i: select_next_task(read_tasks()))
+
+    def test_get_next_task_journal(self, stores):
+        """Test that get_next_task in journal mode pops the queue and appends one event."""
+        assert_sublinear(stores, "journal", lambda size: tool("get_next_task", lambda i: {}))
+
+    def test_update_progress_journal(self, stores):
+        """Test that an update finds the task through the id index and appends one event."""
+        assert_sublinear(stores, "journal", lambda size: tool(
+            "update_progress", lambda i: {"task_id": (i * 7919) % size + 1, "progress": 40}))
+
+    def test_add_note(self, stores):
+        """Test that adding a note appends to the notes log without rewriting tasks.json."""
+        assert_sublinear(stores, "json", lambda size: tool(
+            "add_note", lambda i: {"task_id": (i * 7919) % size + 1, "content": "note"}))
+
+    def test_heartbeat(self, stores):
+        """Test that a heartbeat on an unclaimed task is a lookup only."""
+        assert_sublinear(stores, "json", lambda size: tool(
+            "heartbeat", lambda i: {"task_id": (i * 7919) % size + 1, "claimant": "nobody"}))
@@ -0,0 +1,67 @@
+"""
+Cold startup regression tests for the TaskMateAI server.
+
+Each test imports or starts the server in a fresh interpreter, the way an MCP
+client spawns it, so the checks see the real import-time behaviour.
+"""
+import os
+import sys
+import json
+import subprocess
+
+# Add src and benchmarks to path for imports
+SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src'))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../benchmarks')))
+
+from bench_startup import startup_once
+
+# Modules only needed by optional features; importing the server must not load them
+LAZY_MODULES = ["sqlite3", "gzip", "cProfile", "pstats", "tracemalloc", "taskmateai.http_transport"]
+# Self time of TaskMateAI's own modules (including bytecode compilation when it is not cached)
+OWN_IMPORT_BUDGET_US = 150_000
+
+
+def run_python(cwd, *args):
+    env = dict(os.environ, PYTHONPATH=SRC)
+    return subprocess.run([sys.executable, *args], cwd=cwd, env=env, capture_output=True, text=True, check=True)
+
+
+def parse_importtime(stderr):
+    modules = {}
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and "|" in line[12:]:
+            self_us, _, name = (part.strip() for part in line[12:].split("|"))
+            if self_us.isdigit():
+                modules[name] = int(self_us)
+    return modules
+
+
+class TestStartup:
+    """Checks that keep the server's cold start cheap."""
+
+    def test_import_has_no_side_effects(self, tmp_path):
+        """Test that importing the server creates no files and configures no logging."""
+        result = run_python(tmp_path, "-c", (
+            "import json, logging, taskmateai.server; "
+            "print(json.dumps(len(logging.getLogger().handlers)))"
+        ))
+
+        assert json.loads(result.stdout) == 0
+        assert os.listdir(tmp_path) == []
+
+    def test_optional_modules_are_lazy(self, tmp_path):
+        """Test with -X importtime that optional features are not imported at startup."""
+        modules = parse_importtime(run_python(tmp_path, "-X", "importtime", "-c", "import taskmateai.server").stderr)
+
+        assert "taskmateai.server" in modules
+        assert [name for name in LAZY_MODULES if name in modules] == []
+        own = sum(us for name, us in modules.items() if name.startswith("taskmateai"))
+        assert own < OWN_IMPORT_BUDGET_US, f"{own / 1000:.1f} ms in taskmateai modules"
+
+    def test_first_response(self, tmp_path):
+        """Test that a freshly spawned stdio server answers its first requests."""
+        timings = startup_once(str(tmp_path))
+
+        assert 0 < timings["initialize"] <= timings["first tools/list"] <= timings["first get_tasks"]
+        # The server creates the output directory when it starts, not when it is imported
+        assert os.path.isdir(tmp_path / "output")
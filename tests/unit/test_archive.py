@@ -0,0 +1,128 @@
+"""
+Unit tests for archiving completed tasks into cold segments.
+"""
+import os
+import sys
+import json
+import datetime
+import pytest
+from unittest.mock import patch
+
+# Add src to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from taskmateai.archive import ColdArchive, get_segment_path, select_archivable
+from taskmateai.server import archive_store, call_tool, read_resource, read_tasks, task_cache
+
+NOW = datetime.datetime(2026, 3, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def archive_tasks_file(mock_output_dir, mock_tasks):
+    """Create a tasks file with old and recent completed tasks."""
+    mock_tasks[2]["completed_at"] = "2026-01-01T00:00:00"
+    mock_tasks.append({**mock_tasks[2], "id": 4, "title": "Recent", "completed_at": "2026-02-28T00:00:00"})
+    mock_tasks.append({**mock_tasks[0], "id": 5, "status": "done", "progress": 100,
+                       "completed_at": "2025-01-01T00:00:00"})
+    path = os.path.join(mock_output_dir, "tasks.json")
+    with open(path, 'w') as f:
+        json.dump(mock_tasks, f)
+    task_cache.invalidate()
+    yield path
+    task_cache.invalidate()
+
+
+class TestColdArchive:
+    """Tests for the archive helpers and segments."""
+
+    def test_select_archivable(self, mock_tasks):
+        """Test the cutoff and that the task with the largest ID is kept."""
+        mock_tasks[2]["completed_at"] = "2026-01-01T00:00:00"
+        mock_tasks[1]["completed_at"] = "2026-01-01T00:00:00"
+        cutoff = datetime.datetime(2026, 2, 1)
+
+        assert select_archivable(mock_tasks, cutoff) == []
+
+        mock_tasks.append({"id": 4, "status": "todo"})
+        assert [t["id"] for t in select_archivable(mock_tasks, cutoff)] == [3]
+        assert select_archivable(mock_tasks, datetime.datetime(2025, 1, 1)) == []
+
+    def test_append_and_load(self, mock_output_dir, mock_tasks):
+        """Test that segments are numbered and the later copy of a task wins."""
+        tasks_file = os.path.join(mock_output_dir, "tasks.json")
+        archive = ColdArchive("off")
+
+        assert archive.append(tasks_file, []) is None
+        first = archive.append(tasks_file, mock_tasks[1:])
+        second = archive.append(tasks_file, [{**mock_tasks[2], "title": "Changed"}])
+
+        assert first == get_segment_path(tasks_file, 1)
+        assert second == get_segment_path(tasks_file, 2)
+        assert archive.segments(tasks_file) == [first, second]
+        loaded = archive.load(tasks_file)
+        assert [t["id"] for t in loaded] == [2, 3]
+        assert loaded[1]["title"] == "Changed"
+        assert archive.load(tasks_file) is loaded
+
+    @pytest.mark.asyncio
+    async def test_completed_at_stamped(self, temp_tasks_file_with_data):
+        """Test that completing a task records when and reopening clears it."""
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file_with_data):
+            await call_tool("complete_task", {"task_id": 1})
+            done_at = read_tasks()[0]["completed_at"]
+            await call_tool("update_progress", {"task_id": 1, "progress": 40})
+            reopened = read_tasks()[0]
+
+        assert datetime.datetime.fromisoformat(done_at)
+        assert reopened["completed_at"] is None
+
+
+class TestArchiveStore:
+    """Tests for moving tasks out of the active store."""
+
+    @pytest.mark.parametrize("mode", ["json", "journal"])
+    def test_archive_store(self, archive_tasks_file, mode):
+        """Test that old completed tasks move to a segment and stay out after a reload."""
+        with patch('taskmateai.server.STORAGE_MODE', mode), \
+             patch('taskmateai.server.ARCHIVE_AFTER_DAYS', 7), \
+             patch('taskmateai.server.get_tasks_file_path', return_value=archive_tasks_file):
+            assert archive_store(now=NOW) == 1
+            assert archive_store(now=NOW) == 0
+            task_cache.invalidate()
+            tasks = read_tasks()
+
+        assert [t["id"] for t in tasks] == [1, 2, 4, 5]
+        assert os.path.exists(get_segment_path(archive_tasks_file, 1))
+
+    def test_legacy_done_task_stamped(self, archive_tasks_file):
+        """Test that a completed task without completed_at is stamped instead of archived."""
+        with open(archive_tasks_file) as f:
+            tasks = json.load(f)
+        del tasks[2]["completed_at"]
+        with open(archive_tasks_file, 'w') as f:
+            json.dump(tasks, f)
+
+        with patch('taskmateai.server.ARCHIVE_AFTER_DAYS', 7), \
+             patch('taskmateai.server.get_tasks_file_path', return_value=archive_tasks_file):
+            assert archive_store(now=NOW) == 0
+            assert archive_store(now=NOW + datetime.timedelta(days=8)) == 2
+
+        with open(archive_tasks_file) as f:
+            assert [t["id"] for t in json.load(f)] == [1, 2, 5]
+
+    @pytest.mark.asyncio
+    async def test_read_through(self, archive_tasks_file):
+        """Test that archived tasks are returned only when asked for and IDs are not reused."""
+        with patch('taskmateai.server.ARCHIVE_AFTER_DAYS', 7), \
+             patch('taskmateai.server.get_tasks_file_path', return_value=archive_tasks_file):
+            archive_store(now=NOW)
+            active = json.loads((await call_tool("get_tasks", {"status": "done"}))[0].text)
+            done = json.loads((await call_tool("get_tasks", {"status": "done", "include_archived": True}))[0].text)
+            resource = json.loads(await read_resource("taskmate://tasks/completed?include_archived=1&fields=id"))
+            await call_tool("create_task", {"title": "New", "description": "d"})
+            tasks = read_tasks()
+
+        assert [t["id"] for t in active] == [4, 5]
+        assert [t["id"] for t in done] == [3, 4, 5]
+        assert resource == [{"id": 3}, {"id": 4}, {"id": 5}]
+        assert tasks[-1]["id"] == 6
@@ -0,0 +1,120 @@
+"""
+Unit tests for the TaskMateAI bulk mutation tools.
+"""
+import os
+import sys
+import json
+import pytest
+from unittest.mock import patch
+
+# Add src to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from taskmateai import server
+from taskmateai.server import call_tool, read_tasks
+
+
+async def call_bulk(name, arguments):
+    result = await call_tool(name, arguments)
+    return json.loads(result[0].text)
+
+
+class TestBulkTools:
+    """Tests for create_tasks, update_progress_many, complete_tasks and add_notes."""
+
+    @pytest.mark.asyncio
+    async def test_create_tasks(self, temp_tasks_file_with_data):
+        """Test creating several tasks with one write and per-item results."""
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file_with_data), \
+             patch('taskmateai.server.write_tasks', wraps=server.write_tasks) as write:
+            results = await call_bulk("create_tasks", {"tasks": [
+                {"title": "A", "description": "a", "subtasks": ["s"]},
+                {"title": "B"},
+                {"title": "C", "description": "c", "priority": 5},
+            ]})
+
+        assert write.call_count == 1
+        assert [r["ok"] for r in results] == [True, False, True]
+        assert [r.get("task_id") for r in results] == [4, None, 5]
+        assert "title and description" in results[1]["error"]
+
+        with open(temp_tasks_file_with_data) as f:
+            saved = {t["id"]: t for t in json.load(f)}
+        assert saved[4]["subtasks"][0]["description"] == "s"
+        assert saved[5]["priority"] == 5
+
+    @pytest.mark.asyncio
+    async def test_update_progress_many(self, temp_tasks_file_with_data):
+        """Test updating progress on several tasks with a missing ID in the batch."""
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file_with_data):
+            results = await call_bulk("update_progress_many", {"updates": [
+                {"task_id": 1, "progress": 40},
+                {"task_id": 99, "progress": 10},
+                {"task_id": 2, "progress": 100},
+                {"task_id": 1, "progress": "half"},
+            ]})
+            tasks = {t["id"]: t for t in read_tasks()}
+
+        assert [r["ok"] for r in results] == [True, False, True, False]
+        assert "見つかりません" in results[1]["error"]
+        assert results[2]["status"] == "done"
+        assert tasks[1]["progress"] == 40
+        assert tasks[1]["status"] == "in_progress"
+        assert tasks[2]["status"] == "done"
+
+    @pytest.mark.asyncio
+    async def test_complete_tasks(self, temp_tasks_file_with_data):
+        """Test completing several tasks at once."""
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file_with_data):
+            results = await call_bulk("complete_tasks", {"task_ids": [1, 42, 2]})
+            next_task = await call_tool("get_next_task", {})
+
+        assert [r["ok"] for r in results] == [True, False, True]
+        assert "利用可能なタスクはありません" in next_task[0].text
+
+    @pytest.mark.asyncio
+    async def test_add_notes(self, temp_tasks_file_with_data):
+        """Test adding several notes, including two to the same task."""
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file_with_data):
+            results = await call_bulk("add_notes", {"notes": [
+                {"task_id": 1, "content": "first"},
+                {"task_id": 1, "content": "second"},
+                {"task_id": 3},
+            ]})
+            tasks = {t["id"]: t for t in json.loads((await call_tool("get_tasks", {}))[0].text)}
+
+        assert [r.get("note_id") for r in results] == [1, 2, None]
+        assert results[2]["ok"] is False
+        assert [n["content"] for n in tasks[1]["notes"]] == ["first", "second"]
+
+    @pytest.mark.asyncio
+    async def test_nothing_to_write(self, temp_tasks_file_with_data):
+        """Test that a batch where every item fails does not write."""
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file_with_data), \
+             patch('taskmateai.server.write_tasks', wraps=server.write_tasks) as write:
+            results = await call_bulk("complete_tasks", {"task_ids": [98, 99]})
+
+        assert write.call_count == 0
+        assert not any(r["ok"] for r in results)
+
+    @pytest.mark.asyncio
+    async def test_missing_items(self):
+        """Test that the item list is mandatory."""
+        result = await call_tool("create_tasks", {})
+        assert "Missing required parameter: tasks" in result[0].text
+
+    @pytest.mark.asyncio
+    async def test_create_tasks_sqlite(self, mock_output_dir, mock_tasks):
+        """Test that task IDs stay distinct when creating against the SQLite backend."""
+        store = server.SQLiteStore(os.path.join(mock_output_dir, "taskmate.db"))
+        store.save(mock_tasks)
+        with patch('taskmateai.server.STORAGE_MODE', "sqlite"), \
+             patch('taskmateai.server.sqlite_store', store):
+            results = await call_bulk("create_tasks", {"tasks": [
+                {"title": "A", "description": "a"},
+                {"title": "B", "description": "b"},
+            ]})
+
+        assert [r["task_id"] for r in results] == [4, 5]
+        assert [t["id"] for t in store.load()] == [1, 2, 3, 4, 5]
+        store.close()
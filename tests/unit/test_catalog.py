@@ -0,0 +1,95 @@
+"""
+Unit tests for the TaskMateAI agent/project catalog.
+"""
+import os
+import sys
+from unittest.mock import patch
+
+# Add src to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from taskmateai.catalog import StoreCatalog
+from taskmateai.server import list_agents, list_projects, store_catalog, write_tasks
+
+
+def bump_mtime(path, delta_ns=-10 ** 10):
+    """Move a directory's mtime into the past so the catalog trusts its listing."""
+    mtime_ns = os.stat(path).st_mtime_ns + delta_ns
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+class TestStoreCatalog:
+    """Tests for the StoreCatalog class."""
+
+    def test_listing_is_cached(self, mock_output_dir):
+        """Test that an unchanged directory is not scanned again."""
+        os.makedirs(os.path.join(mock_output_dir, "agent1", "p1"))
+        bump_mtime(mock_output_dir)
+        catalog = StoreCatalog()
+
+        assert catalog.agents(mock_output_dir) == ["agent1"]
+        assert catalog.agents(mock_output_dir) == ["agent1"]
+        assert catalog.scans == 1
+
+    def test_external_change_is_detected(self, mock_output_dir):
+        """Test that a directory created by another process shows up."""
+        catalog = StoreCatalog(settle_seconds=0)
+        assert catalog.agents(mock_output_dir) == []
+
+        os.makedirs(os.path.join(mock_output_dir, "agent2"))
+        bump_mtime(mock_output_dir, 10 ** 6)
+        assert catalog.agents(mock_output_dir) == ["agent2"]
+
+    def test_recent_directory_is_rescanned(self, mock_output_dir):
+        """Test that listings of just-modified directories are not trusted."""
+        catalog = StoreCatalog(settle_seconds=3600)
+        catalog.agents(mock_output_dir)
+        catalog.agents(mock_output_dir)
+        assert catalog.scans == 2
+
+    def test_add_updates_listing_without_rescan(self, mock_output_dir):
+        """Test that stores created by the server are added incrementally."""
+        bump_mtime(mock_output_dir)
+        catalog = StoreCatalog(settle_seconds=0)
+        catalog.agents(mock_output_dir)
+
+        os.makedirs(os.path.join(mock_output_dir, "agent1", "p1"))
+        catalog.add(mock_output_dir, "agent1", "p1")
+
+        assert catalog.agents(mock_output_dir) == ["agent1"]
+        assert catalog.is_known(mock_output_dir, "agent1", "p1")
+        assert catalog.scans == 1
+
+    def test_invalidate(self, mock_output_dir):
+        """Test that invalidation forgets listings and created stores."""
+        bump_mtime(mock_output_dir)
+        catalog = StoreCatalog()
+        catalog.agents(mock_output_dir)
+        catalog.add(mock_output_dir, "agent1")
+
+        catalog.invalidate(mock_output_dir)
+        assert not catalog.is_known(mock_output_dir, "agent1")
+        catalog.agents(mock_output_dir)
+        assert catalog.scans == 2
+
+    def test_missing_directories(self, mock_output_dir):
+        """Test listing directories that do not exist or are files."""
+        catalog = StoreCatalog()
+        assert catalog.projects(mock_output_dir, "nobody") == []
+        open(os.path.join(mock_output_dir, "file"), 'w').close()
+        assert catalog.projects(mock_output_dir, "file") == []
+
+
+class TestServerCatalog:
+    """Tests for the catalog used by list_agents and list_projects."""
+
+    def test_new_store_is_listed(self, mock_output_dir, mock_tasks):
+        """Test that stores written by the server appear in the listings."""
+        with patch('taskmateai.server.OUTPUT_DIR', mock_output_dir):
+            assert list_agents() == []
+            write_tasks(mock_tasks, "agent1", "project1")
+            write_tasks(mock_tasks, "agent0")
+
+            assert list_agents() == ["agent0", "agent1"]
+            assert list_projects("agent1") == ["project1"]
+            assert store_catalog.is_known(mock_output_dir, "agent1", "project1")
@@ -0,0 +1,87 @@
+"""
+Unit tests for running TaskMateAI tool calls off the event loop.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import threading
+import pytest
+from unittest.mock import patch
+
+# Add src to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from taskmateai.server import call_tool, read_resource
+
+
+class Tracker:
+    """Records how many tool calls run at the same time and on which threads."""
+
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+        self.threads = set()
+        self.lock = threading.Lock()
+
+    def __call__(self, name, arguments):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            self.threads.add(threading.current_thread().name)
+        time.sleep(0.05)
+        with self.lock:
+            self.active -= 1
+        return [name]
+
+
+class TestOffloadedIO:
+    """Tests for the I/O thread pool and the per-store async locks."""
+
+    @pytest.mark.asyncio
+    async def test_runs_on_io_threads(self, temp_tasks_file_with_data):
+        """Test that tools and resources run in the I/O pool and still return results."""
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file_with_data):
+            await call_tool("update_progress", {"task_id": 1, "progress": 30})
+            tasks = json.loads((await call_tool("get_tasks", {}))[0].text)
+            resource = json.loads(await read_resource("taskmate://tasks/all?fields=id,progress"))
+
+        assert tasks[0]["progress"] == 30
+        assert resource[0] == {"id": 1, "progress": 30}
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("calls, expected", [
+        # Mutations to different stores run concurrently
+        ([("complete_task", {"agent_id": "a"}), ("complete_task", {"agent_id": "b"})], 2),
+        # Mutations to the same store are serialized
+        ([("complete_task", {"agent_id": "a"}), ("add_note", {"agent_id": "a"})], 1),
+        # Reads do not wait for the store lock
+        ([("get_tasks", {"agent_id": "a"}), ("get_tasks", {"agent_id": "a"})], 2),
+    ])
+    async def test_store_concurrency(self, calls, expected):
+        """Test which tool calls are allowed to overlap."""
+        tracker = Tracker()
+        with patch('taskmateai.server.handle_tool', tracker):
+            results = await asyncio.gather(*(call_tool(name, args) for name, args in calls))
+
+        assert [r[0] for r in results] == [name for name, _ in calls]
+        assert tracker.max_active == expected
+        assert all(name.startswith("taskmate-io") for name in tracker.threads)
+
+    @pytest.mark.asyncio
+    async def test_event_loop_not_blocked(self):
+        """Test that the event loop keeps running while a tool call is in progress."""
+        ticks = []
+
+        async def ticker():
+            for _ in range(3):
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        with patch('taskmateai.server.handle_tool', Tracker()):
+            start = time.monotonic()
+            await asyncio.gather(call_tool("complete_task", {}), ticker())
+
+        assert len(ticks) == 3
+        assert ticks[-1] - start < 0.05
@@ -0,0 +1,86 @@
+"""
+Unit tests for the TaskMateAI HTTP transports.
+"""
+import os
+import sys
+import json
+import socket
+import asyncio
+import pytest
+import httpx
+import uvicorn
+from unittest.mock import MagicMock, patch
+
+# Add src to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+from mcp.client.streamable_http import streamable_http_client
+
+from taskmateai.http_transport import create_http_app
+from taskmateai.server import app, read_tasks
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def start_server(transport, on_shutdown):
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(create_http_app(app, transport, on_shutdown=on_shutdown),
+                                           host="127.0.0.1", port=port, log_level="warning"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    return server, task, f"http://127.0.0.1:{port}"
+
+
+async def create_tasks(client, url, agent_id, count):
+    async with client(url) as streams:
+        async with ClientSession(streams[0], streams[1]) as session:
+            await session.initialize()
+            for i in range(count):
+                await session.call_tool("create_task", {"title": f"{agent_id}-{i}", "description": "d",
+                                                        "agent_id": agent_id})
+            result = await session.call_tool("get_tasks", {"agent_id": agent_id, "fields": ["title"]})
+            return json.loads(result.content[0].text)
+
+
+class TestHTTPTransport:
+    """Tests for serving many clients from one process."""
+
+    def test_invalid_transport(self):
+        """Test that an unknown transport is rejected."""
+        with pytest.raises(ValueError):
+            create_http_app(app, "websocket")
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("transport, client, path", [
+        ("http", streamable_http_client, "/mcp/"),
+        ("sse", sse_client, "/sse"),
+    ])
+    async def test_concurrent_clients_and_graceful_shutdown(self, mock_output_dir, transport, client, path):
+        """Test that concurrent clients share the process and shutdown flushes pending writes."""
+        on_shutdown = MagicMock()
+        with patch('taskmateai.server.OUTPUT_DIR', mock_output_dir):
+            server, task, base = await start_server(transport, on_shutdown)
+            try:
+                async with httpx.AsyncClient() as http:
+                    assert (await http.get(base + "/health")).json() == {"status": "ok", "transport": transport}
+
+                results = await asyncio.gather(*(create_tasks(client, base + path, agent, 3)
+                                                 for agent in ("agent1", "agent2")))
+                on_shutdown.assert_not_called()
+            finally:
+                server.should_exit = True
+                await asyncio.wait_for(task, 10)
+
+            stored = read_tasks("agent1")
+
+        assert [t["title"] for t in results[0]] == ["agent1-0", "agent1-1", "agent1-2"]
+        assert [t["title"] for t in results[1]] == ["agent2-0", "agent2-1", "agent2-2"]
+        assert len(stored) == 3
+        on_shutdown.assert_called_once()
@@ -0,0 +1,231 @@
+"""
+Unit tests for the TaskMateAI append-only journal storage mode.
+"""
+import os
+import sys
+import json
+import threading
+import pytest
+from unittest.mock import patch
+
+# Add src to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from taskmateai.events import (
+    apply_event,
+    create_event,
+    index_tasks,
+    update_event,
+    add_note_event
+)
+from taskmateai.journal import JournalStore, get_journal_path, get_history_path
+from taskmateai.server import call_tool, read_tasks, task_cache
+
+
+@pytest.fixture
+def journal_tasks_file(mock_output_dir, mock_tasks):
+    """Create a snapshot file inside a temporary directory."""
+    tasks_file = os.path.join(mock_output_dir, "tasks.json")
+    with open(tasks_file, 'w') as f:
+        json.dump(mock_tasks, f)
+    return tasks_file
+
+
+class TestEvents:
+    """Tests for applying mutation events."""
+
+    def test_apply_events(self, mock_tasks):
+        """Test that events are applied to the matching tasks."""
+        by_id = index_tasks(mock_tasks)
+        apply_event(mock_tasks, by_id, update_event(1, status="done", progress=100))
+        apply_event(mock_tasks, by_id, create_event({"id": 4, "title": "New"}))
+
+        assert mock_tasks[0]["status"] == "done"
+        assert mock_tasks[3]["title"] == "New"
+        assert by_id[4] is mock_tasks[3]
+
+    def test_replay_is_idempotent(self, mock_tasks):
+        """Test that replaying the same events twice gives the same state."""
+        events = [
+            create_event({"id": 4, "title": "New", "notes": []}),
+            add_note_event(4, {"id": 1, "content": "note"}),
+        ]
+        by_id = index_tasks(mock_tasks)
+        for event in events + events:
+            apply_event(mock_tasks, by_id, event)
+
+        assert len(mock_tasks) == 4
+        assert len(mock_tasks[3]["notes"]) == 1
+
+    def test_unknown_event(self, mock_tasks):
+        """Test that an unknown event type is rejected."""
+        with pytest.raises(ValueError):
+            apply_event(mock_tasks, index_tasks(mock_tasks), {"op": "delete", "id": 1})
+
+
+class TestJournalStore:
+    """Tests for the JournalStore class."""
+
+    def test_append_and_load(self, journal_tasks_file):
+        """Test that appended events are replayed on load."""
+        store = JournalStore()
+        store.append(journal_tasks_file, [update_event(1, progress=40, status="in_progress")])
+
+        tasks, signature = store.load(journal_tasks_file)
+        assert tasks[0]["progress"] == 40
+        assert signature == store.signature(journal_tasks_file)
+
+    def test_append_does_not_rewrite_snapshot(self, journal_tasks_file):
+        """Test that appending leaves the snapshot untouched."""
+        store = JournalStore()
+        before = os.stat(journal_tasks_file).st_mtime_ns
+        store.append(journal_tasks_file, [update_event(1, progress=10)])
+
+        assert os.stat(journal_tasks_file).st_mtime_ns == before
+        with open(get_journal_path(journal_tasks_file)) as f:
+            assert len(f.readlines()) == 1
+
+    def test_truncated_line_is_ignored(self, journal_tasks_file):
+        """Test that a partially written trailing line does not break replay."""
+        store = JournalStore()
+        store.append(journal_tasks_file, [update_event(1, progress=10)])
+        with open(get_journal_path(journal_tasks_file), 'a') as f:
+            f.write('{"op":"update","id":1,"se')
+
+        tasks, _ = store.load(journal_tasks_file)
+        assert tasks[0]["progress"] == 10
+
+    def test_append_after_truncated_line(self, journal_tasks_file):
+        """Test that an event appended after a torn trailing line survives a reload."""
+        store = JournalStore()
+        with open(get_journal_path(journal_tasks_file), 'w') as f:
+            f.write('{"ts":"x","op":"upd')
+        store.append(journal_tasks_file, [update_event(1, status="done")])
+
+        tasks, _ = store.load(journal_tasks_file)
+        assert tasks[0]["status"] == "done"
+
+    def test_compaction(self, journal_tasks_file):
+        """Test that compaction folds the journal into the snapshot."""
+        store = JournalStore(compact_every=2)
+        tasks, _ = store.load(journal_tasks_file)
+        by_id = index_tasks(tasks)
+        events = [update_event(1, progress=10), update_event(2, progress=60)]
+        for event in events:
+            apply_event(tasks, by_id, event)
+        store.append(journal_tasks_file, events)
+
+        assert store.needs_compaction(journal_tasks_file)
+        store.schedule_compaction(journal_tasks_file, tasks)
+        store.flush()
+
+        with open(journal_tasks_file) as f:
+            assert json.load(f) == tasks
+        assert os.path.getsize(get_journal_path(journal_tasks_file)) == 0
+        assert not store.needs_compaction(journal_tasks_file)
+        assert len(store.history(journal_tasks_file, 1)) == 1
+
+    def test_compaction_keeps_events_from_other_processes(self, journal_tasks_file):
+        """Test that events appended while a compaction waits for the store lock survive it."""
+        store = JournalStore(compact_every=1)
+        other = JournalStore()
+        lock = threading.RLock()
+        tasks, _ = store.load(journal_tasks_file)
+        event = update_event(1, progress=10)
+        apply_event(tasks, index_tasks(tasks), event)
+        store.append(journal_tasks_file, [event])
+
+        with lock:
+            store.schedule_compaction(journal_tasks_file, tasks, lock=lock)
+            other.append(journal_tasks_file, [update_event(2, progress=70)])
+        store.flush()
+
+        loaded, _ = store.load(journal_tasks_file)
+        assert loaded[0]["progress"] == 10
+        assert loaded[1]["progress"] == 70
+        assert len(store.history(journal_tasks_file, 2)) == 1
+
+    def test_compaction_is_abandoned_after_snapshot(self, journal_tasks_file, mock_tasks):
+        """Test that a compaction does not overwrite a snapshot written after it was scheduled."""
+        store = JournalStore(compact_every=1)
+        lock = threading.RLock()
+        tasks, _ = store.load(journal_tasks_file)
+        store.append(journal_tasks_file, [update_event(1, progress=10)])
+
+        with lock:
+            store.schedule_compaction(journal_tasks_file, tasks, lock=lock)
+            store.write_snapshot(journal_tasks_file, mock_tasks[:1])
+        store.flush()
+
+        loaded, _ = store.load(journal_tasks_file)
+        assert loaded == mock_tasks[:1]
+        assert not os.path.exists(journal_tasks_file + ".compact.tmp")
+
+    def test_write_snapshot_clears_journal(self, journal_tasks_file, mock_tasks):
+        """Test that a full rewrite empties the journal and keeps history."""
+        store = JournalStore()
+        store.append(journal_tasks_file, [update_event(1, progress=10)])
+        store.write_snapshot(journal_tasks_file, mock_tasks)
+
+        assert not os.path.exists(get_journal_path(journal_tasks_file))
+        assert os.path.exists(get_history_path(journal_tasks_file))
+        tasks, _ = store.load(journal_tasks_file)
+        assert tasks == mock_tasks
+
+
+class TestJournalMode:
+    """Tests for the tools running in journal storage mode."""
+
+    @pytest.mark.asyncio
+    async def test_tools_append_to_journal(self, journal_tasks_file):
+        """Test that tool mutations are journaled and survive a cold reload."""
+        with patch('taskmateai.server.STORAGE_MODE', "journal"), \
+             patch('taskmateai.server.get_tasks_file_path', return_value=journal_tasks_file):
+            await call_tool("update_progress", {"task_id": 1, "progress": 75})
+            await call_tool("add_note", {"task_id": 1, "content": "Journal note"})
+            await call_tool("create_task", {"title": "Journal task", "description": "d"})
+
+            task_cache.invalidate()
+            tasks = json.loads((await call_tool("get_tasks", {}))[0].text)
+
+        assert tasks[0]["progress"] == 75
+        assert tasks[0]["notes"][0]["content"] == "Journal note"
+        assert tasks[3]["title"] == "Journal task"
+        # The note goes to the notes log, not the journal
+        with open(get_journal_path(journal_tasks_file)) as f:
+            assert len(f.readlines()) == 2
+
+    @pytest.mark.asyncio
+    async def test_get_task_history(self, journal_tasks_file):
+        """Test retrieving the mutation history of a task."""
+        with patch('taskmateai.server.STORAGE_MODE', "journal"), \
+             patch('taskmateai.server.get_tasks_file_path', return_value=journal_tasks_file):
+            await call_tool("update_progress", {"task_id": 1, "progress": 50})
+            await call_tool("complete_task", {"task_id": 1})
+            result = await call_tool("get_task_history", {"task_id": 1})
+
+        history = json.loads(result[0].text)
+        assert [event["set"].get("progress") for event in history] == [50, 100]
+        assert all("ts" in event for event in history)
+
+    @pytest.mark.asyncio
+    async def test_get_task_history_includes_notes(self, journal_tasks_file):
+        """Test that notes kept in the notes log appear in the history in time order."""
+        with patch('taskmateai.server.STORAGE_MODE', "journal"), \
+             patch('taskmateai.server.get_tasks_file_path', return_value=journal_tasks_file):
+            await call_tool("update_progress", {"task_id": 1, "progress": 50})
+            await call_tool("add_note", {"task_id": 1, "content": "halfway"})
+            await call_tool("add_note", {"task_id": 2, "content": "other task"})
+            await call_tool("complete_task", {"task_id": 1})
+            result = await call_tool("get_task_history", {"task_id": 1})
+
+        history = json.loads(result[0].text)
+        assert [event["op"] for event in history] == ["update", "add_note", "update"]
+        assert history[1]["note"]["content"] == "halfway"
+        assert history[1]["ts"] == history[1]["note"]["timestamp"]
+
+    @pytest.mark.asyncio
+    async def test_get_task_history_requires_journal_mode(self):
+        """Test that history is unavailable in JSON storage mode."""
+        result = await call_tool("get_task_history", {"task_id": 1})
+        assert "ジャーナルモード" in result[0].text
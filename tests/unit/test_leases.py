@@ -0,0 +1,146 @@
+"""
+Unit tests for TaskMateAI task claiming with leases.
+"""
+import os
+import sys
+import json
+import datetime
+import pytest
+from unittest.mock import patch
+
+# Add src to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from taskmateai.ready_queue import ReadyQueue, is_leased
+from taskmateai.sqlite_store import SQLiteStore
+from taskmateai.server import call_tool, claim_tasks, read_tasks, select_next_task
+
+
+NOW = datetime.datetime(2025, 1, 1, 12, 0, 0)
+
+
+def iso(moment):
+    return moment.isoformat(timespec="seconds")
+
+
+class TestLeaseQueue:
+    """Tests for lease handling in the ready queue."""
+
+    def test_leased_task_is_skipped_until_expiry(self, mock_tasks):
+        """Test that a leased task comes back once its lease expires."""
+        mock_tasks[1]["lease_expires_at"] = iso(NOW + datetime.timedelta(minutes=5))
+        queue = ReadyQueue(mock_tasks, NOW)
+
+        assert queue.peek(NOW)["id"] == 1
+        assert queue.peek(NOW + datetime.timedelta(minutes=5, seconds=1))["id"] == 2
+
+    def test_extended_lease_is_honoured(self, mock_tasks):
+        """Test that a heartbeat moves the lease expiry forward."""
+        queue = ReadyQueue(mock_tasks, NOW)
+        mock_tasks[1]["lease_expires_at"] = iso(NOW + datetime.timedelta(minutes=1))
+        assert queue.peek(NOW)["id"] == 1
+
+        mock_tasks[1]["lease_expires_at"] = iso(NOW + datetime.timedelta(minutes=10))
+        assert queue.peek(NOW + datetime.timedelta(minutes=2))["id"] == 1
+        assert queue.peek(NOW + datetime.timedelta(minutes=11))["id"] == 2
+
+    def test_is_leased(self):
+        """Test lease validity checks."""
+        assert not is_leased({}, NOW)
+        assert not is_leased({"lease_expires_at": "garbage"}, NOW)
+        assert is_leased({"lease_expires_at": iso(NOW + datetime.timedelta(seconds=1))}, NOW)
+        assert not is_leased({"lease_expires_at": iso(NOW)}, NOW)
+
+
+class TestClaimTasks:
+    """Tests for claim_tasks on cached and uncached stores."""
+
+    def test_claim_in_priority_order(self, temp_tasks_file_with_data):
+        """Test claiming several tasks at once."""
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file_with_data):
+            tasks = read_tasks()
+            expires = iso(NOW + datetime.timedelta(minutes=5))
+            claimed = claim_tasks(tasks, "worker-a", 5, expires, now=NOW)
+
+            assert [t["id"] for t in claimed] == [2, 1]
+            assert all(t["claimed_by"] == "worker-a" for t in claimed)
+            assert select_next_task(tasks, now=NOW) is None
+
+    def test_claim_uncached_list(self, mock_tasks):
+        """Test claiming from a list that is not cached."""
+        expires = iso(NOW + datetime.timedelta(minutes=5))
+        assert [t["id"] for t in claim_tasks(mock_tasks, "a", 1, expires, now=NOW)] == [2]
+        assert [t["id"] for t in claim_tasks(mock_tasks, "b", 1, expires, now=NOW)] == [1]
+
+
+class TestClaimTools:
+    """Tests for the claim_next_tasks and heartbeat tools."""
+
+    @pytest.mark.asyncio
+    async def test_two_workers_get_distinct_tasks(self, temp_tasks_file_with_data):
+        """Test that concurrent pollers never receive the same task."""
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file_with_data):
+            first = json.loads((await call_tool("claim_next_tasks", {"claimant": "a"}))[0].text)
+            second = json.loads((await call_tool("claim_next_tasks", {"claimant": "b"}))[0].text)
+            third = json.loads((await call_tool("claim_next_tasks", {"claimant": "c"}))[0].text)
+
+        assert [t["id"] for t in first] == [2]
+        assert [t["id"] for t in second] == [1]
+        assert third == []
+
+        with open(temp_tasks_file_with_data) as f:
+            saved = {t["id"]: t for t in json.load(f)}
+        assert saved[2]["claimed_by"] == "a"
+        assert saved[1]["claimed_by"] == "b"
+        assert saved[1]["status"] == "in_progress"
+
+    @pytest.mark.asyncio
+    async def test_get_next_task_skips_claimed(self, temp_tasks_file_with_data):
+        """Test that get_next_task does not hand out a leased task."""
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file_with_data):
+            await call_tool("claim_next_tasks", {"claimant": "a"})
+            result = await call_tool("get_next_task", {})
+
+        assert json.loads(result[0].text)["id"] == 1
+
+    @pytest.mark.asyncio
+    async def test_heartbeat(self, temp_tasks_file_with_data):
+        """Test extending a lease and rejecting other claimants."""
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file_with_data):
+            await call_tool("claim_next_tasks", {"claimant": "a", "lease_seconds": 10})
+            ok = await call_tool("heartbeat", {"task_id": 2, "claimant": "a", "lease_seconds": 3600})
+            denied = await call_tool("heartbeat", {"task_id": 2, "claimant": "b"})
+            missing = await call_tool("heartbeat", {"task_id": 99, "claimant": "a"})
+            tasks = read_tasks()
+
+        assert "延長されました" in ok[0].text
+        assert "確保されていません" in denied[0].text
+        assert "見つかりません" in missing[0].text
+        lease = datetime.datetime.fromisoformat(tasks[1]["lease_expires_at"])
+        assert lease > datetime.datetime.now() + datetime.timedelta(minutes=30)
+
+    @pytest.mark.asyncio
+    async def test_claim_requires_claimant(self):
+        """Test that claimant is mandatory."""
+        result = await call_tool("claim_next_tasks", {})
+        assert "Missing required parameter: claimant" in result[0].text
+
+
+class TestSQLiteClaim:
+    """Tests for claiming against the SQLite backend."""
+
+    def test_claim_and_expiry(self, mock_output_dir, mock_tasks):
+        """Test claiming in one transaction and lease expiry."""
+        store = SQLiteStore(os.path.join(mock_output_dir, "taskmate.db"))
+        store.save(mock_tasks)
+        expires = iso(NOW + datetime.timedelta(minutes=5))
+
+        claimed = store.claim("a", 5, expires, now=iso(NOW))
+        assert [t["id"] for t in claimed] == [2, 1]
+        assert claimed[0]["claimed_by"] == "a"
+        assert store.claim("b", 1, expires, now=iso(NOW)) == []
+        assert store.next_task(now=iso(NOW)) is None
+
+        later = iso(NOW + datetime.timedelta(minutes=6))
+        assert store.next_task(now=later)["id"] == 2
+        store.close()
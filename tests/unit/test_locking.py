@@ -0,0 +1,169 @@
+"""
+Unit tests for multi-process safe storage.
+"""
+import os
+import sys
+import json
+import fcntl
+import subprocess
+import textwrap
+import threading
+import pytest
+from unittest.mock import patch
+
+# Add src to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from taskmateai import server
+from taskmateai.locking import StoreConflictError, StoreLock, get_lock_path
+from taskmateai.server import call_tool, read_tasks, task_cache, write_tasks
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src'))
+
+
+def is_locked(path):
+    fd = os.open(path, os.O_RDWR)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        return False
+    except BlockingIOError:
+        return True
+    finally:
+        os.close(fd)
+
+
+class TestStoreLock:
+    """Tests for the StoreLock class."""
+
+    def test_flock_held_while_locked(self, mock_output_dir):
+        """Test that the lock file is locked only while the outermost lock is held."""
+        path = get_lock_path(os.path.join(mock_output_dir, "tasks.json"))
+        lock = StoreLock(lambda: path)
+
+        with lock:
+            with lock:
+                assert is_locked(path)
+            assert is_locked(path)
+        assert not is_locked(path)
+
+    def test_without_path(self):
+        """Test that the lock still works inside the process without a lock file."""
+        lock = StoreLock(lambda: None)
+        with lock:
+            with lock:
+                pass
+
+    def test_local_does_not_lock_file(self, mock_output_dir):
+        """Test that the in-process part can be held without locking the lock file."""
+        path = get_lock_path(os.path.join(mock_output_dir, "tasks.json"))
+        lock = StoreLock(lambda: path)
+
+        with lock.local():
+            assert not os.path.exists(path) or not is_locked(path)
+            with lock:
+                assert is_locked(path)
+        assert not is_locked(path)
+
+
+class TestSnapshotReads:
+    """Tests for reads of the cached store while transactions run."""
+
+    def test_reads_wait_for_transactions(self, temp_tasks_file_with_data):
+        """Test that a reader never sees a transaction's uncommitted in-place change."""
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file_with_data):
+            result = []
+            with server.store_lock():
+                tasks = read_tasks()
+                tasks[0]["status"] = "done"
+                reader = threading.Thread(target=lambda: result.append(server.scan_store(status="done")))
+                reader.start()
+                reader.join(0.2)
+                assert reader.is_alive()
+                tasks[0]["status"] = "todo"
+            reader.join()
+
+        assert [t["id"] for t in result[0]] == [3]
+
+    @pytest.mark.asyncio
+    async def test_get_tasks_does_not_lock_file(self, temp_tasks_file_with_data, mock_tasks):
+        """Test that get_tasks reads without taking the cross-process lock."""
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file_with_data), \
+             patch.object(StoreLock, 'acquire', side_effect=AssertionError("locked")):
+            result = await call_tool("get_tasks", {})
+
+        assert [t["id"] for t in json.loads(result[0].text)] == [t["id"] for t in mock_tasks]
+
+
+class TestConflicts:
+    """Tests for detecting writes by other processes."""
+
+    def test_write_detects_external_change(self, temp_tasks_file_with_data, mock_tasks):
+        """Test that a write based on a stale read raises instead of overwriting."""
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file_with_data):
+            tasks = read_tasks()
+            with open(temp_tasks_file_with_data, 'w') as f:
+                json.dump(mock_tasks + [{"id": 4, "title": "Other process"}], f)
+
+            tasks[0]["progress"] = 10
+            with pytest.raises(StoreConflictError):
+                write_tasks(tasks, events=[{"op": "update", "id": 1, "set": {"progress": 10}}])
+
+            assert task_cache.peek(server.get_store_key()) is None
+            assert read_tasks()[3]["title"] == "Other process"
+
+    @pytest.mark.asyncio
+    async def test_tool_retries_on_conflict(self, temp_tasks_file_with_data, mock_tasks):
+        """Test that a tool call retries against the other process's write."""
+        calls = []
+
+        def next_task_id(tasks, agent_id=None, project_name=None):
+            if not calls:
+                with open(temp_tasks_file_with_data, 'w') as f:
+                    json.dump(mock_tasks + [{"id": 4, "title": "Other process"}], f)
+            calls.append(len(tasks))
+            return max(t["id"] for t in tasks) + 1
+
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file_with_data), \
+             patch('taskmateai.server.next_task_id', side_effect=next_task_id):
+            result = await call_tool("create_task", {"title": "Mine", "description": "d"})
+            tasks = read_tasks()
+
+        assert calls == [3, 4]
+        assert "ID: 5" in result[0].text
+        assert [t["title"] for t in tasks[3:]] == ["Other process", "Mine"]
+
+
+class TestMultiProcess:
+    """Tests for several server processes sharing one output directory."""
+
+    @pytest.mark.parametrize("mode", ["json", "journal"])
+    def test_concurrent_processes_lose_no_updates(self, mock_output_dir, mode):
+        """Test that tasks created by concurrent processes are all kept with unique IDs."""
+        script = textwrap.dedent("""
+            import asyncio
+            from taskmateai.server import call_tool
+
+            async def run():
+                for i in range(10):
+                    await call_tool("create_task", {"title": f"t{i}", "description": "d"})
+                    await call_tool("add_note", {"task_id": 1, "content": "n"})
+
+            asyncio.run(run())
+        """)
+        env = {**os.environ, "PYTHONPATH": SRC_DIR, "TASKMATE_STORAGE": mode}
+        processes = [subprocess.Popen([sys.executable, "-c", script], cwd=mock_output_dir, env=env,
+                                      stderr=subprocess.DEVNULL)
+                     for _ in range(3)]
+        assert all(p.wait(timeout=60) == 0 for p in processes)
+
+        tasks_file = os.path.join(mock_output_dir, "output", "tasks.json")
+        with patch('taskmateai.server.STORAGE_MODE', mode), \
+             patch('taskmateai.server.get_tasks_file_path', return_value=tasks_file):
+            task_cache.invalidate()
+            tasks = read_tasks()
+            task_cache.invalidate()
+
+        assert sorted(t["id"] for t in tasks) == list(range(1, 31))
+        with open(os.path.join(mock_output_dir, "output", "tasks.notes.jsonl")) as f:
+            assert [json.loads(line)["note"]["id"] for line in f] == list(range(1, 31))
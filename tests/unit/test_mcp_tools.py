@@ -196,9 +196,11 @@ class TestMCPTools:
             assert len(result) == 1
             assert "ノートがタスク (ID: 1) に追加されました" in result[0].text
             
-            # Verify the note was added
+            # Verify the note was added to the notes log, not the tasks file
             tasks = json.load(open(temp_tasks_file_with_data))
-            task = next(t for t in tasks if t["id"] == 1)
+            assert next(t for t in tasks if t["id"] == 1)["notes"] == []
+            result = await call_tool("get_tasks", {})
+            task = next(t for t in json.loads(result[0].text) if t["id"] == 1)
             assert len(task["notes"]) == 1
             assert task["notes"][0]["content"] == "Test note"
     
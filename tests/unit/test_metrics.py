@@ -0,0 +1,168 @@
+"""
+Unit tests for the TaskMateAI metrics.
+"""
+import os
+import sys
+import json
+import pytest
+import httpx
+from unittest.mock import patch
+
+# Add src to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from taskmateai.http_transport import create_http_app
+from taskmateai.metrics import Histogram, Metrics
+from taskmateai.server import app, call_tool, metrics, prometheus_metrics, read_resource, task_cache
+
+
+class TestHistogram:
+    """Tests for the fixed-bucket latency histogram."""
+
+    def test_quantiles(self):
+        """Test that quantiles are estimated by bucket upper bounds."""
+        histogram = Histogram((0.001, 0.01, 0.1))
+        for seconds in [0.0005] * 98 + [0.05, 0.05]:
+            histogram.observe(seconds)
+
+        assert histogram.count == 100
+        assert histogram.quantile(0.5) == 0.001
+        assert histogram.quantile(0.99) == 0.05  # capped by the observed maximum
+        assert histogram.cumulative() == [(0.001, 98), (0.01, 98), (0.1, 100), (float("inf"), 100)]
+
+    def test_overflow_bucket(self):
+        """Test that values above the largest bucket land in +Inf."""
+        histogram = Histogram((0.001,))
+        histogram.observe(3.0)
+
+        assert histogram.counts == [0, 1]
+        assert histogram.quantile(0.5) == 3.0
+
+    def test_empty(self):
+        """Test that an empty histogram reports zero."""
+        assert Histogram().quantile(0.99) == 0.0
+
+
+class TestMetrics:
+    """Tests for the Metrics registry."""
+
+    def test_timer_counts_calls_and_errors(self):
+        """Test that the timer records calls and counts exceptions as errors."""
+        registry = Metrics()
+        with registry.timer("tool", "ok"):
+            pass
+        with pytest.raises(ValueError):
+            with registry.timer("tool", "bad"):
+                raise ValueError("boom")
+        registry.count_error("tool", "ok")
+        registry.increment("bytes_read", 10)
+        registry.increment("bytes_read", 5)
+
+        snapshot = registry.snapshot({"cache_hit_rate": 0.5})
+        assert snapshot["operations"]["tool"]["ok"]["calls"] == 1
+        assert snapshot["operations"]["tool"]["ok"]["errors"] == 1
+        assert snapshot["operations"]["tool"]["bad"]["errors"] == 1
+        assert snapshot["operations"]["tool"]["bad"]["buckets_ms"]["+Inf"] == 1
+        assert snapshot["counters"] == {"bytes_read": 15}
+        assert snapshot["gauges"] == {"cache_hit_rate": 0.5}
+
+    def test_timed_decorator(self):
+        """Test that the decorator keeps the function's name and result."""
+        registry = Metrics()
+
+        @registry.timed("store", "read")
+        def read():
+            return 42
+
+        assert read() == 42
+        assert read.__name__ == "read"
+        assert registry.snapshot()["operations"]["store"]["read"]["calls"] == 1
+
+    def test_prometheus_format(self):
+        """Test the Prometheus text exposition format."""
+        registry = Metrics()
+        registry.observe("tool", 'we"ird', 0.002)
+        registry.increment("bytes_written", 100)
+
+        text = registry.prometheus({"cache_entries": 3, "label": "ignored"})
+        assert '# TYPE taskmate_operation_duration_seconds histogram' in text
+        assert 'taskmate_operation_duration_seconds_bucket{kind="tool",name="we\\"ird",le="0.0025"} 1' in text
+        assert 'taskmate_operation_duration_seconds_count{kind="tool",name="we\\"ird"} 1' in text
+        assert 'taskmate_operation_errors_total{kind="tool",name="we\\"ird"} 0' in text
+        assert "taskmate_bytes_written_total 100" in text
+        assert "taskmate_cache_entries 3" in text
+        assert "ignored" not in text
+
+
+class TestServerMetrics:
+    """Tests for the instrumentation around tools, resources and store I/O."""
+
+    @pytest.mark.asyncio
+    async def test_get_metrics_tool(self, temp_tasks_file_with_data):
+        """Test that tool calls, store I/O and cache lookups show up in get_metrics."""
+        metrics.reset()
+        task_cache.invalidate()
+        size = os.path.getsize(temp_tasks_file_with_data)
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file_with_data):
+            await call_tool("get_tasks", {})
+            await call_tool("get_tasks", {})
+            await call_tool("update_progress", {"task_id": 999, "progress": 10})
+            await call_tool("update_progress", {"task_id": 1, "progress": 10})
+            snapshot = json.loads((await call_tool("get_metrics", {"reset": True}))[0].text)
+            after_reset = json.loads((await call_tool("get_metrics", {}))[0].text)
+
+        tools = snapshot["operations"]["tool"]
+        store = snapshot["operations"]["store"]
+        assert tools["get_tasks"]["calls"] == 2
+        assert tools["update_progress"]["calls"] == 2
+        assert tools["get_tasks"]["p99_ms"] >= tools["get_tasks"]["p50_ms"] > 0
+        assert store["read_tasks"]["calls"] == 4
+        assert store["write_tasks"]["calls"] == 1
+        assert snapshot["counters"]["bytes_read"] == size
+        assert snapshot["counters"]["bytes_written"] == os.path.getsize(temp_tasks_file_with_data)
+        assert snapshot["gauges"]["cache_hits"] >= 3
+        assert 0 < snapshot["gauges"]["cache_hit_rate"] <= 1
+        # Only the get_metrics call that did the reset has been recorded since
+        assert list(after_reset["operations"]["tool"]) == ["get_metrics"]
+
+    @pytest.mark.asyncio
+    async def test_unexpected_error_counted(self, temp_tasks_file_with_data):
+        """Test that errors reported as tool results are counted."""
+        metrics.reset()
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file_with_data):
+            await call_tool("update_progress", {"progress": 10})
+
+        tool = metrics.snapshot()["operations"]["tool"]["update_progress"]
+        assert tool["calls"] == 1
+        assert tool["errors"] == 1
+
+    @pytest.mark.asyncio
+    async def test_metrics_resource(self, temp_tasks_file_with_data):
+        """Test the taskmate://metrics resource and per-kind resource timings."""
+        metrics.reset()
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file_with_data):
+            await read_resource("taskmate://tasks/pending")
+            with pytest.raises(ValueError):
+                await read_resource("taskmate://tasks/archived")
+            snapshot = json.loads(await read_resource("taskmate://metrics"))
+
+        assert snapshot["operations"]["resource"]["pending"]["calls"] == 1
+        assert snapshot["operations"]["resource"]["unknown"]["errors"] == 1
+
+    @pytest.mark.asyncio
+    async def test_prometheus_endpoint(self):
+        """Test that the HTTP app serves /metrics only when enabled."""
+        metrics.reset()
+        metrics.increment("bytes_read", 7)
+        transport = httpx.ASGITransport(app=create_http_app(app, "sse", metrics_text=prometheus_metrics))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get("/metrics")
+        disabled = httpx.ASGITransport(app=create_http_app(app, "sse"))
+        async with httpx.AsyncClient(transport=disabled, base_url="http://test") as client:
+            missing = await client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "taskmate_bytes_read_total 7" in response.text
+        assert "taskmate_cache_hit_rate" in response.text
+        assert missing.status_code == 404
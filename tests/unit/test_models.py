@@ -0,0 +1,75 @@
+"""
+Unit tests for the TaskMateAI task models.
+"""
+import os
+import sys
+import json
+import pytest
+from unittest.mock import patch
+
+# Add src to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from taskmateai import serializer, server
+from taskmateai.models import Note, Subtask, Task
+from taskmateai.server import call_tool, get_store_key, read_tasks, task_cache
+
+
+class TestModels:
+    """Tests for the Task, Subtask and Note types."""
+
+    def test_plain_dicts(self):
+        """Test that new tasks are plain dicts in the JSON shape."""
+        task = Task(id=1, title="T", description="d", priority=3, status="todo", progress=0,
+                    subtasks=[Subtask(id=1, description="s", status="todo")],
+                    notes=[Note(id=1, content="c", timestamp="t")])
+
+        assert type(task) is dict
+        assert type(task["subtasks"][0]) is dict
+        assert json.loads(serializer.dumps(task)) == task
+
+    def test_round_trip(self, mock_tasks):
+        """Test that extra, missing and null fields are written back unchanged."""
+        mock_tasks[0]["claimed_by"] = "worker"
+        mock_tasks[1]["priority"] = None
+        del mock_tasks[2]["notes"]
+        mock_tasks[0]["subtasks"][0]["extra"] = {"a": 1}
+
+        tasks = serializer.loads(serializer.dumps_bytes(mock_tasks))
+
+        assert tasks == mock_tasks
+        assert json.loads(serializer._std_dumps(tasks, False)) == mock_tasks
+        assert serializer.dumps(tasks[1:2], pretty=True) == json.dumps(mock_tasks[1:2], indent=2, ensure_ascii=False)
+
+
+class TestServerModels:
+    """Tests for models and the id index in the server."""
+
+    def test_cached_store_is_plain_dicts(self, temp_tasks_file_with_data, mock_tasks):
+        """Test that loaded stores are cached as the decoded dicts without conversion."""
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file_with_data):
+            tasks = read_tasks()
+
+        assert all(type(t) is dict for t in tasks)
+        assert tasks == mock_tasks
+
+    @pytest.mark.asyncio
+    async def test_index_reused(self, temp_tasks_file_with_data):
+        """Test that the id index is built once per store and follows new tasks."""
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file_with_data), \
+             patch('taskmateai.server.index_tasks', wraps=server.index_tasks) as index:
+            await call_tool("update_progress", {"task_id": 1, "progress": 10})
+            await call_tool("create_task", {"title": "T", "description": "d"})
+            await call_tool("add_note", {"task_id": 4, "content": "n"})
+            await call_tool("complete_task", {"task_id": 2})
+            result = await call_tool("add_subtask", {"task_id": 4, "description": "s"})
+
+            entry = task_cache.peek(get_store_key())
+            tasks = read_tasks()
+
+        assert index.call_count == 1
+        assert "追加されました" in result[0].text
+        assert entry.by_id[4] is tasks[3]
+        assert tasks[3]["notes"] == []
+        with open(temp_tasks_file_with_data) as f:
+            assert json.load(f)[3]["subtasks"][0]["description"] == "s"
@@ -0,0 +1,120 @@
+"""
+Unit tests for the TaskMateAI notes log.
+"""
+import os
+import sys
+import json
+import pytest
+from unittest.mock import MagicMock, patch
+
+# Add src to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from taskmateai import server
+from taskmateai.models import Note
+from taskmateai.notes_log import NotesLog, get_notes_path
+from taskmateai.server import call_tool, read_resource
+from taskmateai.transaction import TaskTransaction
+
+
+class TestNotesLog:
+    """Tests for the NotesLog class."""
+
+    def test_append_and_index(self, mock_output_dir):
+        """Test that appended notes are indexed by task and survive a reload."""
+        tasks_file = os.path.join(mock_output_dir, "tasks.json")
+        log = NotesLog("off")
+
+        assert log.notes(tasks_file) == {}
+        log.append(tasks_file, [(1, Note(id=1, content="a", timestamp="t")),
+                                (2, Note(id=1, content="b", timestamp="t"))])
+        log.append(tasks_file, [(1, Note(id=2, content="c", timestamp="t"))])
+
+        assert log.count(tasks_file, 1) == 2
+        assert [n["content"] for n in NotesLog().notes(tasks_file)[1]] == ["a", "c"]
+        with open(get_notes_path(tasks_file)) as f:
+            assert len(f.readlines()) == 3
+
+    def test_external_change_reloads(self, mock_output_dir):
+        """Test that a log changed by another process is read again."""
+        tasks_file = os.path.join(mock_output_dir, "tasks.json")
+        log = NotesLog("off")
+        log.append(tasks_file, [(1, Note(id=1, content="a", timestamp="t"))])
+
+        NotesLog("off").append(tasks_file, [(1, Note(id=2, content="b", timestamp="t"))])
+        with open(get_notes_path(tasks_file), 'a') as f:
+            f.write('{"task_id": 1, "note": {"id": 3, "con')
+
+        assert log.count(tasks_file, 1) == 2
+
+    def test_append_after_truncated_line(self, mock_output_dir):
+        """Test that a note appended after a torn trailing line survives a reload."""
+        tasks_file = os.path.join(mock_output_dir, "tasks.json")
+        with open(get_notes_path(tasks_file), 'w') as f:
+            f.write('{"task_id": 1, "note": {"id": 1, "cont')
+        NotesLog("off").append(tasks_file, [(1, Note(id=2, content="kept", timestamp="t"))])
+
+        notes = NotesLog("off").notes(tasks_file)
+        assert [n["content"] for n in notes[1]] == ["kept"]
+
+    def test_indexes_are_bounded(self, mock_output_dir):
+        """Test that the least recently used indexes are dropped over the byte budget."""
+        files = [os.path.join(mock_output_dir, name, "tasks.json") for name in ("a", "b", "c")]
+        for tasks_file in files:
+            NotesLog("off").append(tasks_file, [(1, Note(id=1, content="x" * 100, timestamp="t"))])
+        size = os.path.getsize(get_notes_path(files[0]))
+        log = NotesLog("off", max_bytes=size * 2)
+
+        log.notes(files[0])
+        log.notes(files[1])
+        log.notes(files[0])
+        log.notes(files[2])
+
+        assert len(log) == 2
+        assert log.total_bytes == size * 2
+        # The evicted index is read again on demand
+        assert log.count(files[1], 1) == 1
+        assert len(log) == 2
+
+    def test_transaction_saves_notes_separately(self, mock_tasks):
+        """Test that a notes-only transaction does not save the tasks."""
+        save, save_notes = MagicMock(), MagicMock()
+        tx = TaskTransaction(MagicMock(return_value=mock_tasks), save,
+                             count_notes=lambda task_id: 3, save_notes=save_notes)
+        with tx:
+            tx.add_note(tx.get(1), "a")
+            tx.add_note(tx.get(1), "b")
+            tx.add_note(tx.get(2), "c")
+
+        save.assert_not_called()
+        entries = save_notes.call_args[0][0]
+        assert [(task_id, note["id"]) for task_id, note in entries] == [(1, 4), (1, 5), (2, 5)]
+        assert mock_tasks[0]["notes"] == []
+
+
+class TestServerNotes:
+    """Tests for notes in the server tools and resources."""
+
+    @pytest.mark.asyncio
+    async def test_add_note_does_not_touch_tasks_file(self, temp_tasks_file_with_data):
+        """Test that add_note leaves tasks.json alone and continues the note IDs."""
+        before = os.stat(temp_tasks_file_with_data).st_mtime_ns
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file_with_data):
+            await call_tool("add_note", {"task_id": 2, "content": "second"})
+            tasks = json.loads((await call_tool("get_tasks", {}))[0].text)
+            resource = json.loads(await read_resource("taskmate://tasks/all?fields=id,notes"))
+
+        assert os.stat(temp_tasks_file_with_data).st_mtime_ns == before
+        assert [(n["id"], n["content"]) for n in tasks[1]["notes"]] == [(1, "Sample note"), (2, "second")]
+        assert resource[1]["notes"] == tasks[1]["notes"]
+
+    @pytest.mark.asyncio
+    async def test_notes_loaded_only_when_requested(self, temp_tasks_file_with_data):
+        """Test that summaries and projections without notes skip the notes log."""
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file_with_data), \
+             patch('taskmateai.server.notes_log.notes', wraps=server.notes_log.notes) as notes:
+            await call_tool("get_tasks", {"summary": True})
+            await call_tool("get_tasks", {"fields": ["id", "title"]})
+            await read_resource("taskmate://tasks/all?summary=1")
+
+        notes.assert_not_called()
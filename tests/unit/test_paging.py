@@ -0,0 +1,134 @@
+"""
+Unit tests for TaskMateAI pagination and field projection.
+"""
+import os
+import sys
+import json
+import pytest
+from unittest.mock import patch
+
+# Add src to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from taskmateai.paging import decode_cursor, encode_cursor, paginate, parse_query_options, project_tasks
+from taskmateai.sqlite_store import SQLiteStore
+from taskmateai.server import call_tool, read_resource
+
+
+def make_tasks(count):
+    return [{"id": i, "title": f"Task {i}", "status": "todo", "priority": i % 5 + 1,
+             "subtasks": [{"id": 1, "description": "s", "status": "todo"}], "notes": []}
+            for i in range(1, count + 1)]
+
+
+class TestPaginate:
+    """Tests for the paging helpers."""
+
+    def test_walk_all_pages(self):
+        """Test that following next_cursor visits every task exactly once."""
+        tasks = make_tasks(10)
+        tasks.reverse()
+        seen = []
+        cursor = None
+        while True:
+            page, cursor = paginate(tasks, 3, cursor)
+            seen.extend(t["id"] for t in page)
+            if cursor is None:
+                break
+
+        assert seen == list(range(1, 11))
+
+    def test_cursor_is_stable_under_inserts(self):
+        """Test that tasks created between pages do not shift the next page."""
+        tasks = make_tasks(4)
+        page, cursor = paginate(tasks, 2)
+        tasks.append({"id": 5})
+        page, cursor = paginate(tasks, 2, cursor)
+
+        assert [t["id"] for t in page] == [3, 4]
+        assert cursor is not None
+
+    def test_invalid_arguments(self):
+        """Test rejecting bad limits and cursors."""
+        with pytest.raises(ValueError):
+            paginate([], 0)
+        with pytest.raises(ValueError):
+            decode_cursor("not-a-cursor")
+        with pytest.raises(ValueError):
+            decode_cursor(encode_cursor("text"))
+        assert decode_cursor(encode_cursor(42)) == 42
+
+    def test_project_tasks(self):
+        """Test field projection and summary mode."""
+        tasks = make_tasks(1)
+        assert project_tasks(tasks, ["id", "status", "missing"]) == [{"id": 1, "status": "todo"}]
+        assert "subtasks" not in project_tasks(tasks, summary=True)[0]
+        assert project_tasks(tasks, ["id", "notes"], summary=True) == [{"id": 1}]
+        assert "subtasks" in tasks[0]
+
+    def test_parse_query_options(self):
+        """Test parsing resource query strings."""
+        assert parse_query_options("limit=5&fields=id,title&summary=true&cursor=abc") == {
+            "limit": 5, "fields": ["id", "title"], "summary": True, "cursor": "abc"
+        }
+        assert parse_query_options("") == {}
+        with pytest.raises(ValueError):
+            parse_query_options("limit=many")
+
+
+class TestGetTasksPaging:
+    """Tests for paging through get_tasks and resources."""
+
+    @pytest.mark.asyncio
+    async def test_get_tasks_pages(self, temp_tasks_file):
+        """Test paging get_tasks with a projection."""
+        with open(temp_tasks_file, 'w') as f:
+            json.dump(make_tasks(5), f)
+
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file):
+            first = json.loads((await call_tool("get_tasks", {"limit": 2, "fields": ["id", "title"]}))[0].text)
+            rest = json.loads((await call_tool("get_tasks", {"cursor": first["next_cursor"]}))[0].text)
+            plain = json.loads((await call_tool("get_tasks", {"summary": True}))[0].text)
+
+        assert first["tasks"] == [{"id": 1, "title": "Task 1"}, {"id": 2, "title": "Task 2"}]
+        assert [t["id"] for t in rest["tasks"]] == [3, 4, 5]
+        assert rest["next_cursor"] is None
+        assert isinstance(plain, list)
+        assert "notes" not in plain[0]
+
+    @pytest.mark.asyncio
+    async def test_get_tasks_invalid_limit(self, temp_tasks_file):
+        """Test that a bad limit is reported."""
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file):
+            result = await call_tool("get_tasks", {"limit": 0})
+        assert "Invalid limit" in result[0].text
+
+    @pytest.mark.asyncio
+    async def test_resource_query(self, temp_tasks_file):
+        """Test paging and projection through resource URI query parameters."""
+        with open(temp_tasks_file, 'w') as f:
+            json.dump(make_tasks(5), f)
+
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file):
+            page = json.loads(await read_resource("taskmate://tasks/pending?limit=4&fields=id"))
+            all_tasks = json.loads(await read_resource("taskmate://tasks/all"))
+
+        assert page["tasks"] == [{"id": 1}, {"id": 2}, {"id": 3}, {"id": 4}]
+        assert page["next_cursor"] is not None
+        assert len(all_tasks) == 5
+
+    @pytest.mark.asyncio
+    async def test_sqlite_pages(self, mock_output_dir):
+        """Test paging pushed down to the SQLite backend."""
+        store = SQLiteStore(os.path.join(mock_output_dir, "taskmate.db"))
+        store.save(make_tasks(5))
+        with patch('taskmateai.server.STORAGE_MODE', "sqlite"), \
+             patch('taskmateai.server.sqlite_store', store):
+            first = json.loads((await call_tool("get_tasks", {"limit": 3}))[0].text)
+            rest = json.loads((await call_tool("get_tasks", {"limit": 3, "cursor": first["next_cursor"]}))[0].text)
+
+        assert [t["id"] for t in first["tasks"]] == [1, 2, 3]
+        assert first["tasks"][0]["subtasks"][0]["description"] == "s"
+        assert [t["id"] for t in rest["tasks"]] == [4, 5]
+        assert rest["next_cursor"] is None
+        store.close()
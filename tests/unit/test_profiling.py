@@ -0,0 +1,138 @@
+"""
+Unit tests for the TaskMateAI profiling hooks.
+"""
+import os
+import sys
+import json
+import tracemalloc
+import pytest
+from unittest.mock import patch
+
+# Add src to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from taskmateai import server
+from taskmateai.profiling import Profiler, parse_targets
+from taskmateai.server import call_tool, list_agents, profiler, read_resource, run_tool
+
+
+@pytest.fixture
+def restore_profiler():
+    """Disable profiling and memory tracing again after the test."""
+    yield
+    profiler.configure(None, memory=False)
+
+
+def busy(n):
+    return sum(i * i for i in range(n))
+
+
+class TestProfiler:
+    """Tests for the Profiler class."""
+
+    def test_parse_targets(self):
+        """Test parsing of the TASKMATE_PROFILE setting."""
+        assert parse_targets("") is None
+        assert parse_targets(None) is None
+        assert parse_targets("*") == frozenset()
+        assert parse_targets("get_tasks, add_note") == frozenset(["get_tasks", "add_note"])
+
+    def test_disabled_does_not_wrap(self, tmp_path):
+        """Test that a disabled profiler or a non-target returns the function itself."""
+        disabled = Profiler(lambda: str(tmp_path))
+        targeted = Profiler(lambda: str(tmp_path), frozenset(["get_tasks"]))
+
+        assert not disabled.enabled
+        assert disabled.wrap("tool", "get_tasks", busy) is busy
+        assert targeted.wrap("tool", "add_note", busy) is busy
+        assert targeted.wrap("tool", "get_tasks", busy) is not busy
+
+    def test_invalid_sample_rate(self, tmp_path):
+        """Test that the sample rate must be in (0, 1]."""
+        with pytest.raises(ValueError):
+            Profiler(lambda: str(tmp_path), frozenset(), sample_rate=0)
+
+    def test_dumps_and_summary(self, tmp_path):
+        """Test that profiled calls are dumped, pruned and summarized."""
+        prof = Profiler(lambda: str(tmp_path), frozenset(), keep=2)
+        for _ in range(3):
+            assert prof.wrap("tool", "get_tasks", busy)(1000) == busy(1000)
+        prof.wrap("resource", "pending", busy)(10)
+
+        summary = prof.summary(limit=5, sort="cumtime")
+        assert summary["dumps"] == 3
+        assert summary["operations"] == {"tool-get_tasks": 2, "resource-pending": 1}
+        assert len(summary["hotspots"]) <= 5
+        assert any("busy" in row["function"] for row in summary["hotspots"])
+        assert prof.summary("pending")["dumps"] == 1
+        with pytest.raises(ValueError):
+            prof.summary(sort="calls")
+
+    def test_memory_snapshot(self, tmp_path):
+        """Test that memory snapshots are dumped, pruned and report growth from the previous one."""
+        prof = Profiler(lambda: str(tmp_path), keep=2)
+        with pytest.raises(RuntimeError):
+            prof.snapshot_memory()
+
+        prof.configure(None, memory=True)
+        try:
+            first = prof.snapshot_memory()
+            held = [bytearray(1024) for _ in range(1000)]
+            second = prof.snapshot_memory(limit=5)
+            third = prof.snapshot_memory(limit=1)
+        finally:
+            prof.configure(None, memory=False)
+
+        assert not os.path.exists(first["path"])
+        assert os.path.exists(second["path"]) and os.path.exists(third["path"])
+        assert first["growth"] == []
+        assert second["current_kb"] > 0
+        assert len(second["top"]) <= 5
+        assert any(row["size_diff_kb"] >= 900 for row in second["growth"])
+        assert not tracemalloc.is_tracing()
+        del held
+
+
+class TestServerProfiling:
+    """Tests for the profiling tools and hooks in the server."""
+
+    @pytest.mark.asyncio
+    async def test_disabled_by_default(self, temp_tasks_file_with_data):
+        """Test that tools are not wrapped while profiling is disabled."""
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file_with_data), \
+             patch('taskmateai.server.run_io', wraps=server.run_io) as run_io:
+            await call_tool("get_tasks", {})
+
+        assert not profiler.enabled
+        assert run_io.call_args.args[0] is run_tool
+
+    @pytest.mark.asyncio
+    async def test_configure_and_summary(self, mock_output_dir, temp_tasks_file_with_data, restore_profiler):
+        """Test enabling profiling through the tool and reading the hotspots back."""
+        with patch('taskmateai.server.OUTPUT_DIR', mock_output_dir), \
+             patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file_with_data):
+            status = json.loads((await call_tool("configure_profiling", {
+                "enabled": True, "targets": ["get_tasks", "pending"], "memory": True}))[0].text)
+            await call_tool("get_tasks", {})
+            await call_tool("update_progress", {"task_id": 1, "progress": 20})
+            await read_resource("taskmate://tasks/pending")
+            summary = json.loads((await call_tool("get_profile_summary", {"limit": 10, "memory": True}))[0].text)
+            disabled = json.loads((await call_tool("configure_profiling", {"enabled": False, "memory": False}))[0].text)
+
+        assert status["enabled"] and status["memory"]
+        assert status["targets"] == ["get_tasks", "pending"]
+        assert summary["operations"] == {"tool-get_tasks": 1, "resource-pending": 1}
+        assert 0 < len(summary["hotspots"]) <= 10
+        assert summary["memory"]["path"].startswith(os.path.join(mock_output_dir, ".profiles"))
+        assert os.listdir(os.path.join(mock_output_dir, ".profiles"))
+        # The dump directory is not mistaken for an agent
+        assert list_agents() == []
+        assert disabled == {**disabled, "enabled": False, "targets": [], "memory": False}
+
+    @pytest.mark.asyncio
+    async def test_memory_summary_requires_tracing(self, mock_output_dir):
+        """Test that a memory snapshot without tracing is reported as an error."""
+        with patch('taskmateai.server.OUTPUT_DIR', mock_output_dir):
+            result = await call_tool("get_profile_summary", {"memory": True})
+
+        assert "Memory tracing is not enabled" in result[0].text
@@ -0,0 +1,142 @@
+"""
+Unit tests for querying tasks across every TaskMateAI store.
+"""
+import os
+import sys
+import json
+import time
+import threading
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+# Add src to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from taskmateai.fanout import query_stores
+from taskmateai.server import call_tool, write_tasks
+
+STORES = {
+    (None, None): [{"id": 1, "priority": 2, "status": "todo"}],
+    ("agent1", None): [{"id": 1, "priority": 5, "status": "in_progress"}],
+    ("agent1", "project1"): [{"id": 1, "priority": 4, "status": "in_progress"},
+                             {"id": 2, "priority": 5, "status": "done"}],
+    ("agent2", "projectA"): [{"id": 7, "priority": 5, "status": "in_progress"}],
+}
+
+
+def make_task(task_id, priority, status, title=None):
+    return {"id": task_id, "title": title or f"Task {task_id}", "description": "", "priority": priority,
+            "status": status, "progress": 0, "subtasks": [], "notes": []}
+
+
+@pytest.fixture
+def stores(mock_output_dir):
+    """Write tasks to the default store, an agent store and two project stores."""
+    with patch('taskmateai.server.OUTPUT_DIR', mock_output_dir):
+        for (agent_id, project_name), tasks in STORES.items():
+            write_tasks([make_task(t["id"], t["priority"], t["status"], f"{agent_id}/{project_name}/{t['id']}")
+                         for t in tasks], agent_id, project_name)
+        yield mock_output_dir
+
+
+class TestQueryStores:
+    """Tests for the fan-out and merge helper."""
+
+    def test_merges_sorted_and_limited(self):
+        """Test that results from every store are merged in order and cut at the limit."""
+        with ThreadPoolExecutor(4) as executor:
+            result = query_stores(STORES, lambda a, p: STORES[(a, p)], executor, "priority", 3)
+
+        assert [(task["priority"], store) for task, store in result["tasks"]] == [
+            (5, ("agent1", None)), (5, ("agent1", "project1")), (5, ("agent2", "projectA"))]
+        assert result["total"] == 5
+        assert result["stores"] == 4
+        assert result["errors"] == []
+
+    def test_store_order_without_limit(self):
+        """Test the store order and that a missing limit returns every task."""
+        with ThreadPoolExecutor(2) as executor:
+            result = query_stores(STORES, lambda a, p: STORES[(a, p)], executor, "store")
+
+        assert [(store, task["id"]) for task, store in result["tasks"]] == [
+            ((None, None), 1), (("agent1", None), 1), (("agent1", "project1"), 1),
+            (("agent1", "project1"), 2), (("agent2", "projectA"), 7)]
+
+    def test_failed_store_is_reported(self):
+        """Test that a store that fails to scan is reported and the rest is returned."""
+        def scan(agent_id, project_name):
+            if agent_id == "agent2":
+                raise OSError("unreadable")
+            return STORES[(agent_id, project_name)]
+
+        with ThreadPoolExecutor(2) as executor:
+            result = query_stores(STORES, scan, executor, limit=10)
+
+        assert result["total"] == 4
+        assert result["errors"] == [{"agent_id": "agent2", "project_name": "projectA", "error": "unreadable"}]
+
+    def test_in_flight_scans_are_bounded(self):
+        """Test that at most `concurrency` stores are scanned or held at once."""
+        lock = threading.Lock()
+        active = []
+        peak = []
+
+        def scan(agent_id, project_name):
+            with lock:
+                active.append(agent_id)
+                peak.append(len(active))
+            time.sleep(0.01)
+            with lock:
+                active.remove(agent_id)
+            return [{"id": 1, "priority": int(agent_id)}]
+
+        stores = ((str(i), None) for i in range(20))
+        with ThreadPoolExecutor(8) as executor:
+            result = query_stores(stores, scan, executor, limit=3, concurrency=2)
+
+        assert max(peak) <= 2
+        assert result["stores"] == 20
+        assert [store[0] for _, store in result["tasks"]] == ["19", "18", "17"]
+
+    def test_invalid_arguments(self):
+        """Test that an unknown sort or a bad limit is rejected."""
+        with ThreadPoolExecutor(1) as executor:
+            with pytest.raises(ValueError):
+                query_stores(STORES, lambda a, p: [], executor, "title")
+            with pytest.raises(ValueError):
+                query_stores(STORES, lambda a, p: [], executor, limit=0)
+            with pytest.raises(ValueError):
+                query_stores(STORES, lambda a, p: [], executor, concurrency=0)
+
+
+class TestQueryAllTasksTool:
+    """Tests for the query_all_tasks tool."""
+
+    @pytest.mark.asyncio
+    async def test_filters_across_stores(self, stores):
+        """Test that the get_tasks filters are applied to every store."""
+        with patch('taskmateai.server.OUTPUT_DIR', stores):
+            result = json.loads((await call_tool("query_all_tasks", {
+                "status": "in_progress", "priority_min": 5, "fields": ["id", "title"]}))[0].text)
+
+        assert result["total"] == 2
+        # The agent2 store itself is scanned as well, even though it has no tasks file
+        assert result["stores"] == 5
+        assert result["tasks"] == [
+            {"agent_id": "agent1", "project_name": None, "id": 1, "title": "agent1/None/1"},
+            {"agent_id": "agent2", "project_name": "projectA", "id": 7, "title": "agent2/projectA/7"},
+        ]
+
+    @pytest.mark.asyncio
+    async def test_single_agent_with_notes(self, stores):
+        """Test limiting the query to one agent and attaching logged notes."""
+        with patch('taskmateai.server.OUTPUT_DIR', stores):
+            await call_tool("add_note", {"task_id": 1, "content": "checked", "agent_id": "agent1",
+                                         "project_name": "project1"})
+            result = json.loads((await call_tool("query_all_tasks", {
+                "agent_id": "agent1", "sort": "store", "limit": 2}))[0].text)
+
+        assert result["total"] == 3
+        assert [(t["project_name"], t["id"]) for t in result["tasks"]] == [(None, 1), ("project1", 1)]
+        assert [note["content"] for note in result["tasks"][1]["notes"]] == ["checked"]
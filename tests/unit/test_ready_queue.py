@@ -0,0 +1,105 @@
+"""
+Unit tests for the TaskMateAI ready queue used by get_next_task.
+"""
+import os
+import sys
+import json
+import pytest
+from unittest.mock import patch
+
+# Add src to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from taskmateai.events import create_event, update_event
+from taskmateai.ready_queue import ReadyQueue
+from taskmateai.server import call_tool, read_tasks, select_next_task, task_cache, get_store_key
+
+
+class TestReadyQueue:
+    """Tests for the ReadyQueue class."""
+
+    def test_peek_highest_priority(self, mock_tasks):
+        """Test that the highest priority task not done is returned."""
+        queue = ReadyQueue(mock_tasks)
+        assert queue.peek()["id"] == 2
+        assert len(queue) == 2
+
+    def test_ties_break_on_lowest_id(self):
+        """Test that tasks with equal priority are ordered by ID."""
+        tasks = [{"id": 5, "priority": 3}, {"id": 2, "priority": 3}, {"id": 9, "priority": 1}]
+        assert ReadyQueue(tasks).peek()["id"] == 2
+
+    def test_completed_tasks_are_skipped(self, mock_tasks):
+        """Test that a task marked done leaves the queue lazily."""
+        queue = ReadyQueue(mock_tasks)
+        mock_tasks[1]["status"] = "done"
+        queue.apply([update_event(2, status="done")])
+
+        assert queue.peek()["id"] == 1
+        assert len(queue) == 1
+
+    def test_reopened_task_returns(self, mock_tasks):
+        """Test that a task moving out of done is queued again."""
+        queue = ReadyQueue(mock_tasks)
+        mock_tasks[2]["status"] = "in_progress"
+        mock_tasks[2]["priority"] = 9
+        queue.apply([update_event(3, status="in_progress")])
+
+        assert queue.peek()["id"] == 3
+
+    def test_created_task_is_queued(self, mock_tasks):
+        """Test that create events push the new task."""
+        queue = ReadyQueue(mock_tasks)
+        new_task = {"id": 4, "priority": 5, "status": "todo"}
+        queue.apply([create_event(new_task)])
+
+        # Same priority as task 2, which has the lower ID
+        assert queue.peek()["id"] == 2
+        new_task["priority"] = 6
+        queue.apply([update_event(4, priority=6)])
+        assert queue.peek()["id"] == 4
+
+    def test_empty_queue(self):
+        """Test that an empty or fully completed store yields nothing."""
+        assert ReadyQueue([]).peek() is None
+        assert ReadyQueue([{"id": 1, "status": "done"}]).peek() is None
+
+
+class TestSelectNextTask:
+    """Tests for next task selection in the server."""
+
+    def test_queue_is_built_once(self, temp_tasks_file_with_data):
+        """Test that the queue is kept on the cache entry between calls."""
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file_with_data):
+            tasks = read_tasks()
+            assert select_next_task(tasks)["id"] == 2
+            queue = task_cache.peek(get_store_key()).ready_queue
+            assert queue is not None
+
+            assert select_next_task(read_tasks())["id"] == 2
+            assert task_cache.peek(get_store_key()).ready_queue is queue
+
+    def test_uncached_list_falls_back_to_scan(self, mock_tasks):
+        """Test selection on a list that is not cached."""
+        assert select_next_task(mock_tasks)["id"] == 2
+        assert select_next_task([{"id": 1, "status": "done"}]) is None
+
+    @pytest.mark.asyncio
+    async def test_get_next_task_follows_mutations(self, temp_tasks_file_with_data):
+        """Test that create/complete/update keep get_next_task in sync."""
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file_with_data):
+            async def next_id():
+                result = await call_tool("get_next_task", {})
+                return json.loads(result[0].text)["id"]
+
+            assert await next_id() == 2
+            await call_tool("complete_task", {"task_id": 2})
+            assert await next_id() == 1
+            await call_tool("create_task", {"title": "Urgent", "description": "d", "priority": 5})
+            assert await next_id() == 4
+            await call_tool("update_progress", {"task_id": 4, "progress": 100})
+            assert await next_id() == 1
+            await call_tool("update_subtask", {"task_id": 1, "subtask_id": 1, "status": "done"})
+
+            result = await call_tool("get_next_task", {})
+            assert "利用可能なタスクはありません" in result[0].text
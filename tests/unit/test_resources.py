@@ -0,0 +1,160 @@
+"""
+Unit tests for TaskMateAI resource listing and URI routing.
+"""
+import os
+import sys
+import json
+import pytest
+from unittest.mock import patch
+
+# Add src to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from mcp.types import ListResourcesRequest, PaginatedRequestParams
+from taskmateai.resources import ResourceRoute, iter_stores, list_store_page, route_resource_uri
+from taskmateai.server import app, list_resource_templates, list_resources, read_resource, write_tasks
+
+
+CATALOG = {"agent1": ["project1", "project2"], "agent2": [], "agent3": ["x"]}
+
+
+def list_agents():
+    return list(CATALOG)
+
+
+def list_projects(agent_id):
+    return CATALOG[agent_id]
+
+
+@pytest.fixture
+def agent_tree(mock_output_dir, mock_tasks):
+    """Create task stores for several agents and projects."""
+    with patch('taskmateai.server.OUTPUT_DIR', mock_output_dir):
+        write_tasks(mock_tasks)
+        for agent_id, projects in CATALOG.items():
+            write_tasks(mock_tasks[:1], agent_id)
+            for project_name in projects:
+                write_tasks(mock_tasks[1:], agent_id, project_name)
+        yield mock_output_dir
+
+
+class TestRouter:
+    """Tests for resource URI routing."""
+
+    @pytest.mark.parametrize("uri, expected", [
+        ("taskmate://tasks/all", ResourceRoute(None, None, "all", "")),
+        ("taskmate://agent1/tasks/pending", ResourceRoute("agent1", None, "pending", "")),
+        ("taskmate://agent1/project1/tasks/completed?limit=5",
+         ResourceRoute("agent1", "project1", "completed", "limit=5")),
+        ("taskmate://my%20agent/tasks/all", ResourceRoute("my agent", None, "all", "")),
+    ])
+    def test_routes(self, uri, expected):
+        """Test that supported URIs are parsed."""
+        assert route_resource_uri(uri) == expected
+
+    @pytest.mark.parametrize("uri", [
+        "taskmate://tasks/unknown",
+        "taskmate://a/b/c/tasks/all",
+        "other://tasks/all",
+    ])
+    def test_unknown(self, uri):
+        """Test that unsupported URIs are rejected."""
+        assert route_resource_uri(uri) is None
+
+
+class TestStoreListing:
+    """Tests for paging through stores."""
+
+    def test_order(self):
+        """Test that stores are listed by name with parents first."""
+        assert list(iter_stores(list_agents, list_projects)) == [
+            (None, None), ("agent1", None), ("agent1", "project1"), ("agent1", "project2"),
+            ("agent2", None), ("agent3", None), ("agent3", "x"),
+        ]
+
+    def test_pages(self):
+        """Test that following the cursor visits every store once."""
+        seen = []
+        cursor = None
+        while True:
+            stores, cursor = list_store_page(list_agents, list_projects, cursor, 2)
+            assert len(stores) <= 2
+            seen.extend(stores)
+            if cursor is None:
+                break
+        assert seen == list(iter_stores(list_agents, list_projects))
+
+    def test_projects_listed_lazily(self):
+        """Test that only agents reached by the page are asked for projects."""
+        asked = []
+
+        def tracking_projects(agent_id):
+            asked.append(agent_id)
+            return CATALOG[agent_id]
+
+        list_store_page(list_agents, tracking_projects, None, 3)
+        assert asked == ["agent1"]
+
+    def test_invalid_cursor(self):
+        """Test that a malformed cursor is rejected."""
+        with pytest.raises(ValueError):
+            list_store_page(list_agents, list_projects, "???")
+
+
+class TestListResources:
+    """Tests for the list_resources handler."""
+
+    @pytest.mark.asyncio
+    async def test_concrete_pages(self, agent_tree):
+        """Test paging concrete resources through the request handler."""
+        with patch('taskmateai.server.OUTPUT_DIR', agent_tree), \
+             patch('taskmateai.server.RESOURCE_PAGE_SIZE', 4):
+            handler = app.request_handlers[ListResourcesRequest]
+            first = (await handler(ListResourcesRequest(method="resources/list"))).root
+            second = (await handler(ListResourcesRequest(
+                method="resources/list", params=PaginatedRequestParams(cursor=first.nextCursor)))).root
+
+        uris = [str(r.uri) for r in first.resources + second.resources]
+        assert len(first.resources) == 13
+        assert second.nextCursor is None
+        assert uris[0] == "taskmate://tasks/all"
+        assert uris[12] == "taskmate://metrics"
+        assert "taskmate://agent3/x/tasks/completed" in uris
+        assert len(uris) == len(set(uris)) == 22
+
+    @pytest.mark.asyncio
+    async def test_templates_mode(self, agent_tree):
+        """Test that templates mode does not enumerate agents."""
+        with patch('taskmateai.server.OUTPUT_DIR', agent_tree), \
+             patch('taskmateai.server.RESOURCE_LISTING', "templates"), \
+             patch('taskmateai.server.list_agents', side_effect=AssertionError("listed agents")):
+            result = await list_resources()
+            templates = await list_resource_templates()
+
+        assert [str(r.uri) for r in result.resources] == [
+            "taskmate://tasks/all", "taskmate://tasks/pending", "taskmate://tasks/completed", "taskmate://metrics"
+        ]
+        assert result.nextCursor is None
+        assert "taskmate://{agent_id}/{project_name}/tasks/{kind}" in [t.uriTemplate for t in templates]
+
+
+class TestReadResource:
+    """Tests for read_resource routing."""
+
+    @pytest.mark.asyncio
+    async def test_default_store(self, agent_tree):
+        """Test that taskmate://tasks/all reads the default store."""
+        with patch('taskmateai.server.OUTPUT_DIR', agent_tree):
+            tasks = json.loads(await read_resource("taskmate://tasks/all"))
+            agent_tasks = json.loads(await read_resource("taskmate://agent1/tasks/all"))
+            project_tasks = json.loads(await read_resource("taskmate://agent1/project1/tasks/pending"))
+
+        assert [t["id"] for t in tasks] == [1, 2, 3]
+        assert [t["id"] for t in agent_tasks] == [1]
+        assert [t["id"] for t in project_tasks] == [2]
+
+    @pytest.mark.asyncio
+    async def test_unknown_resource(self):
+        """Test that unknown resources raise an error."""
+        with pytest.raises(ValueError, match="Unknown resource"):
+            await read_resource("taskmate://tasks/archived")
@@ -0,0 +1,158 @@
+"""
+Unit tests for TaskMateAI full-text search.
+"""
+import os
+import sys
+import json
+import pytest
+from unittest.mock import patch
+
+# Add src to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from taskmateai.search import SearchIndex, tokenize
+from taskmateai.server import call_tool, get_store_key, task_cache, write_tasks
+
+TASKS = [
+    {"id": 1, "title": "API設計のレビュー", "description": "認証まわりの設計を確認する",
+     "subtasks": [{"id": 1, "description": "トークンの有効期限", "status": "todo"}], "notes": []},
+    {"id": 2, "title": "データベース移行", "description": "古いテーブルを削除する",
+     "subtasks": [], "notes": [{"id": 1, "content": "設計は完了", "timestamp": "2024-01-01T00:00:00"}]},
+    {"id": 3, "title": "Release notes", "description": "Write the v2 release notes",
+     "subtasks": [], "notes": []},
+]
+
+
+def make_task(task_id, title, description="", priority=3, status="todo"):
+    return {"id": task_id, "title": title, "description": description, "priority": priority,
+            "status": status, "progress": 0, "subtasks": [], "notes": []}
+
+
+async def search(arguments):
+    return json.loads((await call_tool("search_tasks", arguments))[0].text)
+
+
+class TestTokenize:
+    """Tests for the CJK-aware tokenizer."""
+
+    def test_mixed_text(self):
+        """Test that words stay whole and CJK runs become bigrams."""
+        assert tokenize("API設計のレビュー") == ["api", "設計", "計の", "のレ", "レビ", "ビュ", "ュー"]
+
+    def test_normalization(self):
+        """Test that full-width and half-width forms are normalized."""
+        assert tokenize("ＡＰＩ ｶﾀｶﾅ v2_final") == ["api", "カタ", "タカ", "カナ", "v2", "final"]
+
+    def test_single_character_and_empty(self):
+        """Test single CJK characters and non-text values."""
+        assert tokenize("東 と 西") == ["東", "と", "西"]
+        assert tokenize("") == []
+        assert tokenize(None) == []
+
+
+class TestSearchIndex:
+    """Tests for the inverted index."""
+
+    def test_search_ranks_title_matches_first(self):
+        """Test that every query token must match and title matches rank higher."""
+        index = SearchIndex(TASKS)
+
+        assert [task_id for task_id, _ in index.search("設計")] == [1, 2]
+        assert [task_id for task_id, _ in index.search("API 設計")] == [1]
+        assert [task_id for task_id, _ in index.search("RELEASE notes")] == [3]
+        assert index.search("存在しない") == []
+        assert index.search("  ") == []
+
+    def test_single_character_query(self):
+        """Test that a single CJK character matches the bigrams that contain it."""
+        index = SearchIndex(TASKS)
+
+        assert {task_id for task_id, _ in index.search("削")} == {2}
+        assert {task_id for task_id, _ in index.search("設")} == {1, 2}
+
+    def test_incremental_updates(self):
+        """Test that new tasks, subtasks and notes are searchable without a rebuild."""
+        index = SearchIndex(TASKS)
+        index.apply([
+            {"op": "create", "task": make_task(4, "検索機能の追加")},
+            {"op": "add_subtask", "id": 3, "subtask": {"id": 1, "description": "翻訳を確認", "status": "todo"}},
+            {"op": "add_note", "id": 2, "note": {"id": 2, "content": "rollback plan"}},
+        ])
+        index.add_notes([(1, {"id": 1, "content": "索引の性能"})])
+
+        assert [task_id for task_id, _ in index.search("検索")] == [4]
+        assert [task_id for task_id, _ in index.search("翻訳")] == [3]
+        assert [task_id for task_id, _ in index.search("rollback")] == [2]
+        assert [task_id for task_id, _ in index.search("索引")] == [1]
+
+    def test_remove_task(self):
+        """Test that archived tasks are removed from the index."""
+        index = SearchIndex(TASKS)
+        index.apply([{"op": "archive", "id": 1}])
+
+        assert [task_id for task_id, _ in index.search("設計")] == [2]
+        assert len(index) == 2
+
+
+class TestSearchTasksTool:
+    """Tests for the search_tasks tool."""
+
+    @pytest.fixture
+    def stores(self, mock_output_dir):
+        """Write Japanese tasks to the default store and to two agent stores."""
+        with patch('taskmateai.server.OUTPUT_DIR', mock_output_dir):
+            write_tasks([make_task(1, "ログイン画面の設計", priority=2)])
+            write_tasks([make_task(1, "設計レビュー", "APIの設計を確認", priority=5),
+                         make_task(2, "テストの追加", status="done")], "agent1")
+            write_tasks([make_task(1, "画面遷移の設計", status="in_progress")], "agent1", "web")
+            yield mock_output_dir
+
+    @pytest.mark.asyncio
+    async def test_scopes(self, stores):
+        """Test searching one store, one agent and every store."""
+        with patch('taskmateai.server.OUTPUT_DIR', stores):
+            store = await search({"query": "設計", "agent_id": "agent1", "fields": ["id", "title"]})
+            agent = await search({"query": "設計", "agent_id": "agent1", "scope": "agent"})
+            everything = await search({"query": "設計", "scope": "all", "limit": 2})
+            filtered = await search({"query": "設計", "scope": "all", "status": "in_progress"})
+
+        assert store["tasks"] == [{"agent_id": "agent1", "project_name": None, "id": 1, "title": "設計レビュー",
+                                   "score": store["tasks"][0]["score"]}]
+        assert store["tasks"][0]["score"] > 0
+        assert [(t["project_name"], t["id"]) for t in agent["tasks"]] == [(None, 1), ("web", 1)]
+        assert everything["total"] == 3
+        assert len(everything["tasks"]) == 2
+        assert everything["tasks"][0]["score"] >= everything["tasks"][1]["score"]
+        assert [t["title"] for t in filtered["tasks"]] == ["画面遷移の設計"]
+
+    @pytest.mark.asyncio
+    async def test_index_follows_changes(self, stores):
+        """Test that created tasks, subtasks and notes are found through the cached index."""
+        with patch('taskmateai.server.OUTPUT_DIR', stores):
+            assert (await search({"query": "設計"}))["total"] == 1
+            index = task_cache.peek(get_store_key()).search_index
+
+            await call_tool("create_task", {"title": "検索の設計", "description": "転置インデックス"})
+            await call_tool("add_subtask", {"task_id": 1, "description": "パスワード再設定"})
+            await call_tool("add_note", {"task_id": 1, "content": "デザイナーと相談済み"})
+
+            created = await search({"query": "インデックス"})
+            subtask = await search({"query": "パスワード"})
+            note = await search({"query": "相談"})
+
+            assert task_cache.peek(get_store_key()).search_index is index
+
+        assert [t["title"] for t in created["tasks"]] == ["検索の設計"]
+        assert [t["id"] for t in subtask["tasks"]] == [1]
+        assert [t["id"] for t in note["tasks"]] == [1]
+        assert note["tasks"][0]["notes"][0]["content"] == "デザイナーと相談済み"
+
+    @pytest.mark.asyncio
+    async def test_invalid_arguments(self, stores):
+        """Test that a missing query or agent is reported as an error."""
+        with patch('taskmateai.server.OUTPUT_DIR', stores):
+            missing_query = await call_tool("search_tasks", {})
+            missing_agent = await call_tool("search_tasks", {"query": "設計", "scope": "agent"})
+
+        assert "Missing required parameter: query" in missing_query[0].text
+        assert "Missing required parameter: agent_id" in missing_agent[0].text
@@ -0,0 +1,86 @@
+"""
+Unit tests for the TaskMateAI JSON serializer.
+"""
+import os
+import sys
+import json
+import pytest
+from unittest.mock import patch
+
+# Add src to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from taskmateai import serializer, server
+from taskmateai.server import call_tool, read_tasks, write_tasks
+
+
+@pytest.fixture(params=["default", "stdlib"])
+def backend(request):
+    """Run a test with the accelerated encoder (if installed) and with the json fallback."""
+    if request.param == "stdlib":
+        with patch('taskmateai.serializer.orjson', None):
+            yield request.param
+    else:
+        yield request.param
+
+
+class TestSerializer:
+    """Tests for the serializer module."""
+
+    def test_compact_by_default(self, backend, mock_tasks):
+        """Test that the default output has no indentation and round-trips."""
+        text = serializer.dumps(mock_tasks)
+        assert "\n" not in text
+        assert serializer.loads(text) == mock_tasks
+        assert serializer.loads(serializer.dumps_bytes(mock_tasks)) == mock_tasks
+
+    def test_pretty(self, backend, mock_tasks):
+        """Test that pretty mode matches the previous indented format."""
+        assert serializer.dumps(mock_tasks, pretty=True) == json.dumps(mock_tasks, indent=2, ensure_ascii=False)
+
+    def test_non_ascii_is_not_escaped(self, backend):
+        """Test that Japanese text is written as UTF-8."""
+        assert serializer.dumps({"title": "タスク"}) == '{"title":"タスク"}'
+        assert serializer.dumps_bytes({"title": "タスク"}) == '{"title":"タスク"}'.encode("utf-8")
+
+    def test_large_integers(self, backend):
+        """Test values the accelerated encoder cannot represent."""
+        assert serializer.loads(serializer.dumps({"id": 2 ** 70})) == {"id": 2 ** 70}
+
+    def test_decode_error(self, backend):
+        """Test that parse errors are json.JSONDecodeError."""
+        with pytest.raises(json.JSONDecodeError):
+            serializer.loads("{broken")
+
+
+class TestStorageFormat:
+    """Tests for the on-disk format chosen by the server."""
+
+    def test_compact_storage(self, temp_tasks_file, mock_tasks):
+        """Test that tasks.json is written compactly by default."""
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file):
+            write_tasks(mock_tasks)
+            with open(temp_tasks_file, encoding='utf-8') as f:
+                content = f.read()
+            assert "\n" not in content
+            assert read_tasks() == mock_tasks
+
+    def test_pretty_storage(self, temp_tasks_file, mock_tasks):
+        """Test the readable storage option."""
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file), \
+             patch.object(server.task_writer, 'pretty', True):
+            write_tasks(mock_tasks)
+        with open(temp_tasks_file, encoding='utf-8') as f:
+            assert f.read() == json.dumps(mock_tasks, indent=2, ensure_ascii=False)
+
+    @pytest.mark.asyncio
+    async def test_response_format(self, temp_tasks_file_with_data):
+        """Test compact and pretty tool responses."""
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file_with_data):
+            compact = (await call_tool("get_tasks", {}))[0].text
+            with patch('taskmateai.server.PRETTY_RESPONSES', True):
+                pretty = (await call_tool("get_tasks", {}))[0].text
+
+        assert "\n" not in compact
+        assert "\n  " in pretty
+        assert json.loads(compact) == json.loads(pretty)
@@ -0,0 +1,252 @@
+"""
+Unit tests for the TaskMateAI SQLite storage backend.
+"""
+import os
+import sys
+import json
+import datetime
+import pytest
+from unittest.mock import patch
+
+# Add src to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from taskmateai.archive import ColdArchive
+from taskmateai.events import update_event, update_subtask_event, add_note_event
+from taskmateai.notes_log import NotesLog
+from taskmateai.ready_queue import ReadyQueue
+from taskmateai.sqlite_store import SQLiteStore, main as sqlite_main
+from taskmateai.server import call_tool, select_next_task
+
+
+@pytest.fixture
+def sqlite_store(mock_output_dir):
+    """Create a SQLite store in a temporary directory."""
+    store = SQLiteStore(os.path.join(mock_output_dir, "taskmate.db"))
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def sqlite_store_with_data(sqlite_store, mock_tasks):
+    """Create a SQLite store holding the sample tasks for the default store."""
+    sqlite_store.save(mock_tasks)
+    return sqlite_store
+
+
+@pytest.fixture
+def sqlite_mode(sqlite_store_with_data):
+    """Run the server tools against the SQLite backend."""
+    with patch('taskmateai.server.STORAGE_MODE', "sqlite"), \
+         patch('taskmateai.server.sqlite_store', sqlite_store_with_data):
+        yield sqlite_store_with_data
+
+
+class TestSQLiteStore:
+    """Tests for the SQLiteStore class."""
+
+    def test_round_trip(self, sqlite_store_with_data, mock_tasks):
+        """Test that saved tasks load back unchanged."""
+        assert sqlite_store_with_data.load() == mock_tasks
+
+    def test_extra_fields_round_trip(self, sqlite_store):
+        """Test that fields without a dedicated column are preserved."""
+        task = {"id": 1, "title": "t", "status": "todo", "subtasks": [], "notes": [], "tags": ["a"]}
+        sqlite_store.save([task], "agent1", "project1")
+        sqlite_store.save(None, "agent1", "project1", events=[update_event(1, owner="me")])
+
+        loaded = sqlite_store.load("agent1", "project1")[0]
+        assert loaded["tags"] == ["a"]
+        assert loaded["owner"] == "me"
+
+    def test_stores_are_isolated(self, sqlite_store_with_data):
+        """Test that agents and projects do not see each other's tasks."""
+        assert sqlite_store_with_data.load("agent1", "project1") == []
+        sqlite_store_with_data.save([{"id": 1, "title": "a"}], "agent1", "project1")
+
+        assert sqlite_store_with_data.list_agents() == ["agent1"]
+        assert sqlite_store_with_data.list_projects("agent1") == ["project1"]
+        assert len(sqlite_store_with_data.load()) == 3
+
+    def test_query(self, sqlite_store_with_data):
+        """Test filtering by status and minimum priority."""
+        assert [t["id"] for t in sqlite_store_with_data.query(status="todo")] == [1]
+        assert [t["id"] for t in sqlite_store_with_data.query(priority_min=3)] == [1, 2]
+        assert sqlite_store_with_data.query(status="todo")[0]["subtasks"][0]["description"] == "Subtask 1"
+
+    def test_next_task(self, sqlite_store_with_data):
+        """Test that the next task is the highest priority task not done."""
+        assert sqlite_store_with_data.next_task()["id"] == 2
+        sqlite_store_with_data.save(None, events=[update_event(2, status="done")])
+        assert sqlite_store_with_data.next_task()["id"] == 1
+        sqlite_store_with_data.save(None, events=[update_event(1, status="done")])
+        assert sqlite_store_with_data.next_task() is None
+
+    def test_apply_events(self, sqlite_store_with_data):
+        """Test applying subtask and note events."""
+        sqlite_store_with_data.save(None, events=[
+            update_subtask_event(1, 1, status="done"),
+            add_note_event(1, {"id": 1, "content": "n", "timestamp": "2023-01-01T00:00:00"}),
+        ])
+        task = sqlite_store_with_data.load()[0]
+        assert task["subtasks"][0]["status"] == "done"
+        assert task["notes"][0]["content"] == "n"
+
+    def test_max_task_id(self, sqlite_store_with_data):
+        """Test the maximum task ID lookup."""
+        assert sqlite_store_with_data.max_task_id() == 3
+        assert sqlite_store_with_data.max_task_id("nobody") == 0
+
+
+class TestSQLiteMigration:
+    """Tests for importing existing JSON trees."""
+
+    def test_import_tree(self, mock_output_dir, mock_tasks):
+        """Test that every tasks.json in the tree is imported under its agent/project."""
+        for parts in ([], ["agent1"], ["agent1", "project1"]):
+            directory = os.path.join(mock_output_dir, *parts)
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, "tasks.json"), 'w') as f:
+                json.dump(mock_tasks, f)
+
+        db_path = os.path.join(mock_output_dir, "migrated.db")
+        assert sqlite_main(["migrate", "--output-dir", mock_output_dir, "--db", db_path]) == 0
+
+        store = SQLiteStore(db_path)
+        assert store.load() == mock_tasks
+        assert store.load("agent1") == mock_tasks
+        assert store.load("agent1", "project1") == mock_tasks
+        store.close()
+
+    def test_import_notes_and_archive(self, mock_output_dir, mock_tasks):
+        """Test that logged notes and archived tasks are imported with the store."""
+        tasks_file = os.path.join(mock_output_dir, "tasks.json")
+        archived = {**mock_tasks[0], "id": 1, "status": "done", "progress": 100, "completed_at": "2024-01-01T00:00:00"}
+        active = [{**task, "id": task["id"] + 1} for task in mock_tasks]
+        with open(tasks_file, 'w') as f:
+            json.dump(active, f)
+        ColdArchive().append(tasks_file, [archived])
+        NotesLog().append(tasks_file, [(1, {"id": 1, "content": "archived note", "timestamp": "t"}),
+                                       (3, {"id": 2, "content": "logged note", "timestamp": "t"})])
+
+        db_path = os.path.join(mock_output_dir, "migrated.db")
+        store = SQLiteStore(db_path)
+        assert store.import_tree(mock_output_dir) == {tasks_file: 4}
+
+        tasks = {task["id"]: task for task in store.load()}
+        assert list(tasks) == [1, 2, 3, 4]
+        assert tasks[1]["completed_at"] == "2024-01-01T00:00:00"
+        assert [note["content"] for note in tasks[1]["notes"]] == ["archived note"]
+        assert [note["content"] for note in tasks[3]["notes"]] == [
+            note["content"] for note in mock_tasks[1]["notes"]] + ["logged note"]
+        store.close()
+
+
+class TestSQLiteMode:
+    """Tests for the tools running against the SQLite backend."""
+
+    @pytest.mark.asyncio
+    async def test_get_tasks_filters(self, sqlite_mode):
+        """Test get_tasks filtering through the index."""
+        result = await call_tool("get_tasks", {"status": "todo"})
+        assert [t["id"] for t in json.loads(result[0].text)] == [1]
+
+    @pytest.mark.asyncio
+    async def test_get_next_task(self, sqlite_mode):
+        """Test that get_next_task picks and updates the highest priority task."""
+        result = await call_tool("get_next_task", {})
+        task = json.loads(result[0].text)
+        assert task["id"] == 2
+        assert task["status"] == "in_progress"
+
+    @pytest.mark.asyncio
+    async def test_mutations(self, sqlite_mode):
+        """Test that mutating tools update the database."""
+        await call_tool("create_task", {"title": "New", "description": "d", "subtasks": ["s"]})
+        await call_tool("update_subtask", {"task_id": 4, "subtask_id": 1, "status": "done"})
+        await call_tool("add_note", {"task_id": 4, "content": "note"})
+        await call_tool("update_progress", {"task_id": 1, "progress": 30})
+
+        tasks = {t["id"]: t for t in sqlite_mode.load()}
+        assert tasks[4]["status"] == "done"
+        assert tasks[4]["progress"] == 100
+        assert tasks[4]["notes"][0]["content"] == "note"
+        assert tasks[1]["progress"] == 30
+        assert tasks[1]["status"] == "in_progress"
+
+    @pytest.mark.asyncio
+    async def test_mutations_read_single_rows(self, sqlite_mode):
+        """Test that mutations by task ID never load the whole store."""
+        with patch.object(sqlite_mode, 'load', side_effect=AssertionError("whole store loaded")):
+            await call_tool("create_task", {"title": "New", "description": "d"})
+            await call_tool("create_tasks", {"tasks": [{"title": "A", "description": "d"},
+                                                       {"title": "B", "description": "d"}]})
+            await call_tool("update_progress", {"task_id": 1, "progress": 30})
+            await call_tool("add_subtask", {"task_id": 4, "description": "s"})
+            await call_tool("add_note", {"task_id": 4, "content": "note"})
+            await call_tool("complete_task", {"task_id": 2})
+            await call_tool("heartbeat", {"task_id": 4, "claimant": "w"})
+
+        tasks = {t["id"]: t for t in sqlite_mode.load()}
+        assert [tasks[i]["title"] for i in (4, 5, 6)] == ["New", "A", "B"]
+        assert tasks[1]["progress"] == 30
+        assert tasks[2]["status"] == "done"
+        assert tasks[4]["subtasks"][0]["description"] == "s"
+        assert tasks[4]["notes"][0]["content"] == "note"
+
+
+@pytest.fixture
+def readiness_tasks():
+    """Return tasks covering every readiness rule (statuses, leases and priority ties)."""
+    return [
+        {"id": 1, "title": "t1", "priority": 2, "status": "todo"},
+        {"id": 2, "title": "t2", "priority": 5, "status": "blocked"},
+        {"id": 3, "title": "t3", "priority": 5},
+        {"id": 4, "title": "t4", "priority": 9, "status": "done"},
+        {"id": 5, "title": "t5", "priority": 5, "status": "todo", "lease_expires_at": "2099-01-01T00:00:00"},
+        {"id": 6, "title": "t6", "priority": 5, "status": "in_progress", "lease_expires_at": "2000-01-01T00:00:00"},
+        {"id": 7, "title": "t7", "priority": 1, "status": "todo", "lease_expires_at": "not a date"},
+        {"id": 8, "title": "t8", "status": "review"},
+    ]
+
+
+class TestReadinessParity:
+    """Tests that JSON mode and SQLite mode agree on the next task."""
+
+    def test_next_task_order_matches(self, sqlite_store, readiness_tasks):
+        """Test that every selection path picks the same tasks in the same order."""
+        now = datetime.datetime(2024, 1, 1)
+        sqlite_store.save(readiness_tasks)
+        tasks = json.loads(json.dumps(readiness_tasks))
+        queue = ReadyQueue(tasks, now)
+
+        order = []
+        while True:
+            expected = select_next_task(list(tasks), now=now)
+            assert queue.peek(now) is expected
+            picked = sqlite_store.next_task(now=now.isoformat())
+            assert (picked and picked["id"]) == (expected and expected["id"])
+            if expected is None:
+                break
+            order.append(expected["id"])
+            expected["status"] = "done"
+            queue.apply([update_event(expected["id"], status="done")])
+            sqlite_store.save(None, events=[update_event(expected["id"], status="done")])
+
+        assert order == [2, 3, 6, 1, 7, 8]
+
+    @pytest.mark.asyncio
+    async def test_get_next_task_matches(self, sqlite_store, temp_tasks_file, readiness_tasks):
+        """Test that get_next_task returns the same task in both storage modes."""
+        with open(temp_tasks_file, 'w') as f:
+            json.dump(readiness_tasks, f)
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file):
+            json_task = json.loads((await call_tool("get_next_task", {}))[0].text)
+
+        sqlite_store.save(readiness_tasks)
+        with patch('taskmateai.server.STORAGE_MODE', "sqlite"), \
+             patch('taskmateai.server.sqlite_store', sqlite_store):
+            sqlite_task = json.loads((await call_tool("get_next_task", {}))[0].text)
+
+        assert (json_task["id"], json_task["status"]) == (sqlite_task["id"], sqlite_task["status"])
+        assert json_task["id"] == 2
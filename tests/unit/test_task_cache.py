@@ -0,0 +1,120 @@
+"""
+Unit tests for the TaskMateAI in-process task store cache.
+"""
+import os
+import sys
+import json
+import pytest
+from unittest.mock import patch
+
+# Add src to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from taskmateai.cache import TaskStoreCache, file_signature
+from taskmateai.server import read_tasks, write_tasks, next_task_id, call_tool
+
+
+class TestTaskStoreCache:
+    """Tests for the TaskStoreCache class."""
+
+    def test_file_signature_missing_file(self):
+        """Test that a missing file has no signature."""
+        assert file_signature('/nonexistent/tasks.json') is None
+
+    def test_get_miss_and_hit(self):
+        """Test that a stored entry is returned only for a matching signature."""
+        cache = TaskStoreCache(max_bytes=1024)
+        tasks = [{"id": 1}]
+        cache.put(("a", "p"), tasks, ("f", 1, 10), 10)
+
+        assert cache.get(("a", "p"), ("f", 1, 10)).tasks is tasks
+        assert cache.get(("a", "p"), ("f", 2, 10)) is None
+        assert ("a", "p") not in cache
+        assert cache.hits == 1
+        assert cache.misses == 1
+
+    def test_lru_eviction(self):
+        """Test that least recently used entries are evicted over the budget."""
+        cache = TaskStoreCache(max_bytes=100)
+        cache.put("a", [], ("a", 1, 40), 40)
+        cache.put("b", [], ("b", 1, 40), 40)
+        cache.get("a", ("a", 1, 40))
+        cache.put("c", [], ("c", 1, 40), 40)
+
+        assert "a" in cache
+        assert "b" not in cache
+        assert "c" in cache
+        assert cache.total_bytes == 80
+        assert cache.evictions == 1
+
+    def test_oversized_entry_is_kept(self):
+        """Test that the most recent entry is kept even if it exceeds the budget."""
+        cache = TaskStoreCache(max_bytes=10)
+        cache.put("a", [], ("a", 1, 50), 50)
+        assert "a" in cache
+
+    def test_allocate_task_id_scans_only_new_tasks(self):
+        """Test that the ID counter picks up appended tasks."""
+        cache = TaskStoreCache(max_bytes=1024)
+        tasks = [{"id": 3}, {"id": 7}]
+        entry = cache.put("a", tasks, None, 0)
+
+        assert entry.allocate_task_id() == 8
+        tasks.append({"id": 8})
+        tasks.append({"id": 20})
+        assert entry.allocate_task_id() == 21
+
+
+class TestReadTasksCache:
+    """Tests for the cache behind read_tasks/write_tasks."""
+
+    def test_read_tasks_uses_cache(self, temp_tasks_file_with_data, mock_tasks):
+        """Test that repeated reads do not re-parse an unchanged file."""
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file_with_data):
+            first = read_tasks()
+            with patch('taskmateai.server.json.load') as mock_load:
+                second = read_tasks()
+                mock_load.assert_not_called()
+
+        assert first is second
+        assert second == mock_tasks
+
+    def test_read_tasks_detects_external_change(self, temp_tasks_file_with_data, mock_tasks):
+        """Test that an external edit of the tasks file invalidates the cache."""
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file_with_data):
+            assert len(read_tasks()) == 3
+
+            with open(temp_tasks_file_with_data, 'w') as f:
+                json.dump(mock_tasks[:1], f)
+            os.utime(temp_tasks_file_with_data, ns=(0, 0))
+
+            tasks = read_tasks()
+            assert len(tasks) == 1
+
+    def test_write_tasks_updates_cache(self, temp_tasks_file):
+        """Test that written tasks are served from the cache afterwards."""
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file):
+            tasks = [{"id": 1, "title": "cached"}]
+            write_tasks(tasks)
+            assert read_tasks() is tasks
+
+    def test_next_task_id_uses_counter(self, temp_tasks_file_with_data):
+        """Test that next_task_id allocates from the cached per-store counter."""
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file_with_data):
+            tasks = read_tasks()
+            assert next_task_id(tasks) == 4
+            assert next_task_id(tasks) == 5
+
+        # An uncached list falls back to scanning
+        assert next_task_id([{"id": 9}]) == 10
+
+    @pytest.mark.asyncio
+    async def test_create_task_ids_are_sequential(self, temp_tasks_file):
+        """Test that consecutive create_task calls get increasing IDs."""
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file):
+            for i in range(3):
+                await call_tool("create_task", {"title": f"Task {i}", "description": "d"})
+
+        with open(temp_tasks_file) as f:
+            tasks = json.load(f)
+        assert [t["id"] for t in tasks] == [1, 2, 3]
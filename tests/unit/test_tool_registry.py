@@ -0,0 +1,149 @@
+"""
+Unit tests for the TaskMateAI tool registry.
+"""
+import os
+import sys
+import pytest
+from unittest.mock import patch
+from importlib.metadata import EntryPoint
+
+# Add src to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from mcp.types import CallToolRequest, CallToolRequestParams, TextContent
+from taskmateai.server import app, call_tool, list_tools, tool_registry
+from taskmateai.tools import ToolRegistry
+
+OBJECT_SCHEMA = {"type": "object", "properties": {"n": {"type": "integer"}}, "required": ["n"]}
+
+
+def echo(arguments):
+    return [TextContent(type="text", text=str(arguments))]
+
+
+def register_plugin(registry):
+    registry.add("plugin_echo", "Echo from a plugin.", OBJECT_SCHEMA, echo, read_only=True)
+
+
+def broken_plugin(registry):
+    raise RuntimeError("broken")
+
+
+class TestToolRegistry:
+    """Tests for the ToolRegistry class."""
+
+    def test_register_and_lookup(self):
+        """Test that tools are listed in registration order and looked up by name."""
+        registry = ToolRegistry()
+
+        @registry.tool("first", description="First tool.", read_only=True)
+        def first(arguments):
+            return []
+
+        registry.add("second", "Second tool.", OBJECT_SCHEMA, echo)
+
+        assert registry.names() == ["first", "second"]
+        assert "first" in registry and "missing" not in registry
+        assert registry.get("first").handler is first
+        assert registry.get("first").read_only
+        assert not registry.get("second").read_only
+        assert registry.get("first").tool.inputSchema == {"type": "object", "properties": {}}
+        assert registry.get("missing") is None
+
+    def test_duplicate_names(self):
+        """Test that registering a name twice needs replace=True."""
+        registry = ToolRegistry()
+        registry.add("echo", "Echo.", OBJECT_SCHEMA, echo)
+
+        with pytest.raises(ValueError):
+            registry.add("echo", "Echo again.", OBJECT_SCHEMA, echo)
+        registry.add("echo", "Echo again.", OBJECT_SCHEMA, echo, replace=True)
+        assert len(registry) == 1
+        assert registry.get("echo").tool.description == "Echo again."
+
+    def test_tool_list_is_cached(self):
+        """Test that the tool list is reused until a tool is registered."""
+        registry = ToolRegistry()
+        registry.add("echo", "Echo.", OBJECT_SCHEMA, echo)
+
+        tools = registry.tools()
+        assert registry.tools() is tools
+        registry.add("other", "Other.", OBJECT_SCHEMA, echo)
+        assert [tool.name for tool in registry.tools()] == ["echo", "other"]
+        assert registry.tools() is not tools
+
+    def test_validate(self):
+        """Test that arguments are validated against the input schema with a cached validator."""
+        registry = ToolRegistry()
+        registry.add("echo", "Echo.", OBJECT_SCHEMA, echo)
+
+        registry.validate("echo", {"n": 1})
+        validator = registry.get("echo")._validator
+        with pytest.raises(ValueError, match="Input validation error: 'n' is a required property"):
+            registry.validate("echo", {})
+        with pytest.raises(ValueError, match="Input validation error"):
+            registry.validate("echo", {"n": "one"})
+        assert registry.get("echo")._validator is validator
+        # Unknown tools are left to the dispatcher
+        registry.validate("missing", {})
+
+    def test_load_plugins(self):
+        """Test that entry point plugins register tools and broken plugins are skipped."""
+        registry = ToolRegistry()
+        entry_points = [
+            EntryPoint("echo", f"{__name__}:register_plugin", "taskmateai.tools"),
+            EntryPoint("broken", f"{__name__}:broken_plugin", "taskmateai.tools"),
+        ]
+        with patch('importlib.metadata.entry_points', return_value=entry_points) as found:
+            loaded = registry.load_plugins()
+
+        found.assert_called_once_with(group="taskmateai.tools")
+        assert loaded == ["echo"]
+        assert registry.names() == ["plugin_echo"]
+
+
+class TestServerTools:
+    """Tests for the tools registered by the server."""
+
+    @pytest.mark.asyncio
+    async def test_list_tools(self):
+        """Test that list_tools returns every registered tool from the cache."""
+        tools = await list_tools()
+
+        assert await list_tools() is tools
+        assert [tool.name for tool in tools] == tool_registry.names()
+        assert len(tools) == 22
+        assert {name for name in tool_registry.names() if tool_registry.get(name).read_only} == {
+            "list_agents", "list_projects", "get_tasks", "query_all_tasks", "search_tasks", "get_task_history",
+            "get_metrics", "configure_profiling", "get_profile_summary"}
+
+    @pytest.mark.asyncio
+    async def test_unknown_tool(self):
+        """Test that unknown tools are rejected before dispatch."""
+        with pytest.raises(ValueError, match="Unknown tool: missing"):
+            await call_tool("missing", {})
+
+    @pytest.mark.asyncio
+    async def test_plugin_tool_is_dispatched(self):
+        """Test that a tool added to the registry is callable without changing the dispatcher."""
+        registry = ToolRegistry()
+        register_plugin(registry)
+        with patch('taskmateai.server.tool_registry', registry):
+            result = await call_tool("plugin_echo", {"n": 1})
+
+        assert result[0].text == "{'n': 1}"
+
+    @pytest.mark.asyncio
+    async def test_mcp_request_validates_arguments(self, temp_tasks_file_with_data):
+        """Test that MCP tool calls are validated against the input schema."""
+        handler = app.request_handlers[CallToolRequest]
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file_with_data):
+            invalid = await handler(CallToolRequest(params=CallToolRequestParams(
+                name="update_progress", arguments={"task_id": 1, "progress": 150})))
+            valid = await handler(CallToolRequest(params=CallToolRequestParams(
+                name="update_progress", arguments={"task_id": 1, "progress": 50})))
+
+        assert invalid.root.isError
+        assert invalid.root.content[0].text.startswith("Input validation error")
+        assert not valid.root.isError
+        assert "50%" in valid.root.content[0].text
@@ -0,0 +1,142 @@
+"""
+Unit tests for the TaskMateAI unit-of-work transaction.
+"""
+import os
+import sys
+import json
+import pytest
+from unittest.mock import MagicMock, patch
+
+# Add src to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from taskmateai import server
+from taskmateai.transaction import TaskTransaction
+from taskmateai.server import call_tool, read_tasks
+
+
+def make_transaction(tasks):
+    load = MagicMock(return_value=tasks)
+    save = MagicMock()
+    discard = MagicMock()
+    return TaskTransaction(load, save, discard=discard), load, save, discard
+
+
+class TestTaskTransaction:
+    """Tests for the TaskTransaction class."""
+
+    def test_loads_once_and_commits_once(self, mock_tasks):
+        """Test that several changes are loaded and saved once."""
+        tx, load, save, _ = make_transaction(mock_tasks)
+        with tx:
+            tx.set_progress(tx.get(1), 40)
+            tx.add_note(tx.get(2), "n")
+            tx.complete(tx.get(1))
+
+        assert load.call_count == 1
+        assert save.call_count == 1
+        tasks, events = save.call_args[0]
+        assert tasks is mock_tasks
+        assert [e["op"] for e in events] == ["update", "add_note", "update"]
+
+    def test_no_changes_no_write(self, mock_tasks):
+        """Test that a read-only transaction does not write."""
+        tx, load, save, _ = make_transaction(mock_tasks)
+        with tx:
+            assert tx.find(99) is None
+            assert tx.tasks is mock_tasks
+
+        assert load.call_count == 1
+        save.assert_not_called()
+
+    def test_lazy_load(self):
+        """Test that nothing is loaded until tasks are needed."""
+        tx, load, save, _ = make_transaction([])
+        with tx:
+            tx.update({"id": 7}, status="in_progress")
+
+        load.assert_not_called()
+        save.assert_called_once_with(None, [{"op": "update", "id": 7, "set": {"status": "in_progress"}}])
+
+    def test_exception_discards(self, mock_tasks):
+        """Test that an error inside the block skips the save and discards the loaded state."""
+        tx, _, save, discard = make_transaction(mock_tasks)
+        with pytest.raises(KeyError):
+            with tx:
+                tx.complete(tx.get(1))
+                raise KeyError("boom")
+
+        save.assert_not_called()
+        discard.assert_called_once()
+
+    def test_missing_task(self, mock_tasks):
+        """Test that get raises LookupError for unknown IDs."""
+        tx, _, _, _ = make_transaction(mock_tasks)
+        with pytest.raises(LookupError):
+            tx.get(99)
+
+    def test_subtask_rollup(self, mock_tasks):
+        """Test that a subtask update also rolls up the task progress."""
+        tx, _, save, _ = make_transaction(mock_tasks)
+        with tx:
+            assert tx.set_subtask_status(tx.get(1), 99, "done") is None
+            tx.set_subtask_status(tx.get(1), 1, "done")
+
+        events = save.call_args[0][1]
+        assert [e["op"] for e in events] == ["update_subtask", "update"]
+        assert events[1]["set"]["progress"] == 100
+        assert events[1]["set"]["status"] == "done"
+        assert events[1]["set"]["completed_at"] == mock_tasks[0]["completed_at"]
+
+
+class TestToolIO:
+    """Tests that every tool does at most one read and one write."""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("name, arguments, writes", [
+        ("get_tasks", {}, 0),
+        ("get_tasks", {"status": "todo", "limit": 1}, 0),
+        ("get_next_task", {}, 1),
+        ("create_task", {"title": "T", "description": "d", "subtasks": ["a", "b"]}, 1),
+        ("update_progress", {"task_id": 1, "progress": 50}, 1),
+        ("update_progress", {"task_id": 99, "progress": 50}, 0),
+        ("complete_task", {"task_id": 1}, 1),
+        ("add_subtask", {"task_id": 1, "description": "s"}, 1),
+        ("update_subtask", {"task_id": 1, "subtask_id": 1, "status": "done"}, 1),
+        ("update_subtask", {"task_id": 1, "subtask_id": 99, "status": "done"}, 0),
+        ("add_note", {"task_id": 1, "content": "n"}, 0),
+        ("create_tasks", {"tasks": [{"title": "A", "description": "a"}, {"title": "B", "description": "b"}]}, 1),
+        ("update_progress_many", {"updates": [{"task_id": 1, "progress": 10}, {"task_id": 2, "progress": 20}]}, 1),
+        ("complete_tasks", {"task_ids": [1, 2]}, 1),
+        ("add_notes", {"notes": [{"task_id": 1, "content": "a"}, {"task_id": 2, "content": "b"}]}, 0),
+        ("claim_next_tasks", {"claimant": "w", "count": 2}, 1),
+        ("heartbeat", {"task_id": 1, "claimant": "nobody"}, 0),
+    ])
+    async def test_io_count(self, temp_tasks_file_with_data, name, arguments, writes):
+        """Test the number of store reads and writes per tool call."""
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file_with_data), \
+             patch('taskmateai.server.read_tasks', wraps=server.read_tasks) as read, \
+             patch('taskmateai.server.write_tasks', wraps=server.write_tasks) as write, \
+             patch('taskmateai.server.task_writer.writes', 0):
+            result = await call_tool(name, arguments)
+
+            assert "予期せぬエラー" not in result[0].text
+            assert read.call_count == 1
+            assert write.call_count == writes
+            assert server.task_writer.writes == writes
+
+    @pytest.mark.asyncio
+    async def test_update_subtask_single_write(self, temp_tasks_file_with_data):
+        """Test that update_subtask saves the subtask and the rollup together."""
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file_with_data), \
+             patch('taskmateai.server.write_tasks', wraps=server.write_tasks) as write:
+            await call_tool("update_subtask", {"task_id": 1, "subtask_id": 1, "status": "done"})
+            task = read_tasks()[0]
+
+        assert write.call_count == 1
+        assert [e["op"] for e in write.call_args.kwargs["events"]] == ["update_subtask", "update"]
+        assert task["status"] == "done"
+        assert task["progress"] == 100
+
+        with open(temp_tasks_file_with_data) as f:
+            assert json.load(f)[0]["subtasks"][0]["status"] == "done"
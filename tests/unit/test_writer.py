@@ -0,0 +1,191 @@
+"""
+Unit tests for TaskMateAI atomic writes and the write-behind layer.
+"""
+import os
+import sys
+import json
+import threading
+import pytest
+from unittest.mock import patch
+
+# Add src to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from taskmateai.events import create_event, update_event
+from taskmateai.writer import WriteBehind, atomic_write
+from taskmateai.server import call_tool, get_store_key, read_tasks, task_cache
+
+
+class TestAtomicWrite:
+    """Tests for atomic_write."""
+
+    def test_failed_write_keeps_original(self, temp_tasks_file_with_data, mock_tasks):
+        """Test that a crash before the rename leaves the previous file intact."""
+        with patch('taskmateai.writer.os.replace', side_effect=OSError("crash")):
+            with pytest.raises(OSError):
+                atomic_write(temp_tasks_file_with_data, b'[{"id": 1')
+
+        with open(temp_tasks_file_with_data) as f:
+            assert json.load(f) == mock_tasks
+        directory = os.path.dirname(temp_tasks_file_with_data)
+        assert not [n for n in os.listdir(directory) if n.endswith(".tmp")
+                    and n.startswith(os.path.basename(temp_tasks_file_with_data))]
+
+    def test_interrupted_write_is_not_visible(self, temp_tasks_file_with_data, mock_tasks):
+        """Test that read_tasks never sees a half-written file."""
+        real_open = open
+
+        def crashing_open(path, mode='r', *args, **kwargs):
+            f = real_open(path, mode, *args, **kwargs)
+            if 'w' in mode:
+                f.write(b'[{"id": 1, "title": "trunc')
+                f.close()
+                raise OSError("disk full")
+            return f
+
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file_with_data):
+            with patch('builtins.open', crashing_open):
+                with pytest.raises(OSError):
+                    atomic_write(temp_tasks_file_with_data, b'[]')
+            assert read_tasks() == mock_tasks
+
+    @pytest.mark.parametrize("policy, expected", [("always", 2), ("batched", 1), ("off", 0)])
+    def test_fsync_policy(self, temp_tasks_file, policy, expected):
+        """Test how many fsync calls each policy makes."""
+        with patch('taskmateai.writer.os.fsync') as fsync:
+            atomic_write(temp_tasks_file, b'[]', policy)
+        assert fsync.call_count == expected
+
+    def test_invalid_policy(self):
+        """Test that unknown fsync policies are rejected."""
+        with pytest.raises(ValueError):
+            WriteBehind(fsync="sometimes")
+
+
+class TestWriteBehind:
+    """Tests for the WriteBehind class."""
+
+    def test_synchronous_by_default(self, temp_tasks_file):
+        """Test that a zero window writes immediately."""
+        writer = WriteBehind()
+        signature = writer.write(temp_tasks_file, [{"id": 1}])
+
+        assert signature[0] == temp_tasks_file
+        assert writer.pending(temp_tasks_file) is None
+        with open(temp_tasks_file) as f:
+            assert json.load(f) == [{"id": 1}]
+
+    def test_writes_are_coalesced(self, temp_tasks_file):
+        """Test that many writes within the window become one write."""
+        writer = WriteBehind(window=60)
+        written = []
+        tasks = []
+        for i in range(50):
+            tasks.append({"id": i})
+            marker = writer.write(temp_tasks_file, tasks, on_written=lambda old, new: written.append((old, new)))
+
+        assert marker[0] == "pending"
+        assert writer.pending(temp_tasks_file) is tasks
+        assert writer.flush()
+
+        assert writer.writes == 1
+        assert writer.pending(temp_tasks_file) is None
+        assert written[0][0] == marker
+        with open(temp_tasks_file) as f:
+            assert len(json.load(f)) == 50
+
+    def test_failed_flush_is_retried(self, temp_tasks_file):
+        """Test that a failed background write stays pending."""
+        writer = WriteBehind(window=60)
+        writer.write(temp_tasks_file, [{"id": 1}])
+        with patch('taskmateai.writer.atomic_write', side_effect=OSError("disk full")):
+            assert not writer.flush()
+        assert writer.pending(temp_tasks_file) == [{"id": 1}]
+        assert writer.flush()
+
+    def test_flush_merges_external_changes(self, temp_tasks_file):
+        """Test that a flush re-applies pending events on top of another process's write."""
+        atomic_write(temp_tasks_file, b'[{"id": 1, "title": "A"}]')
+        writer = WriteBehind(window=60)
+        written = []
+        mine = {"id": 2, "title": "mine"}
+        writer.write(temp_tasks_file, [{"id": 1, "title": "A"}, mine], lock=threading.RLock(),
+                     on_written=lambda old, new: written.append(new),
+                     events=[create_event(mine), update_event(2, status="done")])
+
+        # Another process creates a task with the same ID while ours is pending
+        atomic_write(temp_tasks_file, b'[{"id": 1, "title": "A"}, {"id": 2, "title": "theirs"}]')
+        assert writer.conflicts(temp_tasks_file)
+        assert writer.flush()
+
+        with open(temp_tasks_file) as f:
+            saved = json.load(f)
+        assert [(t["id"], t["title"]) for t in saved] == [(1, "A"), (2, "theirs"), (3, "mine")]
+        assert saved[2]["status"] == "done" and "status" not in saved[1]
+        assert written == [None]
+        assert writer.merges == 1
+
+    def test_full_write_with_lock_is_synchronous(self, temp_tasks_file):
+        """Test that a locked write without events is not deferred, since it cannot be merged."""
+        writer = WriteBehind(window=60)
+        writer.write(temp_tasks_file, [{"id": 1}], events=[create_event({"id": 1})])
+        signature = writer.write(temp_tasks_file, [{"id": 2}], lock=threading.RLock())
+
+        assert signature[0] == temp_tasks_file
+        assert writer.pending(temp_tasks_file) is None
+        with open(temp_tasks_file) as f:
+            assert json.load(f) == [{"id": 2}]
+
+
+class TestServerWriteBehind:
+    """Tests for write-behind through the tools."""
+
+    @pytest.mark.asyncio
+    async def test_tools_see_pending_state(self, temp_tasks_file_with_data, mock_tasks):
+        """Test that reads see pending changes and the flush revalidates the cache."""
+        writer = WriteBehind(window=60)
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file_with_data), \
+             patch('taskmateai.server.task_writer', writer):
+            for i in range(5):
+                await call_tool("create_task", {"title": f"T{i}", "description": "d"})
+            await call_tool("complete_task", {"task_id": 4})
+
+            assert len(read_tasks()) == 8
+            with open(temp_tasks_file_with_data) as f:
+                assert json.load(f) == mock_tasks
+
+            assert writer.flush()
+            with open(temp_tasks_file_with_data) as f:
+                saved = json.load(f)
+            assert len(saved) == 8
+            assert saved[3]["status"] == "done"
+
+            # The cache entry now matches the file, so no reload is needed
+            entry = task_cache.peek(get_store_key())
+            assert read_tasks() is entry.tasks
+            assert entry.signature[0] == temp_tasks_file_with_data
+
+        assert writer.writes == 1
+
+    @pytest.mark.asyncio
+    async def test_pending_write_is_not_lost(self, temp_tasks_file_with_data, mock_tasks):
+        """Test that another process's write during the window survives and the tool is retried."""
+        writer = WriteBehind(window=60)
+        with patch('taskmateai.server.get_tasks_file_path', return_value=temp_tasks_file_with_data), \
+             patch('taskmateai.server.task_writer', writer):
+            await call_tool("create_task", {"title": "Mine", "description": "d"})
+
+            # Another process completes task 1 while the create is pending
+            external = [dict(t) for t in mock_tasks]
+            external[0]["status"] = "done"
+            atomic_write(temp_tasks_file_with_data, json.dumps(external).encode())
+
+            await call_tool("complete_task", {"task_id": 2})
+            assert writer.flush()
+
+            with open(temp_tasks_file_with_data) as f:
+                saved = {t["id"]: t for t in json.load(f)}
+            assert saved[1]["status"] == "done"
+            assert saved[2]["status"] == "done"
+            assert saved[4]["title"] == "Mine"
+            assert read_tasks() == list(saved.values())